@@ -0,0 +1,14 @@
+-- Migration 037: Unique (video_id, data_coleta) em videos_historico
+-- Necessario para save_videos_data usar upsert(on_conflict="video_id,data_coleta")
+-- em lote (1 chamada por chunk) em vez de SELECT + UPDATE/INSERT por video.
+
+-- 1. Remover snapshots duplicados do mesmo dia (mantem o id mais recente)
+DELETE FROM videos_historico a
+USING videos_historico b
+WHERE a.video_id = b.video_id
+  AND a.data_coleta = b.data_coleta
+  AND a.id < b.id;
+
+-- 2. Constraint usada pelo ON CONFLICT
+CREATE UNIQUE INDEX IF NOT EXISTS idx_videos_historico_video_data_unique
+    ON videos_historico(video_id, data_coleta);
@@ -0,0 +1,35 @@
+-- ============================================================
+-- MIGRATION 038: Ingestao incremental de CTR (Reporting API)
+-- Data: 2026-10-18
+-- Ordem: Rodar ANTES de deployar codigo novo no Railway
+-- ============================================================
+-- O ctr_collector baixava TODOS os CSVs dos ultimos 180 dias toda semana e
+-- re-agregava do zero. Agora:
+--   - yt_ctr_report_ledger: reports ja processados por job (so baixa os novos)
+--   - yt_ctr_video_totals: acumulado por video (impressoes + cliques), onde os
+--     CSVs novos sao somados. yt_video_metrics.impressions/ctr saem daqui.
+
+-- 1. Ledger de reports processados
+CREATE TABLE IF NOT EXISTS yt_ctr_report_ledger (
+    id SERIAL PRIMARY KEY,
+    channel_id VARCHAR(30) NOT NULL,
+    job_id VARCHAR(100) NOT NULL,
+    report_id VARCHAR(100) NOT NULL,
+    report_start DATE,
+    rows_parsed INTEGER DEFAULT 0,
+    processed_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    UNIQUE(job_id, report_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_ctr_report_ledger_channel
+    ON yt_ctr_report_ledger(channel_id);
+
+-- 2. Acumulado por video (CTR ponderado = total_clicks / total_impressions)
+CREATE TABLE IF NOT EXISTS yt_ctr_video_totals (
+    channel_id VARCHAR(30) NOT NULL,
+    video_id VARCHAR(20) NOT NULL,
+    total_impressions BIGINT NOT NULL DEFAULT 0,
+    total_clicks DOUBLE PRECISION NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    PRIMARY KEY (channel_id, video_id)
+);
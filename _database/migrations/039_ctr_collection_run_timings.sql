@@ -0,0 +1,12 @@
+-- ============================================================
+-- MIGRATION 039: Tempo por canal na coleta CTR
+-- Data: 2026-10-18
+-- Ordem: Rodar ANTES de deployar codigo novo no Railway
+-- ============================================================
+-- A coleta CTR agora processa canais em paralelo e grava uma linha por execucao
+-- em ctr_collection_runs. channel_timings guarda, por canal:
+--   [{"channel_id", "proxy", "status", "records", "seconds"}, ...]
+
+ALTER TABLE ctr_collection_runs
+    ADD COLUMN IF NOT EXISTS skipped_count INTEGER DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS channel_timings JSONB;
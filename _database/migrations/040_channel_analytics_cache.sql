@@ -0,0 +1,21 @@
+-- ============================================================
+-- MIGRATION 040: Cache materializado de analytics por canal
+-- Data: 2026-10-18
+-- Ordem: Rodar ANTES de deployar codigo novo no Railway
+-- ============================================================
+-- /api/canais/{canal_id}/analytics recalculava ChannelAnalytics a cada abertura
+-- do modal. Agora a analise de todos os canais ativos e gravada aqui apos a
+-- coleta diaria (build_analytics_cache) e o endpoint so recalcula quando a linha
+-- estiver expirada ou com versao antiga.
+
+CREATE TABLE IF NOT EXISTS channel_analytics_cache (
+    canal_id INTEGER PRIMARY KEY REFERENCES canais_monitorados(id) ON DELETE CASCADE,
+    data JSONB NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1,
+    computed_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    expires_at TIMESTAMPTZ NOT NULL,
+    processing_time_ms INTEGER DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_channel_analytics_cache_expires
+    ON channel_analytics_cache(expires_at);
@@ -0,0 +1,48 @@
+-- ============================================================
+-- MIGRATION 041: Agregados de engajamento no banco
+-- Data: 2026-10-18
+-- Ordem: Rodar ANTES de deployar codigo novo no Railway
+-- ============================================================
+-- get_canal_engagement_data fazia select('*') de TODOS os comentarios do canal e
+-- contava sentimentos em Python (picos de memoria em canais com 50k+ comentarios).
+-- Agora as contagens vem destas RPCs e as listas de comentarios sao buscadas
+-- paginadas por categoria (indice abaixo).
+
+-- 1. Contagem por video e sentimento (videos_summary)
+CREATE OR REPLACE FUNCTION get_canal_engagement_summary(p_canal_id INTEGER)
+RETURNS TABLE(
+    video_id TEXT,
+    video_title TEXT,
+    total_comments BIGINT,
+    positive_count BIGINT,
+    negative_count BIGINT,
+    neutral_count BIGINT,
+    problem_count BIGINT
+) AS $$
+    SELECT
+        video_id::TEXT,
+        MAX(video_title)::TEXT,
+        COUNT(*),
+        COUNT(*) FILTER (WHERE sentiment_category = 'positive'),
+        COUNT(*) FILTER (WHERE sentiment_category = 'negative'),
+        COUNT(*) FILTER (WHERE sentiment_category IS NULL
+                           OR sentiment_category NOT IN ('positive', 'negative', 'problem')),
+        COUNT(*) FILTER (WHERE sentiment_category = 'problem')
+    FROM video_comments
+    WHERE canal_id = p_canal_id
+    GROUP BY video_id
+    ORDER BY COUNT(*) DESC;
+$$ LANGUAGE sql STABLE;
+
+-- 2. Problemas por tipo (actionable_breakdown)
+CREATE OR REPLACE FUNCTION get_canal_problem_breakdown(p_canal_id INTEGER)
+RETURNS TABLE(problem_type TEXT, count BIGINT) AS $$
+    SELECT COALESCE(problem_type, 'other')::TEXT, COUNT(*)
+    FROM video_comments
+    WHERE canal_id = p_canal_id AND sentiment_category = 'problem'
+    GROUP BY 1;
+$$ LANGUAGE sql STABLE;
+
+-- 3. Listas por categoria paginadas (ordem por likes)
+CREATE INDEX IF NOT EXISTS idx_video_comments_canal_sentiment_likes
+    ON video_comments(canal_id, sentiment_category, like_count DESC);
@@ -0,0 +1,38 @@
+-- ============================================================
+-- MIGRATION 042: Rebuild incremental do engagement_cache
+-- Data: 2026-10-18
+-- Ordem: Rodar ANTES de deployar codigo novo no Railway
+-- ============================================================
+-- build_engagement_cache so reprocessa canais cujos video_comments mudaram depois
+-- do processed_at do cache. Para isso:
+--   - updated_at e mantido pelo banco em TODO update (varios fluxos atualizam
+--     traducao/resposta sem mexer em updated_at)
+--   - get_comments_last_change_by_canal(): ultima mudanca por canal em 1 query
+
+-- 1. updated_at automatico
+ALTER TABLE video_comments ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE;
+ALTER TABLE video_comments ALTER COLUMN updated_at SET DEFAULT now();
+
+CREATE OR REPLACE FUNCTION set_video_comments_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = now();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_video_comments_updated_at ON video_comments;
+CREATE TRIGGER trg_video_comments_updated_at
+    BEFORE UPDATE ON video_comments
+    FOR EACH ROW EXECUTE FUNCTION set_video_comments_updated_at();
+
+-- 2. Ultima mudanca por canal
+CREATE INDEX IF NOT EXISTS idx_video_comments_canal_updated
+    ON video_comments(canal_id, updated_at DESC);
+
+CREATE OR REPLACE FUNCTION get_comments_last_change_by_canal()
+RETURNS TABLE(canal_id INTEGER, last_change TIMESTAMPTZ) AS $$
+    SELECT canal_id, MAX(updated_at)
+    FROM video_comments
+    GROUP BY canal_id;
+$$ LANGUAGE sql STABLE;
@@ -0,0 +1,68 @@
+-- ============================================================
+-- MIGRATION 043: Matriz de status dos agentes em 1 query (Mission Control)
+-- Data: 2026-10-18
+-- Ordem: Rodar ANTES de deployar codigo novo no Railway
+-- ============================================================
+-- get_agent_real_status fazia 1 query .limit(1) por agente por canal e
+-- get_agent_overview_batch lia as ultimas 100 execucoes de cada tabela e
+-- deduplicava em Python (canais sumiam quando as execucoes se acumulavam).
+-- get_agent_latest_runs(): ultima execucao de cada agente por canal
+-- (DISTINCT ON sobre o indice channel_id, run_date DESC de cada tabela).
+-- p_channel_id NULL = todos os canais.
+
+CREATE INDEX IF NOT EXISTS idx_copy_runs_channel_date ON copy_analysis_runs(channel_id, run_date DESC);
+CREATE INDEX IF NOT EXISTS idx_satisfaction_runs_channel_date ON satisfaction_analysis_runs(channel_id, run_date DESC);
+CREATE INDEX IF NOT EXISTS idx_authenticity_runs_channel_date ON authenticity_analysis_runs(channel_id, run_date DESC);
+CREATE INDEX IF NOT EXISTS idx_theme_runs_channel_date ON theme_analysis_runs(channel_id, run_date DESC);
+CREATE INDEX IF NOT EXISTS idx_motor_runs_channel_date ON motor_analysis_runs(channel_id, run_date DESC);
+CREATE INDEX IF NOT EXISTS idx_prod_order_channel_date ON production_order_runs(channel_id, run_date DESC);
+
+CREATE OR REPLACE FUNCTION get_agent_latest_runs(p_channel_id VARCHAR DEFAULT NULL)
+RETURNS TABLE(agent TEXT, channel_id VARCHAR, run_date TIMESTAMPTZ, data JSONB) AS $$
+    (SELECT DISTINCT ON (r.channel_id) 'estrutura_copy', r.channel_id, r.run_date,
+            jsonb_build_object('total_videos_analyzed', r.total_videos_analyzed,
+                               'channel_avg_retention', r.channel_avg_retention)
+     FROM copy_analysis_runs r
+     WHERE p_channel_id IS NULL OR r.channel_id = p_channel_id
+     ORDER BY r.channel_id, r.run_date DESC)
+    UNION ALL
+    (SELECT DISTINCT ON (r.channel_id) 'satisfacao', r.channel_id, r.run_date,
+            jsonb_build_object('total_videos_analyzed', r.total_videos_analyzed,
+                               'channel_avg_approval', r.channel_avg_approval)
+     FROM satisfaction_analysis_runs r
+     WHERE p_channel_id IS NULL OR r.channel_id = p_channel_id
+     ORDER BY r.channel_id, r.run_date DESC)
+    UNION ALL
+    (SELECT DISTINCT ON (r.channel_id) 'autenticidade', r.channel_id, r.run_date,
+            jsonb_build_object('authenticity_score', r.authenticity_score,
+                               'authenticity_level', r.authenticity_level,
+                               'has_alerts', r.has_alerts)
+     FROM authenticity_analysis_runs r
+     WHERE p_channel_id IS NULL OR r.channel_id = p_channel_id
+     ORDER BY r.channel_id, r.run_date DESC)
+    UNION ALL
+    (SELECT DISTINCT ON (r.channel_id) 'temas', r.channel_id, r.run_date,
+            jsonb_build_object('total_videos_analyzed', r.total_videos_analyzed,
+                               'theme_count', r.theme_count,
+                               -- So o primeiro item do ranking e usado no status
+                               'ranking_json', CASE WHEN jsonb_typeof(r.ranking_json) = 'array'
+                                                    THEN jsonb_build_array(r.ranking_json -> 0)
+                                                    ELSE r.ranking_json END)
+     FROM theme_analysis_runs r
+     WHERE p_channel_id IS NULL OR r.channel_id = p_channel_id
+     ORDER BY r.channel_id, r.run_date DESC)
+    UNION ALL
+    (SELECT DISTINCT ON (r.channel_id) 'motores', r.channel_id, r.run_date,
+            jsonb_build_object('total_videos', r.total_videos,
+                               'motor_counts_json', r.motor_counts_json)
+     FROM motor_analysis_runs r
+     WHERE p_channel_id IS NULL OR r.channel_id = p_channel_id
+     ORDER BY r.channel_id, r.run_date DESC)
+    UNION ALL
+    (SELECT DISTINCT ON (r.channel_id) 'ordenador', r.channel_id, r.run_date,
+            jsonb_build_object('total_scripts', r.total_scripts,
+                               'channel_health', r.channel_health)
+     FROM production_order_runs r
+     WHERE p_channel_id IS NULL OR r.channel_id = p_channel_id
+     ORDER BY r.channel_id, r.run_date DESC);
+$$ LANGUAGE sql STABLE;
@@ -0,0 +1,11 @@
+-- ============================================================
+-- MIGRATION 044: Duracao por canal no upload diario
+-- Data: 2026-10-18
+-- Ordem: Rodar ANTES de deployar codigo novo no Railway
+-- ============================================================
+-- execute_daily_upload processa varios canais em paralelo. Cada registro de
+-- yt_canal_upload_diario guarda quanto tempo o canal levou (planilha + fila +
+-- upload), para achar gargalos por canal.
+
+ALTER TABLE yt_canal_upload_diario
+    ADD COLUMN IF NOT EXISTS duracao_segundos NUMERIC(10, 1);
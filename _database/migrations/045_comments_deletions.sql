@@ -0,0 +1,46 @@
+-- ============================================================
+-- MIGRATION 045: Remocao de comentarios conta como mudanca do canal
+-- Data: 2026-10-18
+-- Ordem: Rodar ANTES de deployar codigo novo no Railway
+-- ============================================================
+-- DELETE em video_comments nao mexe em MAX(updated_at), entao o rebuild
+-- incremental do engagement_cache (migration 042) nao via a remocao.
+-- Guardamos a ultima remocao por canal e a RPC usa a maior das duas datas.
+
+-- 1. Ultima remocao por canal
+CREATE TABLE IF NOT EXISTS video_comments_deletions (
+    canal_id INTEGER PRIMARY KEY,
+    deleted_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION track_video_comments_deletions()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO video_comments_deletions (canal_id, deleted_at)
+    SELECT DISTINCT canal_id, now()
+    FROM old_rows
+    WHERE canal_id IS NOT NULL
+    ON CONFLICT (canal_id) DO UPDATE SET deleted_at = EXCLUDED.deleted_at;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Por statement (transition table): DELETE em massa da limpeza = 1 insert
+DROP TRIGGER IF EXISTS trg_video_comments_deletions ON video_comments;
+CREATE TRIGGER trg_video_comments_deletions
+    AFTER DELETE ON video_comments
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION track_video_comments_deletions();
+
+-- 2. Ultima mudanca por canal = max(updated_at, ultima remocao)
+CREATE OR REPLACE FUNCTION get_comments_last_change_by_canal()
+RETURNS TABLE(canal_id INTEGER, last_change TIMESTAMPTZ) AS $$
+    SELECT COALESCE(c.canal_id, d.canal_id),
+           GREATEST(c.last_update, d.deleted_at)
+    FROM (
+        SELECT canal_id, MAX(updated_at) AS last_update
+        FROM video_comments
+        GROUP BY canal_id
+    ) c
+    FULL OUTER JOIN video_comments_deletions d ON d.canal_id = c.canal_id;
+$$ LANGUAGE sql STABLE;
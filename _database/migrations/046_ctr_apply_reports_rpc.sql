@@ -0,0 +1,59 @@
+-- ============================================================
+-- MIGRATION 046: Soma de reports de CTR atomica com o ledger
+-- Data: 2026-10-18
+-- Ordem: Rodar ANTES de deployar codigo novo no Railway
+-- ============================================================
+-- O ctr_collector lia yt_ctr_video_totals, somava em Python, gravava em lotes
+-- e so depois registrava o ledger. Falha entre os passos fazia a proxima coleta
+-- somar os mesmos reports de novo.
+--
+-- apply_ctr_reports(): numa unica transacao insere os reports no ledger
+-- (ON CONFLICT DO NOTHING) e soma aos acumulados SO os deltas dos reports que
+-- entraram agora -> idempotente por report_id. Retorna os acumulados dos videos
+-- tocados.
+--
+-- p_reports: [{report_id, report_start, rows_parsed,
+--              totals: [{video_id, impressions, clicks}]}]
+
+CREATE OR REPLACE FUNCTION apply_ctr_reports(
+    p_channel_id VARCHAR,
+    p_job_id VARCHAR,
+    p_reports JSONB
+)
+RETURNS TABLE(video_id VARCHAR, total_impressions BIGINT, total_clicks DOUBLE PRECISION) AS $$
+#variable_conflict use_column
+BEGIN
+    RETURN QUERY
+    WITH reports AS (
+        SELECT r->>'report_id' AS report_id,
+               (r->>'report_start')::DATE AS report_start,
+               COALESCE((r->>'rows_parsed')::INTEGER, 0) AS rows_parsed,
+               r->'totals' AS totals
+        FROM jsonb_array_elements(p_reports) r
+    ),
+    inserted AS (
+        INSERT INTO yt_ctr_report_ledger (channel_id, job_id, report_id, report_start, rows_parsed)
+        SELECT p_channel_id, p_job_id, report_id, report_start, rows_parsed
+        FROM reports
+        ON CONFLICT (job_id, report_id) DO NOTHING
+        RETURNING report_id
+    ),
+    deltas AS (
+        SELECT t->>'video_id' AS video_id,
+               SUM((t->>'impressions')::BIGINT) AS impressions,
+               SUM((t->>'clicks')::DOUBLE PRECISION) AS clicks
+        FROM reports r
+        JOIN inserted i ON i.report_id = r.report_id
+        CROSS JOIN LATERAL jsonb_array_elements(COALESCE(r.totals, '[]'::jsonb)) t
+        GROUP BY 1
+    )
+    INSERT INTO yt_ctr_video_totals AS v (channel_id, video_id, total_impressions, total_clicks, updated_at)
+    SELECT p_channel_id, d.video_id, d.impressions, d.clicks, now()
+    FROM deltas d
+    ON CONFLICT (channel_id, video_id) DO UPDATE SET
+        total_impressions = v.total_impressions + EXCLUDED.total_impressions,
+        total_clicks = v.total_clicks + EXCLUDED.total_clicks,
+        updated_at = now()
+    RETURNING v.video_id, v.total_impressions, v.total_clicks;
+END;
+$$ LANGUAGE plpgsql;
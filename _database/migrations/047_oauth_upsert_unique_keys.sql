@@ -0,0 +1,45 @@
+-- ============================================================
+-- MIGRATION 047: Chaves unicas dos upserts em lote da coleta OAuth
+-- Data: 2026-10-18
+-- Ordem: Rodar ANTES de deployar codigo novo no Railway
+-- ============================================================
+-- monetization_oauth_collector grava yt_daily_metrics e yt_video_metrics com
+-- POST ?on_conflict=... (resolution=merge-duplicates). O PostgREST so aceita
+-- on_conflict se existir constraint/indice UNIQUE exatamente nessas colunas.
+--
+-- As constraints ja constam do schema original
+-- (_archives/referencia/documentacao-completa/05_DATABASE_SCHEMA.md:
+--  UNIQUE(channel_id, date) e UNIQUE(channel_id, video_id)); esta migration so
+-- garante que existam no banco. No-op onde ja existem.
+-- Se houver linhas duplicadas, o ADD CONSTRAINT falha: deduplicar antes.
+
+DO $$
+BEGIN
+    -- yt_daily_metrics: 1 linha por (channel_id, date)
+    IF NOT EXISTS (
+        SELECT 1
+        FROM pg_index i
+        WHERE i.indrelid = 'yt_daily_metrics'::regclass
+          AND i.indisunique
+          AND (SELECT array_agg(a.attname::text ORDER BY a.attname)
+               FROM pg_attribute a
+               WHERE a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)) = ARRAY['channel_id', 'date']
+    ) THEN
+        ALTER TABLE yt_daily_metrics
+            ADD CONSTRAINT yt_daily_metrics_channel_id_date_key UNIQUE (channel_id, date);
+    END IF;
+
+    -- yt_video_metrics: 1 linha por (channel_id, video_id)
+    IF NOT EXISTS (
+        SELECT 1
+        FROM pg_index i
+        WHERE i.indrelid = 'yt_video_metrics'::regclass
+          AND i.indisunique
+          AND (SELECT array_agg(a.attname::text ORDER BY a.attname)
+               FROM pg_attribute a
+               WHERE a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)) = ARRAY['channel_id', 'video_id']
+    ) THEN
+        ALTER TABLE yt_video_metrics
+            ADD CONSTRAINT yt_video_metrics_channel_id_video_id_key UNIQUE (channel_id, video_id);
+    END IF;
+END $$;
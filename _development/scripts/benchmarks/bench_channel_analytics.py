@@ -0,0 +1,119 @@
+"""
+Benchmark do ChannelAnalytics: loops em Python vs NumPy vetorizado
+Data: 18/10/2026
+
+Gera um dataset sintético (por padrão 1.000 canais, ~40 vídeos de 30d e 60 dias de
+histórico por canal), roda a implementação de referência (analyze_channel_legacy) e a
+vetorizada (ChannelArrays + analyze_arrays) e compara tempo e saída.
+
+Não acessa o Supabase.
+
+Uso:
+    python _development/scripts/benchmarks/bench_channel_analytics.py --canais 1000 --videos 40
+"""
+
+import argparse
+import io
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+# Configurar encoding UTF-8 para Windows
+sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
+
+from analytics import ChannelAnalytics, ChannelArrays, TEMAS  # noqa: E402
+
+PALAVRAS = [kw for kws in TEMAS.values() for kw in kws] + ['segredo', 'história', 'império', 'verdade', 'antiga']
+
+
+def gerar_canal(canal_id: int, n_videos: int, now: datetime, rng: random.Random):
+    canal = {
+        'id': canal_id, 'nome_canal': f'Canal {canal_id}', 'subnicho': 'Historia', 'lingua': 'pt',
+        'tipo': 'nosso', 'url_canal': f'https://youtube.com/@canal{canal_id}',
+        'inscritos_atual': rng.randint(1_000, 500_000)
+    }
+
+    videos = []
+    for i in range(rng.randint(n_videos // 2, n_videos * 3 // 2)):
+        pub = now - timedelta(days=rng.uniform(0, 30), hours=rng.randint(0, 23))
+        titulo = ' '.join(rng.choice(PALAVRAS) for _ in range(rng.randint(3, 8)))
+        if rng.random() < 0.3:
+            titulo += f' {rng.randint(1, 100)}'
+        if rng.random() < 0.2:
+            titulo += '?'
+        views = int(rng.lognormvariate(9, 1.5))
+        videos.append({
+            'video_id': f'v{canal_id}_{i}', 'titulo': titulo, 'url_video': '',
+            'data_publicacao': pub.isoformat(), 'views_atuais': views,
+            'likes': views // rng.randint(20, 60), 'comentarios': views // rng.randint(200, 900),
+            'duracao': rng.randint(60, 3600)
+        })
+    videos.sort(key=lambda v: v['views_atuais'], reverse=True)
+
+    historico = []
+    base = rng.randint(10_000, 1_000_000)
+    engagement = rng.uniform(1, 8)
+    for d in range(60, 0, -1):
+        base = max(0, int(base * rng.uniform(0.85, 1.2)))
+        engagement = max(0.0, engagement + rng.uniform(-0.3, 0.2))
+        historico.append({
+            'data_coleta': (now - timedelta(days=d)).date().isoformat(),
+            'views_7d': base, 'views_15d': base * 2, 'views_30d': base * 4,
+            'inscritos_diff': rng.randint(-50, 500), 'engagement_rate': round(engagement, 2)
+        })
+
+    return canal, videos, historico
+
+
+def normalizar(resultado: dict) -> dict:
+    """Remove campos sem ordem garantida (keywords vêm de um set)"""
+    for padrao in resultado.get('padroes', []):
+        if 'keywords' in padrao:
+            padrao['keywords'] = sorted(padrao['keywords'])
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark ChannelAnalytics (loops vs NumPy)')
+    parser.add_argument('--canais', type=int, default=1000)
+    parser.add_argument('--videos', type=int, default=40, help='média de vídeos (30d) por canal')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    now = datetime.now(timezone.utc)
+    dataset = [gerar_canal(i, args.videos, now, rng) for i in range(1, args.canais + 1)]
+    total_videos = sum(len(v) for _, v, _ in dataset)
+    print(f'Dataset sintético: {args.canais} canais, {total_videos} vídeos, {args.canais * 60} linhas de histórico')
+
+    analyzer = ChannelAnalytics(db_client=None)
+
+    start = time.perf_counter()
+    legacy = {c['id']: analyzer.analyze_channel_legacy(c, v, h) for c, v, h in dataset}
+    legacy_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    arrays = [(c, ChannelArrays(v, h, now)) for c, v, h in dataset]
+    convert_s = time.perf_counter() - start
+    start = time.perf_counter()
+    vectorized = {c['id']: analyzer.analyze_arrays(c, arr) for c, arr in arrays}
+    analyze_s = time.perf_counter() - start
+
+    divergentes = [cid for cid in legacy if normalizar(legacy[cid]) != normalizar(vectorized[cid])]
+
+    print(f'Loops (Python):      {legacy_s * 1000:9.1f} ms  ({legacy_s / args.canais * 1000:.2f} ms/canal)')
+    print(f'NumPy - conversão:   {convert_s * 1000:9.1f} ms')
+    print(f'NumPy - análises:    {analyze_s * 1000:9.1f} ms')
+    total_np = convert_s + analyze_s
+    print(f'NumPy - total:       {total_np * 1000:9.1f} ms  ({total_np / args.canais * 1000:.2f} ms/canal)')
+    print(f'Speedup (total):     {legacy_s / total_np:9.2f}x')
+    print(f'Speedup (análises):  {legacy_s / analyze_s:9.2f}x')
+    print(f'Saídas divergentes:  {len(divergentes)} / {args.canais}' + (f'  ex: {divergentes[:5]}' if divergentes else ''))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark de latência de endpoints sob carga concorrente
+Data: 18/10/2026
+
+Dispara N requisições com C clientes simultâneos contra um endpoint do dashboard
+e imprime p50/p95/p99. Rodar antes e depois de uma mudança para comparar.
+
+Uso:
+    python _development/scripts/benchmarks/bench_endpoint_latency.py \
+        --url http://localhost:8000/api/canais-tabela --requests 200 --concurrency 20
+
+    # Mede o event loop: enquanto /api/canais-tabela é martelado, /health deve continuar rápido
+    python _development/scripts/benchmarks/bench_endpoint_latency.py \
+        --url http://localhost:8000/api/canais-tabela --probe http://localhost:8000/health
+"""
+
+import argparse
+import asyncio
+import sys
+import io
+import time
+from typing import List, Optional
+
+import httpx
+
+# Configurar encoding UTF-8 para Windows
+sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round((pct / 100) * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+async def run_load(url: str, total: int, concurrency: int, headers: dict) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    bytes_total = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(timeout=120, headers=headers) as client:
+        async def one():
+            nonlocal errors, bytes_total
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    resp = await client.get(url)
+                    bytes_total += len(resp.content)
+                    if resp.status_code >= 400:
+                        errors += 1
+                except Exception:
+                    errors += 1
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        wall_start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        wall = time.perf_counter() - wall_start
+
+    return {
+        "requests": total,
+        "errors": errors,
+        "wall_s": wall,
+        "rps": total / wall if wall > 0 else 0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "avg_bytes": bytes_total / max(1, total - errors),
+    }
+
+
+async def run_probe(url: str, stop: asyncio.Event, headers: dict) -> List[float]:
+    latencies = []
+    async with httpx.AsyncClient(timeout=60, headers=headers) as client:
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                await client.get(url)
+            except Exception:
+                pass
+            latencies.append((time.perf_counter() - start) * 1000)
+            await asyncio.sleep(0.1)
+    return latencies
+
+
+def print_result(label: str, r: dict):
+    print(f"{label}: {r['requests']} reqs, {r['errors']} erros, {r['wall_s']:.1f}s, {r['rps']:.1f} req/s")
+    print(f"   p50={r['p50']:.0f}ms  p95={r['p95']:.0f}ms  p99={r['p99']:.0f}ms  ~{r['avg_bytes'] / 1024:.1f}KB/resp")
+
+
+async def main(args):
+    headers = {}
+    if args.token:
+        headers["Authorization"] = f"Bearer {args.token}"
+    if args.accept_encoding:
+        headers["Accept-Encoding"] = args.accept_encoding
+
+    print("=" * 70)
+    print(f"BENCHMARK {args.url}")
+    print(f"{args.requests} requisições, {args.concurrency} concorrentes")
+    print("=" * 70)
+
+    probe_task: Optional[asyncio.Task] = None
+    stop = asyncio.Event()
+    if args.probe:
+        probe_task = asyncio.create_task(run_probe(args.probe, stop, headers))
+
+    result = await run_load(args.url, args.requests, args.concurrency, headers)
+    print_result("Carga", result)
+
+    if probe_task:
+        stop.set()
+        probe = await probe_task
+        print(f"Probe {args.probe}: {len(probe)} amostras  p50={percentile(probe, 50):.0f}ms  p95={percentile(probe, 95):.0f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de latência de endpoints")
+    parser.add_argument("--url", required=True)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--probe", help="Endpoint leve medido em paralelo (detecta event loop bloqueado)")
+    parser.add_argument("--token", help="JWT opcional (Authorization: Bearer)")
+    parser.add_argument("--accept-encoding", dest="accept_encoding", help="Ex: gzip, br")
+    asyncio.run(main(parser.parse_args()))
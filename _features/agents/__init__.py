@@ -14,6 +14,7 @@
 # ========================================
 
 from .base import BaseAgent, AgentResult
+from .dataset import VideoDataset
 from .scout_agent import ScoutAgent
 from .trend_agent import TrendAgent
 from .pattern_agent import PatternAgent
@@ -32,6 +33,7 @@ from .ai_title_agent import AITitleAgent
 __all__ = [
     'BaseAgent',
     'AgentResult',
+    'VideoDataset',
     'ScoutAgent',
     'TrendAgent',
     'PatternAgent',
@@ -141,37 +141,26 @@ class AdvisorAgent(BaseAgent):
         Sucesso = views > 50K nos ultimos 30 dias.
         """
         try:
-            cutoff_date = (datetime.now(timezone.utc) - timedelta(days=30)).isoformat()
-
-            all_videos = []
-            batch_size = 1000
-            offset = 0
-
-            while True:
-                response = self.db.supabase.table("videos_historico")\
-                    .select("*, canais_monitorados!inner(id, nome_canal, subnicho, lingua, tipo)")\
-                    .gte("data_publicacao", cutoff_date)\
-                    .gte("views_atuais", 50000)\
-                    .eq("canais_monitorados.tipo", "minerado")\
-                    .range(offset, offset + batch_size - 1)\
-                    .execute()
-
-                if not response.data:
-                    break
-
-                all_videos.extend(response.data)
-
-                if len(response.data) < batch_size:
-                    break
+            if self.dataset is not None:
+                return self.dataset.records(
+                    published_since=datetime.now(timezone.utc) - timedelta(days=30),
+                    min_views=50000,
+                    tipo="minerado"
+                )
 
-                offset += batch_size
+            cutoff_date = (datetime.now(timezone.utc) - timedelta(days=30)).isoformat()
 
-            # Deduplicar
+            # Deduplicar - streaming paginado (keyset), sem acumular o historico
             videos_dict = {}
-            for video in all_videos:
-                video_id = video.get("video_id")
-                if video_id not in videos_dict:
-                    videos_dict[video_id] = video
+            async for page in self.db.iter_records(
+                "videos_historico",
+                "*, canais_monitorados!inner(id, nome_canal, subnicho, lingua, tipo)",
+                apply=lambda q: q.gte("data_publicacao", cutoff_date).gte("views_atuais", 50000).eq("canais_monitorados.tipo", "minerado")
+            ):
+                for video in page:
+                    video_id = video.get("video_id")
+                    if video_id not in videos_dict:
+                        videos_dict[video_id] = video
 
             return list(videos_dict.values())
 
@@ -81,6 +81,8 @@ class BaseAgent(ABC):
         self.status = AgentStatus.IDLE
         self.last_run: Optional[datetime] = None
         self.last_result: Optional[AgentResult] = None
+        # VideoDataset da execucao atual (setado pelo orchestrator em run_all; None = busca propria)
+        self.dataset = None
 
     @property
     @abstractmethod
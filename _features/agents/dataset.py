@@ -0,0 +1,173 @@
+# ========================================
+# VIDEO DATASET - Snapshot compartilhado entre agentes
+# ========================================
+# Funcao: Carregar videos_historico UMA vez por execucao do orchestrator
+#         (ultima coleta de cada video) e entregar a todos os agentes
+# Custo: ZERO (1 leitura paginada do Supabase por run_all)
+# ========================================
+
+import sys
+import time
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Mesmo select usado pelos agentes (video + info do canal)
+VIDEO_SELECT = "*, canais_monitorados!inner(id, nome_canal, subnicho, lingua, tipo)"
+CANAL_FIELD = "canais_monitorados"
+
+
+def _parse_ts(value: Any) -> Optional[float]:
+    """Converte timestamp do Supabase (ISO, com ou sem timezone) em epoch UTC."""
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except (ValueError, TypeError):
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+class VideoDataset:
+    """
+    Ultima coleta de cada video de videos_historico, em formato colunar.
+
+    - Colunas: {campo: [valor por video]} (uma lista por campo, nao um dict por video)
+    - Canais: dict por canal_id, compartilhado pelos videos do canal
+    - Somente leitura: records() sem filtro devolve sempre a mesma lista (montada 1x
+      e compartilhada pelos agentes em paralelo) - agentes nao alteram os dicts
+    """
+
+    def __init__(self):
+        self.columns: Dict[str, List[Any]] = {}
+        self.canais: Dict[Any, Dict] = {}
+        self._canal_ids: List[Any] = []
+        self._published_ts: List[Optional[float]] = []
+        self._index: Dict[str, int] = {}
+        self._all_records: Optional[List[Dict]] = None
+        self.snapshots_read = 0
+        self.load_seconds = 0.0
+
+    def __len__(self) -> int:
+        return len(self._canal_ids)
+
+    @classmethod
+    async def load(cls, db_client) -> "VideoDataset":
+        """Le videos_historico (streaming keyset) e mantem so a coleta mais recente por video."""
+        dataset = cls()
+        start = time.monotonic()
+        async for page in db_client.iter_records("videos_historico", VIDEO_SELECT):
+            for row in page:
+                dataset._add(row)
+        dataset.load_seconds = time.monotonic() - start
+        logger.info(
+            f"[VideoDataset] {len(dataset)} videos ({dataset.snapshots_read} coletas lidas) "
+            f"em {dataset.load_seconds:.1f}s, ~{dataset.approx_size_bytes() / 1024 / 1024:.1f}MB"
+        )
+        return dataset
+
+    def _add(self, row: Dict):
+        self.snapshots_read += 1
+        video_id = row.get("video_id")
+        position = self._index.get(video_id)
+        if position is not None:
+            current = self.columns.get("data_coleta", [None] * len(self))[position] or ""
+            if (row.get("data_coleta") or "") <= current:
+                return
+        else:
+            position = len(self)
+            self._index[video_id] = position
+            self._canal_ids.append(None)
+            self._published_ts.append(None)
+            for values in self.columns.values():
+                values.append(None)
+
+        self._all_records = None
+        canal = row.get(CANAL_FIELD) or {}
+        canal_id = row.get("canal_id", canal.get("id"))
+        if canal_id not in self.canais:
+            self.canais[canal_id] = dict(canal)
+        self._canal_ids[position] = canal_id
+        self._published_ts[position] = _parse_ts(row.get("data_publicacao"))
+
+        for field, value in row.items():
+            if field == CANAL_FIELD:
+                continue
+            values = self.columns.get(field)
+            if values is None:
+                # Campo novo no meio da carga: preenche os videos anteriores com None
+                values = self.columns[field] = [None] * len(self)
+            values[position] = value
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+
+    def column(self, field: str) -> List[Any]:
+        """Coluna inteira (nao alterar - lista compartilhada entre agentes)."""
+        return self.columns.get(field, [None] * len(self))
+
+    def _positions(self, published_since: Optional[datetime] = None, min_views: Optional[int] = None,
+                   tipo: Optional[str] = None) -> Iterable[int]:
+        since_ts = published_since.timestamp() if published_since else None
+        views = self.column("views_atuais")
+        for position, canal_id in enumerate(self._canal_ids):
+            if tipo is not None and self.canais[canal_id].get("tipo") != tipo:
+                continue
+            if min_views is not None and (views[position] or 0) < min_views:
+                continue
+            if since_ts is not None:
+                published = self._published_ts[position]
+                if published is None or published < since_ts:
+                    continue
+            yield position
+
+    def records(self, published_since: Optional[datetime] = None, min_views: Optional[int] = None,
+                tipo: Optional[str] = None) -> List[Dict]:
+        """
+        Videos filtrados no formato dos selects dos agentes
+        (campos de videos_historico + "canais_monitorados": {...}).
+
+        Sem filtro: lista montada na primeira chamada e reutilizada (nao alterar).
+        """
+        unfiltered = published_since is None and min_views is None and tipo is None
+        if unfiltered and self._all_records is not None:
+            return self._all_records
+
+        fields = list(self.columns.items())
+        records = []
+        for position in self._positions(published_since, min_views, tipo):
+            record = {field: values[position] for field, values in fields}
+            record[CANAL_FIELD] = self.canais[self._canal_ids[position]]
+            records.append(record)
+
+        if unfiltered:
+            self._all_records = records
+        return records
+
+    # ------------------------------------------------------------------
+    # Metricas
+    # ------------------------------------------------------------------
+
+    def approx_size_bytes(self) -> int:
+        """Estimativa da memoria ocupada pelas colunas + canais."""
+        size = sys.getsizeof(self._canal_ids) + sys.getsizeof(self._published_ts) + sys.getsizeof(self._index)
+        for values in self.columns.values():
+            size += sys.getsizeof(values) + sum(sys.getsizeof(v) for v in values)
+        for canal in self.canais.values():
+            size += sys.getsizeof(canal) + sum(sys.getsizeof(v) for v in canal.values())
+        return size
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "videos": len(self),
+            "snapshots_read": self.snapshots_read,
+            "canais": len(self.canais),
+            "columns": len(self.columns),
+            "load_seconds": round(self.load_seconds, 2),
+            "approx_size_mb": round(self.approx_size_bytes() / 1024 / 1024, 2)
+        }
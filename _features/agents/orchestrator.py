@@ -7,12 +7,13 @@
 
 import logging
 import asyncio
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, List, Optional
 
 import os
 
 from .base import BaseAgent, AgentResult, AgentStatus
+from .dataset import VideoDataset
 from .scout_agent import ScoutAgent
 from .trend_agent import TrendAgent
 from .pattern_agent import PatternAgent
@@ -79,6 +80,8 @@ class AgentOrchestrator:
         # Resultados da ultima execucao
         self.last_results: Dict[str, AgentResult] = {}
         self.last_run: Optional[datetime] = None
+        # Carga do dataset compartilhado na ultima execucao (tempo + memoria)
+        self.last_dataset_stats: Optional[Dict[str, Any]] = None
 
         logger.info(f"Orchestrator initialized with {len(self.agents)} agents")
 
@@ -90,7 +93,8 @@ class AgentOrchestrator:
             parallel: Se True, executa agentes em paralelo (mais rapido)
 
         Returns:
-            Dicionario com resultados de cada agente
+            Dicionario com resultados de cada agente + "VideoDataset"
+            (tempo de carga e memoria do dataset compartilhado em metrics)
         """
         logger.info("=" * 80)
         logger.info("INICIANDO EXECUCAO DE TODOS OS AGENTES")
@@ -130,6 +134,9 @@ class AgentOrchestrator:
         scout_agent = ["ScoutAgent"]
 
         try:
+            # Dataset compartilhado: videos_historico lido 1x e entregue a todos os agentes
+            await self._attach_dataset()
+
             # Fase 1: Analise de dados
             logger.info("-" * 40)
             logger.info("FASE 1: Analise de dados")
@@ -176,6 +183,8 @@ class AgentOrchestrator:
             logger.error(f"Erro durante execucao dos agentes: {e}")
             import traceback
             logger.error(traceback.format_exc())
+        finally:
+            self._detach_dataset()
 
         # Calcular duracao total
         end_time = datetime.now(timezone.utc)
@@ -190,6 +199,11 @@ class AgentOrchestrator:
         logger.info("EXECUCAO CONCLUIDA")
         logger.info(f"Duracao total: {duration:.1f}s")
         logger.info(f"Agentes executados: {len(results)}")
+        if self.last_dataset_stats and "videos" in self.last_dataset_stats:
+            logger.info(
+                f"Dataset compartilhado: {self.last_dataset_stats['videos']} videos, "
+                f"{self.last_dataset_stats['load_seconds']}s, ~{self.last_dataset_stats['approx_size_mb']}MB"
+            )
 
         success_count = sum(1 for r in results.values() if r.success)
         logger.info(f"Sucessos: {success_count} / {len(results)}")
@@ -200,7 +214,40 @@ class AgentOrchestrator:
 
         logger.info("=" * 80)
 
-        return results
+        return {**results, "VideoDataset": self._dataset_result(start_time)}
+
+    def _dataset_result(self, started_at: datetime) -> AgentResult:
+        """Carga do dataset compartilhado no formato dos resultados dos agentes."""
+        stats = dict(self.last_dataset_stats or {})
+        load_seconds = stats.get("load_seconds", 0.0)
+        return AgentResult(
+            agent_name="VideoDataset",
+            status=AgentStatus.FAILED if "error" in stats or not stats else AgentStatus.COMPLETED,
+            started_at=started_at,
+            completed_at=started_at + timedelta(seconds=load_seconds),
+            data=stats,
+            errors=[stats["error"]] if "error" in stats else [],
+            metrics=stats
+        )
+
+    async def _attach_dataset(self):
+        """Carrega o VideoDataset da execucao e entrega (somente leitura) a todos os agentes."""
+        try:
+            dataset = await VideoDataset.load(self.db)
+        except Exception as e:
+            # Sem dataset cada agente volta a buscar os proprios dados
+            logger.error(f"Erro carregando dataset compartilhado: {e}")
+            self.last_dataset_stats = {"error": str(e)}
+            return
+
+        self.last_dataset_stats = dataset.stats()
+        for agent in self.agents.values():
+            agent.dataset = dataset
+
+    def _detach_dataset(self):
+        """Libera o dataset ao fim da execucao (run_single continua buscando direto)."""
+        for agent in self.agents.values():
+            agent.dataset = None
 
     async def _run_parallel(self, agent_names: List[str]) -> Dict[str, AgentResult]:
         """Executa agentes em paralelo"""
@@ -276,7 +323,11 @@ class AgentOrchestrator:
             "AlertAgent"
         ]
 
-        return await self._run_parallel(analysis_agents)
+        await self._attach_dataset()
+        try:
+            return await self._run_parallel(analysis_agents)
+        finally:
+            self._detach_dataset()
 
     async def run_scout(self) -> AgentResult:
         """
@@ -289,6 +340,7 @@ class AgentOrchestrator:
         """Retorna status de todos os agentes"""
         return {
             "last_run": self.last_run.isoformat() if self.last_run else None,
+            "dataset": self.last_dataset_stats,
             "agents": {
                 name: agent.get_status()
                 for name, agent in self.agents.items()
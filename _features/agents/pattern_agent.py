@@ -133,36 +133,23 @@ class PatternAgent(BaseAgent):
     async def _get_all_videos_with_stats(self) -> List[Dict]:
         """Busca todos os videos com informacoes do canal"""
         try:
-            all_videos = []
-            batch_size = 1000
-            offset = 0
+            if self.dataset is not None:
+                return self.dataset.records()
 
-            while True:
-                response = self.db.supabase.table("videos_historico")\
-                    .select("*, canais_monitorados!inner(nome_canal, subnicho, lingua, tipo)")\
-                    .range(offset, offset + batch_size - 1)\
-                    .execute()
-
-                if not response.data:
-                    break
-
-                all_videos.extend(response.data)
-
-                if len(response.data) < batch_size:
-                    break
-
-                offset += batch_size
-
-            # Deduplicar por video_id (pegar coleta mais recente)
+            # Deduplicar por video_id (pegar coleta mais recente) - streaming paginado (keyset), sem acumular o historico
             videos_dict = {}
-            for video in all_videos:
-                video_id = video.get("video_id")
-                data_coleta = video.get("data_coleta", "")
-
-                if video_id not in videos_dict:
-                    videos_dict[video_id] = video
-                elif data_coleta > videos_dict[video_id].get("data_coleta", ""):
-                    videos_dict[video_id] = video
+            async for page in self.db.iter_records(
+                "videos_historico",
+                "*, canais_monitorados!inner(nome_canal, subnicho, lingua, tipo)"
+            ):
+                for video in page:
+                    video_id = video.get("video_id")
+                    data_coleta = video.get("data_coleta", "")
+
+                    if video_id not in videos_dict:
+                        videos_dict[video_id] = video
+                    elif data_coleta > videos_dict[video_id].get("data_coleta", ""):
+                        videos_dict[video_id] = video
 
             return list(videos_dict.values())
 
@@ -118,34 +118,20 @@ class RecyclerAgent(BaseAgent):
     async def _get_our_successful_videos(self) -> List[Dict]:
         """Busca nossos videos que tiveram sucesso"""
         try:
-            all_videos = []
-            batch_size = 1000
-            offset = 0
+            if self.dataset is not None:
+                return self.dataset.records(min_views=self.success_threshold, tipo="nosso")
 
-            while True:
-                response = self.db.supabase.table("videos_historico")\
-                    .select("*, canais_monitorados!inner(id, nome_canal, subnicho, lingua, tipo)")\
-                    .eq("canais_monitorados.tipo", "nosso")\
-                    .gte("views_atuais", self.success_threshold)\
-                    .range(offset, offset + batch_size - 1)\
-                    .execute()
-
-                if not response.data:
-                    break
-
-                all_videos.extend(response.data)
-
-                if len(response.data) < batch_size:
-                    break
-
-                offset += batch_size
-
-            # Deduplicar
+            # Deduplicar - streaming paginado (keyset), sem acumular o historico
             videos_dict = {}
-            for video in all_videos:
-                video_id = video.get("video_id")
-                if video_id not in videos_dict:
-                    videos_dict[video_id] = video
+            async for page in self.db.iter_records(
+                "videos_historico",
+                "*, canais_monitorados!inner(id, nome_canal, subnicho, lingua, tipo)",
+                apply=lambda q: q.eq("canais_monitorados.tipo", "nosso").gte("views_atuais", self.success_threshold)
+            ):
+                for video in page:
+                    video_id = video.get("video_id")
+                    if video_id not in videos_dict:
+                        videos_dict[video_id] = video
 
             return list(videos_dict.values())
 
@@ -114,41 +114,29 @@ class TrendAgent(BaseAgent):
     async def _get_recent_videos(self) -> List[Dict]:
         """Busca videos publicados nos ultimos X dias"""
         try:
+            if self.dataset is not None:
+                return self.dataset.records(
+                    published_since=datetime.now(timezone.utc) - timedelta(days=self.recent_days)
+                )
+
             cutoff_date = (datetime.now(timezone.utc) - timedelta(days=self.recent_days)).isoformat()
 
             # Buscar videos com paginacao
-            all_videos = []
-            batch_size = 1000
-            offset = 0
-
-            while True:
-                response = self.db.supabase.table("videos_historico")\
-                    .select("*, canais_monitorados!inner(nome_canal, subnicho, lingua, tipo)")\
-                    .gte("data_publicacao", cutoff_date)\
-                    .order("views_atuais", desc=True)\
-                    .range(offset, offset + batch_size - 1)\
-                    .execute()
-
-                if not response.data:
-                    break
-
-                all_videos.extend(response.data)
-
-                if len(response.data) < batch_size:
-                    break
-
-                offset += batch_size
-
-            # Deduplicar por video_id (pegar coleta mais recente)
+            # Deduplicar por video_id (pegar coleta mais recente) - streaming paginado (keyset), sem acumular o historico
             videos_dict = {}
-            for video in all_videos:
-                video_id = video.get("video_id")
-                data_coleta = video.get("data_coleta", "")
-
-                if video_id not in videos_dict:
-                    videos_dict[video_id] = video
-                elif data_coleta > videos_dict[video_id].get("data_coleta", ""):
-                    videos_dict[video_id] = video
+            async for page in self.db.iter_records(
+                "videos_historico",
+                "*, canais_monitorados!inner(nome_canal, subnicho, lingua, tipo)",
+                apply=lambda q: q.gte("data_publicacao", cutoff_date)
+            ):
+                for video in page:
+                    video_id = video.get("video_id")
+                    data_coleta = video.get("data_coleta", "")
+
+                    if video_id not in videos_dict:
+                        videos_dict[video_id] = video
+                    elif data_coleta > videos_dict[video_id].get("data_coleta", ""):
+                        videos_dict[video_id] = video
 
             return list(videos_dict.values())
 
@@ -162,44 +150,33 @@ class TrendAgent(BaseAgent):
         Retorna: {canal_id: {"avg_views": X, "total_videos": Y}}
         """
         try:
-            # Buscar todos os videos para calcular media
-            all_videos = []
-            batch_size = 1000
-            offset = 0
-
-            while True:
-                response = self.db.supabase.table("videos_historico")\
-                    .select("canal_id, video_id, views_atuais, data_coleta")\
-                    .range(offset, offset + batch_size - 1)\
-                    .execute()
-
-                if not response.data:
-                    break
-
-                all_videos.extend(response.data)
-
-                if len(response.data) < batch_size:
-                    break
-
-                offset += batch_size
-
-            # Deduplicar por video_id
-            videos_dict = {}
-            for video in all_videos:
-                video_id = video.get("video_id")
-                data_coleta = video.get("data_coleta", "")
-
-                if video_id not in videos_dict:
-                    videos_dict[video_id] = video
-                elif data_coleta > videos_dict[video_id].get("data_coleta", ""):
-                    videos_dict[video_id] = video
-
-            # Calcular stats por canal
             canal_videos = defaultdict(list)
-            for video in videos_dict.values():
-                canal_id = video.get("canal_id")
-                views = video.get("views_atuais", 0)
-                canal_videos[canal_id].append(views)
+            if self.dataset is not None:
+                # Dataset compartilhado: usa as colunas direto, sem montar dicts
+                for canal_id, views in zip(self.dataset.column("canal_id"), self.dataset.column("views_atuais")):
+                    canal_videos[canal_id].append(views or 0)
+            else:
+                # Buscar todos os videos para calcular media
+                # Deduplicar por video_id - streaming paginado (keyset), sem acumular o historico
+                videos_dict = {}
+                async for page in self.db.iter_records(
+                    "videos_historico",
+                    "canal_id, video_id, views_atuais, data_coleta"
+                ):
+                    for video in page:
+                        video_id = video.get("video_id")
+                        data_coleta = video.get("data_coleta", "")
+
+                        if video_id not in videos_dict:
+                            videos_dict[video_id] = video
+                        elif data_coleta > videos_dict[video_id].get("data_coleta", ""):
+                            videos_dict[video_id] = video
+
+                # Calcular stats por canal
+                for video in videos_dict.values():
+                    canal_id = video.get("canal_id")
+                    views = video.get("views_atuais", 0)
+                    canal_videos[canal_id].append(views)
 
             # Calcular medias
             canais_stats = {}
@@ -14,16 +14,125 @@ Autor: cellibs-escritorio
 Data: 19/01/2026
 """
 
+import os
 import logging
 from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Any, Optional, Tuple
 import numpy as np
 from collections import defaultdict, Counter
 import re
+import time
 import statistics
 
+from database import run_query
+
 logger = logging.getLogger(__name__)
 
+# Cache materializado (channel_analytics_cache): versão do payload e validade
+# Subir ANALYTICS_CACHE_VERSION quando o formato da análise mudar (linhas antigas viram stale)
+ANALYTICS_CACHE_VERSION = 1
+ANALYTICS_CACHE_TTL_HOURS = int(os.environ.get("ANALYTICS_CACHE_TTL_HOURS", "26"))
+ANALYTICS_CACHE_UPSERT_CHUNK = 100
+
+# Palavras-chave por tema (expandível) - usadas no clustering de conteúdo
+TEMAS = {
+    'Batalhas e Guerras': ['batalha', 'guerra', 'conflito', 'luta', 'combate', 'militar', 'exército'],
+    'Imperadores e Líderes': ['imperador', 'césar', 'augustus', 'rei', 'rainha', 'líder', 'general'],
+    'Vida Cotidiana': ['vida', 'cotidiano', 'dia a dia', 'romano', 'grego', 'cidadão', 'povo'],
+    'Mitologia': ['deus', 'deusa', 'mito', 'lenda', 'olimpo', 'mitologia', 'divindade'],
+    'Arte e Cultura': ['arte', 'cultura', 'arquitetura', 'escultura', 'pintura', 'teatro', 'música'],
+    'Filosofia': ['filosofia', 'filósofo', 'pensamento', 'ideia', 'teoria', 'sócrates', 'platão'],
+    'Tecnologia Antiga': ['tecnologia', 'invenção', 'engenharia', 'construção', 'aqueduto', 'máquina']
+}
+TEMA_NOMES = list(TEMAS) + ['Outros']
+
+DIAS_SEMANA = ['Domingo', 'Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado']
+
+
+# Um regex por tema (substring de qualquer keyword) e um para "tem dígito"
+_TEMA_PATTERNS = [re.compile('|'.join(re.escape(kw) for kw in keywords)) for keywords in TEMAS.values()]
+_DIGITO = re.compile(r'\d')
+
+
+def _classificar_tema(titulo: str) -> int:
+    """Índice do tema em TEMA_NOMES (primeiro tema com keyword no título, senão 'Outros')"""
+    titulo_lower = titulo.lower()
+    for i, pattern in enumerate(_TEMA_PATTERNS):
+        if pattern.search(titulo_lower):
+            return i
+    return len(TEMAS)
+
+
+def _coluna(rows: List[Dict], campo: str, vazio: float = np.nan) -> np.ndarray:
+    """Coluna numérica (float64) de uma lista de dicts; None/ausente vira `vazio` (NaN)"""
+    return np.fromiter(
+        (vazio if r.get(campo) is None else r[campo] for r in rows),
+        dtype=np.float64, count=len(rows)
+    )
+
+
+def _percentil_ordenado(valores: np.ndarray, pct: float) -> float:
+    """np.percentile (interpolação linear) sobre um array já ordenado"""
+    pos = pct / 100 * (len(valores) - 1)
+    lo = int(pos)
+    hi = min(lo + 1, len(valores) - 1)
+    t = pos - lo
+    a, b = float(valores[lo]), float(valores[hi])
+    # Mesma fórmula do numpy (_lerp) para o resultado bater bit a bit
+    return b - (b - a) * (1 - t) if t >= 0.5 else a + (b - a) * t
+
+
+class ChannelArrays:
+    """
+    Vídeos (30d) e histórico (60d) de um canal convertidos em arrays NumPy UMA vez.
+    Todas as análises vetorizadas do ChannelAnalytics leem daqui.
+    """
+
+    def __init__(self, videos: List[Dict], historico: List[Dict], now: Optional[datetime] = None):
+        self.now = now or datetime.now(timezone.utc)
+        self.videos = videos
+        self.historico = historico
+
+        # Vídeos (None -> 0)
+        self.views = _coluna(videos, 'views_atuais', 0)
+        self.likes = _coluna(videos, 'likes', 0)
+        self.comentarios = _coluna(videos, 'comentarios', 0)
+        self.duracao = _coluna(videos, 'duracao', 0)
+
+        self.titulos = [v.get('titulo') or '' for v in videos]
+        n = len(videos)
+        self.tem_numero = np.fromiter((_DIGITO.search(t) is not None for t in self.titulos), dtype=bool, count=n)
+        self.tem_pergunta = np.fromiter(('?' in t for t in self.titulos), dtype=bool, count=n)
+        self.tema = np.fromiter((_classificar_tema(t) for t in self.titulos), dtype=np.int16, count=n)
+
+        # Datas de publicação: epoch, dia da semana e hora (NaN / -1 se inválida)
+        self.pub_ts = np.full(n, np.nan)
+        self.weekday = np.full(n, -1, dtype=np.int16)
+        self.hora = np.full(n, -1, dtype=np.int16)
+        for i, video in enumerate(videos):
+            try:
+                pub_date = datetime.fromisoformat(video['data_publicacao'].replace('Z', '+00:00'))
+            except Exception:
+                continue
+            if pub_date.tzinfo is None:
+                pub_date = pub_date.replace(tzinfo=timezone.utc)
+            self.pub_ts[i] = pub_date.timestamp()
+            self.weekday[i] = pub_date.weekday()
+            self.hora[i] = pub_date.hour
+
+        # Views ordenadas (quartis sem np.percentile a cada chamada)
+        self.views_sorted = np.sort(self.views)
+
+        # Dias desde a publicação (floor, igual a timedelta.days)
+        self.dias = np.floor((self.now.timestamp() - self.pub_ts) / 86400)
+
+        # Histórico (ordem crescente de data_coleta; NaN = None)
+        self.h_views_7d = _coluna(historico, 'views_7d')
+        self.h_views_15d = _coluna(historico, 'views_15d')
+        self.h_views_30d = _coluna(historico, 'views_30d')
+        self.h_engagement = _coluna(historico, 'engagement_rate')
+        self.h_views_7d_zero = np.where(np.isnan(self.h_views_7d), 0.0, self.h_views_7d)
+
 
 class ChannelAnalytics:
     """Classe principal para análises de canal YouTube"""
@@ -60,16 +169,41 @@ class ChannelAnalytics:
             # 3. Buscar histórico de 60 dias
             historico = await self._get_historico_60d(canal_id)
 
-            # 4. Realizar análises
-            metricas = self._calculate_metrics(canal_info, videos, historico)
-            top_videos = self._get_top_videos(videos, limit=10)
-            padroes = self._identify_patterns(videos)
-            clusters = self._cluster_content(videos)
-            anomalias = self._detect_anomalies(historico)
-            melhor_momento = self._find_best_posting_time(videos)
+            # 4. Converter em arrays (uma vez) e realizar análises vetorizadas
+            return self.analyze_arrays(canal_info, ChannelArrays(videos, historico))
 
-            # 5. Compilar resultado
-            return {
+        except Exception as e:
+            logger.error(f"Erro na análise do canal {canal_id}: {e}")
+            return {}
+
+    def analyze_arrays(self, canal_info: Dict, arr: ChannelArrays) -> Dict[str, Any]:
+        """Todas as análises de um canal a partir dos arrays já convertidos"""
+        return self._compile_result(
+            canal_info,
+            metricas=self._metrics_np(canal_info, arr),
+            top_videos=self._top_videos_np(arr, limit=10),
+            padroes=self._patterns_np(arr),
+            clusters=self._clusters_np(arr),
+            anomalias=self._anomalies_np(arr),
+            melhor_momento=self._best_posting_time_np(arr)
+        )
+
+    def analyze_channel_legacy(self, canal_info: Dict, videos: List[Dict], historico: List[Dict]) -> Dict[str, Any]:
+        """Implementação de referência (loops em Python) - usada no benchmark/comparação"""
+        return self._compile_result(
+            canal_info,
+            metricas=self._calculate_metrics(canal_info, videos, historico),
+            top_videos=self._get_top_videos(videos, limit=10),
+            padroes=self._identify_patterns(videos),
+            clusters=self._cluster_content(videos),
+            anomalias=self._detect_anomalies(historico),
+            melhor_momento=self._find_best_posting_time(videos)
+        )
+
+    def _compile_result(self, canal_info: Dict, metricas: Dict, top_videos: List[Dict], padroes: List[Dict],
+                        clusters: List[Dict], anomalias: List[Dict], melhor_momento: Dict) -> Dict[str, Any]:
+        """Monta o JSON final da análise"""
+        return {
                 'canal_info': {
                     'id': canal_info['id'],
                     'nome': canal_info['nome_canal'],
@@ -92,9 +226,132 @@ class ChannelAnalytics:
                 'melhor_momento': melhor_momento
             }
 
+    async def analyze_channels_batch(self, canal_ids: Optional[List[int]] = None) -> Dict[int, Dict[str, Any]]:
+        """
+        Análise de TODOS os canais ativos (ou dos canal_ids informados) em uma chamada.
+        Para pré-cálculo noturno: 3 leituras paginadas (canais, vídeos 30d, histórico 60d)
+        em vez de 3 queries por canal.
+
+        Returns:
+            {canal_id: análise} no mesmo formato de analyze_channel()
+        """
+        start = time.monotonic()
+        now = datetime.now(timezone.utc)
+        cutoff_videos = (now - timedelta(days=30)).isoformat()
+        cutoff_historico = (now - timedelta(days=60)).date().isoformat()
+
+        canais = await self.db.fetch_all_records('canais_monitorados', '*', filters={'status': 'ativo'})
+        if canal_ids is not None:
+            wanted = set(canal_ids)
+            canais = [c for c in canais if c['id'] in wanted]
+
+        videos_por_canal = defaultdict(list)
+        async for page in self.db.iter_records(
+            'videos_historico', '*',
+            apply=lambda q: q.gte('data_publicacao', cutoff_videos)
+        ):
+            for video in page:
+                videos_por_canal[video.get('canal_id')].append(video)
+
+        historico_por_canal = defaultdict(list)
+        async for page in self.db.iter_records(
+            'dados_canais_historico', '*',
+            apply=lambda q: q.gte('data_coleta', cutoff_historico)
+        ):
+            for row in page:
+                historico_por_canal[row.get('canal_id')].append(row)
+
+        load_seconds = time.monotonic() - start
+        resultados = {}
+        for canal in canais:
+            canal_id = canal['id']
+            try:
+                # Mesma ordem das queries por canal (views desc / data_coleta asc)
+                videos = sorted(videos_por_canal.get(canal_id, []), key=lambda v: v.get('views_atuais') or 0, reverse=True)
+                historico = sorted(historico_por_canal.get(canal_id, []), key=lambda h: h.get('data_coleta') or '')
+                if historico and historico[-1].get('inscritos') is not None:
+                    canal = {**canal, 'inscritos_atual': historico[-1]['inscritos']}
+                resultados[canal_id] = self.analyze_arrays(canal, ChannelArrays(videos, historico, now))
+            except Exception as e:
+                logger.error(f"Erro na análise em lote do canal {canal_id}: {e}")
+
+        logger.info(
+            f"📊 Analytics em lote: {len(resultados)}/{len(canais)} canais "
+            f"(carga {load_seconds:.1f}s, total {time.monotonic() - start:.1f}s)"
+        )
+        return resultados
+
+    # ==================================================================
+    # Cache materializado (channel_analytics_cache)
+    # ==================================================================
+
+    async def get_cached_analysis(self, canal_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Análise pré-calculada do canal, se existir, for da versão atual e não estiver expirada.
+        Retorna None em cache miss/stale.
+        """
+        try:
+            response = await run_query(self.db.supabase.table('channel_analytics_cache')
+                .select('data, version, computed_at, expires_at')
+                .eq('canal_id', canal_id)
+                .eq('version', ANALYTICS_CACHE_VERSION)
+                .gt('expires_at', datetime.now(timezone.utc).isoformat())
+                .limit(1))
+            if not response.data:
+                return None
+
+            entry = response.data[0]
+            result = entry['data']
+            result['_cache_metadata'] = {
+                'cached': True,
+                'version': entry['version'],
+                'computed_at': entry['computed_at'],
+                'expires_at': entry['expires_at']
+            }
+            return result
+
         except Exception as e:
-            logger.error(f"Erro na análise do canal {canal_id}: {e}")
-            return {}
+            logger.error(f"Erro ao buscar analytics em cache do canal {canal_id}: {e}")
+            return None
+
+    async def save_cached_analyses(self, analyses: Dict[int, Dict[str, Any]], processing_time_ms: int = 0) -> int:
+        """Grava análises em channel_analytics_cache (upsert em lotes). Retorna quantas foram salvas."""
+        now = datetime.now(timezone.utc)
+        expires_at = (now + timedelta(hours=ANALYTICS_CACHE_TTL_HOURS)).isoformat()
+        rows = [{
+            'canal_id': canal_id,
+            'data': data,
+            'version': ANALYTICS_CACHE_VERSION,
+            'computed_at': now.isoformat(),
+            'expires_at': expires_at,
+            'processing_time_ms': processing_time_ms
+        } for canal_id, data in analyses.items() if data]
+
+        saved = 0
+        for i in range(0, len(rows), ANALYTICS_CACHE_UPSERT_CHUNK):
+            chunk = rows[i:i + ANALYTICS_CACHE_UPSERT_CHUNK]
+            try:
+                await run_query(self.db.supabase.table('channel_analytics_cache').upsert(chunk, on_conflict='canal_id'))
+                saved += len(chunk)
+            except Exception as e:
+                logger.error(f"Erro ao salvar analytics em cache ({len(chunk)} canais): {e}")
+        return saved
+
+    async def analyze_channel_cached(self, canal_id: int) -> Dict[str, Any]:
+        """
+        Serve a análise do cache materializado; recalcula (e regrava) só quando
+        a linha não existe, expirou ou é de uma versão antiga.
+        """
+        cached = await self.get_cached_analysis(canal_id)
+        if cached is not None:
+            return cached
+
+        start = time.monotonic()
+        analysis = await self.analyze_channel(canal_id)
+        if analysis:
+            await self.save_cached_analyses({canal_id: analysis}, int((time.monotonic() - start) * 1000))
+            analysis['_cache_metadata'] = {'cached': False, 'version': ANALYTICS_CACHE_VERSION}
+        return analysis
 
     async def _get_canal_info(self, canal_id: int) -> Optional[Dict]:
         """Busca informações básicas do canal"""
@@ -403,24 +660,13 @@ class ChannelAnalytics:
                 'count': 0
             })
 
-            # Palavras-chave por tema (expandível)
-            temas = {
-                'Batalhas e Guerras': ['batalha', 'guerra', 'conflito', 'luta', 'combate', 'militar', 'exército'],
-                'Imperadores e Líderes': ['imperador', 'césar', 'augustus', 'rei', 'rainha', 'líder', 'general'],
-                'Vida Cotidiana': ['vida', 'cotidiano', 'dia a dia', 'romano', 'grego', 'cidadão', 'povo'],
-                'Mitologia': ['deus', 'deusa', 'mito', 'lenda', 'olimpo', 'mitologia', 'divindade'],
-                'Arte e Cultura': ['arte', 'cultura', 'arquitetura', 'escultura', 'pintura', 'teatro', 'música'],
-                'Filosofia': ['filosofia', 'filósofo', 'pensamento', 'ideia', 'teoria', 'sócrates', 'platão'],
-                'Tecnologia Antiga': ['tecnologia', 'invenção', 'engenharia', 'construção', 'aqueduto', 'máquina']
-            }
-
             # Classificar cada vídeo
             for video in videos:
                 titulo_lower = video.get('titulo', '').lower()
                 tema_encontrado = 'Outros'
 
                 # Procurar tema correspondente
-                for tema, keywords in temas.items():
+                for tema, keywords in TEMAS.items():
                     if any(keyword in titulo_lower for keyword in keywords):
                         tema_encontrado = tema
                         break
@@ -661,4 +907,405 @@ class ChannelAnalytics:
                 'hora': None,
                 'boost': 0,
                 'mensagem': 'Erro na análise'
-            }
\ No newline at end of file
+            }
+
+    # ==================================================================
+    # Implementação vetorizada (NumPy) - mesma saída dos métodos acima
+    # ==================================================================
+
+    def _metrics_np(self, canal: Dict, arr: ChannelArrays) -> Dict:
+        """Versão vetorizada de _calculate_metrics"""
+        try:
+            metricas = {
+                'views_7d': 0,
+                'views_15d': 0,
+                'views_30d': 0,
+                'growth_7d': 0,
+                'growth_15d': 0,
+                'growth_30d': 0,
+                'engagement_rate': 0,
+                'score': 0,
+                'inscritos_diff': 0,
+                'ranking_subnicho': 0,
+                'percentil': 0
+            }
+
+            n_hist = len(arr.historico)
+            if n_hist:
+                latest = arr.historico[-1]
+                metricas['views_7d'] = latest.get('views_7d', 0)
+                metricas['views_15d'] = latest.get('views_15d', 0)
+                metricas['views_30d'] = latest.get('views_30d', 0)
+                metricas['inscritos_diff'] = latest.get('inscritos_diff', 0)
+
+                # Crescimento vs 7/15/30 coletas atrás
+                for janela, serie, campo in ((7, arr.h_views_7d, 'views_7d'),
+                                             (15, arr.h_views_15d, 'views_15d'),
+                                             (30, arr.h_views_30d, 'views_30d')):
+                    if n_hist >= janela:
+                        antes = serie[-janela]
+                        if antes > 0:
+                            metricas[f'growth_{janela}d'] = float((np.nan_to_num(serie[-1]) - antes) / antes * 100)
+
+            total_views = arr.views.sum()
+            if total_views > 0:
+                total_engagement = arr.likes.sum() + arr.comentarios.sum()
+                metricas['engagement_rate'] = round(float(total_engagement / total_views * 100), 2)
+
+            inscritos = canal.get('inscritos_atual', 1)
+            if inscritos and inscritos > 0 and (metricas['views_30d'] or 0) > 0:
+                views_per_sub = metricas['views_30d'] / inscritos
+                metricas['score'] = min(100, round(views_per_sub * 10, 1))
+
+            return metricas
+
+        except Exception as e:
+            logger.error(f"Erro ao calcular métricas: {e}")
+            return {}
+
+    def _top_videos_np(self, arr: ChannelArrays, limit: int = 10) -> List[Dict]:
+        """Versão vetorizada de _get_top_videos"""
+        try:
+            # Estável: empates mantêm a ordem original (igual sorted(reverse=True))
+            order = np.argsort(-arr.views, kind='stable')[:limit]
+            dias = np.nan_to_num(arr.dias[order]).astype(np.int64)
+            views = arr.views[order]
+            engagement = np.divide(
+                (arr.likes[order] + arr.comentarios[order]) * 100, views,
+                out=np.zeros(len(order)), where=views > 0
+            )
+            views_por_dia = views / np.maximum(dias, 1)
+
+            result = []
+            for pos, i in enumerate(order):
+                video = arr.videos[i]
+                video_id = video.get('video_id', '')
+                result.append({
+                    'video_id': video_id,
+                    'titulo': video.get('titulo', ''),
+                    'url': video.get('url_video', ''),
+                    'thumbnail_url': f"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg" if video_id else '',
+                    'views': int(views[pos]),
+                    'likes': video.get('likes', 0),
+                    'comentarios': video.get('comentarios', 0),
+                    'duracao': video.get('duracao', 0),
+                    'publicado_ha_dias': int(dias[pos]),
+                    'engagement_rate': round(float(engagement[pos]), 2),
+                    'views_por_dia': round(float(views_por_dia[pos]))
+                })
+
+            return result
+
+        except Exception as e:
+            logger.error(f"Erro ao processar top vídeos: {e}")
+            return []
+
+    def _patterns_np(self, arr: ChannelArrays) -> List[Dict]:
+        """Versão vetorizada de _identify_patterns (máscaras de quartil)"""
+        try:
+            if len(arr.views) < 10:
+                return []
+
+            q75 = _percentil_ordenado(arr.views_sorted, 75)
+            q25 = _percentil_ordenado(arr.views_sorted, 25)
+            top = arr.views > q75
+            low = arr.views < q25
+            n_top, n_low = int(top.sum()), int(low.sum())
+            if not n_top or not n_low:
+                return []
+
+            padroes = []
+
+            # PADRÃO 1 e 2: títulos com números / perguntas
+            for flag, tipo, descricao in ((arr.tem_numero, 'titulo_numeros', 'Títulos com números'),
+                                          (arr.tem_pergunta, 'titulo_perguntas', 'Títulos com perguntas')):
+                pct_top = float(flag[top].sum()) / n_top * 100
+                pct_low = float(flag[low].sum()) / n_low * 100
+                if pct_top > pct_low * 1.2:
+                    boost = ((pct_top / max(pct_low, 1)) - 1) * 100
+                    padroes.append({
+                        'tipo': tipo,
+                        'descricao': descricao,
+                        'boost': f'+{boost:.0f}%',
+                        'evidencia': f'{pct_top:.0f}% dos top vs {pct_low:.0f}% dos baixos',
+                        'exemplos': [arr.titulos[i] for i in np.flatnonzero(top & flag)[:3]]
+                    })
+
+            # PADRÃO 3: Duração ideal
+            com_duracao = arr.duracao > 0
+            duracao_top = arr.duracao[top & com_duracao]
+            duracao_low = arr.duracao[low & com_duracao]
+            if duracao_top.size and duracao_low.size:
+                media_top = float(duracao_top.mean()) / 60
+                media_low = float(duracao_low.mean()) / 60
+
+                if media_top > media_low * 1.2 or media_top < media_low * 0.8:
+                    diff_pct = ((media_top / media_low) - 1) * 100
+                    padroes.append({
+                        'tipo': 'duracao_ideal',
+                        'descricao': f'Duração ideal: {media_top:.1f} minutos',
+                        'boost': f'{diff_pct:+.0f}%',
+                        'evidencia': f'Top: {media_top:.1f}min vs Baixos: {media_low:.1f}min',
+                        'range_ideal': f'{media_top-2:.0f}-{media_top+2:.0f} minutos'
+                    })
+
+            # PADRÃO 4: Palavras-chave de sucesso (texto - continua em Python)
+            palavras_top = self._extract_keywords([arr.videos[i] for i in np.flatnonzero(top)])
+            palavras_low = self._extract_keywords([arr.videos[i] for i in np.flatnonzero(low)])
+
+            palavras_exclusivas_top = set(palavras_top.keys()) - set(palavras_low.keys())
+            if palavras_exclusivas_top:
+                padroes.append({
+                    'tipo': 'keywords_sucesso',
+                    'descricao': 'Palavras-chave de sucesso',
+                    'boost': 'Variável',
+                    'evidencia': f'Aparecem só nos top performers',
+                    'keywords': list(palavras_exclusivas_top)[:5]
+                })
+
+            return padroes
+
+        except Exception as e:
+            logger.error(f"Erro ao identificar padrões: {e}")
+            return []
+
+    def _clusters_np(self, arr: ChannelArrays) -> List[Dict]:
+        """Versão vetorizada de _cluster_content (bincount por tema)"""
+        try:
+            n = len(arr.views)
+            if not n:
+                return []
+
+            counts = np.bincount(arr.tema, minlength=len(TEMA_NOMES))
+            views_por_tema = np.bincount(arr.tema, weights=arr.views, minlength=len(TEMA_NOMES))
+            total_views_canal = float(arr.views.sum())
+            media_geral = total_views_canal / n
+
+            # Temas na ordem em que aparecem (desempate do sort igual à versão em loop)
+            temas_presentes, primeira_ocorrencia = np.unique(arr.tema, return_index=True)
+            temas_presentes = temas_presentes[np.argsort(primeira_ocorrencia)]
+
+            resultado = []
+            for t in temas_presentes:
+                count = int(counts[t])
+                media_views = float(views_por_tema[t]) / count
+                percentual = (float(views_por_tema[t]) / total_views_canal * 100) if total_views_canal > 0 else 0
+                roi = media_views / media_geral if media_geral > 0 else 0
+
+                if roi >= 2:
+                    categoria, emoji = 'alto', '🏆'
+                elif roi >= 0.8:
+                    categoria, emoji = 'medio', '📈'
+                else:
+                    categoria, emoji = 'baixo', '⚠️'
+
+                resultado.append({
+                    'tema': TEMA_NOMES[t],
+                    'categoria': categoria,
+                    'emoji': emoji,
+                    'quantidade_videos': count,
+                    'percentual_videos': round((count / n) * 100, 1),
+                    'media_views': int(media_views),
+                    'percentual_views': round(percentual, 1),
+                    'roi': round(roi, 2)
+                })
+
+            return sorted(resultado, key=lambda x: x['roi'], reverse=True)
+
+        except Exception as e:
+            logger.error(f"Erro ao criar clusters: {e}")
+            return []
+
+    def _anomalies_np(self, arr: ChannelArrays) -> List[Dict]:
+        """Versão vetorizada de _detect_anomalies (z-scores em array)"""
+        try:
+            historico = arr.historico
+            if len(historico) < 7:
+                return []
+
+            anomalias = []
+
+            # Outliers de views_7d (z-score > 2) nos últimos 7 pontos da série
+            views_series = arr.h_views_7d[~np.isnan(arr.h_views_7d)]
+            if views_series.size > 3:
+                std = views_series.std()
+                if std > 0:
+                    z_scores = (views_series[-7:] - views_series.mean()) / std
+                    for i in np.flatnonzero(np.abs(z_scores) > 2):
+                        z_score = float(z_scores[i])
+                        data = historico[-(7 - i)]['data_coleta']
+                        if z_score > 0:
+                            anomalias.append({
+                                'tipo': 'spike_positivo',
+                                'gravidade': 'info',
+                                'emoji': '🚀',
+                                'descricao': f'Spike de views detectado',
+                                'detalhes': f'{abs(z_score):.1f}x acima do normal',
+                                'data': data
+                            })
+                        else:
+                            anomalias.append({
+                                'tipo': 'queda_abrupta',
+                                'gravidade': 'warning',
+                                'emoji': '📉',
+                                'descricao': f'Queda abrupta de views',
+                                'detalhes': f'{abs(z_score):.1f}x abaixo do normal',
+                                'data': data
+                            })
+
+            # Tendência: média dos últimos 7 vs 7 anteriores
+            if len(historico) >= 14:
+                views_7d = arr.h_views_7d_zero
+                media_recent = views_7d[-7:].mean()
+                media_previous = views_7d[-14:-7].mean()
+
+                if media_previous > 0:
+                    change = float((media_recent - media_previous) / media_previous * 100)
+                    if change < -30:
+                        anomalias.append({
+                            'tipo': 'tendencia_negativa',
+                            'gravidade': 'critical',
+                            'emoji': '⚠️',
+                            'descricao': 'Tendência negativa forte',
+                            'detalhes': f'Queda de {abs(change):.0f}% na última semana'
+                        })
+                    elif change > 50:
+                        anomalias.append({
+                            'tipo': 'tendencia_positiva',
+                            'gravidade': 'success',
+                            'emoji': '📈',
+                            'descricao': 'Crescimento acelerado',
+                            'detalhes': f'Alta de {change:.0f}% na última semana'
+                        })
+
+            # Engagement em queda contínua (últimos 14 pontos)
+            engagement = arr.h_engagement[-14:]
+            engagement = engagement[~np.isnan(engagement)]
+            if engagement.size >= 7 and np.all(np.diff(engagement) <= 0):
+                drop = float(engagement[0] - engagement[-1])
+                if drop > 0.5:
+                    anomalias.append({
+                        'tipo': 'engagement_decline',
+                        'gravidade': 'warning',
+                        'emoji': '💬',
+                        'descricao': 'Engagement em declínio',
+                        'detalhes': f'Queda de {drop:.1f}pp em {engagement.size} dias'
+                    })
+
+            return anomalias
+
+        except Exception as e:
+            logger.error(f"Erro ao detectar anomalias: {e}")
+            return []
+
+    def _best_posting_time_np(self, arr: ChannelArrays) -> Dict:
+        """Versão vetorizada de _find_best_posting_time (histograma dia x hora com bincount)"""
+        try:
+            if len(arr.views) < 10:
+                return {
+                    'dia_semana': None,
+                    'hora': None,
+                    'boost': 0,
+                    'mensagem': 'Dados insuficientes'
+                }
+
+            valid = ~np.isnan(arr.pub_ts)
+            if not valid.any():
+                return {
+                    'dia_semana': None,
+                    'hora': None,
+                    'boost': 0,
+                    'mensagem': 'Erro ao processar datas'
+                }
+
+            # Views por dia desde a publicação, agrupadas em 7x24 slots (dia*24 + hora)
+            slots = arr.weekday[valid].astype(np.int64) * 24 + arr.hora[valid]
+            views_por_dia = arr.views[valid] / np.maximum(arr.dias[valid], 1)
+            counts = np.bincount(slots, minlength=168)
+            sums = np.bincount(slots, weights=views_por_dia, minlength=168)
+
+            # Mínimo de 2 vídeos por slot; slots na ordem em que aparecem (desempates)
+            primeira = np.full(168, len(slots))
+            np.minimum.at(primeira, slots, np.arange(len(slots)))
+            slots_validos = np.flatnonzero(counts >= 2)
+            if not slots_validos.size:
+                return {
+                    'dia_semana': None,
+                    'hora': None,
+                    'boost': 0,
+                    'mensagem': 'Dados insuficientes para análise'
+                }
+            slots_validos = slots_validos[np.argsort(primeira[slots_validos], kind='stable')]
+            medias = sums[slots_validos] / counts[slots_validos]
+
+            best = int(slots_validos[np.argmax(medias)])
+            best_dia, best_hora = divmod(best, 24)
+            best_performance = float(medias.max())
+
+            media_geral = float(medias.mean())
+            boost = ((best_performance / media_geral) - 1) * 100 if media_geral > 0 else 0
+
+            # Ranking de dias: média das médias dos slots de cada dia
+            dias_slots = slots_validos // 24
+            soma_dia = np.bincount(dias_slots, weights=medias, minlength=7)
+            count_dia = np.bincount(dias_slots, minlength=7)
+            ranking_dias = []
+            for dia in dict.fromkeys(dias_slots.tolist()):
+                media_dia = soma_dia[dia] / count_dia[dia]
+                boost_dia = ((media_dia / media_geral) - 1) * 100 if media_geral > 0 else 0
+                ranking_dias.append({
+                    'dia': DIAS_SEMANA[dia],
+                    'performance': round(float(boost_dia))
+                })
+
+            ranking_dias.sort(key=lambda x: x['performance'], reverse=True)
+
+            return {
+                'dia_semana': DIAS_SEMANA[best_dia],
+                'dia_numero': best_dia,
+                'hora': best_hora,
+                'boost': round(boost),
+                'mensagem': f'{DIAS_SEMANA[best_dia]} às {best_hora}:00',
+                'ranking_dias': ranking_dias[:3]
+            }
+
+        except Exception as e:
+            logger.error(f"Erro ao calcular melhor horário: {e}")
+            return {
+                'dia_semana': None,
+                'hora': None,
+                'boost': 0,
+                'mensagem': 'Erro na análise'
+            }
+
+
+# Função helper para usar no main.py (encadeada após a coleta, como build_engagement_cache)
+async def build_analytics_cache(db_client) -> Dict[str, Any]:
+    """
+    Materializa a análise de todos os canais ativos em channel_analytics_cache
+    e atualiza melhor_dia_semana/melhor_hora em canais_monitorados.
+    """
+    start = time.monotonic()
+    analyzer = ChannelAnalytics(db_client)
+    analyses = await analyzer.analyze_channels_batch()
+    elapsed_ms = int((time.monotonic() - start) * 1000)
+    per_canal_ms = elapsed_ms // len(analyses) if analyses else 0
+
+    saved = await analyzer.save_cached_analyses(analyses, per_canal_ms)
+
+    # Melhor momento (antes atualizado a cada abertura do modal)
+    for canal_id, analysis in analyses.items():
+        momento = analysis.get('melhor_momento') or {}
+        if momento.get('dia_numero') is None or momento.get('hora') is None:
+            continue
+        try:
+            await run_query(db_client.supabase.table('canais_monitorados').update({
+                'melhor_dia_semana': momento['dia_numero'],
+                'melhor_hora': momento['hora']
+            }).eq('id', canal_id))
+        except Exception as e:
+            logger.warning(f"Erro ao salvar melhor momento do canal {canal_id}: {e}")
+
+    elapsed = time.monotonic() - start
+    logger.info(f"💾 Analytics materializado: {saved}/{len(analyses)} canais em {elapsed:.1f}s")
+    return {'processed': saved, 'total': len(analyses), 'elapsed_seconds': round(elapsed, 1)}
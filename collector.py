@@ -3,6 +3,7 @@ import re
 import asyncio
 import logging
 import html
+import time
 import urllib.parse
 from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Optional, Any, Set
@@ -13,6 +14,13 @@ import json
 
 logger = logging.getLogger(__name__)
 
+# Pool HTTP da Data API: conexões simultâneas e keep-alive (segundos) da sessão do collector
+YOUTUBE_HTTP_POOL_LIMIT = int(os.environ.get("YOUTUBE_HTTP_POOL_LIMIT", "20"))
+YOUTUBE_HTTP_KEEPALIVE = int(os.environ.get("YOUTUBE_HTTP_KEEPALIVE", "30"))
+
+# Vídeos com comentários buscados em paralelo por canal (get_all_channel_comments)
+COMMENTS_VIDEO_CONCURRENCY = int(os.environ.get("COMMENTS_VIDEO_CONCURRENCY", "5"))
+
 # FUNÇÃO PARA DECODIFICAR HTML ENTITIES
 def decode_html_entities(text: str) -> str:
     """Decodifica HTML entities em texto (ex: &#39; -> ')"""
@@ -132,10 +140,65 @@ class YouTubeCollector:
         # 🚀 OTIMIZAÇÃO: Cache de channel_id para evitar requisições duplicadas
         self.channel_id_cache: Dict[str, str] = {}  # {url_canal: channel_id}
 
+        # 🚀 SESSÃO HTTP PERSISTENTE (pool de conexões + keep-alive)
+        # Criada em reset_for_new_collection() e fechada no fim do job (close_session)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reset_http_stats()
+
         logger.info(f"🚀 YouTube collector initialized with {len(self.api_keys)} API keys")
         logger.info(f"📊 Total quota disponível: {len(self.api_keys) * 10000:,} units/dia")
         logger.info(f"📊 Rate limiter: {self.rate_limiters[0].max_requests} req/{self.rate_limiters[0].time_window}s per key")
 
+    def _reset_http_stats(self):
+        self.http_requests = 0
+        self.http_latency_total = 0.0
+        self.http_latencies: deque = deque(maxlen=1000)
+        self.http_connections_created = 0
+        self.http_connections_reused = 0
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        """Sessão única com pool de conexões; trace conta conexões novas x reutilizadas."""
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_connection_create_end(session, ctx, params):
+            self.http_connections_created += 1
+
+        async def on_connection_reuseconn(session, ctx, params):
+            self.http_connections_reused += 1
+
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+
+        connector = aiohttp.TCPConnector(
+            limit=YOUTUBE_HTTP_POOL_LIMIT,
+            keepalive_timeout=YOUTUBE_HTTP_KEEPALIVE,
+            ttl_dns_cache=300
+        )
+        self._session_loop = asyncio.get_running_loop()
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=60),
+            trace_configs=[trace_config]
+        )
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Sessão persistente (cria sob demanda se fechada ou de outro event loop)."""
+        if (self._session is None or self._session.closed
+                or self._session_loop is not asyncio.get_running_loop()):
+            self._session = self._create_session()
+        return self._session
+
+    async def close_session(self):
+        """Fecha a sessão HTTP persistente (chamado no fim do job de coleta)."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info(
+                f"🔌 Sessão HTTP fechada - {self.http_requests} requests, "
+                f"{self.http_connections_created} conexões abertas, {self.http_connections_reused} reutilizadas"
+            )
+        self._session = None
+
     def reset_for_new_collection(self):
         """Reset collector state - LIMPA CHAVES SE JÁ MUDOU DE DIA UTC"""
         self.failed_canals = set()
@@ -143,6 +206,16 @@ class YouTubeCollector:
         self.quota_units_per_key = {i: 0 for i in range(len(self.api_keys))}
         self.quota_units_per_canal = {}
 
+        # 🚀 Sessão HTTP nova por coleta (fora de um event loop fica para o 1º request)
+        if self._session is not None and not self._session.closed:
+            asyncio.ensure_future(self._session.close())
+        self._session = None
+        try:
+            self._session = self._create_session()
+        except RuntimeError:
+            pass
+        self._reset_http_stats()
+
         # 🚀 OTIMIZAÇÃO: NÃO limpar channel_id_cache - pode reusar entre coletas
         # Cache persiste até restart do servidor (economiza requisições)
 
@@ -213,13 +286,16 @@ class YouTubeCollector:
         else:
             return 1
 
-    def increment_quota_counter(self, canal_name: str, cost: int):
+    def increment_quota_counter(self, canal_name: str, cost: int, key_index: Optional[int] = None):
         """
         🆕 INCREMENTA CONTADOR DE QUOTA UNITS (CORRETO!)
         Agora usa o CUSTO REAL da requisição
+        key_index: chave usada na requisição (coleta concorrente pode ter rotacionado a atual)
         """
+        if key_index is None:
+            key_index = self.current_key_index
         self.total_quota_units += cost
-        self.quota_units_per_key[self.current_key_index] += cost
+        self.quota_units_per_key[key_index] += cost
 
         if canal_name not in self.quota_units_per_canal:
             self.quota_units_per_canal[canal_name] = 0
@@ -227,7 +303,15 @@ class YouTubeCollector:
 
     def get_request_stats(self) -> Dict[str, Any]:
         """Get request statistics"""
+        latencies = sorted(self.http_latencies)
+        connections_total = self.http_connections_created + self.http_connections_reused
         return {
+            "http_requests": self.http_requests,
+            "http_avg_latency_ms": round(self.http_latency_total / self.http_requests * 1000, 1) if self.http_requests else 0.0,
+            "http_p95_latency_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1) if latencies else 0.0,
+            "http_connections_created": self.http_connections_created,
+            "http_connections_reused": self.http_connections_reused,
+            "http_connection_reuse_pct": round(self.http_connections_reused / connections_total * 100, 1) if connections_total else 0.0,
             "total_quota_units": self.total_quota_units,  # Nome correto agora
             "quota_units_per_key": self.quota_units_per_key.copy(),
             "quota_units_per_canal": self.quota_units_per_canal.copy(),
@@ -267,22 +351,26 @@ class YouTubeCollector:
             stats = self.rate_limiters[self.current_key_index].get_stats()
             logger.info(f"🔄 Rotated: Key {old_index + 2} → Key {self.current_key_index + 2} (load: {stats['requests_in_window']}/{stats['max_requests']})")
 
-    def mark_key_as_exhausted(self):
-        """Marca chave atual como esgotada ATÉ MEIA-NOITE UTC"""
+    def mark_key_as_exhausted(self, key_index: Optional[int] = None):
+        """Marca chave (default: atual) como esgotada ATÉ MEIA-NOITE UTC"""
+        if key_index is None:
+            key_index = self.current_key_index
         today_utc = datetime.now(timezone.utc).date()
-        self.exhausted_keys_date[self.current_key_index] = today_utc
+        self.exhausted_keys_date[key_index] = today_utc
 
-        logger.error(f"🚨 QUOTA EXCEEDED - Key {self.current_key_index + 2} EXHAUSTED até meia-noite UTC ({today_utc})")
+        logger.error(f"🚨 QUOTA EXCEEDED - Key {key_index + 2} EXHAUSTED até meia-noite UTC ({today_utc})")
         logger.error(f"🔑 Chaves restantes: {len(self.api_keys) - len(self.exhausted_keys_date) - len(self.suspended_keys)}/{len(self.api_keys)}")
         logger.error(f"💰 Quota restante: {(len(self.api_keys) - len(self.exhausted_keys_date) - len(self.suspended_keys)) * 10000:,} units")
 
         self.rotate_to_next_key()
 
-    def mark_key_as_suspended(self):
-        """🆕 Marca chave atual como SUSPENSA (reseta no restart)"""
-        self.suspended_keys.add(self.current_key_index)
+    def mark_key_as_suspended(self, key_index: Optional[int] = None):
+        """🆕 Marca chave (default: atual) como SUSPENSA (reseta no restart)"""
+        if key_index is None:
+            key_index = self.current_key_index
+        self.suspended_keys.add(key_index)
 
-        logger.error(f"❌ KEY SUSPENDED - Key {self.current_key_index + 2} marcada como suspensa até restart")
+        logger.error(f"❌ KEY SUSPENDED - Key {key_index + 2} marcada como suspensa até restart")
         logger.error(f"🔑 Chaves restantes: {len(self.api_keys) - len(self.exhausted_keys_date) - len(self.suspended_keys)}/{len(self.api_keys)}")
         logger.error(f"💰 Quota restante: {(len(self.api_keys) - len(self.exhausted_keys_date) - len(self.suspended_keys)) * 10000:,} units")
 
@@ -320,72 +408,85 @@ class YouTubeCollector:
 
         params['key'] = current_key
 
-        await self.rate_limiters[self.current_key_index].wait_if_needed()
+        # Fixar o índice da chave usada: com coleta concorrente outro worker pode rotacionar
+        # current_key_index enquanto esta requisição aguarda o rate limiter
+        key_index = self.current_key_index
+
+        await self.rate_limiters[key_index].wait_if_needed()
 
         try:
-            async with aiohttp.ClientSession() as session:
-                # 🆕 CALCULAR CUSTO REAL E INCREMENTAR CORRETAMENTE
-                request_cost = self.get_request_cost(url)
-                self.increment_quota_counter(canal_name, request_cost)
-                self.rate_limiters[self.current_key_index].record_request()
-
-                # 🚀 OTIMIZAÇÃO: Removido base_delay - RateLimiter já controla requisições
-                # if self.total_quota_units > 0:
-                #     await asyncio.sleep(self.base_delay)
-
-                async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=60)) as response:
-
-                    if response.status == 200:
-                        data = await response.json()
-                        return data
-
-                    elif response.status == 403:
-                        error_data = await response.json()
-                        error_obj = error_data.get('error', {})
-                        error_msg = error_obj.get('message', '').lower()
-                        error_reason = ''
-                        if error_obj.get('errors'):
-                            error_reason = error_obj['errors'][0].get('reason', '').lower()
-
-                        logger.warning(f"⚠️ 403 Error - Message: '{error_msg}' | Reason: '{error_reason}'")
-
-                        # CASO 1: Quota Excedida
-                        if 'quota' in error_msg or 'quota' in error_reason or 'dailylimit' in error_reason:
-                            logger.error(f"🚨 QUOTA EXCEEDED on key {self.current_key_index + 2}")
-                            self.mark_key_as_exhausted()
-
-                            if retry_count < self.max_retries and not self.all_keys_exhausted():
-                                logger.info(f"♻️ Tentando com próxima chave disponível...")
-                                return await self.make_api_request(url, params, canal_name, retry_count + 1)
-                            return None
+            # 🚀 Sessão persistente: reaproveita conexões (sem DNS/TCP/TLS por request)
+            session = self._get_session()
+
+            # 🆕 CALCULAR CUSTO REAL E INCREMENTAR CORRETAMENTE
+            request_cost = self.get_request_cost(url)
+            self.increment_quota_counter(canal_name, request_cost, key_index)
+            self.rate_limiters[key_index].record_request()
+
+            # 🚀 OTIMIZAÇÃO: Removido base_delay - RateLimiter já controla requisições
+            # if self.total_quota_units > 0:
+            #     await asyncio.sleep(self.base_delay)
+
+            request_start = time.perf_counter()
+            async with session.get(url, params=params) as response:
+                elapsed = time.perf_counter() - request_start
+                self.http_requests += 1
+                self.http_latency_total += elapsed
+                self.http_latencies.append(elapsed)
+
+                if response.status == 200:
+                    data = await response.json()
+                    return data
+
+                elif response.status == 403:
+                    error_data = await response.json()
+                    error_obj = error_data.get('error', {})
+                    error_msg = error_obj.get('message', '').lower()
+                    error_reason = ''
+                    if error_obj.get('errors'):
+                        error_reason = error_obj['errors'][0].get('reason', '').lower()
+
+                    logger.warning(f"⚠️ 403 Error - Message: '{error_msg}' | Reason: '{error_reason}'")
+
+                    # CASO 1: Quota Excedida
+                    if 'quota' in error_msg or 'quota' in error_reason or 'dailylimit' in error_reason:
+                        logger.error(f"🚨 QUOTA EXCEEDED on key {key_index + 2}")
+                        if key_index not in self.exhausted_keys_date:
+                            self.mark_key_as_exhausted(key_index)
+
+                        if retry_count < self.max_retries and not self.all_keys_exhausted():
+                            logger.info(f"♻️ Tentando com próxima chave disponível...")
+                            return await self.make_api_request(url, params, canal_name, retry_count + 1)
+                        return None
 
-                        # CASO 2: Rate Limit
-                        elif 'ratelimit' in error_msg or 'ratelimit' in error_reason or 'usageratelimit' in error_reason:
-                            if retry_count < self.max_retries:
-                                wait_time = (2 ** retry_count) * 30
-                                logger.warning(f"⏱️ RATE LIMIT hit on key {self.current_key_index + 2}")
-                                logger.info(f"♻️ Retry {retry_count + 1}/{self.max_retries} após {wait_time}s")
-                                await asyncio.sleep(wait_time)
-                                return await self.make_api_request(url, params, canal_name, retry_count + 1)
-                            else:
-                                logger.error(f"❌ Max retries atingido após rate limit")
-                                return None
-
-                        # CASO 3: 🆕 Key Suspensa (403 genérico) - AGORA ROTACIONA!
+                    # CASO 2: Rate Limit
+                    elif 'ratelimit' in error_msg or 'ratelimit' in error_reason or 'usageratelimit' in error_reason:
+                        if retry_count < self.max_retries:
+                            wait_time = (2 ** retry_count) * 30
+                            logger.warning(f"⏱️ RATE LIMIT hit on key {key_index + 2}")
+                            logger.info(f"♻️ Retry {retry_count + 1}/{self.max_retries} após {wait_time}s")
+                            await asyncio.sleep(wait_time)
+                            return await self.make_api_request(url, params, canal_name, retry_count + 1)
                         else:
-                            logger.error(f"❌ KEY SUSPENDED (403 genérico) on key {self.current_key_index + 2}: {error_msg}")
-                            self.mark_key_as_suspended()
-
-                            if retry_count < self.max_retries and not self.all_keys_exhausted():
-                                logger.info(f"♻️ Tentando com próxima chave disponível...")
-                                return await self.make_api_request(url, params, canal_name, retry_count + 1)
-                            else:
-                                logger.error(f"❌ Todas as chaves esgotadas ou suspensas")
-                                return None
+                            logger.error(f"❌ Max retries atingido após rate limit")
+                            return None
 
+                    # CASO 3: 🆕 Key Suspensa (403 genérico) - AGORA ROTACIONA!
                     else:
-                        logger.warning(f"⚠️ HTTP {response.status}: {await response.text()}")
-                        return None
+                        logger.error(f"❌ KEY SUSPENDED (403 genérico) on key {key_index + 2}: {error_msg}")
+                        if key_index not in self.suspended_keys:
+                            self.mark_key_as_suspended(key_index)
+
+                        if retry_count < self.max_retries and not self.all_keys_exhausted():
+                            logger.info(f"♻️ Tentando com próxima chave disponível...")
+                            return await self.make_api_request(url, params, canal_name, retry_count + 1)
+                        else:
+                            logger.error(f"❌ Todas as chaves esgotadas ou suspensas")
+                            return None
+
+                else:
+                    logger.warning(f"⚠️ HTTP {response.status}: {await response.text()}")
+                    return None
 
         except asyncio.TimeoutError:
             logger.warning(f"⏱️ Timeout na requisição")
@@ -396,8 +497,10 @@ class YouTubeCollector:
 
         except ClientConnectionError as e:
             # Tratamento especial para ConnectionTerminated (limite HTTP/2)
+            # ServerDisconnected: conexão keep-alive do pool fechada pelo servidor (descartada, retry usa outra)
             error_str = str(e)
-            if 'ConnectionTerminated' in error_str or 'ConnectionReset' in error_str:
+            if ('ConnectionTerminated' in error_str or 'ConnectionReset' in error_str
+                    or isinstance(e, aiohttp.ServerDisconnectedError)):
                 logger.warning(f"⚠️ Conexão terminada pelo servidor YouTube (limite HTTP/2 atingido)")
                 logger.info(f"   Erro: {error_str[:100]}...")
 
@@ -869,11 +972,14 @@ class YouTubeCollector:
     # 🆕 SISTEMA DE COLETA DE COMENTÁRIOS
     # ===============================================
 
-    async def get_video_comments(self, video_id: str, video_title: str = "", max_results: int = 100) -> Optional[List[Dict[str, Any]]]:
+    async def get_video_comments(self, video_id: str, video_title: str = "", max_results: int = 100,
+                                 since: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
         """
         Busca comentários de um vídeo específico
         - Custo: 1 unit por request (até 100 comentários)
         - Suporta paginação para buscar TODOS os comentários
+        - since: timestamp ISO da última coleta - como a ordem é 'time' (mais recentes
+          primeiro), para no primeiro comentário principal mais antigo que isso
         """
         try:
             if not video_id:
@@ -883,6 +989,8 @@ class YouTubeCollector:
             all_comments = []
             next_page_token = None
             total_fetched = 0
+            reached_since = False
+            since_cutoff = since[:19] if since else None
 
             logger.info(f"💬 Buscando comentários do vídeo: {video_title[:50]}...")
 
@@ -907,6 +1015,11 @@ class YouTubeCollector:
                 for item in data.get('items', []):
                     snippet = item['snippet']['topLevelComment']['snippet']
 
+                    # Coleta incremental: daqui pra frente tudo já foi coletado
+                    if since_cutoff and snippet['publishedAt'][:19] <= since_cutoff:
+                        reached_since = True
+                        break
+
                     comment = {
                         'comment_id': item['id'],
                         'video_id': video_id,
@@ -945,7 +1058,7 @@ class YouTubeCollector:
 
                 # Verificar se tem próxima página e se ainda não atingiu o limite
                 next_page_token = data.get('nextPageToken')
-                if not next_page_token or total_fetched >= max_results:
+                if reached_since or not next_page_token or total_fetched >= max_results:
                     break
 
                 # Limitar a 1000 comentários por vídeo para não sobrecarregar
@@ -964,7 +1077,10 @@ class YouTubeCollector:
         """
         Busca comentários de todos os vídeos de um canal
         Otimizado para canais 'nossos' apenas
-        Suporta coleta incremental usando timestamp
+        Suporta coleta incremental usando timestamp:
+        - cada vídeo para de paginar ao chegar em comentários anteriores a last_collected_timestamp
+        - vídeos com 'commentCount' igual a 'previousCommentCount' (snapshot anterior) são pulados
+        Vídeos em paralelo (até COMMENTS_VIDEO_CONCURRENCY), sob o mesmo rate limiter por chave.
         """
         try:
             if not videos:
@@ -976,47 +1092,66 @@ class YouTubeCollector:
 
             # Coletar de TODOS os vídeos ordenados por DATA (mais recentes primeiro), SEM LIMITE
             # Mudança: ordenar por publishedAt em vez de views para pegar comentários recentes
-            all_videos_sorted = sorted(videos, key=lambda x: x.get('publishedAt', ''), reverse=True)
+            all_videos_sorted = sorted(videos, key=lambda x: x.get('publishedAt', '') or '', reverse=True)
 
-            # SEM LIMITE - coletar de TODOS os vídeos do canal
-            videos_to_collect = all_videos_sorted
+            # Incremental: pular vídeos cuja contagem de comentários não mudou desde a última coleta
+            videos_to_collect = []
+            skipped_unchanged = 0
+            for video in all_videos_sorted:
+                if not video.get('videoId'):
+                    continue
+                previous = video.get('previousCommentCount')
+                if (last_collected_timestamp and previous is not None
+                        and video.get('commentCount') is not None and int(video['commentCount']) == int(previous)):
+                    skipped_unchanged += 1
+                    continue
+                videos_to_collect.append(video)
 
             # Log informativo
-            total_views = sum(int(v.get('viewCount', 0)) for v in videos_to_collect)
-            logger.info(f"📊 Coletando comentários de {len(videos_to_collect)} vídeos de {canal_name}: {total_views:,} views totais")
+            total_views = sum(int(v.get('viewCount', 0) or 0) for v in videos_to_collect)
+            logger.info(
+                f"📊 Coletando comentários de {len(videos_to_collect)} vídeos de {canal_name}: {total_views:,} views totais "
+                f"({skipped_unchanged} sem comentários novos pulados, {COMMENTS_VIDEO_CONCURRENCY} em paralelo)"
+            )
 
-            logger.info(f"📊 Coletando TODOS comentários de {len(videos_to_collect)} vídeos de {canal_name} (upsert no banco filtra duplicatas)")
+            semaphore = asyncio.Semaphore(max(1, COMMENTS_VIDEO_CONCURRENCY))
 
-            for video in videos_to_collect:
-                video_id = video.get('videoId')
-                video_title = video.get('title', 'Sem título')
+            async def fetch(video):
+                async with semaphore:
+                    if self.all_keys_exhausted():
+                        return video, []
+                    # Buscar comentários do vídeo (upsert no banco cuida de duplicatas)
+                    comments = await self.get_video_comments(
+                        video['videoId'], video.get('title', 'Sem título'), max_results=100,
+                        since=last_collected_timestamp
+                    )
+                    return video, comments
+
+            results = await asyncio.gather(*(fetch(video) for video in videos_to_collect))
 
-                if not video_id:
+            for video, comments in results:
+                if not comments:
                     continue
 
-                # Buscar TODOS comentários do vídeo (upsert no banco cuida de duplicatas)
-                comments = await self.get_video_comments(video_id, video_title, max_results=100)
+                video_id = video['videoId']
+                video_title = video.get('title', 'Sem título')
 
-                if comments:
-                    # Rastrear timestamp mais recente
-                    for comment in comments:
-                        comment_time = comment.get('published_at', '')
-                        if comment_time and (not latest_comment_timestamp or comment_time > latest_comment_timestamp):
-                            latest_comment_timestamp = comment_time
+                # Rastrear timestamp mais recente
+                for comment in comments:
+                    comment_time = comment.get('published_at', '')
+                    if comment_time and (not latest_comment_timestamp or comment_time > latest_comment_timestamp):
+                        latest_comment_timestamp = comment_time
 
-                    logger.info(f"  ✅ {video_title[:30]}: {len(comments)} comentários")
+                logger.info(f"  ✅ {video_title[:30]}: {len(comments)} comentários")
 
-                    comments_by_video[video_id] = {
-                        'video_title': video_title,
-                        'video_views': video.get('viewCount', 0),
-                        'video_published': video.get('publishedAt'),
-                        'comments': comments,
-                        'total_count': len(comments)
-                    }
-                    total_comments += len(comments)
-
-                # Pequena pausa entre vídeos para não sobrecarregar
-                await asyncio.sleep(0.5)
+                comments_by_video[video_id] = {
+                    'video_title': video_title,
+                    'video_views': video.get('viewCount', 0),
+                    'video_published': video.get('publishedAt'),
+                    'comments': comments,
+                    'total_count': len(comments)
+                }
+                total_comments += len(comments)
 
             if total_comments > 0:
                 logger.info(f"✅ {total_comments} comentários coletados de {canal_name} (novos serão inseridos, existentes ignorados)")
@@ -1026,6 +1161,7 @@ class YouTubeCollector:
             return {
                 'canal_name': canal_name,
                 'total_videos_analyzed': len(videos_to_collect),
+                'total_videos_skipped': skipped_unchanged,
                 'total_comments': total_comments,
                 'comments_by_video': comments_by_video,
                 'latest_comment_timestamp': latest_comment_timestamp,
@@ -7,8 +7,9 @@ usando a YouTube Reporting API (channel_reach_basic_a1).
 Diferente do Analytics API, o Reporting API funciona assim:
 1. Criar um "job" por canal (unica vez)
 2. Google gera 1 CSV por dia automaticamente
-3. Baixar CSVs novos e parsear
-4. Agregar: soma impressoes + CTR medio ponderado por video
+3. Baixar CSVs novos (ledger yt_ctr_report_ledger) e parsear em streaming
+4. Agregar: soma impressoes + cliques no acumulado por video (yt_ctr_video_totals)
+   junto com o ledger, numa unica transacao (RPC apply_ctr_reports)
 5. Salvar em yt_video_metrics (mesma tabela de retencao/views)
 
 Requer:
@@ -22,12 +23,16 @@ import sys
 import csv
 import io
 import gzip
+import time
 import requests
 import logging
 import asyncio
-from datetime import datetime, timedelta
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from collections import defaultdict
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 
 load_dotenv()
 
@@ -64,7 +69,7 @@ def get_collection_status():
 def get_collection_history(limit=20):
     """Deriva historico de coletas agrupando yt_reporting_jobs.updated_at em lotes."""
     read_headers = {"apikey": AUTH_KEY, "Authorization": f"Bearer {AUTH_KEY}"}
-    resp = requests.get(
+    resp = _http().get(
         f"{SUPABASE_URL}/rest/v1/yt_reporting_jobs",
         params={
             "select": "channel_id,updated_at,last_report_date",
@@ -134,6 +139,45 @@ SUPABASE_HEADERS = {
 REPORTING_API_BASE = "https://youtubereporting.googleapis.com/v1"
 REPORT_TYPE = "channel_reach_basic_a1"
 
+# Buffer de leitura do download em streaming dos CSVs
+CSV_STREAM_BUFFER = 64 * 1024
+
+# Canais processados em paralelo na coleta semanal
+CTR_CHANNEL_CONCURRENCY = int(os.environ.get("CTR_CHANNEL_CONCURRENCY", "4"))
+
+# Uma sessao HTTP (keep-alive) por credencial de proxy; a thread de cada canal
+# usa a sessao do seu proxy via _http()
+_sessions = {}
+_sessions_lock = threading.Lock()
+_thread_state = threading.local()
+
+
+def _session_for(proxy_key):
+    """Sessao HTTP compartilhada pelos canais do mesmo proxy (criada sob demanda)."""
+    with _sessions_lock:
+        session = _sessions.get(proxy_key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=CTR_CHANNEL_CONCURRENCY)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[proxy_key] = session
+        return session
+
+
+def _http():
+    """Sessao HTTP da thread atual (proxy do canal em coleta) ou a sessao padrao."""
+    return getattr(_thread_state, "session", None) or _session_for("default")
+
+
+def _close_sessions():
+    """Fecha as sessoes dos proxies abertas na coleta (a padrao segue em uso pelos endpoints)."""
+    with _sessions_lock:
+        keys = [k for k in _sessions if k != "default"]
+        sessions = [_sessions.pop(k) for k in keys]
+    for session in sessions:
+        session.close()
+
 
 # =============================================================================
 # FUNCOES AUXILIARES - OAUTH (reutiliza padrao do monetization_oauth_collector)
@@ -141,7 +185,7 @@ REPORT_TYPE = "channel_reach_basic_a1"
 
 def get_channels_with_oauth():
     """Busca canais ATIVOS com tokens OAuth."""
-    resp = requests.get(
+    resp = _http().get(
         f"{SUPABASE_URL}/rest/v1/yt_oauth_tokens",
         params={"select": "channel_id"},
         headers={"apikey": AUTH_KEY, "Authorization": f"Bearer {AUTH_KEY}"}
@@ -155,7 +199,7 @@ def get_channels_with_oauth():
         return []
 
     ids_str = ",".join(channel_ids)
-    resp = requests.get(
+    resp = _http().get(
         f"{SUPABASE_URL}/rest/v1/yt_channels",
         params={
             "channel_id": f"in.({ids_str})",
@@ -174,7 +218,7 @@ def get_channels_with_oauth():
 
 def get_tokens(channel_id):
     """Busca tokens OAuth de um canal."""
-    resp = requests.get(
+    resp = _http().get(
         f"{SUPABASE_URL}/rest/v1/yt_oauth_tokens",
         params={"channel_id": f"eq.{channel_id}"},
         headers={"apikey": AUTH_KEY, "Authorization": f"Bearer {AUTH_KEY}"}
@@ -187,13 +231,13 @@ def get_tokens(channel_id):
 def get_credentials(channel_id, proxy_name):
     """Busca credenciais OAuth (proxy ou isoladas)."""
     if proxy_name:
-        resp = requests.get(
+        resp = _http().get(
             f"{SUPABASE_URL}/rest/v1/yt_proxy_credentials",
             params={"proxy_name": f"eq.{proxy_name}"},
             headers={"apikey": AUTH_KEY, "Authorization": f"Bearer {AUTH_KEY}"}
         )
     else:
-        resp = requests.get(
+        resp = _http().get(
             f"{SUPABASE_URL}/rest/v1/yt_channel_credentials",
             params={"channel_id": f"eq.{channel_id}"},
             headers={"apikey": AUTH_KEY, "Authorization": f"Bearer {AUTH_KEY}"}
@@ -205,7 +249,7 @@ def get_credentials(channel_id, proxy_name):
 
 def refresh_access_token(refresh_token, client_id, client_secret):
     """Renova o access_token usando o refresh_token."""
-    resp = requests.post("https://oauth2.googleapis.com/token", data={
+    resp = _http().post("https://oauth2.googleapis.com/token", data={
         "client_id": client_id,
         "client_secret": client_secret,
         "refresh_token": refresh_token,
@@ -219,7 +263,7 @@ def refresh_access_token(refresh_token, client_id, client_secret):
 
 def update_tokens(channel_id, access_token):
     """Atualiza access_token no Supabase."""
-    requests.patch(
+    _http().patch(
         f"{SUPABASE_URL}/rest/v1/yt_oauth_tokens",
         params={"channel_id": f"eq.{channel_id}"},
         headers=SUPABASE_HEADERS,
@@ -233,7 +277,7 @@ def update_tokens(channel_id, access_token):
 
 def get_reporting_job(channel_id):
     """Busca job existente do canal no banco."""
-    resp = requests.get(
+    resp = _http().get(
         f"{SUPABASE_URL}/rest/v1/yt_reporting_jobs",
         params={
             "channel_id": f"eq.{channel_id}",
@@ -258,7 +302,7 @@ def save_reporting_job(channel_id, job_id, status="active", error_message=None):
         "updated_at": datetime.now().isoformat()
     }
     # Tentar INSERT primeiro
-    resp = requests.post(
+    resp = _http().post(
         f"{SUPABASE_URL}/rest/v1/yt_reporting_jobs",
         headers=SUPABASE_HEADERS,
         json=data
@@ -274,7 +318,7 @@ def save_reporting_job(channel_id, job_id, status="active", error_message=None):
             "error_message": error_message,
             "updated_at": datetime.now().isoformat()
         }
-        resp2 = requests.patch(
+        resp2 = _http().patch(
             f"{SUPABASE_URL}/rest/v1/yt_reporting_jobs",
             params={
                 "channel_id": f"eq.{channel_id}",
@@ -301,7 +345,7 @@ def update_reporting_job(channel_id, last_report_date=None, last_report_id=None,
     if error_message is not None:
         data["error_message"] = error_message
 
-    requests.patch(
+    _http().patch(
         f"{SUPABASE_URL}/rest/v1/yt_reporting_jobs",
         params={
             "channel_id": f"eq.{channel_id}",
@@ -318,7 +362,7 @@ def update_reporting_job(channel_id, last_report_date=None, last_report_id=None,
 
 def create_reporting_job(access_token):
     """Cria um job no YouTube Reporting API."""
-    resp = requests.post(
+    resp = _http().post(
         f"{REPORTING_API_BASE}/jobs",
         headers={
             "Authorization": f"Bearer {access_token}",
@@ -340,7 +384,7 @@ def create_reporting_job(access_token):
 
 def list_existing_jobs(access_token):
     """Lista jobs existentes no YouTube Reporting API para este canal."""
-    resp = requests.get(
+    resp = _http().get(
         f"{REPORTING_API_BASE}/jobs",
         headers={"Authorization": f"Bearer {access_token}"}
     )
@@ -396,7 +440,7 @@ def list_available_reports(job_id, access_token, since_date=None):
         # createdAfter filtra reports criados depois dessa data (ISO 8601)
         params["createdAfter"] = f"{since_date}T00:00:00Z"
 
-    resp = requests.get(
+    resp = _http().get(
         f"{REPORTING_API_BASE}/jobs/{job_id}/reports",
         params=params,
         headers={"Authorization": f"Bearer {access_token}"}
@@ -421,104 +465,206 @@ def list_available_reports(job_id, access_token, since_date=None):
     return result
 
 
-def download_and_parse_csv(download_url, access_token):
+def _open_csv_stream(resp):
+    """
+    Stream de texto do CSV direto da resposta HTTP (sem carregar o arquivo inteiro).
+    Content-Encoding gzip é decodificado pelo urllib3; arquivo .gz (magic bytes 1f8b)
+    passa por GzipFile em streaming.
+    """
+    resp.raw.decode_content = True
+    raw = io.BufferedReader(resp.raw, buffer_size=CSV_STREAM_BUFFER)
+    if raw.peek(2)[:2] == b"\x1f\x8b":
+        raw = gzip.GzipFile(fileobj=raw)
+    # video_id e numeros sao ASCII - bytes invalidos nao derrubam o parse
+    return io.TextIOWrapper(raw, encoding="utf-8", errors="replace", newline="")
+
+
+def iter_csv_rows(download_url, access_token):
     """
-    Baixa um CSV do Reporting API e parseia.
-    Retorna lista de dicts: {video_id, impressions, ctr}
+    Baixa um CSV do Reporting API em streaming e gera linhas parseadas.
+    Gera dicts: {video_id, impressions, ctr}. Levanta RuntimeError se o download falhar.
     """
-    resp = requests.get(
+    resp = _http().get(
         download_url,
         headers={"Authorization": f"Bearer {access_token}"},
         stream=True
     )
     if resp.status_code != 200:
-        log.error(f"Erro ao baixar CSV: {resp.status_code}")
-        return []
-
-    # Descomprimir se gzip
-    content = resp.content
-    if resp.headers.get("Content-Encoding") == "gzip" or download_url.endswith(".gz"):
-        try:
-            content = gzip.decompress(content)
-        except Exception:
-            pass  # Ja esta descomprimido
+        resp.close()
+        raise RuntimeError(f"Erro ao baixar CSV: {resp.status_code}")
 
-    # Decodificar e parsear CSV
     try:
-        text = content.decode("utf-8")
-    except UnicodeDecodeError:
-        text = content.decode("latin-1")
-
-    reader = csv.DictReader(io.StringIO(text))
-    rows = []
-    for row in reader:
-        video_id = row.get("video_id", "")
-        if not video_id:
-            continue
+        for row in csv.DictReader(_open_csv_stream(resp)):
+            video_id = row.get("video_id", "")
+            if not video_id:
+                continue
 
-        try:
-            impressions = int(row.get("video_thumbnail_impressions", 0))
-            ctr = float(row.get("video_thumbnail_impressions_ctr", 0))
-        except (ValueError, TypeError):
-            continue
+            try:
+                impressions = int(row.get("video_thumbnail_impressions", 0))
+                ctr = float(row.get("video_thumbnail_impressions_ctr", 0))
+            except (ValueError, TypeError):
+                continue
+
+            yield {
+                "video_id": video_id,
+                "impressions": impressions,
+                "ctr": ctr
+            }
+    finally:
+        resp.close()
 
-        rows.append({
-            "video_id": video_id,
-            "impressions": impressions,
-            "ctr": ctr
-        })
 
-    return rows
+# =============================================================================
+# FUNCOES - LEDGER DE REPORTS (yt_ctr_report_ledger)
+# =============================================================================
+
+def get_processed_report_ids(job_id):
+    """IDs de reports ja processados para o job (so os novos sao baixados)."""
+    read_headers = {"apikey": AUTH_KEY, "Authorization": f"Bearer {AUTH_KEY}"}
+    processed = set()
+    offset = 0
+    page_size = 1000
+
+    while True:
+        resp = _http().get(
+            f"{SUPABASE_URL}/rest/v1/yt_ctr_report_ledger",
+            params={
+                "job_id": f"eq.{job_id}",
+                "select": "report_id",
+                "order": "id",
+                "limit": page_size,
+                "offset": offset
+            },
+            headers=read_headers
+        )
+        if resp.status_code != 200:
+            # Sem ledger nao da pra saber o que ja foi somado - reprocessar duplicaria os acumulados
+            raise RuntimeError(f"Erro ao ler ledger de reports: {resp.status_code} - {resp.text[:200]}")
+        page = resp.json()
+        processed.update(r["report_id"] for r in page)
+        if len(page) < page_size:
+            return processed
+        offset += page_size
 
 
 # =============================================================================
 # FUNCOES - AGREGACAO E SALVAMENTO
 # =============================================================================
 
-def aggregate_weekly_data(all_rows):
+def accumulate_rows(rows, totals=None):
     """
-    Agrega dados de multiplos CSVs diarios por video_id.
-    - Soma impressoes
-    - Calcula CTR medio ponderado: total_cliques / total_impressoes
-    Retorna dict: {video_id: {impressions: N, ctr: F}}
+    Soma linhas de CSV (iteravel - pode ser o stream) por video_id.
+    Cliques = impressoes * CTR, para o CTR medio ponderado.
+    Retorna (totals, linhas_lidas) - totals: {video_id: {total_impressions: N, total_clicks: F}}
     """
-    video_data = defaultdict(lambda: {"total_impressions": 0, "total_clicks": 0})
+    if totals is None:
+        totals = defaultdict(lambda: {"total_impressions": 0, "total_clicks": 0})
 
-    for row in all_rows:
+    count = 0
+    for row in rows:
         vid = row["video_id"]
         imp = row["impressions"]
-        ctr = row["ctr"]
         # Calcular cliques a partir de impressoes * CTR
-        clicks = imp * ctr
+        totals[vid]["total_impressions"] += imp
+        totals[vid]["total_clicks"] += imp * row["ctr"]
+        count += 1
 
-        video_data[vid]["total_impressions"] += imp
-        video_data[vid]["total_clicks"] += clicks
+    return totals, count
 
-    # Calcular CTR medio ponderado
+
+def finalize_totals(totals):
+    """Converte acumulados em {video_id: {impressions: N, ctr: F}} (CTR medio ponderado)."""
     result = {}
-    for vid, data in video_data.items():
+    for vid, data in totals.items():
         total_imp = data["total_impressions"]
-        total_clicks = data["total_clicks"]
-        weighted_ctr = (total_clicks / total_imp) if total_imp > 0 else 0
-
+        weighted_ctr = (data["total_clicks"] / total_imp) if total_imp > 0 else 0
         result[vid] = {
             "impressions": total_imp,
             "ctr": round(weighted_ctr, 6)
         }
-
     return result
 
 
-def save_ctr_data(channel_id, aggregated_data):
+def apply_reports_to_totals(channel_id, job_id, reports, reports_per_call=20):
     """
-    Salva impressions + ctr em yt_video_metrics.
-    Os dados ja vem agregados de TODOS os CSVs disponiveis (~180 dias),
-    entao o total ja e o acumulado do periodo — salva direto (sobrescreve).
-    Se video NAO existe → INSERT.
+    Soma os reports novos aos acumulados de yt_ctr_video_totals e registra o ledger
+    na MESMA transacao (RPC apply_ctr_reports). Report ja presente no ledger nao e
+    somado de novo, entao repetir a chamada apos falha nao duplica acumulados.
+
+    reports: [{report_id, report_start, rows_parsed, totals: {video_id: {total_impressions, total_clicks}}}]
+    Retorna os totais mesclados dos videos tocados.
+    """
+    rpc_headers = {k: v for k, v in SUPABASE_HEADERS.items() if k != "Prefer"}
+    merged = {}
+
+    for i in range(0, len(reports), reports_per_call):
+        payload = [{
+            "report_id": report["report_id"],
+            "report_start": report["report_start"],
+            "rows_parsed": report["rows_parsed"],
+            "totals": [
+                {"video_id": vid, "impressions": data["total_impressions"], "clicks": data["total_clicks"]}
+                for vid, data in report["totals"].items()
+            ]
+        } for report in reports[i:i + reports_per_call]]
+
+        resp = _http().post(
+            f"{SUPABASE_URL}/rest/v1/rpc/apply_ctr_reports",
+            headers=rpc_headers,
+            json={"p_channel_id": channel_id, "p_job_id": job_id, "p_reports": payload}
+        )
+        if resp.status_code != 200:
+            raise RuntimeError(f"Erro ao somar reports de CTR: {resp.status_code} - {resp.text[:200]}")
+        for row in resp.json():
+            merged[row["video_id"]] = {
+                "total_impressions": row["total_impressions"] or 0,
+                "total_clicks": row["total_clicks"] or 0
+            }
+
+    return merged
+
+
+def get_channel_totals(channel_id):
+    """Todos os acumulados de CTR do canal (para o CTR medio do canal)."""
+    read_headers = {"apikey": AUTH_KEY, "Authorization": f"Bearer {AUTH_KEY}"}
+    totals = {}
+    offset = 0
+    page_size = 1000
+
+    while True:
+        resp = _http().get(
+            f"{SUPABASE_URL}/rest/v1/yt_ctr_video_totals",
+            params={
+                "channel_id": f"eq.{channel_id}",
+                "select": "video_id,total_impressions,total_clicks",
+                "order": "video_id",
+                "limit": page_size,
+                "offset": offset
+            },
+            headers=read_headers
+        )
+        if resp.status_code != 200:
+            log.warning(f"[{channel_id}] Erro ao ler acumulados do canal: {resp.status_code}")
+            break
+        page = resp.json()
+        for row in page:
+            totals[row["video_id"]] = {
+                "total_impressions": row["total_impressions"] or 0,
+                "total_clicks": row["total_clicks"] or 0
+            }
+        if len(page) < page_size:
+            break
+        offset += page_size
+
+    return totals
+
+
+def _save_ctr_row(channel_id, video_id, data):
+    """
+    Fallback linha a linha de save_ctr_data.
+    Se video existe → PATCH; se NAO existe → INSERT (409 → PATCH).
+    Retorna "updated", "inserted" ou None (erro).
     """
-    saved = 0
-    inserted = 0
-    errors = 0
     read_headers = {"apikey": AUTH_KEY, "Authorization": f"Bearer {AUTH_KEY}"}
 
     # Headers SEM resolution=merge-duplicates para INSERT puro
@@ -528,76 +674,90 @@ def save_ctr_data(channel_id, aggregated_data):
         "Content-Type": "application/json",
         "Prefer": "return=minimal"
     }
+    patch_data = {"impressions": data["impressions"], "ctr": data["ctr"], "updated_at": datetime.now().isoformat()}
 
-    for video_id, data in aggregated_data.items():
-        # Verificar se video ja existe na tabela
-        check = requests.get(
+    # Verificar se video ja existe na tabela
+    check = _http().get(
+        f"{SUPABASE_URL}/rest/v1/yt_video_metrics",
+        params={
+            "channel_id": f"eq.{channel_id}",
+            "video_id": f"eq.{video_id}",
+            "select": "id"
+        },
+        headers=read_headers
+    )
+
+    if not (check.status_code == 200 and check.json()):
+        # Video NAO existe → INSERT com impressions + ctr
+        resp = _http().post(
             f"{SUPABASE_URL}/rest/v1/yt_video_metrics",
-            params={
-                "channel_id": f"eq.{channel_id}",
-                "video_id": f"eq.{video_id}",
-                "select": "id"
-            },
-            headers=read_headers
+            headers=insert_headers,
+            json={"channel_id": channel_id, "video_id": video_id, **patch_data}
         )
+        if resp.status_code in [200, 201, 204]:
+            return "inserted"
+        if resp.status_code != 409:
+            log.error(f"[{channel_id}] INSERT CTR falhou video {video_id}: {resp.status_code}")
+            return None
+
+    # Video existe → PATCH com total acumulado
+    resp = _http().patch(
+        f"{SUPABASE_URL}/rest/v1/yt_video_metrics",
+        params={
+            "channel_id": f"eq.{channel_id}",
+            "video_id": f"eq.{video_id}"
+        },
+        headers=SUPABASE_HEADERS,
+        json=patch_data
+    )
+    if resp.status_code in [200, 204]:
+        return "updated"
+    log.error(f"[{channel_id}] PATCH CTR falhou video {video_id}: {resp.status_code}")
+    return None
 
-        if check.status_code == 200 and check.json():
-            # Video existe → PATCH com total acumulado dos CSVs
-            resp = requests.patch(
-                f"{SUPABASE_URL}/rest/v1/yt_video_metrics",
-                params={
-                    "channel_id": f"eq.{channel_id}",
-                    "video_id": f"eq.{video_id}"
-                },
-                headers=SUPABASE_HEADERS,
-                json={
-                    "impressions": data["impressions"],
-                    "ctr": data["ctr"],
-                    "updated_at": datetime.now().isoformat()
-                }
-            )
-            if resp.status_code in [200, 204]:
+
+def save_ctr_data(channel_id, aggregated_data, chunk_size=500):
+    """
+    Salva impressions + ctr em yt_video_metrics.
+    Os dados sao o acumulado (yt_ctr_video_totals) dos videos tocados pelos reports
+    novos — salva direto (sobrescreve). Upsert em lote em (channel_id, video_id): o
+    payload so tem impressions/ctr, entao as colunas de retencao/views nao mudam.
+    Se o lote falhar → linha a linha (PATCH ou INSERT).
+    """
+    saved = 0
+    errors = 0
+    now = datetime.now().isoformat()
+    items = list(aggregated_data.items())
+
+    for i in range(0, len(items), chunk_size):
+        chunk = items[i:i + chunk_size]
+        resp = _http().post(
+            f"{SUPABASE_URL}/rest/v1/yt_video_metrics",
+            params={"on_conflict": "channel_id,video_id"},
+            headers=SUPABASE_HEADERS,
+            json=[{
+                "channel_id": channel_id,
+                "video_id": video_id,
+                "impressions": data["impressions"],
+                "ctr": data["ctr"],
+                "updated_at": now
+            } for video_id, data in chunk]
+        )
+        if resp.status_code in [200, 201, 204]:
+            saved += len(chunk)
+            continue
+
+        log.warning(f"[{channel_id}] Upsert CTR em lote falhou ({resp.status_code}) - salvando linha a linha")
+        for video_id, data in chunk:
+            if _save_ctr_row(channel_id, video_id, data):
                 saved += 1
             else:
                 errors += 1
-                log.error(f"[{channel_id}] PATCH CTR falhou video {video_id}: {resp.status_code}")
-        else:
-            # Video NAO existe → INSERT com impressions + ctr
-            resp = requests.post(
-                f"{SUPABASE_URL}/rest/v1/yt_video_metrics",
-                headers=insert_headers,
-                json={
-                    "channel_id": channel_id,
-                    "video_id": video_id,
-                    "impressions": data["impressions"],
-                    "ctr": data["ctr"],
-                    "updated_at": datetime.now().isoformat()
-                }
-            )
-            if resp.status_code in [200, 201, 204]:
-                inserted += 1
-            elif resp.status_code == 409:
-                resp2 = requests.patch(
-                    f"{SUPABASE_URL}/rest/v1/yt_video_metrics",
-                    params={"channel_id": f"eq.{channel_id}", "video_id": f"eq.{video_id}"},
-                    headers=SUPABASE_HEADERS,
-                    json={"impressions": data["impressions"], "ctr": data["ctr"], "updated_at": datetime.now().isoformat()}
-                )
-                if resp2.status_code in [200, 204]:
-                    saved += 1
-                else:
-                    errors += 1
-                    log.error(f"[{channel_id}] PATCH CTR (fallback) falhou video {video_id}: {resp2.status_code}")
-            else:
-                errors += 1
-                log.error(f"[{channel_id}] INSERT CTR falhou video {video_id}: {resp.status_code}")
 
-    if inserted > 0:
-        log.info(f"  {inserted} videos novos criados em yt_video_metrics (so com CTR)")
     if errors > 0:
         log.warning(f"  {errors} erros ao salvar CTR")
 
-    return saved + inserted
+    return saved
 
 
 def save_channel_avg_ctr(channel_id, aggregated_data):
@@ -610,7 +770,7 @@ def save_channel_avg_ctr(channel_id, aggregated_data):
     total_clicks = sum(d["impressions"] * d["ctr"] for d in aggregated_data.values())
     avg_ctr = round(total_clicks / total_impressions, 6) if total_impressions > 0 else 0
 
-    resp = requests.patch(
+    resp = _http().patch(
         f"{SUPABASE_URL}/rest/v1/yt_channels",
         params={"channel_id": f"eq.{channel_id}"},
         headers=SUPABASE_HEADERS,
@@ -728,119 +888,213 @@ async def collect_ctr_reports():
         _ctr_collection_status["finished_at"] = datetime.now().isoformat()
 
 
-def _do_collect_ctr_reports_sync():
-    """Logica interna da coleta CTR (sync, roda em thread)."""
-    log.info("=" * 60)
-    log.info("CTR COLLECTION: Baixando relatorios de impressoes/CTR")
-    log.info("=" * 60)
+def _collect_channel_ctr(channel):
+    """
+    Coleta CTR de UM canal (token, job, reports novos, acumulados).
+    Retorna (status, registros_salvos) - status: "success", "skipped" ou "error".
+    """
+    channel_id = channel["channel_id"]
+    channel_name = channel.get("channel_name", channel_id)
+    proxy_name = channel.get("proxy_name")
 
-    channels = get_channels_with_oauth()
-    if not channels:
-        return {"error": "Nenhum canal com OAuth", "success": 0, "errors": 0, "total_records": 0}
+    try:
+        # Obter token
+        tokens = get_tokens(channel_id)
+        if not tokens:
+            log.warning(f"[{channel_name}] Sem tokens - pulando")
+            return "error", 0
 
-    success_count = 0
-    error_count = 0
-    total_records = 0
-    skipped_count = 0
+        credentials = get_credentials(channel_id, proxy_name)
+        if not credentials:
+            log.warning(f"[{channel_name}] Sem credenciais - pulando")
+            return "error", 0
 
-    for channel in channels:
-        channel_id = channel["channel_id"]
-        channel_name = channel.get("channel_name", channel_id)
-        proxy_name = channel.get("proxy_name")
+        access_token = refresh_access_token(
+            tokens["refresh_token"],
+            credentials["client_id"],
+            credentials["client_secret"]
+        )
+        if not access_token:
+            log.warning(f"[{channel_name}] Token refresh falhou - pulando")
+            return "error", 0
 
-        try:
-            # Obter token
-            tokens = get_tokens(channel_id)
-            if not tokens:
-                log.warning(f"[{channel_name}] Sem tokens - pulando")
-                error_count += 1
-                continue
+        update_tokens(channel_id, access_token)
 
-            credentials = get_credentials(channel_id, proxy_name)
-            if not credentials:
-                log.warning(f"[{channel_name}] Sem credenciais - pulando")
-                error_count += 1
+        # Auto-provisioning: criar job se nao existe
+        job_id = get_or_create_job(channel_id, access_token)
+        if not job_id:
+            log.warning(f"[{channel_name}] Sem job ativo - pulando")
+            return "error", 0
+
+        # Listar CSVs disponiveis (ate ~180 dias) e pular os ja processados (ledger)
+        since_date = (datetime.now() - timedelta(days=180)).strftime("%Y-%m-%d")
+        reports = list_available_reports(job_id, access_token, since_date)
+        processed_ids = get_processed_report_ids(job_id)
+        reports = [r for r in reports if r["id"] not in processed_ids]
+        if not reports:
+            log.info(f"[{channel_name}] Nenhum relatorio novo ({len(processed_ids)} ja processados)")
+            return "skipped", 0
+
+        log.info(f"[{channel_name}] {len(reports)} relatorios novos para baixar ({len(processed_ids)} ja processados)")
+
+        # Baixar e agregar CSVs novos em streaming (sem acumular as linhas)
+        new_reports = []
+        last_report_id = None
+        last_report_date = None
+
+        for report in reports:
+            # Acumula cada report separado: download interrompido no meio nao entra
+            # no total nem no ledger (sera baixado de novo na proxima coleta)
+            try:
+                report_totals, rows_parsed = accumulate_rows(iter_csv_rows(report["downloadUrl"], access_token))
+            except Exception as e:
+                log.error(f"[{channel_name}] Report {report['id']}: {e}")
                 continue
 
-            access_token = refresh_access_token(
-                tokens["refresh_token"],
-                credentials["client_id"],
-                credentials["client_secret"]
+            # Extrair data do startTime (formato ISO 8601)
+            start_time = report.get("startTime", "")
+            new_reports.append({
+                "report_id": report["id"],
+                "report_start": start_time[:10] if start_time else None,
+                "rows_parsed": rows_parsed,
+                "totals": report_totals
+            })
+            if rows_parsed:
+                last_report_id = report["id"]
+                if start_time:
+                    last_report_date = start_time[:10]  # YYYY-MM-DD
+
+        # Somar aos acumulados salvos + ledger na mesma transacao (falha = erro do canal,
+        # nada fica meio gravado; report ja no ledger nao e somado 2x)
+        merged = apply_reports_to_totals(channel_id, job_id, new_reports)
+
+        if not merged:
+            log.info(f"[{channel_name}] CSVs vazios (sem dados de impressoes)")
+            return "skipped", 0
+
+        aggregated = finalize_totals(merged)
+        log.info(f"[{channel_name}] {len(aggregated)} videos com dados de CTR novos")
+
+        # Salvar CTR por video no Supabase
+        saved = save_ctr_data(channel_id, aggregated)
+        log.info(f"[{channel_name}] {saved} videos salvos em yt_video_metrics")
+
+        # Salvar CTR medio do canal em yt_channels (todos os videos do canal)
+        save_channel_avg_ctr(channel_id, finalize_totals(get_channel_totals(channel_id)))
+
+        # Atualizar job com ultimo report processado
+        if last_report_date and last_report_id:
+            update_reporting_job(
+                channel_id,
+                last_report_date=last_report_date,
+                last_report_id=last_report_id,
+                error_message=""
             )
-            if not access_token:
-                log.warning(f"[{channel_name}] Token refresh falhou - pulando")
-                error_count += 1
-                continue
 
-            update_tokens(channel_id, access_token)
+        return "success", saved
 
-            # Auto-provisioning: criar job se nao existe
-            job_id = get_or_create_job(channel_id, access_token)
-            if not job_id:
-                log.warning(f"[{channel_name}] Sem job ativo - pulando")
-                error_count += 1
-                continue
+    except Exception as e:
+        log.error(f"[{channel_name}] Erro: {e}")
+        update_reporting_job(channel_id, error_message=str(e)[:500])
+        return "error", 0
 
-            # Buscar TODOS os CSVs disponiveis (ate ~180 dias)
-            # Impressoes sao acumuladas no save_ctr_data, entao precisamos de todos os reports
-            since_date = (datetime.now() - timedelta(days=180)).strftime("%Y-%m-%d")
 
-            # Listar CSVs disponiveis
-            reports = list_available_reports(job_id, access_token, since_date)
-            if not reports:
-                log.info(f"[{channel_name}] Nenhum relatorio novo")
-                skipped_count += 1
-                continue
 
-            log.info(f"[{channel_name}] {len(reports)} relatorios novos para baixar")
-
-            # Baixar e parsear todos os CSVs
-            all_rows = []
-            last_report_id = None
-            last_report_date = None
-
-            for report in reports:
-                csv_rows = download_and_parse_csv(report["downloadUrl"], access_token)
-                if csv_rows:
-                    all_rows.extend(csv_rows)
-                    last_report_id = report["id"]
-                    # Extrair data do startTime (formato ISO 8601)
-                    start_time = report.get("startTime", "")
-                    if start_time:
-                        last_report_date = start_time[:10]  # YYYY-MM-DD
-
-            if not all_rows:
-                log.info(f"[{channel_name}] CSVs vazios (sem dados de impressoes)")
-                skipped_count += 1
-                continue
+def _proxy_key(channel):
+    """Chave da sessao HTTP do canal: proxy (credencial compartilhada) ou credencial isolada."""
+    return channel.get("proxy_name") or f"isolated:{channel['channel_id']}"
 
-            # Agregar dados semanais
-            aggregated = aggregate_weekly_data(all_rows)
-            log.info(f"[{channel_name}] {len(aggregated)} videos com dados de CTR")
 
-            # Salvar CTR por video no Supabase
-            saved = save_ctr_data(channel_id, aggregated)
-            total_records += saved
-            log.info(f"[{channel_name}] {saved} videos salvos em yt_video_metrics")
+def _collect_channel_timed(channel):
+    """Roda _collect_channel_ctr na sessao HTTP do proxy do canal e mede o tempo."""
+    _thread_state.session = _session_for(_proxy_key(channel))
+    started = time.monotonic()
+    try:
+        status, saved = _collect_channel_ctr(channel)
+    except Exception as e:
+        log.error(f"[{channel.get('channel_name', channel['channel_id'])}] Erro inesperado: {e}")
+        status, saved = "error", 0
+    finally:
+        _thread_state.session = None
+    return {
+        "channel_id": channel["channel_id"],
+        "proxy": channel.get("proxy_name"),
+        "status": status,
+        "records": saved,
+        "seconds": round(time.monotonic() - started, 2)
+    }
 
-            # Salvar CTR medio do canal em yt_channels
-            save_channel_avg_ctr(channel_id, aggregated)
 
-            # Atualizar job com ultimo report processado
-            if last_report_date and last_report_id:
-                update_reporting_job(
-                    channel_id,
-                    last_report_date=last_report_date,
-                    last_report_id=last_report_id,
-                    error_message=""
-                )
+def start_collection_run(total_channels):
+    """Cria a linha da coleta em ctr_collection_runs (status running). Retorna o id."""
+    resp = _http().post(
+        f"{SUPABASE_URL}/rest/v1/ctr_collection_runs",
+        headers={**SUPABASE_HEADERS, "Prefer": "return=representation"},
+        json={
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "total_channels": total_channels,
+            "status": "running"
+        }
+    )
+    if resp.status_code in [200, 201] and resp.json():
+        return resp.json()[0]["id"]
+    log.warning(f"Erro ao registrar coleta em ctr_collection_runs: {resp.status_code}")
+    return None
 
-            success_count += 1
 
-        except Exception as e:
-            log.error(f"[{channel_name}] Erro: {e}")
-            error_count += 1
-            update_reporting_job(channel_id, error_message=str(e)[:500])
+def finish_collection_run(run_id, result, channel_timings):
+    """Fecha a linha da coleta com os totais e o tempo de cada canal."""
+    if not run_id:
+        return
+    resp = _http().patch(
+        f"{SUPABASE_URL}/rest/v1/ctr_collection_runs",
+        params={"id": f"eq.{run_id}"},
+        headers=SUPABASE_HEADERS,
+        json={
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "success_count": result["success"],
+            "error_count": result["errors"],
+            "skipped_count": result["skipped"],
+            "total_records": result["total_records"],
+            "total_channels": result["total_channels"],
+            "status": "error" if result["errors"] and not result["success"] else "success",
+            "channel_timings": channel_timings
+        }
+    )
+    if resp.status_code not in [200, 204]:
+        log.warning(f"Erro ao fechar coleta em ctr_collection_runs: {resp.status_code}")
+
+
+def _do_collect_ctr_reports_sync(concurrency=None):
+    """
+    Logica interna da coleta CTR (sync, roda em thread).
+    Canais processados em paralelo (pool de CTR_CHANNEL_CONCURRENCY threads), cada um
+    usando a sessao HTTP do seu proxy. concurrency=1 = modo sequencial antigo.
+    """
+    concurrency = concurrency or CTR_CHANNEL_CONCURRENCY
+    log.info("=" * 60)
+    log.info(f"CTR COLLECTION: Baixando relatorios de impressoes/CTR ({concurrency} canais em paralelo)")
+    log.info("=" * 60)
+
+    channels = get_channels_with_oauth()
+    if not channels:
+        return {"error": "Nenhum canal com OAuth", "success": 0, "errors": 0, "total_records": 0}
+
+    run_id = start_collection_run(len(channels))
+    started = time.monotonic()
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="ctr") as pool:
+            channel_timings = list(pool.map(_collect_channel_timed, channels))
+    finally:
+        _close_sessions()
+
+    success_count = sum(1 for t in channel_timings if t["status"] == "success")
+    error_count = sum(1 for t in channel_timings if t["status"] == "error")
+    skipped_count = sum(1 for t in channel_timings if t["status"] == "skipped")
+    total_records = sum(t["records"] for t in channel_timings)
+    elapsed = time.monotonic() - started
+    slowest = max(channel_timings, key=lambda t: t["seconds"])
 
     log.info("=" * 60)
     log.info(f"CTR COLLECTION CONCLUIDA:")
@@ -848,20 +1102,24 @@ def _do_collect_ctr_reports_sync():
     log.info(f"  Erros: {error_count}")
     log.info(f"  Pulados (sem dados novos): {skipped_count}")
     log.info(f"  Total records salvos: {total_records}")
+    log.info(f"  Tempo total: {elapsed:.1f}s (canal mais lento: {slowest['channel_id']} {slowest['seconds']:.1f}s)")
     log.info("=" * 60)
 
-    return {
+    result = {
         "success": success_count,
         "errors": error_count,
         "skipped": skipped_count,
         "total_records": total_records,
-        "total_channels": len(channels)
+        "total_channels": len(channels),
+        "elapsed_seconds": round(elapsed, 1)
     }
+    finish_collection_run(run_id, result, channel_timings)
+    return result
 
 
 async def get_all_jobs_status():
     """Retorna status de todos os reporting jobs."""
-    resp = requests.get(
+    resp = _http().get(
         f"{SUPABASE_URL}/rest/v1/yt_reporting_jobs",
         params={
             "report_type": f"eq.{REPORT_TYPE}",
@@ -878,7 +1136,7 @@ async def get_all_jobs_status():
     # Enriquecer com nomes dos canais
     if jobs:
         channel_ids = ",".join(set(j["channel_id"] for j in jobs))
-        resp2 = requests.get(
+        resp2 = _http().get(
             f"{SUPABASE_URL}/rest/v1/yt_channels",
             params={
                 "channel_id": f"in.({channel_ids})",
@@ -904,7 +1162,7 @@ async def get_all_jobs_status():
 
 async def get_channel_ctr(channel_id, limit=50):
     """Retorna dados de CTR para videos de um canal + CTR medio do canal."""
-    resp = requests.get(
+    resp = _http().get(
         f"{SUPABASE_URL}/rest/v1/yt_video_metrics",
         params={
             "channel_id": f"eq.{channel_id}",
@@ -928,7 +1186,7 @@ async def get_channel_ctr(channel_id, limit=50):
         for i in range(0, len(video_ids), 50):
             batch = video_ids[i:i+50]
             ids_str = ",".join(f'"{vid}"' for vid in batch)
-            title_resp = requests.get(
+            title_resp = _http().get(
                 f"{SUPABASE_URL}/rest/v1/videos_historico",
                 params={
                     "video_id": f"in.({ids_str})",
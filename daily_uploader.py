@@ -13,8 +13,10 @@ from supabase import create_client
 from dotenv import load_dotenv
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
+from upload_sheets import read_upload_rows, reset_watermark
 import json
 import time
+from collections import deque
 
 # Carrega variáveis de ambiente
 load_dotenv()
@@ -37,6 +39,13 @@ SPREADSHEET_CACHE = {}
 CACHE_DURATION = 300  # 5 minutos
 MAX_CACHE_SIZE = 100  # Máximo de entradas no cache
 
+# Canais processados em paralelo no upload diário
+# (uploads no YouTube seguem limitados pelo upload_semaphore do main; leituras do Sheets pelo token bucket)
+DAILY_UPLOAD_CONCURRENCY = max(1, int(os.environ.get("DAILY_UPLOAD_CONCURRENCY", "4")))
+
+# Canais com processamento em andamento (pass diário + retry manual): nunca 2 uploads do mesmo canal ao mesmo tempo
+_canais_em_processamento = set()
+
 def limpar_cache_expirado():
     """Remove entradas expiradas do cache de planilhas"""
     global SPREADSHEET_CACHE
@@ -62,6 +71,11 @@ def limpar_cache_expirado():
             del SPREADSHEET_CACHE[key]
         logger.info(f"Cache reduzido: {entries_to_remove} entradas removidas (limite de tamanho)")
 
+def invalidar_cache_planilha(spreadsheet_id: str):
+    """Descarta a planilha do cache e o watermark: próxima leitura é completa"""
+    SPREADSHEET_CACHE.pop(spreadsheet_id, None)
+    reset_watermark(spreadsheet_id)
+
 def get_oauth_channel_ids() -> set:
     """Retorna set de channel_ids que possuem OAuth configurado.
     Canais com OAuth = passaram pelo wizard completo e podem fazer upload."""
@@ -136,6 +150,9 @@ class DailyUploader:
             self._finalizar_log_diario(log_id, hora_inicio, 0, 0, 0, 0, 0)
             return {"sucesso": [], "erro": [], "sem_video": [], "pulado": []}
 
+        # 1 entrada por canal (retry pode trazer o mesmo canal várias vezes)
+        canais = list({c['channel_id']: c for c in canais}.values())
+
         # Priorizar monetizados
         monetizados = [c for c in canais if c.get('is_monetized')]
         nao_monetizados = [c for c in canais if not c.get('is_monetized')]
@@ -153,35 +170,53 @@ class DailyUploader:
             "pulado": []
         }
 
-        for i, canal in enumerate(canais_ordenados, 1):
-            logger.info(f"\n[{i}/{len(canais_ordenados)}] Processando: {canal['channel_name']}")
+        # Fila em ordem de prioridade: cada worker pega o próximo canal da fila,
+        # então monetizados começam primeiro mesmo com vários canais em paralelo
+        fila = deque(canais_ordenados)
+        total = len(canais_ordenados)
+        iniciados = 0
+
+        async def processar(canal: Dict, posicao: int):
+            nome = canal['channel_name']
+            logger.info(f"[{posicao}/{total}] Processando: {nome}")
+            inicio = time.monotonic()
 
             try:
                 resultado = await self._process_canal_upload(canal, hoje, retry_attempt)
                 status = resultado.get('status', 'erro')
+                resultado['duracao_segundos'] = round(time.monotonic() - inicio, 1)
                 resultados[status].append(resultado)
 
                 # Log do resultado
                 if status == 'sucesso':
-                    logger.info(f"    ✅ Upload realizado: {resultado.get('video_title', 'N/A')}")
+                    logger.info(f"    ✅ {nome}: upload realizado: {resultado.get('video_title', 'N/A')} ({resultado['duracao_segundos']}s)")
                 elif status == 'sem_video':
-                    logger.warning(f"    ⚠️ Sem vídeos disponíveis")
+                    logger.warning(f"    ⚠️ {nome}: sem vídeos disponíveis")
                 elif status == 'pulado':
-                    logger.info(f"    ⏭️ Já fez upload hoje")
+                    logger.info(f"    ⏭️ {nome}: {resultado.get('message', 'pulado')}")
                 else:
-                    logger.error(f"    ❌ Erro: {resultado.get('error', 'Erro desconhecido')}")
+                    logger.error(f"    ❌ {nome}: {resultado.get('error', 'Erro desconhecido')}")
 
             except Exception as e:
-                logger.error(f"    ❌ Erro crítico: {str(e)}")
+                logger.error(f"    ❌ {nome}: erro crítico: {str(e)}")
                 resultados['erro'].append({
                     'status': 'erro',
                     'channel_id': canal['channel_id'],
-                    'channel_name': canal['channel_name'],
-                    'error': str(e)
+                    'channel_name': nome,
+                    'error': str(e),
+                    'duracao_segundos': round(time.monotonic() - inicio, 1)
                 })
 
-            # Pequeno delay para não sobrecarregar
-            await asyncio.sleep(1)
+        async def worker():
+            nonlocal iniciados
+            while fila:
+                canal = fila.popleft()
+                iniciados += 1
+                await processar(canal, iniciados)
+
+        inicio_pass = time.monotonic()
+        await asyncio.gather(*(worker() for _ in range(min(DAILY_UPLOAD_CONCURRENCY, total))))
+        duracao_pass = time.monotonic() - inicio_pass
 
         # Finalizar log diário
         self._finalizar_log_diario(
@@ -201,6 +236,13 @@ class DailyUploader:
         logger.info(f"   ❌ Erros: {len(resultados['erro'])}")
         logger.info(f"   ⚠️ Sem vídeo: {len(resultados['sem_video'])}")
         logger.info(f"   ⏭️ Pulados: {len(resultados['pulado'])}")
+        logger.info(f"   ⏱️ Tempo total: {duracao_pass:.1f}s ({DAILY_UPLOAD_CONCURRENCY} canais em paralelo)")
+        mais_lentos = sorted(
+            (r for lista in resultados.values() for r in lista),
+            key=lambda r: r.get('duracao_segundos', 0), reverse=True
+        )[:3]
+        for r in mais_lentos:
+            logger.info(f"      🐢 {r.get('channel_name')}: {r.get('duracao_segundos', 0)}s ({r.get('status')})")
         logger.info("=" * 60)
 
         return resultados
@@ -257,7 +299,32 @@ class DailyUploader:
 
     async def _process_canal_upload(self, canal: Dict, data: Any, retry_attempt: int) -> Dict:
         """
-        Processa upload de 1 canal
+        Processa upload de 1 canal (no máximo 1 processamento por canal ao mesmo tempo)
+        """
+        channel_id = canal['channel_id']
+        if channel_id in _canais_em_processamento:
+            logger.info(f"Canal {canal['channel_name']} já está com upload em andamento")
+            return {
+                'status': 'pulado',
+                'channel_id': channel_id,
+                'channel_name': canal['channel_name'],
+                'message': 'Upload já em andamento'
+            }
+
+        _canais_em_processamento.add(channel_id)
+        try:
+            return await self._processar_canal(canal, data, retry_attempt, time.monotonic())
+        finally:
+            _canais_em_processamento.discard(channel_id)
+
+    @staticmethod
+    def _duracao(inicio: float) -> float:
+        return round(time.monotonic() - inicio, 1)
+
+    async def _processar_canal(self, canal: Dict, data: Any, retry_attempt: int, inicio: float) -> Dict:
+        """
+        Planilha -> fila -> upload de 1 canal. Chamadas síncronas ao Supabase rodam em
+        thread para não travar os outros canais do pass.
         """
         channel_id = canal['channel_id']
         channel_name = canal['channel_name']
@@ -269,8 +336,9 @@ class DailyUploader:
         # Verificar se tem planilha configurada
         if not spreadsheet_id:
             logger.warning(f"Canal {channel_name} sem planilha configurada")
-            self._registrar_canal_diario(channel_id, channel_name, data, 'erro',
-                                        'Sem planilha configurada', retry_attempt)
+            await asyncio.to_thread(self._registrar_canal_diario, channel_id, channel_name, data, 'erro',
+                                    'Sem planilha configurada', retry_attempt,
+                                    duracao_segundos=self._duracao(inicio))
             return {
                 'status': 'erro',
                 'channel_id': channel_id,
@@ -279,17 +347,17 @@ class DailyUploader:
             }
 
         # Limpa cache para forçar busca atualizada (importante para uploads forçados)
-        if spreadsheet_id in SPREADSHEET_CACHE:
-            del SPREADSHEET_CACHE[spreadsheet_id]
-            logger.debug(f"Cache limpo para planilha de {channel_name}")
+        invalidar_cache_planilha(spreadsheet_id)
+        logger.debug(f"Cache limpo para planilha de {channel_name}")
 
         # Buscar vídeo pronto na planilha
         video_pronto = await self._find_ready_video(spreadsheet_id, channel_name)
 
         if not video_pronto:
             # Registra que não tem vídeo
-            self._registrar_canal_diario(channel_id, channel_name, data, 'sem_video',
-                                        None, retry_attempt)
+            await asyncio.to_thread(self._registrar_canal_diario, channel_id, channel_name, data, 'sem_video',
+                                    None, retry_attempt,
+                                    duracao_segundos=self._duracao(inicio))
             return {
                 'status': 'sem_video',
                 'channel_id': channel_id,
@@ -297,7 +365,7 @@ class DailyUploader:
             }
 
         # Verificar duplicata (proteção extra)
-        if self._video_ja_foi_uploaded(channel_id, video_pronto['titulo']):
+        if await asyncio.to_thread(self._video_ja_foi_uploaded, channel_id, video_pronto['titulo']):
             logger.info(f"Vídeo '{video_pronto['titulo']}' já foi uploaded anteriormente")
             return {
                 'status': 'pulado',
@@ -307,11 +375,12 @@ class DailyUploader:
             }
 
         # Adicionar na fila de upload
-        upload_id = self._add_to_queue(canal, video_pronto)
+        upload_id = await asyncio.to_thread(self._add_to_queue, canal, video_pronto)
 
         if not upload_id:
-            self._registrar_canal_diario(channel_id, channel_name, data, 'erro',
-                                        'Falha ao adicionar na fila', retry_attempt)
+            await asyncio.to_thread(self._registrar_canal_diario, channel_id, channel_name, data, 'erro',
+                                    'Falha ao adicionar na fila', retry_attempt,
+                                    duracao_segundos=self._duracao(inicio))
             return {
                 'status': 'erro',
                 'channel_id': channel_id,
@@ -328,11 +397,12 @@ class DailyUploader:
             result = await process_upload_task(upload_id)
 
             # Verifica resultado
-            upload_status = self._check_upload_status(upload_id)
+            upload_status = await asyncio.to_thread(self._check_upload_status, upload_id)
 
             if upload_status == 'completed':
                 # Registra sucesso
-                self._registrar_canal_diario(
+                await asyncio.to_thread(
+                    self._registrar_canal_diario,
                     channel_id=channel_id,
                     channel_name=channel_name,
                     data=data,
@@ -341,7 +411,8 @@ class DailyUploader:
                     tentativa_numero=retry_attempt,
                     upload_id=upload_id,
                     video_titulo=video_pronto['titulo'],
-                    video_url=video_pronto.get('video_url')
+                    video_url=video_pronto.get('video_url'),
+                    duracao_segundos=self._duracao(inicio)
                 )
 
                 return {
@@ -353,10 +424,11 @@ class DailyUploader:
                 }
             else:
                 # Busca mensagem de erro
-                erro_msg = self._get_upload_error(upload_id)
+                erro_msg = await asyncio.to_thread(self._get_upload_error, upload_id)
 
                 # Registra erro
-                self._registrar_canal_diario(
+                await asyncio.to_thread(
+                    self._registrar_canal_diario,
                     channel_id=channel_id,
                     channel_name=channel_name,
                     data=data,
@@ -364,7 +436,8 @@ class DailyUploader:
                     erro_mensagem=erro_msg,
                     tentativa_numero=retry_attempt,
                     upload_id=upload_id,
-                    video_titulo=video_pronto['titulo']
+                    video_titulo=video_pronto['titulo'],
+                    duracao_segundos=self._duracao(inicio)
                 )
 
                 return {
@@ -380,14 +453,16 @@ class DailyUploader:
             logger.error(f"Erro ao processar upload: {error_msg}")
 
             # Registra erro
-            self._registrar_canal_diario(
+            await asyncio.to_thread(
+                self._registrar_canal_diario,
                 channel_id=channel_id,
                 channel_name=channel_name,
                 data=data,
                 status='erro',
                 erro_mensagem=error_msg,
                 tentativa_numero=retry_attempt,
-                video_titulo=video_pronto.get('titulo')
+                video_titulo=video_pronto.get('titulo'),
+                duracao_segundos=self._duracao(inicio)
             )
 
             return {
@@ -429,25 +504,9 @@ class DailyUploader:
                 logger.error("Cliente Google Sheets não inicializado")
                 return None
 
-            # Abre planilha
-            # Delay antes de abrir planilha para evitar quota exceeded
-            await asyncio.sleep(2)
-
-            sheet = self.sheets_client.open_by_key(spreadsheet_id)
-
-            # Delay após abrir planilha
-            await asyncio.sleep(1)
-
-            worksheet = sheet.get_worksheet(0)  # Primeira aba
-
-            # Delay antes de buscar valores
-            await asyncio.sleep(1)
-
-            # Pega todas as linhas (otimização: últimas 50)
-            all_values = worksheet.get_all_values()
-
-            # Delay após buscar todos os valores
-            await asyncio.sleep(1)
+            # 1 batchGet (colunas A:C + J:O, a partir da 1ª linha em aberto),
+            # limitado pelo token bucket da quota do Sheets, fora do event loop
+            all_values = await read_upload_rows(self.sheets_client, spreadsheet_id)
 
             # Cache para próximas consultas
             SPREADSHEET_CACHE[cache_key] = (time.time(), all_values)
@@ -707,8 +766,9 @@ class DailyUploader:
     def _registrar_canal_diario(self, channel_id: str, channel_name: str, data: Any,
                                 status: str, erro_mensagem: Optional[str] = None,
                                 tentativa_numero: int = 1, upload_id: Optional[int] = None,
-                                video_titulo: Optional[str] = None, video_url: Optional[str] = None):
-        """Registra ou atualiza status do canal no dia"""
+                                video_titulo: Optional[str] = None, video_url: Optional[str] = None,
+                                duracao_segundos: Optional[float] = None):
+        """Registra ou atualiza status do canal no dia (duracao_segundos = tempo do canal no pass)"""
         try:
             data_dict = {
                 'channel_id': channel_id,
@@ -728,6 +788,8 @@ class DailyUploader:
                 data_dict['video_titulo'] = video_titulo
             if video_url:
                 data_dict['video_url'] = video_url
+            if duracao_segundos is not None:
+                data_dict['duracao_segundos'] = duracao_segundos
 
             # INSERT novo registro (permite múltiplos uploads por dia)
             # Mudança crítica: INSERT ao invés de UPSERT
@@ -883,8 +945,7 @@ class DailyUploader:
                 }
 
             # Limpa cache para forçar busca atualizada
-            if spreadsheet_id in SPREADSHEET_CACHE:
-                del SPREADSHEET_CACHE[spreadsheet_id]
+            invalidar_cache_planilha(spreadsheet_id)
 
             # Busca o PRÓXIMO vídeo (skip_count=1 pula o primeiro)
             video_pronto = await self._find_ready_video(spreadsheet_id, channel_name, skip_count=1)
@@ -2,13 +2,149 @@ import os
 import asyncio
 import time
 from datetime import datetime, timedelta, timezone
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, AsyncIterator, Callable
 import logging
 from supabase import create_client, Client
 import json
+from concurrent.futures import ThreadPoolExecutor
+from request_metrics import record_db_query
 
 logger = logging.getLogger(__name__)
 
+# ========================================
+# ACESSO ASSÍNCRONO AO SUPABASE
+# ========================================
+# supabase-py é síncrono: chamar .execute() direto dentro de um "async def" trava o
+# event loop do FastAPI até a query voltar. run_query() executa a query num pool
+# limitado de threads. Cada Client mantém um único httpx.Client (keep-alive, até 20
+# conexões ociosas), então com <= 20 workers as conexões HTTP são sempre reutilizadas.
+SUPABASE_MAX_WORKERS = int(os.environ.get("SUPABASE_MAX_WORKERS", "16"))
+_db_executor = ThreadPoolExecutor(max_workers=SUPABASE_MAX_WORKERS, thread_name_prefix="supabase")
+
+# Engajamento: comentários por categoria que entram na prévia/cache (o resto é paginado)
+ENGAGEMENT_PREVIEW_LIMIT = int(os.environ.get("ENGAGEMENT_PREVIEW_LIMIT", "20"))
+ENGAGEMENT_COMMENT_FIELDS = (
+    "comment_id, video_id, video_title, author_name, comment_text_pt, comment_text_original, "
+    "is_translated, like_count, sentiment_category, problem_type, problem_description, "
+    "insight_text, suggested_action, suggested_response, published_at"
+)
+
+
+async def run_query(query):
+    """
+    Executa um query builder do supabase-py (table/rpc) sem bloquear o event loop.
+
+    Uso: response = await run_query(client.table("x").select("*").eq("id", 1))
+    """
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    try:
+        return await loop.run_in_executor(_db_executor, query.execute)
+    finally:
+        # Métricas por request (/api/metrics): tabela/rpc + tempo
+        record_db_query(getattr(query, "path", None) or type(query).__name__, time.perf_counter() - start)
+
+
+async def iter_table_pages(client: Client, table: str, select_fields: str = "*", filters: Optional[Dict] = None,
+                           apply: Optional[Callable] = None, batch_size: int = 1000, key_field: str = "id",
+                           prefetch: bool = True) -> AsyncIterator[List[Dict]]:
+    """
+    Itera uma tabela página a página com paginação por cursor (keyset: key_field > último visto).
+
+    Diferente de range(offset, ...), o custo de cada página não cresce com o offset e
+    nada é acumulado: o chamador agrega página a página em memória constante.
+    Com prefetch=True a próxima página já é buscada enquanto o chamador processa a atual.
+
+    Args:
+        client: Client do supabase-py
+        table: Nome da tabela
+        select_fields: Campos a selecionar (key_field é incluído automaticamente)
+        filters: Dicionário de filtros {campo: valor} (eq)
+        apply: Função opcional query -> query para filtros extras (gte, in_, joins...)
+        batch_size: Tamanho da página
+        key_field: Coluna única e ordenável usada como cursor
+        prefetch: Buscar a próxima página em paralelo ao processamento
+
+    Yields:
+        Lista de registros de cada página
+    """
+    if select_fields != "*" and not select_fields.startswith("*"):
+        fields = [f.strip() for f in select_fields.split(",")]
+        if key_field not in fields:
+            select_fields = f"{key_field}, {select_fields}"
+
+    def build(last_key):
+        query = client.table(table).select(select_fields)
+        if filters:
+            for field, value in filters.items():
+                if value is not None:
+                    query = query.eq(field, value)
+        if apply:
+            query = apply(query)
+        if last_key is not None:
+            query = query.gt(key_field, last_key)
+        return query.order(key_field).limit(batch_size)
+
+    pending = asyncio.ensure_future(run_query(build(None)))
+    try:
+        while pending is not None:
+            rows = (await pending).data or []
+            pending = None
+
+            if not rows:
+                break
+
+            if len(rows) == batch_size and prefetch:
+                pending = asyncio.ensure_future(run_query(build(rows[-1][key_field])))
+
+            yield rows
+
+            if len(rows) < batch_size:
+                break
+            if pending is None:
+                pending = asyncio.ensure_future(run_query(build(rows[-1][key_field])))
+    finally:
+        if pending is not None and not pending.done():
+            pending.cancel()
+
+class CanalHistoricoSnapshot:
+    """
+    Linhas de referência de dados_canais_historico carregadas uma vez por coleta.
+    Responde em memória as mesmas perguntas que save_canal_data fazia ao banco.
+    """
+    def __init__(self, reference_date):
+        self.reference_date = reference_date  # Dia UTC da coleta (linhas de hoje ficam fora)
+        self.rows_by_canal: Dict[int, List[Dict]] = {}
+        self.total_rows = 0
+        self._sorted = True
+
+    def add(self, row: Dict):
+        self.rows_by_canal.setdefault(row["canal_id"], []).append(row)
+        self.total_rows += 1
+        self._sorted = False
+
+    def _ensure_sorted(self):
+        if not self._sorted:
+            for rows in self.rows_by_canal.values():
+                rows.sort(key=lambda r: r["data_coleta"], reverse=True)
+            self._sorted = True
+
+    def latest_on_or_before(self, canal_id: int, target_date: str) -> Optional[Dict]:
+        """Linha mais recente com data_coleta <= target_date e view_count preenchido"""
+        self._ensure_sorted()
+        for row in self.rows_by_canal.get(canal_id, []):
+            if row["data_coleta"] <= target_date:
+                return row if row.get("view_count") is not None else None
+        return None
+
+    def inscritos_on(self, canal_id: int, date_str: str) -> Optional[int]:
+        """inscritos do canal exatamente em date_str (None se não coletado)"""
+        for row in self.rows_by_canal.get(canal_id, []):
+            if row["data_coleta"] == date_str:
+                return row.get("inscritos")
+        return None
+
+
 class SupabaseClient:
     def __init__(self):
         url = os.environ.get("SUPABASE_URL")
@@ -32,7 +168,7 @@ class SupabaseClient:
 
     async def test_connection(self):
         try:
-            response = self.supabase.table("canais_monitorados").select("id").limit(1).execute()
+            response = await run_query(self.supabase.table("canais_monitorados").select("id").limit(1))
             return True
         except Exception as e:
             logger.error(f"Database connection test failed: {e}")
@@ -66,7 +202,7 @@ class SupabaseClient:
                         if value is not None:
                             query = query.eq(field, value)
 
-                response = query.execute()
+                response = await run_query(query)
 
                 if not response.data:
                     break
@@ -90,9 +226,22 @@ class SupabaseClient:
         logger.info(f"✅ Busca completa na tabela '{table}': {len(all_records)} registros totais")
         return all_records
 
+    def iter_records(self, table: str, select_fields: str = "*", filters: Optional[Dict] = None,
+                     apply: Optional[Callable] = None, batch_size: int = 1000, key_field: str = "id",
+                     prefetch: bool = True) -> AsyncIterator[List[Dict]]:
+        """
+        Versão streaming de fetch_all_records (keyset + prefetch). Ver iter_table_pages.
+
+        Uso:
+            async for page in db.iter_records("videos_historico", "canal_id, views_atuais"):
+                for row in page: ...
+        """
+        return iter_table_pages(self.supabase, table, select_fields, filters, apply,
+                                batch_size, key_field, prefetch)
+
     async def upsert_canal(self, canal_data: Dict[str, Any]) -> Dict:
         try:
-            response = self.supabase.table("canais_monitorados").upsert({
+            response = await run_query(self.supabase.table("canais_monitorados").upsert({
                 "nome_canal": canal_data.get("nome_canal"),
                 "url_canal": canal_data.get("url_canal"),
                 "nicho": canal_data.get("nicho", ""),
@@ -100,7 +249,7 @@ class SupabaseClient:
                 "lingua": canal_data.get("lingua", "English"),
                 "tipo": canal_data.get("tipo", "minerado"),
                 "status": canal_data.get("status", "ativo")
-            }).execute()
+            }))
             
             logger.info(f"Canal upserted: {canal_data.get('nome_canal')}")
             return response.data[0] if response.data else None
@@ -126,7 +275,60 @@ class SupabaseClient:
             logger.error(f"Error getting canais for collection: {e}")
             raise
 
-    async def save_canal_data(self, canal_id: int, data: Dict[str, Any]):
+    async def load_canal_history_snapshot(self, canal_ids: Optional[List[int]] = None, lookback_days: int = 60, batch_size: int = 1000) -> "CanalHistoricoSnapshot":
+        """
+        Carrega, em UMA passada paginada, as linhas de referência de dados_canais_historico
+        (view_count/inscritos) usadas por save_canal_data para D-1/D-7/D-15/D-30.
+
+        Chamado uma vez no início da coleta: save_canal_data passa a calcular os
+        deltas em memória em vez de 4 queries de histórico por canal.
+
+        Args:
+            canal_ids: Restringe a esses canais (None = todos)
+            lookback_days: Janela carregada antes de hoje (cobre D-30 com folga para buracos)
+            batch_size: Tamanho da página
+
+        Returns:
+            CanalHistoricoSnapshot com as linhas por canal (hoje excluído)
+        """
+        hoje = datetime.now(timezone.utc).date()
+        inicio = (hoje - timedelta(days=lookback_days)).isoformat()
+        snapshot = CanalHistoricoSnapshot(reference_date=hoje)
+
+        offset = 0
+        while True:
+            query = self.supabase.table("dados_canais_historico")\
+                .select("id, canal_id, data_coleta, view_count, inscritos")\
+                .gte("data_coleta", inicio)\
+                .lt("data_coleta", hoje.isoformat())
+
+            if canal_ids is not None:
+                query = query.in_("canal_id", canal_ids)
+
+            response = await run_query(query.order("id").range(offset, offset + batch_size - 1))
+            rows = response.data or []
+
+            for row in rows:
+                snapshot.add(row)
+
+            if len(rows) < batch_size:
+                break
+            offset += batch_size
+
+        if canal_ids is None:
+            logger.info(f"📸 Snapshot de histórico carregado: {snapshot.total_rows} linhas, {len(snapshot.rows_by_canal)} canais (desde {inicio})")
+        return snapshot
+
+    async def save_canal_data(self, canal_id: int, data: Dict[str, Any], tipo: Optional[str] = None, snapshot: Optional["CanalHistoricoSnapshot"] = None):
+        """
+        Salva o snapshot diário do canal em dados_canais_historico (1 upsert).
+
+        Args:
+            canal_id: ID do canal
+            data: Stats retornados por collector.get_canal_data
+            tipo: tipo do canal ('nosso'/'minerado'); None = busca no banco
+            snapshot: Histórico pré-carregado (load_canal_history_snapshot); None = carrega só deste canal
+        """
         try:
             data_coleta = datetime.now(timezone.utc).date().isoformat()
             hoje = datetime.now(timezone.utc).date()
@@ -143,22 +345,19 @@ class SupabaseClient:
                 logger.warning(f"Skipping save for canal_id {canal_id} - no view data")
                 return None
 
+            # Snapshot da coleta é de outro dia (coleta virou meia-noite UTC) → recarregar só este canal
+            if snapshot is None or snapshot.reference_date != hoje:
+                snapshot = await self.load_canal_history_snapshot(canal_ids=[canal_id])
+
             # 🆕 CALCULAR VIEWS_7D/15D/30D COMO DELTAS DO VIEW_COUNT TOTAL
             # views_Nd = view_count_hoje - view_count_N_dias_atras
             if view_count_atual is not None:
                 for days_ago, field_name in [(7, "views_7d"), (15, "views_15d"), (30, "views_30d")]:
                     target_date = (hoje - timedelta(days=days_ago)).isoformat()
+                    hist_row = snapshot.latest_on_or_before(canal_id, target_date)
 
-                    hist_result = self.supabase.table("dados_canais_historico")\
-                        .select("view_count, data_coleta")\
-                        .eq("canal_id", canal_id)\
-                        .lte("data_coleta", target_date)\
-                        .order("data_coleta", desc=True)\
-                        .limit(1)\
-                        .execute()
-
-                    if hist_result.data and hist_result.data[0].get("view_count") is not None:
-                        old_view_count = hist_result.data[0]["view_count"]
+                    if hist_row:
+                        old_view_count = hist_row["view_count"]
                         delta = view_count_atual - old_view_count
                         if delta >= 0:
                             if field_name == "views_7d":
@@ -167,29 +366,28 @@ class SupabaseClient:
                                 views_15d = delta
                             elif field_name == "views_30d":
                                 views_30d = delta
-                            logger.debug(f"📊 Canal {canal_id}: {field_name} = {delta} (delta from {hist_result.data[0]['data_coleta']})")
+                            logger.debug(f"📊 Canal {canal_id}: {field_name} = {delta} (delta from {hist_row['data_coleta']})")
 
             # CALCULAR INSCRITOS_DIFF NO MOMENTO DA COLETA
             inscritos_diff = None
             inscritos_atual = data.get("inscritos")
 
             if inscritos_atual is not None:
-                canal_info = self.supabase.table("canais_monitorados").select("tipo").eq("id", canal_id).execute()
+                if tipo is None:
+                    canal_info = await run_query(self.supabase.table("canais_monitorados").select("tipo").eq("id", canal_id))
+                    tipo = canal_info.data[0].get("tipo") if canal_info.data else None
 
-                if canal_info.data and canal_info.data[0].get("tipo") == "nosso":
+                if tipo == "nosso":
                     data_ontem = (hoje - timedelta(days=1)).isoformat()
-                    ontem_result = self.supabase.table("dados_canais_historico").select("inscritos").eq("canal_id", canal_id).eq("data_coleta", data_ontem).execute()
+                    inscritos_ontem = snapshot.inscritos_on(canal_id, data_ontem)
 
-                    if ontem_result.data and ontem_result.data[0].get("inscritos") is not None:
-                        inscritos_ontem = ontem_result.data[0]["inscritos"]
+                    if inscritos_ontem is not None:
                         inscritos_diff = inscritos_atual - inscritos_ontem
                         logger.info(f"📊 Canal {canal_id}: inscritos_diff = {inscritos_diff} (hoje: {inscritos_atual}, ontem: {inscritos_ontem})")
                     else:
                         inscritos_diff = 0
                         logger.info(f"📊 Canal {canal_id}: inscritos_diff = 0 (sem dados de ontem)")
 
-            existing = self.supabase.table("dados_canais_historico").select("*").eq("canal_id", canal_id).eq("data_coleta", data_coleta).execute()
-
             canal_data = {
                 "canal_id": canal_id,
                 "data_coleta": data_coleta,
@@ -203,65 +401,134 @@ class SupabaseClient:
                 "inscritos_diff": inscritos_diff
             }
 
-            if existing.data:
-                response = self.supabase.table("dados_canais_historico").update(canal_data).eq("canal_id", canal_id).eq("data_coleta", data_coleta).execute()
-            else:
-                response = self.supabase.table("dados_canais_historico").insert(canal_data).execute()
+            response = await run_query(self.supabase.table("dados_canais_historico")
+                .upsert(canal_data, on_conflict="canal_id,data_coleta"))
 
             return response.data
         except Exception as e:
             logger.error(f"Error saving canal data: {e}")
             raise
 
-    async def save_videos_data(self, canal_id: int, videos: List[Dict[str, Any]]):
+    async def save_videos_data(self, canal_id: int, videos: List[Dict[str, Any]], chunk_size: int = 500) -> List[Dict[str, Any]]:
+        """
+        Salva snapshots do dia em videos_historico via upsert em lote.
+
+        Um único upsert(on_conflict="video_id,data_coleta") por chunk em vez de
+        SELECT + UPDATE/INSERT por vídeo. Se um chunk falhar, apenas aquele chunk
+        é reprocessado linha a linha (fallback antigo).
+
+        Args:
+            canal_id: ID do canal
+            videos: Lista de vídeos retornada pelo collector
+            chunk_size: Linhas por upsert (default: 500)
+
+        Returns:
+            Lista de status por linha: {video_id, status, error?}
+            status: 'upserted' (lote), 'updated'/'inserted' (fallback) ou 'error'
+        """
         try:
             if not videos:
                 return []
-                
+
             current_date = datetime.now(timezone.utc).date().isoformat()
-            
-            saved_videos = []
+
+            # Deduplicar por video_id (mesma linha 2x no lote quebra o ON CONFLICT)
+            rows_by_video: Dict[str, Dict[str, Any]] = {}
             for video in videos:
-                try:
-                    video_data = {
-                        "canal_id": canal_id,
-                        "video_id": video.get("video_id"),
-                        "titulo": video.get("titulo"),
-                        "url_video": video.get("url_video"),
-                        "data_publicacao": video.get("data_publicacao"),
-                        "data_coleta": current_date,
-                        "views_atuais": video.get("views_atuais"),
-                        "likes": video.get("likes"),
-                        "comentarios": video.get("comentarios"),
-                        "duracao": video.get("duracao")
-                    }
-                    
-                    existing = self.supabase.table("videos_historico").select("id").eq("video_id", video_data["video_id"]).eq("data_coleta", current_date).execute()
-                    
-                    if existing.data:
-                        response = self.supabase.table("videos_historico").update(video_data).eq("video_id", video_data["video_id"]).eq("data_coleta", current_date).execute()
-                    else:
-                        response = self.supabase.table("videos_historico").insert(video_data).execute()
-                    
-                    if response.data:
-                        saved_videos.extend(response.data)
-                        
-                except Exception as video_error:
-                    logger.warning(f"Error saving individual video {video.get('video_id')}: {video_error}")
+                video_id = video.get("video_id")
+                if not video_id:
                     continue
-            
-            logger.info(f"Saved {len(saved_videos)} videos for canal {canal_id}")
-            return saved_videos
-            
+                rows_by_video[video_id] = {
+                    "canal_id": canal_id,
+                    "video_id": video_id,
+                    "titulo": video.get("titulo"),
+                    "url_video": video.get("url_video"),
+                    "data_publicacao": video.get("data_publicacao"),
+                    "data_coleta": current_date,
+                    "views_atuais": video.get("views_atuais"),
+                    "likes": video.get("likes"),
+                    "comentarios": video.get("comentarios"),
+                    "duracao": video.get("duracao")
+                }
+
+            rows = list(rows_by_video.values())
+            results: List[Dict[str, Any]] = []
+
+            for i in range(0, len(rows), chunk_size):
+                chunk = rows[i:i + chunk_size]
+                try:
+                    await run_query(self.supabase.table("videos_historico").upsert(
+                        chunk, on_conflict="video_id,data_coleta"
+                    ))
+                    results.extend({"video_id": row["video_id"], "status": "upserted"} for row in chunk)
+                except Exception as chunk_error:
+                    logger.warning(f"Bulk upsert failed for canal {canal_id} (chunk {i // chunk_size + 1}, {len(chunk)} rows): {chunk_error} - fallback row-by-row")
+                    results.extend(await self._save_videos_row_by_row(chunk, current_date))
+
+            saved_count = sum(1 for r in results if r["status"] != "error")
+            logger.info(f"Saved {saved_count}/{len(rows)} videos for canal {canal_id}")
+            return results
+
         except Exception as e:
             logger.error(f"Error saving videos data: {e}")
             raise
 
+    async def _save_videos_row_by_row(self, rows: List[Dict[str, Any]], current_date: str) -> List[Dict[str, Any]]:
+        """Fallback de save_videos_data: SELECT + UPDATE/INSERT por vídeo (caminho antigo)."""
+        results = []
+        for video_data in rows:
+            try:
+                existing = await run_query(self.supabase.table("videos_historico").select("id").eq("video_id", video_data["video_id"]).eq("data_coleta", current_date))
+
+                if existing.data:
+                    await run_query(self.supabase.table("videos_historico").update(video_data).eq("video_id", video_data["video_id"]).eq("data_coleta", current_date))
+                    results.append({"video_id": video_data["video_id"], "status": "updated"})
+                else:
+                    await run_query(self.supabase.table("videos_historico").insert(video_data))
+                    results.append({"video_id": video_data["video_id"], "status": "inserted"})
+
+            except Exception as video_error:
+                logger.warning(f"Error saving individual video {video_data.get('video_id')}: {video_error}")
+                results.append({"video_id": video_data.get("video_id"), "status": "error", "error": str(video_error)[:200]})
+        return results
+
+    async def get_previous_comment_counts(self, video_ids: List[str], lookback_days: int = 7,
+                                          chunk_size: int = 100) -> Dict[str, int]:
+        """
+        Contagem de comentários (campo comentarios) do snapshot mais recente ANTERIOR a hoje.
+        Usado pela coleta de comentários para pular vídeos sem comentários novos.
+
+        Returns:
+            {video_id: comentarios} - vídeos sem snapshot anterior ficam de fora
+        """
+        hoje = datetime.now(timezone.utc).date()
+        inicio = (hoje - timedelta(days=lookback_days)).isoformat()
+        latest: Dict[str, tuple] = {}
+
+        try:
+            # chunk_size x lookback_days linhas por query (abaixo do limite de 1000 do PostgREST)
+            for i in range(0, len(video_ids), chunk_size):
+                chunk = video_ids[i:i + chunk_size]
+                response = await run_query(self.supabase.table("videos_historico")
+                    .select("video_id, comentarios, data_coleta")
+                    .in_("video_id", chunk)
+                    .gte("data_coleta", inicio)
+                    .lt("data_coleta", hoje.isoformat()))
+                for row in response.data or []:
+                    current = latest.get(row["video_id"])
+                    if current is None or row["data_coleta"] > current[0]:
+                        latest[row["video_id"]] = (row["data_coleta"], row.get("comentarios"))
+        except Exception as e:
+            logger.warning(f"Erro ao buscar contagem anterior de comentários: {e}")
+            return {}
+
+        return {video_id: count for video_id, (_, count) in latest.items() if count is not None}
+
     async def update_last_collection(self, canal_id: int):
         try:
-            response = self.supabase.table("canais_monitorados").update({
+            response = await run_query(self.supabase.table("canais_monitorados").update({
                 "ultima_coleta": datetime.now(timezone.utc).isoformat()
-            }).eq("id", canal_id).execute()
+            }).eq("id", canal_id))
             return response.data
         except Exception as e:
             logger.error(f"Error updating last collection: {e}")
@@ -269,7 +536,7 @@ class SupabaseClient:
 
     async def create_coleta_log(self, canais_total: int) -> int:
         try:
-            response = self.supabase.table("coletas_historico").insert({
+            response = await run_query(self.supabase.table("coletas_historico").insert({
                 "data_inicio": datetime.now(timezone.utc).isoformat(),
                 "status": "em_progresso",
                 "canais_total": canais_total,
@@ -277,7 +544,7 @@ class SupabaseClient:
                 "canais_erro": 0,
                 "videos_coletados": 0,
                 "requisicoes_usadas": 0
-            }).execute()
+            }))
             
             coleta_id = response.data[0]["id"]
             return coleta_id
@@ -287,7 +554,7 @@ class SupabaseClient:
 
     async def update_coleta_log(self, coleta_id: int, status: str, canais_sucesso: int, canais_erro: int, videos_coletados: int, requisicoes_usadas: int = 0, mensagem_erro: Optional[str] = None):
         try:
-            data_inicio_response = self.supabase.table("coletas_historico").select("data_inicio").eq("id", coleta_id).execute()
+            data_inicio_response = await run_query(self.supabase.table("coletas_historico").select("data_inicio").eq("id", coleta_id))
 
             if data_inicio_response.data:
                 # Normalizar timestamp para evitar erro de isoformat com microsegundos
@@ -319,7 +586,7 @@ class SupabaseClient:
             if mensagem_erro:
                 update_data["mensagem_erro"] = mensagem_erro
             
-            response = self.supabase.table("coletas_historico").update(update_data).eq("id", coleta_id).execute()
+            response = await run_query(self.supabase.table("coletas_historico").update(update_data).eq("id", coleta_id))
             
             return response.data
         except Exception as e:
@@ -328,7 +595,7 @@ class SupabaseClient:
 
     async def get_coletas_historico(self, limit: int = 20) -> List[Dict]:
         try:
-            response = self.supabase.table("coletas_historico").select("*").order("data_inicio", desc=True).limit(limit).execute()
+            response = await run_query(self.supabase.table("coletas_historico").select("*").order("data_inicio", desc=True).limit(limit))
             return response.data if response.data else []
         except Exception as e:
             logger.error(f"Error fetching coletas historico: {e}")
@@ -339,10 +606,10 @@ class SupabaseClient:
             # Aumentado de 1h para 2h - coletas demoram 60-80min para 263 canais
             duas_horas_atras = (datetime.now(timezone.utc) - timedelta(hours=2)).isoformat()
 
-            response = self.supabase.table("coletas_historico").update({
+            response = await run_query(self.supabase.table("coletas_historico").update({
                 "status": "erro",
                 "mensagem_erro": "Coleta travada - marcada como erro automaticamente (timeout 2h)"
-            }).eq("status", "em_progresso").lt("data_inicio", duas_horas_atras).execute()
+            }).eq("status", "em_progresso").lt("data_inicio", duas_horas_atras))
 
             count = len(response.data) if response.data else 0
             if count > 0:
@@ -355,7 +622,7 @@ class SupabaseClient:
 
     async def delete_coleta(self, coleta_id: int):
         try:
-            response = self.supabase.table("coletas_historico").delete().eq("id", coleta_id).execute()
+            response = await run_query(self.supabase.table("coletas_historico").delete().eq("id", coleta_id))
             return response.data
         except Exception as e:
             logger.error(f"Error deleting coleta: {e}")
@@ -365,7 +632,7 @@ class SupabaseClient:
         try:
             hoje = datetime.now(timezone.utc).date().isoformat()
             
-            response = self.supabase.table("coletas_historico").select("requisicoes_usadas").gte("data_inicio", hoje).execute()
+            response = await run_query(self.supabase.table("coletas_historico").select("requisicoes_usadas").gte("data_inicio", hoje))
             
             total = sum(coleta.get("requisicoes_usadas", 0) for coleta in response.data)
             
@@ -393,7 +660,7 @@ class SupabaseClient:
             if tipo:
                 query = query.eq("tipo", tipo)
             
-            canais_response = query.execute()
+            canais_response = await run_query(query)
             
             # 🔧 BUSCAR HISTÓRICO DOS ÚLTIMOS 35 DIAS (para calcular growth_7d e growth_30d)
             # FIX: Paginação completa para evitar limite de 1000 registros do Supabase
@@ -402,11 +669,10 @@ class SupabaseClient:
             pagination_offset = 0  # Renomeado para não colidir com parâmetro 'offset' da função
 
             while True:
-                response = self.supabase.table("dados_canais_historico")\
-                    .select("*")\
-                    .gte("data_coleta", trinta_e_cinco_dias_atras)\
-                    .range(pagination_offset, pagination_offset + page_size - 1)\
-                    .execute()
+                response = await run_query(self.supabase.table("dados_canais_historico")
+                    .select("*")
+                    .gte("data_coleta", trinta_e_cinco_dias_atras)
+                    .range(pagination_offset, pagination_offset + page_size - 1))
 
                 if not response.data:
                     break
@@ -602,11 +868,10 @@ class SupabaseClient:
             offset_count = 0
 
             while True:
-                response = self.supabase.table("videos_historico")\
-                    .select("*")\
-                    .gte("data_publicacao", cutoff_date)\
-                    .range(offset_count, offset_count + batch_size - 1)\
-                    .execute()
+                response = await run_query(self.supabase.table("videos_historico")
+                    .select("*")
+                    .gte("data_publicacao", cutoff_date)
+                    .range(offset_count, offset_count + batch_size - 1))
 
                 if not response.data:
                     break
@@ -637,7 +902,7 @@ class SupabaseClient:
             
             if videos:
                 canal_ids = list(set(v["canal_id"] for v in videos))
-                canais_response = self.supabase.table("canais_monitorados").select("*").in_("id", canal_ids).execute()
+                canais_response = await run_query(self.supabase.table("canais_monitorados").select("*").in_("id", canal_ids))
                 canais_dict = {c["id"]: c for c in canais_response.data}
                 
                 for video in videos:
@@ -682,12 +947,11 @@ class SupabaseClient:
                 query_limit = limit * 2  # Margem para deduplicação
 
             # Buscar vídeos mais recentes deste canal
-            response = self.supabase.table("videos_historico")\
-                .select("*")\
-                .eq("canal_id", canal_id)\
-                .order("data_publicacao", desc=True)\
-                .limit(query_limit)\
-                .execute()
+            response = await run_query(self.supabase.table("videos_historico")
+                .select("*")
+                .eq("canal_id", canal_id)
+                .order("data_publicacao", desc=True)
+                .limit(query_limit))
 
             if not response.data:
                 logger.info(f"Nenhum vídeo encontrado para canal {canal_id}")
@@ -748,11 +1012,10 @@ class SupabaseClient:
 
             # Paginar para buscar TODOS os registros
             while True:
-                response = self.supabase.table("videos_historico")\
-                    .select("*")\
-                    .eq("canal_id", canal_id)\
-                    .range(offset, offset + batch_size - 1)\
-                    .execute()
+                response = await run_query(self.supabase.table("videos_historico")
+                    .select("*")
+                    .eq("canal_id", canal_id)
+                    .range(offset, offset + batch_size - 1))
 
                 if response.data:
                     all_videos.extend(response.data)
@@ -821,10 +1084,9 @@ class SupabaseClient:
         """
         try:
             # Buscar todos os vídeos deste canal (campos mínimos para performance)
-            response = self.supabase.table("videos_historico")\
-                .select("video_id, views_atuais, data_coleta")\
-                .eq("canal_id", canal_id)\
-                .execute()
+            response = await run_query(self.supabase.table("videos_historico")
+                .select("video_id, views_atuais, data_coleta")
+                .eq("canal_id", canal_id))
 
             if not response.data:
                 return {"total_videos": 0, "total_views": 0}
@@ -875,9 +1137,8 @@ class SupabaseClient:
                 logger.info("📊 Tentando buscar stats da Materialized View...")
 
                 # Query direto na Materialized View (< 100ms)
-                response = self.supabase.table("mv_canal_video_stats")\
-                    .select("canal_id, total_videos, total_views")\
-                    .execute()
+                response = await run_query(self.supabase.table("mv_canal_video_stats")
+                    .select("canal_id, total_videos, total_views"))
 
                 if response.data:
                     result = {}
@@ -923,7 +1184,7 @@ class SupabaseClient:
                 GROUP BY canal_id
                 """
 
-                response = self.supabase.rpc("execute_sql", {"query": query}).execute()
+                response = await run_query(self.supabase.rpc("execute_sql", {"query": query}))
 
                 # Processar resultado da query SQL
                 result = {}
@@ -943,61 +1204,46 @@ class SupabaseClient:
                 logger.warning("RPC não disponível, usando fallback method (paginação)")
                 logger.warning("⚠️ ATENÇÃO: Este método é LENTO (~95s). Execute o SQL em create_materialized_view.sql no Supabase!")
 
-                # Buscar TODOS os vídeos com paginação
-                all_records = []
-                pagination_offset = 0
-                limit = 1000
+                # Buscar TODOS os vídeos em streaming (keyset), guardando só o snapshot mais recente
+                videos_by_canal = {}
+                total_records = 0
+                pages = 0
                 start_time = datetime.now()
 
                 logger.info("🔄 Buscando todos os vídeos com paginação (isso pode demorar)...")
 
-                while True:
-                    response = self.supabase.table("videos_historico")\
-                        .select("canal_id, video_id, views_atuais, data_coleta")\
-                        .range(pagination_offset, pagination_offset + limit - 1)\
-                        .execute()
+                async for page in self.iter_records("videos_historico", "canal_id, video_id, views_atuais, data_coleta"):
+                    pages += 1
+                    total_records += len(page)
 
-                    if response.data:
-                        all_records.extend(response.data)
+                    for record in page:
+                        canal_id = record.get("canal_id")
+                        video_id = record.get("video_id")
+                        data_coleta = record.get("data_coleta", "")
 
-                        # Log a cada 10 páginas para não poluir
-                        if (pagination_offset // limit + 1) % 10 == 0:
-                            elapsed = (datetime.now() - start_time).total_seconds()
-                            logger.info(f"  📊 {len(all_records)} registros carregados... ({elapsed:.1f}s)")
+                        if canal_id not in videos_by_canal:
+                            videos_by_canal[canal_id] = {}
 
-                        if len(response.data) < limit:
-                            # Última página
-                            break
-                        pagination_offset += limit
-                    else:
-                        break
+                        current = videos_by_canal[canal_id].get(video_id)
+                        if current is None or data_coleta > current[0]:
+                            videos_by_canal[canal_id][video_id] = (data_coleta, record.get("views_atuais") or 0)
+
+                    # Log a cada 10 páginas para não poluir
+                    if pages % 10 == 0:
+                        elapsed = (datetime.now() - start_time).total_seconds()
+                        logger.info(f"  📊 {total_records} registros processados... ({elapsed:.1f}s)")
 
                 elapsed_total = (datetime.now() - start_time).total_seconds()
-                logger.info(f"✅ Total: {len(all_records)} registros em {elapsed_total:.1f}s")
+                logger.info(f"✅ Total: {total_records} registros em {elapsed_total:.1f}s")
 
-                if not all_records:
+                if not videos_by_canal:
                     return {}
 
-                # Processar em Python (deduplicar e agregar)
-                videos_by_canal = {}
-                for record in all_records:
-                    canal_id = record.get("canal_id")
-                    video_id = record.get("video_id")
-                    data_coleta = record.get("data_coleta", "")
-
-                    if canal_id not in videos_by_canal:
-                        videos_by_canal[canal_id] = {}
-
-                    if video_id not in videos_by_canal[canal_id]:
-                        videos_by_canal[canal_id][video_id] = record
-                    elif data_coleta > videos_by_canal[canal_id][video_id].get("data_coleta", ""):
-                        videos_by_canal[canal_id][video_id] = record
-
                 # Calcular stats
                 result = {}
                 for canal_id, videos in videos_by_canal.items():
                     total_videos = len(videos)
-                    total_views = sum(v.get("views_atuais", 0) for v in videos.values())
+                    total_views = sum(views for _, views in videos.values())
                     result[canal_id] = {
                         "total_videos": total_videos,
                         "total_views": total_views
@@ -1033,7 +1279,7 @@ class SupabaseClient:
 
             # Chamar função SQL de refresh
             # CONCURRENTLY = não bloqueia leituras durante refresh
-            self.supabase.rpc("refresh_mv_canal_video_stats").execute()
+            await run_query(self.supabase.rpc("refresh_mv_canal_video_stats"))
 
             elapsed = (datetime.now() - start_time).total_seconds()
             logger.info(f"✅ Materialized View atualizada com sucesso!")
@@ -1088,7 +1334,7 @@ class SupabaseClient:
         # ===== TENTATIVA 1: Via RPC =====
         try:
             sr_client = getattr(self, 'supabase_service', None) or self.supabase
-            response = sr_client.rpc("refresh_all_dashboard_mvs").execute()
+            response = await run_query(sr_client.rpc("refresh_all_dashboard_mvs"))
 
             if response.data:
                 all_success = True
@@ -1238,7 +1484,7 @@ class SupabaseClient:
                 query = query.eq("lingua", lingua)
 
             # Executar query
-            response = query.execute()
+            response = await run_query(query)
 
             if response.data:
                 elapsed_ms = int((time.time() - start_time) * 1000)
@@ -1334,16 +1580,16 @@ class SupabaseClient:
 
     async def get_filter_options(self) -> Dict[str, List]:
         try:
-            nichos_response = self.supabase.table("canais_monitorados").select("nicho").execute()
+            nichos_response = await run_query(self.supabase.table("canais_monitorados").select("nicho"))
             nichos = list(set(item["nicho"] for item in nichos_response.data if item["nicho"]))
             
-            subnichos_response = self.supabase.table("canais_monitorados").select("subnicho").execute()
+            subnichos_response = await run_query(self.supabase.table("canais_monitorados").select("subnicho"))
             subnichos = list(set(item["subnicho"] for item in subnichos_response.data if item["subnicho"]))
             
-            linguas_response = self.supabase.table("canais_monitorados").select("lingua").execute()
+            linguas_response = await run_query(self.supabase.table("canais_monitorados").select("lingua"))
             linguas = list(set(item["lingua"] for item in linguas_response.data if item.get("lingua")))
             
-            canais_response = self.supabase.table("canais_monitorados").select("nome_canal").eq("status", "ativo").execute()
+            canais_response = await run_query(self.supabase.table("canais_monitorados").select("nome_canal").eq("status", "ativo"))
             canais = [item["nome_canal"] for item in canais_response.data]
             
             return {
@@ -1358,13 +1604,13 @@ class SupabaseClient:
 
     async def get_system_stats(self) -> Dict[str, Any]:
         try:
-            canais_response = self.supabase.table("canais_monitorados").select("id", count="exact").execute()
+            canais_response = await run_query(self.supabase.table("canais_monitorados").select("id", count="exact"))
             total_canais = canais_response.count
             
-            videos_response = self.supabase.table("videos_historico").select("id", count="exact").execute()
+            videos_response = await run_query(self.supabase.table("videos_historico").select("id", count="exact"))
             total_videos = videos_response.count
             
-            last_collection_response = self.supabase.table("canais_monitorados").select("ultima_coleta").order("ultima_coleta", desc=True).limit(1).execute()
+            last_collection_response = await run_query(self.supabase.table("canais_monitorados").select("ultima_coleta").order("ultima_coleta", desc=True).limit(1))
             last_collection = last_collection_response.data[0]["ultima_coleta"] if last_collection_response.data else None
             
             return {
@@ -1381,8 +1627,8 @@ class SupabaseClient:
         try:
             cutoff_date = (datetime.now(timezone.utc) - timedelta(days=60)).date().isoformat()
             
-            canal_response = self.supabase.table("dados_canais_historico").delete().lt("data_coleta", cutoff_date).execute()
-            video_response = self.supabase.table("videos_historico").delete().lt("data_coleta", cutoff_date).execute()
+            canal_response = await run_query(self.supabase.table("dados_canais_historico").delete().lt("data_coleta", cutoff_date))
+            video_response = await run_query(self.supabase.table("videos_historico").delete().lt("data_coleta", cutoff_date))
             
             logger.info(f"Cleaned up old data before {cutoff_date}")
         except Exception as e:
@@ -1391,15 +1637,15 @@ class SupabaseClient:
 
     async def add_favorito(self, tipo: str, item_id: int) -> Dict:
         try:
-            existing = self.supabase.table("favoritos").select("*").eq("tipo", tipo).eq("item_id", item_id).execute()
+            existing = await run_query(self.supabase.table("favoritos").select("*").eq("tipo", tipo).eq("item_id", item_id))
             
             if existing.data:
                 return existing.data[0]
             
-            response = self.supabase.table("favoritos").insert({
+            response = await run_query(self.supabase.table("favoritos").insert({
                 "tipo": tipo,
                 "item_id": item_id
-            }).execute()
+            }))
             
             return response.data[0] if response.data else None
         except Exception as e:
@@ -1408,7 +1654,7 @@ class SupabaseClient:
 
     async def remove_favorito(self, tipo: str, item_id: int):
         try:
-            response = self.supabase.table("favoritos").delete().eq("tipo", tipo).eq("item_id", item_id).execute()
+            response = await run_query(self.supabase.table("favoritos").delete().eq("tipo", tipo).eq("item_id", item_id))
             return response.data
         except Exception as e:
             logger.error(f"Error removing favorito: {e}")
@@ -1416,7 +1662,7 @@ class SupabaseClient:
 
     async def get_favoritos_canais(self) -> List[Dict]:
         try:
-            favoritos_response = self.supabase.table("favoritos").select("item_id").eq("tipo", "canal").execute()
+            favoritos_response = await run_query(self.supabase.table("favoritos").select("item_id").eq("tipo", "canal"))
             
             if not favoritos_response.data:
                 return []
@@ -1432,18 +1678,18 @@ class SupabaseClient:
 
     async def get_favoritos_videos(self) -> List[Dict]:
         try:
-            favoritos_response = self.supabase.table("favoritos").select("item_id").eq("tipo", "video").execute()
+            favoritos_response = await run_query(self.supabase.table("favoritos").select("item_id").eq("tipo", "video"))
             
             if not favoritos_response.data:
                 return []
             
             video_ids = [fav["item_id"] for fav in favoritos_response.data]
-            videos_response = self.supabase.table("videos_historico").select("*").in_("id", video_ids).execute()
+            videos_response = await run_query(self.supabase.table("videos_historico").select("*").in_("id", video_ids))
             videos = videos_response.data
             
             if videos:
                 canal_ids = list(set(v["canal_id"] for v in videos))
-                canais_response = self.supabase.table("canais_monitorados").select("*").in_("id", canal_ids).execute()
+                canais_response = await run_query(self.supabase.table("canais_monitorados").select("*").in_("id", canal_ids))
                 canais_dict = {c["id"]: c for c in canais_response.data}
                 
                 for video in videos:
@@ -1461,7 +1707,7 @@ class SupabaseClient:
     async def delete_canal_permanently(self, canal_id: int):
         try:
             # Primeiro buscar todos os video_ids do canal
-            videos_result = self.supabase.table("videos_historico").select("video_id").eq("canal_id", canal_id).execute()
+            videos_result = await run_query(self.supabase.table("videos_historico").select("video_id").eq("canal_id", canal_id))
 
             # Deletar comentários de todos os vídeos do canal
             if videos_result.data:
@@ -1469,14 +1715,14 @@ class SupabaseClient:
                 # Deletar em lotes de 100 para evitar timeout
                 for i in range(0, len(video_ids), 100):
                     batch = video_ids[i:i+100]
-                    self.supabase.table("video_comments").delete().in_("video_id", batch).execute()
+                    await run_query(self.supabase.table("video_comments").delete().in_("video_id", batch))
 
             # Ordem de deleção (respeitar foreign keys)
-            self.supabase.table("videos_historico").delete().eq("canal_id", canal_id).execute()
-            self.supabase.table("dados_canais_historico").delete().eq("canal_id", canal_id).execute()
-            self.supabase.table("notificacoes").delete().eq("canal_id", canal_id).execute()  # Adicionado!
-            self.supabase.table("favoritos").delete().eq("tipo", "canal").eq("item_id", canal_id).execute()
-            self.supabase.table("canais_monitorados").delete().eq("id", canal_id).execute()
+            await run_query(self.supabase.table("videos_historico").delete().eq("canal_id", canal_id))
+            await run_query(self.supabase.table("dados_canais_historico").delete().eq("canal_id", canal_id))
+            await run_query(self.supabase.table("notificacoes").delete().eq("canal_id", canal_id))  # Adicionado!
+            await run_query(self.supabase.table("favoritos").delete().eq("tipo", "canal").eq("item_id", canal_id))
+            await run_query(self.supabase.table("canais_monitorados").delete().eq("id", canal_id))
 
             return True
         except Exception as e:
@@ -1496,7 +1742,7 @@ class SupabaseClient:
             if vista_filter is not None:
                 query = query.eq("vista", vista_filter)
 
-            response = query.order("data_disparo", desc=True).range(offset, offset + limit - 1).execute()
+            response = await run_query(query.order("data_disparo", desc=True).range(offset, offset + limit - 1))
 
             if not response.data:
                 return []
@@ -1506,9 +1752,9 @@ class SupabaseClient:
             video_ids = [n["video_id"] for n in notificacoes if n.get("video_id")]
 
             if video_ids:
-                videos_response = self.supabase.table("videos_historico").select(
+                videos_response = await run_query(self.supabase.table("videos_historico").select(
                     "video_id, data_publicacao"
-                ).in_("video_id", video_ids).execute()
+                ).in_("video_id", video_ids))
 
                 videos_dict = {v["video_id"]: v["data_publicacao"] for v in videos_response.data}
 
@@ -1548,10 +1794,10 @@ class SupabaseClient:
         Marca uma notificação como vista.
         """
         try:
-            response = self.supabase.table("notificacoes").update({
+            response = await run_query(self.supabase.table("notificacoes").update({
                 "vista": True,
                 "data_vista": datetime.now(timezone.utc).isoformat()
-            }).eq("id", notif_id).execute()
+            }).eq("id", notif_id))
             
             return True
         except Exception as e:
@@ -1570,10 +1816,10 @@ class SupabaseClient:
             bool: True se sucesso, False se notificação não encontrada
         """
         try:
-            response = self.supabase.table("notificacoes").update({
+            response = await run_query(self.supabase.table("notificacoes").update({
                 "vista": False,
                 "data_vista": None
-            }).eq("id", notif_id).execute()
+            }).eq("id", notif_id))
             
             return True
         except Exception as e:
@@ -1602,10 +1848,10 @@ class SupabaseClient:
         try:
             # Se não tem filtros, marcar todas direto (comportamento original)
             if not lingua and not subnicho and not tipo_canal and not periodo_dias:
-                response = self.supabase.table("notificacoes").update({
+                response = await run_query(self.supabase.table("notificacoes").update({
                     "vista": True,
                     "data_vista": datetime.now(timezone.utc).isoformat()
-                }).eq("vista", False).execute()
+                }).eq("vista", False))
 
                 return len(response.data) if response.data else 0
 
@@ -1624,7 +1870,7 @@ class SupabaseClient:
             if periodo_dias:
                 query = query.eq("periodo_dias", periodo_dias)
 
-            ids_response = query.execute()
+            ids_response = await run_query(query)
 
             if not ids_response.data or len(ids_response.data) == 0:
                 logger.info("Nenhuma notificação encontrada com os filtros aplicados")
@@ -1634,10 +1880,10 @@ class SupabaseClient:
             ids = [item["id"] for item in ids_response.data]
 
             # Marcar todas de uma vez
-            update_response = self.supabase.table("notificacoes").update({
+            update_response = await run_query(self.supabase.table("notificacoes").update({
                 "vista": True,
                 "data_vista": datetime.now(timezone.utc).isoformat()
-            }).in_("id", ids).execute()
+            }).in_("id", ids))
 
             marked_count = len(ids)
             logger.info(f"✅ {marked_count} notificações marcadas como vistas (filtros aplicados)")
@@ -1650,20 +1896,20 @@ class SupabaseClient:
     
     async def get_notificacao_stats(self) -> Dict:
         try:
-            total_response = self.supabase.table("notificacoes").select("id", count="exact").execute()
+            total_response = await run_query(self.supabase.table("notificacoes").select("id", count="exact"))
             total = total_response.count if total_response.count else 0
             
-            nao_vistas_response = self.supabase.table("notificacoes").select("id", count="exact").eq("vista", False).execute()
+            nao_vistas_response = await run_query(self.supabase.table("notificacoes").select("id", count="exact").eq("vista", False))
             nao_vistas = nao_vistas_response.count if nao_vistas_response.count else 0
             
             vistas = total - nao_vistas
             
             hoje = datetime.now(timezone.utc).date().isoformat()
-            hoje_response = self.supabase.table("notificacoes").select("id", count="exact").gte("data_disparo", hoje).execute()
+            hoje_response = await run_query(self.supabase.table("notificacoes").select("id", count="exact").gte("data_disparo", hoje))
             hoje_count = hoje_response.count if hoje_response.count else 0
             
             semana_atras = (datetime.now(timezone.utc) - timedelta(days=7)).isoformat()
-            semana_response = self.supabase.table("notificacoes").select("id", count="exact").gte("data_disparo", semana_atras).execute()
+            semana_response = await run_query(self.supabase.table("notificacoes").select("id", count="exact").gte("data_disparo", semana_atras))
             semana_count = semana_response.count if semana_response.count else 0
             
             return {
@@ -1685,7 +1931,7 @@ class SupabaseClient:
             
     async def get_regras_notificacoes(self) -> List[Dict]:
         try:
-            response = self.supabase.table("regras_notificacoes").select("*").order("views_minimas", desc=False).execute()
+            response = await run_query(self.supabase.table("regras_notificacoes").select("*").order("views_minimas", desc=False))
             return response.data if response.data else []
         except Exception as e:
             logger.error(f"Erro ao buscar regras de notificacoes: {e}")
@@ -1699,7 +1945,7 @@ class SupabaseClient:
                 elif isinstance(regra_data['subnichos'], str):
                     regra_data['subnichos'] = [regra_data['subnichos']]
             
-            response = self.supabase.table("regras_notificacoes").insert(regra_data).execute()
+            response = await run_query(self.supabase.table("regras_notificacoes").insert(regra_data))
             
             if response.data:
                 logger.info(f"✅ Regra criada: {regra_data.get('nome_regra')} com {len(regra_data.get('subnichos', [])) if regra_data.get('subnichos') else 'todos os'} subnicho(s)")
@@ -1717,7 +1963,7 @@ class SupabaseClient:
                 elif isinstance(regra_data['subnichos'], str):
                     regra_data['subnichos'] = [regra_data['subnichos']]
             
-            response = self.supabase.table("regras_notificacoes").update(regra_data).eq("id", regra_id).execute()
+            response = await run_query(self.supabase.table("regras_notificacoes").update(regra_data).eq("id", regra_id))
             
             if response.data:
                 logger.info(f"✅ Regra atualizada: ID {regra_id}")
@@ -1729,7 +1975,7 @@ class SupabaseClient:
     
     async def delete_regra_notificacao(self, regra_id: int) -> bool:
         try:
-            response = self.supabase.table("regras_notificacoes").delete().eq("id", regra_id).execute()
+            response = await run_query(self.supabase.table("regras_notificacoes").delete().eq("id", regra_id))
             return True
         except Exception as e:
             logger.error(f"Erro ao deletar regra de notificacao: {e}")
@@ -1737,16 +1983,16 @@ class SupabaseClient:
     
     async def toggle_regra_notificacao(self, regra_id: int) -> Optional[Dict]:
         try:
-            current = self.supabase.table("regras_notificacoes").select("ativa").eq("id", regra_id).execute()
+            current = await run_query(self.supabase.table("regras_notificacoes").select("ativa").eq("id", regra_id))
 
             if not current.data:
                 return None
 
             nova_ativa = not current.data[0]["ativa"]
 
-            response = self.supabase.table("regras_notificacoes").update({
+            response = await run_query(self.supabase.table("regras_notificacoes").update({
                 "ativa": nova_ativa
-            }).eq("id", regra_id).execute()
+            }).eq("id", regra_id))
 
             return response.data[0] if response.data else None
         except Exception as e:
@@ -1788,10 +2034,9 @@ class SupabaseClient:
 
             # Só atualizar se houver dados novos
             if update_data:
-                response = self.supabase.table("canais_monitorados")\
-                    .update(update_data)\
-                    .eq("id", canal_id)\
-                    .execute()
+                response = await run_query(self.supabase.table("canais_monitorados")
+                    .update(update_data)
+                    .eq("id", canal_id))
 
                 logger.info(f"✅ Analytics fields updated for canal {canal_id}")
                 return True
@@ -1818,11 +2063,10 @@ class SupabaseClient:
             logger.info(f"🧹 Iniciando limpeza de notificações antigas (>{days} dias)...")
 
             # Deletar notificações não vistas com data_disparo < cutoff_date
-            response = self.supabase.table("notificacoes")\
-                .delete()\
-                .eq("vista", False)\
-                .lt("data_disparo", cutoff_date)\
-                .execute()
+            response = await run_query(self.supabase.table("notificacoes")
+                .delete()
+                .eq("vista", False)
+                .lt("data_disparo", cutoff_date))
 
             deleted_count = len(response.data) if response.data else 0
 
@@ -1836,7 +2080,7 @@ class SupabaseClient:
 
     async def get_cached_transcription(self, video_id: str):
         try:
-            response = self.supabase.table("transcriptions").select("*").eq("video_id", video_id).execute()
+            response = await run_query(self.supabase.table("transcriptions").select("*").eq("video_id", video_id))
             
             if response.data and len(response.data) > 0:
                 logger.info(f"✅ Cache hit for video: {video_id}")
@@ -1856,7 +2100,7 @@ class SupabaseClient:
                 "updated_at": datetime.now(timezone.utc).isoformat()
             }
             
-            response = self.supabase.table("transcriptions").upsert(data).execute()
+            response = await run_query(self.supabase.table("transcriptions").upsert(data))
             
             logger.info(f"💾 Transcription cached for video: {video_id}")
             return response.data[0] if response.data else None
@@ -1874,13 +2118,12 @@ class SupabaseClient:
         try:
             today = datetime.now().strftime("%Y-%m-%d")
             
-            response = self.supabase.table("keyword_analysis")\
-                .select("*")\
-                .eq("period_days", period_days)\
-                .eq("analyzed_date", today)\
-                .order("frequency", desc=True)\
-                .limit(20)\
-                .execute()
+            response = await run_query(self.supabase.table("keyword_analysis")
+                .select("*")
+                .eq("period_days", period_days)
+                .eq("analyzed_date", today)
+                .order("frequency", desc=True)
+                .limit(20))
             
             return response.data if response.data else []
         except Exception as e:
@@ -1892,14 +2135,13 @@ class SupabaseClient:
         try:
             today = datetime.now().strftime("%Y-%m-%d")
             
-            response = self.supabase.table("title_patterns")\
-                .select("*")\
-                .eq("subniche", subniche)\
-                .eq("period_days", period_days)\
-                .eq("analyzed_date", today)\
-                .order("avg_views", desc=True)\
-                .limit(5)\
-                .execute()
+            response = await run_query(self.supabase.table("title_patterns")
+                .select("*")
+                .eq("subniche", subniche)
+                .eq("period_days", period_days)
+                .eq("analyzed_date", today)
+                .order("avg_views", desc=True)
+                .limit(5))
             
             return response.data if response.data else []
         except Exception as e:
@@ -1911,13 +2153,12 @@ class SupabaseClient:
         try:
             today = datetime.now().strftime("%Y-%m-%d")
             
-            response = self.supabase.table("top_channels_snapshot")\
-                .select("*, canais_monitorados!inner(nome_canal, url_canal)")\
-                .eq("subniche", subniche)\
-                .eq("snapshot_date", today)\
-                .order("rank_position", desc=False)\
-                .limit(5)\
-                .execute()
+            response = await run_query(self.supabase.table("top_channels_snapshot")
+                .select("*, canais_monitorados!inner(nome_canal, url_canal)")
+                .eq("subniche", subniche)
+                .eq("snapshot_date", today)
+                .order("rank_position", desc=False)
+                .limit(5))
             
             return response.data if response.data else []
         except Exception as e:
@@ -1936,7 +2177,7 @@ class SupabaseClient:
             if subniche:
                 query = query.eq("subniche", subniche)
             
-            response = query.order("avg_views", desc=True).execute()
+            response = await run_query(query.order("avg_views", desc=True))
             
             return response.data if response.data else []
         except Exception as e:
@@ -1946,11 +2187,10 @@ class SupabaseClient:
     async def get_weekly_report_latest(self) -> Optional[Dict]:
         """Busca o relatório semanal mais recente"""
         try:
-            response = self.supabase.table("weekly_reports")\
-                .select("*")\
-                .order("week_start", desc=True)\
-                .limit(1)\
-                .execute()
+            response = await run_query(self.supabase.table("weekly_reports")
+                .select("*")
+                .order("week_start", desc=True)
+                .limit(1))
             
             if response.data:
                 import json
@@ -1966,10 +2206,9 @@ class SupabaseClient:
     async def get_all_subniches(self) -> List[str]:
         """Busca lista de todos os subniches ativos"""
         try:
-            response = self.supabase.table("canais_monitorados")\
-                .select("subnicho")\
-                .eq("status", "ativo")\
-                .execute()
+            response = await run_query(self.supabase.table("canais_monitorados")
+                .select("subnicho")
+                .eq("status", "ativo"))
 
             if response.data:
                 subniches = list(set([c['subnicho'] for c in response.data]))
@@ -2026,7 +2265,7 @@ class SupabaseClient:
                 })
 
             # Upsert: cria novo ou atualiza se já existe (baseado em UNIQUE constraint)
-            response = self.supabase.table("subniche_trends_snapshot").upsert(records).execute()
+            response = await run_query(self.supabase.table("subniche_trends_snapshot").upsert(records))
 
             logger.info(f"✅ Salvos {len(records)} registros de subniche trends")
             return True
@@ -2047,12 +2286,11 @@ class SupabaseClient:
         """
         try:
             # Buscar a data mais recente disponível para este período
-            latest_date_response = self.supabase.table("subniche_trends_snapshot")\
-                .select("analyzed_date")\
-                .eq("period_days", period_days)\
-                .order("analyzed_date", desc=True)\
-                .limit(1)\
-                .execute()
+            latest_date_response = await run_query(self.supabase.table("subniche_trends_snapshot")
+                .select("analyzed_date")
+                .eq("period_days", period_days)
+                .order("analyzed_date", desc=True)
+                .limit(1))
 
             if not latest_date_response.data:
                 logger.warning(f"Nenhum snapshot encontrado para {period_days}d")
@@ -2061,12 +2299,11 @@ class SupabaseClient:
             latest_date = latest_date_response.data[0]["analyzed_date"]
 
             # Buscar todos os dados dessa data mais recente
-            response = self.supabase.table("subniche_trends_snapshot")\
-                .select("*")\
-                .eq("period_days", period_days)\
-                .eq("analyzed_date", latest_date)\
-                .order("subnicho", desc=False)\
-                .execute()
+            response = await run_query(self.supabase.table("subniche_trends_snapshot")
+                .select("*")
+                .eq("period_days", period_days)
+                .eq("analyzed_date", latest_date)
+                .order("subnicho", desc=False))
 
             if response.data:
                 logger.info(f"📊 Subniche trends ({period_days}d): {len(response.data)} registros (data: {latest_date})")
@@ -2111,11 +2348,11 @@ class SupabaseClient:
         Reseta contador de falhas e atualiza timestamp de último sucesso.
         """
         try:
-            self.supabase.table("canais_monitorados").update({
+            await run_query(self.supabase.table("canais_monitorados").update({
                 "coleta_falhas_consecutivas": 0,
                 "coleta_ultimo_sucesso": datetime.now(timezone.utc).isoformat(),
                 "coleta_ultimo_erro": None
-            }).eq("id", canal_id).execute()
+            }).eq("id", canal_id))
         except Exception as e:
             logger.warning(f"Erro ao marcar coleta como sucesso para canal {canal_id}: {e}")
 
@@ -2129,20 +2366,19 @@ class SupabaseClient:
         """
         try:
             # Buscar valor atual de falhas
-            atual = self.supabase.table("canais_monitorados")\
-                .select("coleta_falhas_consecutivas")\
-                .eq("id", canal_id)\
-                .execute()
+            atual = await run_query(self.supabase.table("canais_monitorados")
+                .select("coleta_falhas_consecutivas")
+                .eq("id", canal_id))
 
             falhas_atuais = 0
             if atual.data and len(atual.data) > 0:
                 falhas_atuais = atual.data[0].get("coleta_falhas_consecutivas") or 0
 
             # Incrementar e salvar
-            self.supabase.table("canais_monitorados").update({
+            await run_query(self.supabase.table("canais_monitorados").update({
                 "coleta_falhas_consecutivas": falhas_atuais + 1,
                 "coleta_ultimo_erro": erro[:500] if erro else None  # Limitar tamanho do erro
-            }).eq("id", canal_id).execute()
+            }).eq("id", canal_id))
 
             logger.warning(f"Canal {canal_id}: falha #{falhas_atuais + 1} - {erro[:100]}...")
         except Exception as e:
@@ -2154,14 +2390,13 @@ class SupabaseClient:
         Usado para implementar coleta incremental de comentários.
         """
         try:
-            self.supabase.table("canais_monitorados").update({
+            await run_query(self.supabase.table("canais_monitorados").update({
                 "ultimo_comentario_coletado": timestamp,
-                "total_comentarios_coletados": self.supabase.table("canais_monitorados")
+                "total_comentarios_coletados": (await run_query(self.supabase.table("canais_monitorados")
                     .select("total_comentarios_coletados")
-                    .eq("id", canal_id)
-                    .execute()
+                    .eq("id", canal_id)))
                     .data[0].get("total_comentarios_coletados", 0) + 1
-            }).eq("id", canal_id).execute()
+            }).eq("id", canal_id))
 
             logger.debug(f"Timestamp de comentário atualizado para canal {canal_id}: {timestamp}")
         except Exception as e:
@@ -2176,11 +2411,10 @@ class SupabaseClient:
             Lista de dicts com info dos canais problemáticos
         """
         try:
-            response = self.supabase.table("canais_monitorados")\
-                .select("id, nome_canal, url_canal, subnicho, tipo, lingua, coleta_falhas_consecutivas, coleta_ultimo_erro, coleta_ultimo_sucesso, ultima_coleta")\
-                .gt("coleta_falhas_consecutivas", 0)\
-                .order("coleta_falhas_consecutivas", desc=True)\
-                .execute()
+            response = await run_query(self.supabase.table("canais_monitorados")
+                .select("id, nome_canal, url_canal, subnicho, tipo, lingua, coleta_falhas_consecutivas, coleta_ultimo_erro, coleta_ultimo_sucesso, ultima_coleta")
+                .gt("coleta_falhas_consecutivas", 0)
+                .order("coleta_falhas_consecutivas", desc=True))
 
             return response.data if response.data else []
         except Exception as e:
@@ -2200,11 +2434,10 @@ class SupabaseClient:
         try:
             cutoff = (datetime.now(timezone.utc) - timedelta(days=dias)).isoformat()
 
-            response = self.supabase.table("canais_monitorados")\
-                .select("id, nome_canal, url_canal, subnicho, tipo, ultima_coleta, coleta_falhas_consecutivas, coleta_ultimo_erro")\
-                .eq("status", "ativo")\
-                .or_(f"ultima_coleta.is.null,ultima_coleta.lt.{cutoff}")\
-                .execute()
+            response = await run_query(self.supabase.table("canais_monitorados")
+                .select("id, nome_canal, url_canal, subnicho, tipo, ultima_coleta, coleta_falhas_consecutivas, coleta_ultimo_erro")
+                .eq("status", "ativo")
+                .or_(f"ultima_coleta.is.null,ultima_coleta.lt.{cutoff}"))
 
             return response.data if response.data else []
         except Exception as e:
@@ -2275,7 +2508,7 @@ class SupabaseClient:
                 records.append(record)
 
             # Inserir em lote (upsert para evitar duplicatas)
-            response = self.supabase.table('video_comments').upsert(records).execute()
+            response = await run_query(self.supabase.table('video_comments').upsert(records))
 
             logger.info(f"✅ {len(records)} comentários salvos para vídeo {video_id}")
             return True
@@ -2306,7 +2539,7 @@ class SupabaseClient:
                 'last_analyzed_at': datetime.now(timezone.utc).isoformat()
             }
 
-            response = self.supabase.table('video_comments_summary').upsert(data).execute()
+            response = await run_query(self.supabase.table('video_comments_summary').upsert(data))
 
             return True
 
@@ -2314,66 +2547,35 @@ class SupabaseClient:
             logger.error(f"❌ Erro ao salvar resumo de comentários: {e}")
             return False
 
-    async def get_canal_engagement_data(self, canal_id: int) -> Dict[str, Any]:
-        """
-        Busca dados de engajamento completos de um canal DIRETO dos comentários
-        """
-        try:
-            # Buscar TODOS os comentários do canal
-            all_comments_response = self.supabase.table('video_comments')\
-                .select('*')\
-                .eq('canal_id', canal_id)\
-                .execute()
-
-            all_comments = all_comments_response.data if all_comments_response.data else []
-
-            # Calcular métricas gerais
-            total_comments = len(all_comments)
-            positive_count = len([c for c in all_comments if c.get('sentiment_category') == 'positive'])
-            negative_count = len([c for c in all_comments if c.get('sentiment_category') == 'negative'])
-            problem_count = len([c for c in all_comments if c.get('sentiment_category') == 'problem'])
-
-            # Agrupar comentários por vídeo
-            videos_data = {}
-            for comment in all_comments:
-                video_id = comment.get('video_id')
-                if video_id not in videos_data:
-                    videos_data[video_id] = {
-                        'video_id': video_id,
-                        'video_title': comment.get('video_title', ''),
-                        'total_comments': 0,
-                        'positive_count': 0,
-                        'negative_count': 0,
-                        'neutral_count': 0,
-                        'problem_count': 0,
-                        'comments': []
-                    }
-
-                videos_data[video_id]['total_comments'] += 1
-                videos_data[video_id]['comments'].append(comment)
-
-                sentiment = comment.get('sentiment_category', 'neutral')
-                if sentiment == 'positive':
-                    videos_data[video_id]['positive_count'] += 1
-                elif sentiment == 'negative':
-                    videos_data[video_id]['negative_count'] += 1
-                elif sentiment == 'problem':
-                    videos_data[video_id]['problem_count'] += 1
-                else:
-                    videos_data[video_id]['neutral_count'] += 1
+    async def get_canal_engagement_data(self, canal_id: int,
+                                        preview_limit: int = ENGAGEMENT_PREVIEW_LIMIT) -> Dict[str, Any]:
+        """
+        Resumo de engajamento de um canal a partir de agregados no banco.
 
-            # Converter para lista e ordenar por total de comentários
-            videos_list = list(videos_data.values())
-            videos_list.sort(key=lambda x: x['total_comments'], reverse=True)
+        - summary / videos_summary: contagens por vídeo e sentimento (RPC get_canal_engagement_summary)
+        - problem_breakdown: problemas por tipo (RPC get_canal_problem_breakdown)
+        - listas por categoria: só os `preview_limit` comentários com mais likes;
+          o restante é paginado sob demanda via get_engagement_comments()
+        """
+        try:
+            summary_response, breakdown_response = await asyncio.gather(
+                run_query(self.supabase.rpc('get_canal_engagement_summary', {'p_canal_id': canal_id})),
+                run_query(self.supabase.rpc('get_canal_problem_breakdown', {'p_canal_id': canal_id}))
+            )
+            videos_list = summary_response.data or []
 
-            # Buscar comentários positivos e negativos para destaque
-            positive_comments = [c for c in all_comments if c.get('sentiment_category') == 'positive']
-            negative_comments = [c for c in all_comments if c.get('sentiment_category') == 'negative']
-            problem_comments = [c for c in all_comments if c.get('sentiment_category') == 'problem']
+            total_comments = sum(v['total_comments'] for v in videos_list)
+            positive_count = sum(v['positive_count'] for v in videos_list)
+            negative_count = sum(v['negative_count'] for v in videos_list)
+            problem_count = sum(v['problem_count'] for v in videos_list)
 
-            # Ordenar por like_count se existir
-            positive_comments.sort(key=lambda x: x.get('like_count', 0), reverse=True)
-            negative_comments.sort(key=lambda x: x.get('like_count', 0), reverse=True)
+            positive_comments, negative_comments, problem_comments = [], [], []
+            if total_comments and preview_limit:
+                previews = await asyncio.gather(*(
+                    self.get_engagement_comments(canal_id, category, page=1, limit=preview_limit)
+                    for category in ('positive', 'negative', 'problem')
+                ))
+                positive_comments, negative_comments, problem_comments = (p['comments'] for p in previews)
 
             return {
                 'summary': {
@@ -2383,18 +2585,21 @@ class SupabaseClient:
                     'positive_pct': round(positive_count / total_comments * 100, 1) if total_comments > 0 else 0,
                     'negative_pct': round(negative_count / total_comments * 100, 1) if total_comments > 0 else 0,
                     'actionable_count': problem_count,  # problemas são acionáveis
-                    'problems_count': problem_count
+                    'problems_count': problem_count,
+                    'problem_breakdown': {r['problem_type']: r['count'] for r in (breakdown_response.data or [])}
                 },
-                'videos_summary': videos_list,  # TODOS os vídeos com comentários
-                'problem_comments': problem_comments,  # TODOS os problemas (sem limite)
-                'positive_comments': positive_comments,  # TODOS os positivos (sem limite)
-                'negative_comments': negative_comments,  # TODOS os negativos (sem limite)
-                'actionable_comments': problem_comments  # TODOS os problemas são acionáveis (sem limite)
+                'videos_summary': videos_list,  # Contagens por vídeo (sem os comentários)
+                'problem_comments': problem_comments,  # Prévia (top por likes) - resto via paginação
+                'positive_comments': positive_comments,
+                'negative_comments': negative_comments,
+                'actionable_comments': problem_comments  # problemas são acionáveis
             }
 
         except Exception as e:
             logger.error(f"❌ Erro ao buscar dados de engajamento: {e}")
+            # 'error' marca o fallback vazio: quem materializa (engagement_cache) não deve gravá-lo
             return {
+                'error': str(e),
                 'summary': {'total_comments': 0},
                 'videos_summary': [],
                 'problem_comments': [],
@@ -2402,18 +2607,52 @@ class SupabaseClient:
                 'actionable_comments': []
             }
 
+    async def get_engagement_comments(self, canal_id: int, category: str = 'all', page: int = 1,
+                                      limit: int = 50, video_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Página de comentários de um canal (ou vídeo) por categoria, ordenada por likes.
+
+        Args:
+            category: 'all', 'positive', 'negative', 'problem' ou 'actionable' (= problem)
+            page: página (1-based)
+            limit: comentários por página
+            video_id: restringe a um vídeo
+
+        Returns:
+            {'comments': [...], 'page', 'limit', 'total'}
+        """
+        if category == 'actionable':
+            category = 'problem'
+        offset = (max(page, 1) - 1) * limit
+
+        query = self.supabase.table('video_comments')\
+            .select(ENGAGEMENT_COMMENT_FIELDS, count='exact')\
+            .eq('canal_id', canal_id)
+        if category != 'all':
+            query = query.eq('sentiment_category', category)
+        if video_id:
+            query = query.eq('video_id', video_id)
+        query = query.order('like_count', desc=True).range(offset, offset + limit - 1)
+
+        response = await run_query(query)
+        return {
+            'comments': response.data or [],
+            'page': page,
+            'limit': limit,
+            'total': response.count or 0
+        }
+
     async def mark_comment_resolved(self, comment_id: str) -> bool:
         """
         Marca um comentário como resolvido
         """
         try:
-            response = self.supabase.table('video_comments')\
+            response = await run_query(self.supabase.table('video_comments')
                 .update({
                     'is_resolved': True,
                     'resolved_at': datetime.now(timezone.utc).isoformat()
-                })\
-                .eq('comment_id', comment_id)\
-                .execute()
+                })
+                .eq('comment_id', comment_id))
 
             return True
 
@@ -2426,12 +2665,11 @@ class SupabaseClient:
         Busca comentários de um vídeo específico
         """
         try:
-            response = self.supabase.table('video_comments')\
-                .select('*')\
-                .eq('video_id', video_id)\
-                .order('like_count', desc=True)\
-                .limit(limit)\
-                .execute()
+            response = await run_query(self.supabase.table('video_comments')
+                .select('*')
+                .eq('video_id', video_id)
+                .order('like_count', desc=True)
+                .limit(limit))
 
             return response.data if response.data else []
 
@@ -7,14 +7,37 @@ Executa após a coleta diária para processar e armazenar dados em cache.
 Data: 29/01/2025
 """
 
+import os
+import time
+import asyncio
 import logging
 import json
 from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Any, Optional
-from database import SupabaseClient
+from database import SupabaseClient, run_query
 
 logger = logging.getLogger(__name__)
 
+# Canais reprocessados em paralelo no build do cache
+ENGAGEMENT_CACHE_CONCURRENCY = int(os.environ.get("ENGAGEMENT_CACHE_CONCURRENCY", "4"))
+# Validade de uma entrada do cache (renovada a cada build para canais sem comentários novos,
+# mesmo já expirada: o build diário decide só por mudança em video_comments)
+ENGAGEMENT_CACHE_TTL_HOURS = 6
+
+# Resultado do último build (por processo) - exposto em get_cache_stats()
+_last_build: Dict[str, Any] = {}
+
+
+def _parse_ts(value: Optional[str]) -> Optional[datetime]:
+    """Timestamp ISO do Supabase -> datetime UTC (None se vazio/inválido)."""
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
 
 class EngagementPreprocessor:
     """
@@ -31,65 +54,88 @@ class EngagementPreprocessor:
         """
         self.db = db or SupabaseClient()
 
-    async def build_engagement_cache(self) -> Dict[str, Any]:
+    async def build_engagement_cache(self, force: bool = False) -> Dict[str, Any]:
         """
-        Constrói cache completo de engajamento para todos os canais.
+        Constrói o cache de engajamento dos canais "nossos" ativos.
         Executa APÓS daily_analysis_job (último step).
 
+        Incremental: só reprocessa canais sem cache ou cujos video_comments mudaram
+        (update, insert ou delete) depois do processed_at (force=True reprocessa todos).
+        Os demais só têm a validade renovada - também quando já expiraram, antes da
+        limpeza de expirados. Reprocessamento em paralelo
+        (ENGAGEMENT_CACHE_CONCURRENCY canais por vez).
+
         Returns:
-            Dict com estatísticas do processamento
+            Dict com estatísticas do processamento (inclui skipped e tempo por canal)
         """
+        global _last_build
         try:
             logger.info("=" * 80)
-            logger.info("🔄 CONSTRUINDO CACHE DE ENGAJAMENTO")
+            logger.info("🔄 CONSTRUINDO CACHE DE ENGAJAMENTO" + (" (forçado)" if force else " (incremental)"))
             logger.info("=" * 80)
 
             start_time = datetime.now()
 
             # Buscar apenas canais "nossos" ativos
-            canais_response = self.db.supabase.table('canais_monitorados')\
-                .select('id, nome_canal')\
-                .eq('tipo', 'nosso')\
-                .eq('status', 'ativo')\
-                .execute()
+            canais_response = await run_query(self.db.supabase.table('canais_monitorados')
+                .select('id, nome_canal')
+                .eq('tipo', 'nosso')
+                .eq('status', 'ativo'))
 
             if not canais_response.data:
                 logger.warning("⚠️ Nenhum canal 'nosso' ativo encontrado")
-                return {'processed': 0, 'failed': 0, 'total': 0}
+                return {'processed': 0, 'failed': 0, 'skipped': 0, 'total': 0}
 
             canais = canais_response.data
             total_canais = len(canais)
 
-            logger.info(f"📊 {total_canais} canais para processar")
-
-            processed = 0
-            failed = 0
-
-            for index, canal in enumerate(canais, 1):
-                canal_id = canal['id']
-                canal_nome = canal['nome_canal']
+            if force:
+                to_rebuild, unchanged = canais, []
+            else:
+                to_rebuild, unchanged = await self._split_changed_canais(canais)
 
-                try:
-                    logger.info(f"[{index}/{total_canais}] Processando: {canal_nome} (ID: {canal_id})")
+            logger.info(f"📊 {total_canais} canais: {len(to_rebuild)} para processar, "
+                        f"{len(unchanged)} sem comentários novos")
 
-                    success = await self.process_and_cache_canal(canal_id)
+            # Canais sem mudança: só renova a validade (1 update). Se a renovação falhar,
+            # reprocessa: a limpeza abaixo apagaria as entradas expiradas
+            if unchanged and not await self._extend_cache_expiry([c['id'] for c in unchanged]):
+                to_rebuild, unchanged = to_rebuild + unchanged, []
 
-                    if success:
-                        processed += 1
-                        logger.info(f"✅ [{index}/{total_canais}] {canal_nome} - Cache atualizado")
-                    else:
-                        failed += 1
-                        logger.warning(f"⚠️ [{index}/{total_canais}] {canal_nome} - Sem dados para cache")
+            semaphore = asyncio.Semaphore(ENGAGEMENT_CACHE_CONCURRENCY)
 
-                except Exception as e:
-                    failed += 1
-                    logger.error(f"❌ [{index}/{total_canais}] Erro ao processar {canal_nome}: {e}")
-                    import traceback
-                    logger.error(traceback.format_exc())
+            async def rebuild(index: int, canal: Dict) -> Dict[str, Any]:
+                canal_id = canal['id']
+                canal_nome = canal['nome_canal']
+                async with semaphore:
+                    started = time.monotonic()
+                    try:
+                        success = await self.process_and_cache_canal(canal_id)
+                        status = 'processed' if success else 'failed'
+                        if success:
+                            logger.info(f"✅ [{index}/{len(to_rebuild)}] {canal_nome} - Cache atualizado")
+                        else:
+                            logger.warning(f"⚠️ [{index}/{len(to_rebuild)}] {canal_nome} - Sem dados para cache")
+                    except Exception as e:
+                        status = 'failed'
+                        logger.error(f"❌ [{index}/{len(to_rebuild)}] Erro ao processar {canal_nome}: {e}")
+                    return {
+                        'canal_id': canal_id,
+                        'nome_canal': canal_nome,
+                        'status': status,
+                        'elapsed_ms': int((time.monotonic() - started) * 1000)
+                    }
+
+            channel_timings = await asyncio.gather(*(
+                rebuild(index, canal) for index, canal in enumerate(to_rebuild, 1)
+            ))
+
+            processed = sum(1 for t in channel_timings if t['status'] == 'processed')
+            failed = len(channel_timings) - processed
 
             # Limpar cache expirado
             try:
-                cleanup_result = self.db.supabase.rpc('delete_expired_engagement_cache').execute()
+                cleanup_result = await run_query(self.db.supabase.rpc('delete_expired_engagement_cache'))
                 if cleanup_result.data is not None:
                     logger.info(f"🧹 Cache expirado limpo: {cleanup_result.data} registros")
             except Exception as e:
@@ -100,22 +146,68 @@ class EngagementPreprocessor:
             logger.info("=" * 80)
             logger.info("✅ CACHE DE ENGAJAMENTO CONCLUÍDO")
             logger.info(f"✅ Processados: {processed}/{total_canais}")
+            logger.info(f"⏭️ Sem mudanças: {len(unchanged)}/{total_canais}")
             logger.info(f"❌ Falhas: {failed}/{total_canais}")
             logger.info(f"⏱️ Tempo total: {elapsed_time:.1f}s")
             logger.info("=" * 80)
 
-            return {
+            result = {
                 'processed': processed,
                 'failed': failed,
+                'skipped': len(unchanged),
                 'total': total_canais,
-                'elapsed_seconds': elapsed_time
+                'elapsed_seconds': elapsed_time,
+                'channel_timings': sorted(channel_timings, key=lambda t: t['elapsed_ms'], reverse=True)
             }
+            _last_build = {'finished_at': datetime.now(timezone.utc).isoformat(), 'force': force, **result}
+            return result
 
         except Exception as e:
             logger.error(f"❌ Erro crítico no build_engagement_cache: {e}")
             import traceback
             logger.error(traceback.format_exc())
-            return {'processed': 0, 'failed': 0, 'total': 0}
+            return {'processed': 0, 'failed': 0, 'skipped': 0, 'total': 0}
+
+    async def _split_changed_canais(self, canais: List[Dict]) -> tuple:
+        """
+        Separa canais que precisam de rebuild (sem cache ou comentários alterados/removidos
+        após processed_at) dos que continuam válidos. expires_at não entra na decisão:
+        o build roda 1x/dia e toda entrada já estaria expirada.
+        """
+        changes_response, cache_response = await asyncio.gather(
+            run_query(self.db.supabase.rpc('get_comments_last_change_by_canal')),
+            run_query(self.db.supabase.table('engagement_cache')
+                .select('canal_id, processed_at')
+                .in_('canal_id', [c['id'] for c in canais]))
+        )
+        last_change = {r['canal_id']: _parse_ts(r['last_change']) for r in (changes_response.data or [])}
+        cached = {r['canal_id']: r for r in (cache_response.data or [])}
+
+        to_rebuild, unchanged = [], []
+        for canal in canais:
+            entry = cached.get(canal['id'])
+            processed_at = _parse_ts(entry.get('processed_at')) if entry else None
+            changed_at = last_change.get(canal['id'])
+
+            if processed_at is None:
+                to_rebuild.append(canal)
+            elif changed_at is not None and changed_at > processed_at:
+                to_rebuild.append(canal)
+            else:
+                unchanged.append(canal)
+        return to_rebuild, unchanged
+
+    async def _extend_cache_expiry(self, canal_ids: List[int]) -> bool:
+        """Renova expires_at das entradas de canais sem comentários novos (False se falhar)."""
+        expires_at = datetime.now(timezone.utc) + timedelta(hours=ENGAGEMENT_CACHE_TTL_HOURS)
+        try:
+            await run_query(self.db.supabase.table('engagement_cache')
+                .update({'expires_at': expires_at.isoformat()})
+                .in_('canal_id', canal_ids))
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao renovar validade do cache: {e}")
+            return False
 
     async def process_and_cache_canal(self, canal_id: int) -> bool:
         """
@@ -129,6 +221,9 @@ class EngagementPreprocessor:
         """
         try:
             start_time = datetime.now()
+            # processed_at = início da leitura: comentário alterado durante a leitura
+            # fica com updated_at > processed_at e o canal é reprocessado no próximo build
+            processed_at = datetime.now(timezone.utc)
 
             # Usar a função existente para obter dados de engajamento
             engagement_data = await self.db.get_canal_engagement_data(canal_id)
@@ -137,6 +232,11 @@ class EngagementPreprocessor:
                 logger.info(f"   ℹ️ Canal {canal_id}: sem dados de engajamento")
                 return False
 
+            # Leitura falhou (fallback zerado): não grava - a entrada anterior continua valendo
+            if engagement_data.get('error'):
+                logger.error(f"   ❌ Canal {canal_id}: leitura de engajamento falhou - cache não atualizado")
+                return False
+
             # Calcular tempo de processamento
             processing_time_ms = int((datetime.now() - start_time).total_seconds() * 1000)
 
@@ -144,7 +244,7 @@ class EngagementPreprocessor:
             total_comments = engagement_data.get('summary', {}).get('total_comments', 0)
             total_videos = len(engagement_data.get('videos_summary', []))
 
-            # Preparar dados para cache
+            # Preparar dados para cache (contagens agregadas + prévias limitadas por categoria)
             cache_data = {
                 'summary': engagement_data.get('summary', {}),
                 'videos_summary': engagement_data.get('videos_summary', []),
@@ -155,19 +255,19 @@ class EngagementPreprocessor:
             }
 
             # Calcular expiração (6h a partir de agora)
-            expires_at = datetime.now(timezone.utc) + timedelta(hours=6)
+            expires_at = datetime.now(timezone.utc) + timedelta(hours=ENGAGEMENT_CACHE_TTL_HOURS)
 
             # Salvar no cache (upsert para atualizar se já existe)
-            cache_response = self.db.supabase.table('engagement_cache').upsert({
+            cache_response = await run_query(self.db.supabase.table('engagement_cache').upsert({
                 'canal_id': canal_id,
                 'data': cache_data,
-                'processed_at': datetime.now(timezone.utc).isoformat(),
+                'processed_at': processed_at.isoformat(),
                 'expires_at': expires_at.isoformat(),
                 'total_comments': total_comments,
                 'total_videos': total_videos,
                 'processing_time_ms': processing_time_ms,
                 'updated_at': datetime.now(timezone.utc).isoformat()
-            }, on_conflict='canal_id').execute()
+            }, on_conflict='canal_id'))
 
             if cache_response.data:
                 logger.info(f"   💾 Cache salvo: {total_comments} comentários, "
@@ -195,11 +295,10 @@ class EngagementPreprocessor:
         """
         try:
             # Buscar cache válido (não expirado)
-            cache_response = self.db.supabase.table('engagement_cache')\
-                .select('*')\
-                .eq('canal_id', canal_id)\
-                .gt('expires_at', datetime.now(timezone.utc).isoformat())\
-                .execute()
+            cache_response = await run_query(self.db.supabase.table('engagement_cache')
+                .select('*')
+                .eq('canal_id', canal_id)
+                .gt('expires_at', datetime.now(timezone.utc).isoformat()))
 
             if not cache_response.data:
                 logger.info(f"⚠️ Cache miss para canal {canal_id} (vazio ou expirado)")
@@ -250,7 +349,7 @@ class EngagementPreprocessor:
                 }
             else:
                 logger.info("🔄 Forçando rebuild do cache para TODOS os canais")
-                return await self.build_engagement_cache()
+                return await self.build_engagement_cache(force=True)
 
         except Exception as e:
             logger.error(f"❌ Erro ao forçar rebuild: {e}")
@@ -265,27 +364,26 @@ class EngagementPreprocessor:
         """
         try:
             # Total de registros em cache
-            total_response = self.db.supabase.table('engagement_cache')\
-                .select('id', count='exact')\
-                .execute()
+            total_response = await run_query(self.db.supabase.table('engagement_cache')
+                .select('id', count='exact'))
 
             # Registros válidos (não expirados)
-            valid_response = self.db.supabase.table('engagement_cache')\
-                .select('id', count='exact')\
-                .gt('expires_at', datetime.now(timezone.utc).isoformat())\
-                .execute()
+            valid_response = await run_query(self.db.supabase.table('engagement_cache')
+                .select('id', count='exact')
+                .gt('expires_at', datetime.now(timezone.utc).isoformat()))
 
             # Registros expirados
-            expired_response = self.db.supabase.table('engagement_cache')\
-                .select('id', count='exact')\
-                .lte('expires_at', datetime.now(timezone.utc).isoformat())\
-                .execute()
+            expired_response = await run_query(self.db.supabase.table('engagement_cache')
+                .select('id', count='exact')
+                .lte('expires_at', datetime.now(timezone.utc).isoformat()))
 
             return {
                 'total_cached': total_response.count or 0,
                 'valid_cached': valid_response.count or 0,
                 'expired_cached': expired_response.count or 0,
-                'cache_hit_rate': 0  # Pode ser calculado com métricas adicionais
+                'cache_hit_rate': 0,  # Pode ser calculado com métricas adicionais
+                # Último build: processados/pulados/falhas + tempo por canal
+                'last_build': _last_build or None
             }
 
         except Exception as e:
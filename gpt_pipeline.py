@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+Pipeline de batches GPT (análise + tradução de comentários)
+
+- Dedup: textos idênticos (entre vídeos e canais) viram UM item por execução
+- Cache por hash do texto (ResponseCache próprio, orçamento GPT_TEXT_CACHE_MAX_MB
+  separado do cache de respostas da API): comentário visto de novo após re-coleta
+  não gasta token nem latência, e traduções de 72h não despejam o dashboard
+- Concorrência: GPT_BATCH_CONCURRENCY batches em paralelo, limitados por um
+  orçamento de tokens por minuto (GPT_TOKENS_PER_MINUTE)
+- Métricas por estágio (comentários/min, tokens, cache hits) expostas em
+  GPTAnalyzer.get_daily_metrics()
+"""
+
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from response_cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+# Batches GPT em paralelo (por chamada de pipeline)
+GPT_BATCH_CONCURRENCY = int(os.environ.get("GPT_BATCH_CONCURRENCY", "3"))
+# Orçamento de tokens por minuto (compartilhado por análise e tradução)
+GPT_TOKENS_PER_MINUTE = int(os.environ.get("GPT_TOKENS_PER_MINUTE", "150000"))
+# Validade do cache de traduções/análises por texto
+GPT_TEXT_CACHE_TTL_HOURS = int(os.environ.get("GPT_TEXT_CACHE_TTL_HOURS", "72"))
+# Orçamento de memória do cache de textos GPT (separado do response_cache da API)
+GPT_TEXT_CACHE_MAX_MB = int(os.environ.get("GPT_TEXT_CACHE_MAX_MB", "16"))
+
+text_cache = ResponseCache(max_bytes=GPT_TEXT_CACHE_MAX_MB * 1024 * 1024)
+for _namespace in ("gpt_analysis", "gpt_translation"):
+    text_cache.register_namespace(_namespace, GPT_TEXT_CACHE_TTL_HOURS * 3600)
+
+
+def text_hash(text: str, *context: str) -> str:
+    """Hash do texto normalizado (espaços colapsados) + contexto que altera o resultado."""
+    normalized = " ".join((text or "").split())
+    return hashlib.sha256("\x1f".join((*context, normalized)).encode("utf-8")).hexdigest()
+
+
+class TokenBudget:
+    """
+    Janela deslizante de 60s com os tokens reservados pelas chamadas em andamento.
+
+    reserve() bloqueia até caber a estimativa; settle() troca a estimativa pelo
+    consumo real (response.usage) quando a resposta chega.
+    """
+
+    WINDOW_SECONDS = 60.0
+
+    def __init__(self, tokens_per_minute: int):
+        self.tokens_per_minute = tokens_per_minute
+        self._window: "deque[List[float]]" = deque()  # [timestamp, tokens]
+        self.wait_seconds = 0.0
+
+    def _used(self, now: float) -> float:
+        while self._window and now - self._window[0][0] >= self.WINDOW_SECONDS:
+            self._window.popleft()
+        return sum(tokens for _, tokens in self._window)
+
+    async def reserve(self, tokens: int) -> List[float]:
+        # Sem await entre checar e reservar: atômico dentro do event loop (sem Lock,
+        # que ficaria preso ao primeiro loop que o usasse)
+        started = time.monotonic()
+        while True:
+            now = time.monotonic()
+            used = self._used(now)
+            # Janela vazia sempre aceita (batch maior que o orçamento não trava)
+            if not self._window or used + tokens <= self.tokens_per_minute:
+                reservation = [now, float(tokens)]
+                self._window.append(reservation)
+                self.wait_seconds += now - started
+                return reservation
+            await asyncio.sleep(self.WINDOW_SECONDS - (now - self._window[0][0]) + 0.05)
+
+    @staticmethod
+    def settle(reservation: List[float], actual_tokens: Optional[int]):
+        if actual_tokens is not None:
+            reservation[1] = float(actual_tokens)
+
+
+# Orçamento único por processo (análise e tradução usam a mesma chave da OpenAI)
+token_budget = TokenBudget(GPT_TOKENS_PER_MINUTE)
+
+
+def _empty_stage() -> Dict[str, float]:
+    return {
+        'items': 0,          # textos recebidos
+        'cache_hits': 0,     # servidos do cache por hash
+        'deduped': 0,        # repetidos dentro da mesma execução
+        'sent': 0,           # textos enviados ao GPT
+        'failed': 0,         # textos de batches que falharam
+        'batches': 0,
+        'tokens': 0,
+        'busy_seconds': 0.0  # tempo de parede das execuções do pipeline
+    }
+
+
+_stage_metrics: Dict[str, Dict[str, float]] = {}
+
+
+def get_pipeline_metrics() -> Dict[str, Any]:
+    """Métricas por estágio desde o último reset (throughput em comentários/min)."""
+    stages = {}
+    for stage, m in _stage_metrics.items():
+        busy = m['busy_seconds']
+        stages[stage] = {
+            **{k: int(v) for k, v in m.items() if k != 'busy_seconds'},
+            'busy_seconds': round(busy, 1),
+            'comments_per_min': round(m['items'] / busy * 60, 1) if busy else 0.0,
+            'cache_hit_rate_pct': round(m['cache_hits'] / m['items'] * 100, 1) if m['items'] else 0.0
+        }
+    return {
+        'stages': stages,
+        'concurrency': GPT_BATCH_CONCURRENCY,
+        'tokens_per_minute': GPT_TOKENS_PER_MINUTE,
+        'budget_wait_seconds': round(token_budget.wait_seconds, 1),
+        'text_cache': {
+            k: v for k, v in text_cache.stats().items() if k != 'namespaces'
+        }
+    }
+
+
+def reset_pipeline_metrics():
+    _stage_metrics.clear()
+    token_budget.wait_seconds = 0.0
+
+
+async def run_cached_batches(
+    stage: str,
+    items: List[Tuple[str, Any]],
+    batch_size: int,
+    call: Callable[[List[Any]], Awaitable[Tuple[List[Any], Optional[int]]]],
+    estimate_tokens: Callable[[List[Any]], int],
+    cacheable: Callable[[Any], bool] = lambda result: result is not None
+) -> Tuple[Dict[str, Any], List[Tuple[List[str], Exception]]]:
+    """
+    Executa `call` sobre os itens ainda sem resultado, em batches concorrentes.
+
+    Args:
+        stage: Nome do estágio (namespace do cache = "gpt_<stage>")
+        items: [(hash, payload)] - hashes repetidos são enviados uma vez só
+        batch_size: Itens por chamada GPT
+        call: async (payloads) -> (resultados na mesma ordem, tokens usados ou None)
+        estimate_tokens: Estimativa de tokens de um batch (reserva no orçamento)
+        cacheable: Se um resultado pode ir para o cache
+
+    Returns:
+        ({hash: resultado}, [(hashes do batch, erro) de cada batch que falhou])
+        Hashes de batches com erro (ou sem resultado) ficam fora do dict.
+    """
+    namespace = f"gpt_{stage}"
+    metrics = _stage_metrics.setdefault(stage, _empty_stage())
+    started = time.monotonic()
+
+    results: Dict[str, Any] = {}
+    pending: Dict[str, Any] = {}
+    for key, payload in items:
+        metrics['items'] += 1
+        if key in results or key in pending:
+            metrics['deduped'] += 1
+            continue
+        cached = text_cache.get(namespace, key)
+        if cached is not None:
+            metrics['cache_hits'] += 1
+            results[key] = cached
+        else:
+            pending[key] = payload
+
+    keys = list(pending)
+    batches = [keys[i:i + batch_size] for i in range(0, len(keys), batch_size)]
+    semaphore = asyncio.Semaphore(GPT_BATCH_CONCURRENCY)
+    failures: List[Tuple[List[str], Exception]] = []
+
+    async def run_batch(batch_keys: List[str]):
+        payloads = [pending[k] for k in batch_keys]
+        async with semaphore:
+            reservation = await token_budget.reserve(estimate_tokens(payloads))
+            try:
+                batch_results, tokens_used = await call(payloads)
+            except Exception as e:
+                metrics['failed'] += len(batch_keys)
+                failures.append((batch_keys, e))
+                return
+            token_budget.settle(reservation, tokens_used)
+
+        metrics['batches'] += 1
+        metrics['sent'] += len(batch_keys)
+        metrics['tokens'] += tokens_used or 0
+        for key, result in zip(batch_keys, batch_results):
+            if result is None:
+                continue
+            results[key] = result
+            if cacheable(result):
+                text_cache.set(namespace, key, result)
+
+    if batches:
+        logger.info(f"🧮 [{stage}] {len(items)} textos: {len(results)} do cache, "
+                    f"{len(keys)} únicos em {len(batches)} batches (x{GPT_BATCH_CONCURRENCY})")
+        await asyncio.gather(*(run_batch(b) for b in batches))
+
+    metrics['busy_seconds'] += time.monotonic() - started
+    return results, failures
@@ -15,6 +15,8 @@ from openai import OpenAI
 from dotenv import load_dotenv
 import time
 
+from gpt_pipeline import get_pipeline_metrics, reset_pipeline_metrics, run_cached_batches, text_hash
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -23,6 +25,26 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 
 
+def _empty_daily_metrics() -> Dict:
+    return {
+        'total_analyzed': 0,
+        'total_tokens_input': 0,
+        'total_tokens_output': 0,
+        'total_requests': 0,
+        'total_errors': 0,
+        'total_time_ms': 0,
+        'estimated_cost_usd': 0.0,
+        'high_confidence_count': 0,
+        'medium_confidence_count': 0,
+        'low_confidence_count': 0
+    }
+
+
+# Métricas diárias compartilhadas por todas as instâncias (coleta, endpoints e
+# run_collection_job criam GPTAnalyzer() separados)
+_daily_metrics: Dict = _empty_daily_metrics()
+
+
 class GPTAnalyzer:
     """Analisador de comentários usando OpenAI GPT"""
 
@@ -41,19 +63,8 @@ class GPTAnalyzer:
 
         logger.info(f"✅ GPTAnalyzer inicializado - Modelo: {self.model}")
 
-        # Métricas diárias
-        self.daily_metrics = {
-            'total_analyzed': 0,
-            'total_tokens_input': 0,
-            'total_tokens_output': 0,
-            'total_requests': 0,
-            'total_errors': 0,
-            'total_time_ms': 0,
-            'estimated_cost_usd': 0.0,
-            'high_confidence_count': 0,
-            'medium_confidence_count': 0,
-            'low_confidence_count': 0
-        }
+        # Métricas diárias (dict do módulo, compartilhado entre instâncias)
+        self.daily_metrics = _daily_metrics
 
         logger.info(f"GPTAnalyzer inicializado com modelo: {self.model}")
 
@@ -208,115 +219,130 @@ IMPORTANTE SOBRE TRADUÇÃO:
             return []
 
         logger.info(f"📊 Iniciando análise GPT de {len(comments)} comentários - Canal: {canal_name}")
-        analyzed_comments = []
 
-        # Processar em batches para economizar tokens
-        total_batches = (len(comments) + batch_size - 1) // batch_size
-        for i in range(0, len(comments), batch_size):
-            batch = comments[i:i + batch_size]
-            batch_num = (i // batch_size) + 1
-            logger.info(f"🔄 Processando batch {batch_num}/{total_batches} com {len(batch)} comentários...")
+        # Textos iguais (entre vídeos/canais) são analisados uma vez; análises já feitas
+        # vêm do cache por hash. Com resposta sugerida o canal entra na chave (a resposta
+        # fala como o canal); sem ela a análise não depende do canal.
+        context = ('response', canal_name) if include_response else ('analysis',)
+        keys = [text_hash(self._comment_text(comment), self.model, *context) for comment in comments]
+
+        async def call(batch: List[Dict]) -> Tuple[List[Optional[Dict]], Optional[int]]:
+            analyses, tokens_used = await self._analyze_single_batch(batch, video_title, canal_name, include_response)
+            if len(analyses) < len(batch):
+                logger.warning(f"Análise não retornada para {len(batch) - len(analyses)} comentário(s) do batch")
+            return [analyses[j] if j < len(analyses) else None for j in range(len(batch))], tokens_used
+
+        analyses, failures = await run_cached_batches(
+            stage="analysis",
+            items=list(zip(keys, comments)),
+            batch_size=batch_size,
+            call=call,
+            estimate_tokens=self._estimate_batch_tokens
+        )
 
-            try:
-                # Fazer a análise do batch
-                batch_analysis = await self._analyze_single_batch(batch, video_title, canal_name, include_response)
-                logger.info(f"✅ Batch {batch_num} analisado: {len(batch_analysis)} respostas retornadas")
-
-                # Combinar comentários originais com análise
-                for j, comment in enumerate(batch):
-                    if j < len(batch_analysis):
-                        analysis = batch_analysis[j]
-
-                        # Merge dados originais com análise
-                        analyzed_comment = {
-                            'comment_id': comment.get('comment_id', comment.get('commentId')),
-                            'video_id': comment.get('video_id', comment.get('videoId')),
-                            'video_title': video_title or comment.get('video_title'),
-                            'author_name': comment.get('author_name', comment.get('author')),
-                            'author_channel_id': comment.get('author_channel_id'),
-                            'comment_text_original': comment.get('text', comment.get('comment_text_original')),
-                            'comment_text_pt': analysis.get('translation_pt', ''),  # TRADUÇÃO DO GPT
-                            'is_translated': analysis.get('is_translated', False),  # FLAG DE TRADUÇÃO
-                            'like_count': comment.get('like_count', comment.get('likeCount', 0)),
-                            'reply_count': comment.get('reply_count', comment.get('replyCount', 0)),
-                            'is_reply': comment.get('is_reply', False),
-                            'parent_comment_id': comment.get('parent_comment_id'),
-                            'published_at': comment.get('published_at', comment.get('publishedAt')),
-
-                            # Adicionar análise GPT
-                            'gpt_analysis': {
-                                'sentiment': analysis.get('sentiment', {}),
-                                'categories': analysis.get('categories', []),
-                                'primary_category': analysis.get('primary_category'),
-                                'subcategories': analysis.get('subcategories', {}),
-                                'topics': analysis.get('topics', []),
-                                'key_points': analysis.get('key_points', []),
-                                'emotional_tone': analysis.get('emotional_tone'),
-                                'intent': analysis.get('intent'),
-                                'context_indicators': analysis.get('context_indicators', []),
-                                'language': analysis.get('language', 'pt')
-                            },
-
-                            # Campos extraídos para queries rápidas
-                            'sentiment_category': analysis.get('sentiment', {}).get('category'),
-                            'sentiment_score': analysis.get('sentiment', {}).get('score'),
-                            'sentiment_confidence': analysis.get('sentiment', {}).get('confidence'),
-                            'categories': analysis.get('categories', []),
-                            'primary_category': analysis.get('primary_category'),
-                            'emotional_tone': analysis.get('emotional_tone'),
-                            'priority_score': analysis.get('priority_score', 0),
-                            'urgency_level': analysis.get('urgency_level', 'low'),
-                            'requires_response': analysis.get('requires_response', False),
-                            'suggested_response': analysis.get('suggested_response'),
-                            'response_tone': analysis.get('response_tone'),
-                            'insight_summary': analysis.get('insight_summary'),
-                            'actionable_items': analysis.get('actionable_items')
-                        }
-
-                        analyzed_comments.append(analyzed_comment)
-
-                        # Atualizar métricas de confiança
-                        confidence = analysis.get('sentiment', {}).get('confidence', 0)
-                        if confidence >= 0.8:
-                            self.daily_metrics['high_confidence_count'] += 1
-                        elif confidence >= 0.5:
-                            self.daily_metrics['medium_confidence_count'] += 1
-                        else:
-                            self.daily_metrics['low_confidence_count'] += 1
-                    else:
-                        # Se análise falhou para este comentário, adicionar sem análise
-                        logger.warning(f"Análise não retornada para comentário {j+1}")
-                        analyzed_comments.append(comment)
-
-            except Exception as e:
-                logger.error(f"❌ ERRO ao analisar batch {batch_num}: {str(e)}")
-                logger.error(f"   Canal: {canal_name}, Vídeo: {video_title}")
-                logger.error(f"   Batch size: {len(batch)}")
-                self.daily_metrics['total_errors'] += 1
-                # NÃO adicionar comentários sem análise - melhor falhar do que salvar incompleto
-                logger.warning(f"⚠️ Batch {batch_num} NÃO será salvo devido ao erro")
-
-            # Pequena pausa entre batches para evitar rate limit
-            if i + batch_size < len(comments):
-                await asyncio.sleep(0.5)
+        failed_keys = set()
+        for batch_keys, e in failures:
+            logger.error(f"❌ ERRO ao analisar batch: {str(e)}")
+            logger.error(f"   Canal: {canal_name}, Vídeo: {video_title}")
+            logger.error(f"   Batch size: {len(batch_keys)}")
+            failed_keys.update(batch_keys)
+        if failures:
+            # NÃO adicionar comentários sem análise - melhor falhar do que salvar incompleto
+            logger.warning(f"⚠️ {len(failures)} batch(es) NÃO serão salvos devido ao erro")
+
+        analyzed_comments = []
+        for comment, key in zip(comments, keys):
+            analysis = analyses.get(key)
+            if analysis is not None:
+                analyzed_comments.append(self._merge_analysis(comment, analysis, video_title))
+            elif key not in failed_keys:
+                # Batch respondeu, mas sem análise para este comentário
+                analyzed_comments.append(comment)
 
         logger.info(f"✅ Total de {len(analyzed_comments)} comentários analisados")
         self.daily_metrics['total_analyzed'] += len(analyzed_comments)
 
         return analyzed_comments
 
+    @staticmethod
+    def _comment_text(comment: Dict) -> str:
+        return comment.get('text', comment.get('comment_text_original', '')) or ''
+
+    def _estimate_batch_tokens(self, batch: List[Dict]) -> int:
+        """Estimativa para o orçamento TPM: ~4 chars/token no prompt + resposta máxima."""
+        chars = sum(len(self._comment_text(c)) for c in batch)
+        return 1500 + chars // 4 + 4000
+
+    def _merge_analysis(self, comment: Dict, analysis: Dict, video_title: str) -> Dict:
+        """Combina o comentário original com a análise GPT (e atualiza métricas de confiança)."""
+        analyzed_comment = {
+            'comment_id': comment.get('comment_id', comment.get('commentId')),
+            'video_id': comment.get('video_id', comment.get('videoId')),
+            'video_title': video_title or comment.get('video_title'),
+            'author_name': comment.get('author_name', comment.get('author')),
+            'author_channel_id': comment.get('author_channel_id'),
+            'comment_text_original': comment.get('text', comment.get('comment_text_original')),
+            'comment_text_pt': analysis.get('translation_pt', ''),  # TRADUÇÃO DO GPT
+            'is_translated': analysis.get('is_translated', False),  # FLAG DE TRADUÇÃO
+            'like_count': comment.get('like_count', comment.get('likeCount', 0)),
+            'reply_count': comment.get('reply_count', comment.get('replyCount', 0)),
+            'is_reply': comment.get('is_reply', False),
+            'parent_comment_id': comment.get('parent_comment_id'),
+            'published_at': comment.get('published_at', comment.get('publishedAt')),
+
+            # Adicionar análise GPT
+            'gpt_analysis': {
+                'sentiment': analysis.get('sentiment', {}),
+                'categories': analysis.get('categories', []),
+                'primary_category': analysis.get('primary_category'),
+                'subcategories': analysis.get('subcategories', {}),
+                'topics': analysis.get('topics', []),
+                'key_points': analysis.get('key_points', []),
+                'emotional_tone': analysis.get('emotional_tone'),
+                'intent': analysis.get('intent'),
+                'context_indicators': analysis.get('context_indicators', []),
+                'language': analysis.get('language', 'pt')
+            },
+
+            # Campos extraídos para queries rápidas
+            'sentiment_category': analysis.get('sentiment', {}).get('category'),
+            'sentiment_score': analysis.get('sentiment', {}).get('score'),
+            'sentiment_confidence': analysis.get('sentiment', {}).get('confidence'),
+            'categories': analysis.get('categories', []),
+            'primary_category': analysis.get('primary_category'),
+            'emotional_tone': analysis.get('emotional_tone'),
+            'priority_score': analysis.get('priority_score', 0),
+            'urgency_level': analysis.get('urgency_level', 'low'),
+            'requires_response': analysis.get('requires_response', False),
+            'suggested_response': analysis.get('suggested_response'),
+            'response_tone': analysis.get('response_tone'),
+            'insight_summary': analysis.get('insight_summary'),
+            'actionable_items': analysis.get('actionable_items')
+        }
+
+        # Atualizar métricas de confiança
+        confidence = analysis.get('sentiment', {}).get('confidence', 0) or 0
+        if confidence >= 0.8:
+            self.daily_metrics['high_confidence_count'] += 1
+        elif confidence >= 0.5:
+            self.daily_metrics['medium_confidence_count'] += 1
+        else:
+            self.daily_metrics['low_confidence_count'] += 1
+
+        return analyzed_comment
+
     async def _analyze_single_batch(
         self,
         batch: List[Dict],
         video_title: str,
         canal_name: str,
         include_response: bool = True
-    ) -> List[Dict]:
+    ) -> Tuple[List[Dict], Optional[int]]:
         """
         Analisa um único batch de comentários.
 
         Returns:
-            Lista com análises dos comentários
+            (lista com análises dos comentários, tokens usados)
         """
         start_time = time.time()
 
@@ -333,7 +359,9 @@ IMPORTANTE SOBRE TRADUÇÃO:
 
             # Chamar API da OpenAI
             logger.info(f"🌐 Chamando OpenAI API - Modelo: {self.model}")
-            response = self.client.chat.completions.create(
+            # Cliente síncrono em thread: batches concorrentes não travam o event loop
+            response = await asyncio.to_thread(
+                self.client.chat.completions.create,
                 model=self.model,
                 messages=messages,
                 temperature=0.3,  # Mais determinístico para análises
@@ -383,7 +411,8 @@ IMPORTANTE SOBRE TRADUÇÃO:
 
             logger.info(f"✅ Batch analisado em {elapsed_ms}ms - {len(comments_analysis)} comentários")
 
-            return comments_analysis
+            tokens_used = response.usage.total_tokens if response.usage else None
+            return comments_analysis, tokens_used
 
         except Exception as e:
             logger.error(f"❌ ERRO CRÍTICO na chamada GPT: {str(e)}")
@@ -444,23 +473,16 @@ IMPORTANTE SOBRE TRADUÇÃO:
             'estimated_cost_usd': round(self.daily_metrics['estimated_cost_usd'], 2),
             'high_confidence_count': self.daily_metrics['high_confidence_count'],
             'medium_confidence_count': self.daily_metrics['medium_confidence_count'],
-            'low_confidence_count': self.daily_metrics['low_confidence_count']
+            'low_confidence_count': self.daily_metrics['low_confidence_count'],
+            # Pipeline de batches: comentários/min, tokens e cache hits por estágio
+            'pipeline': get_pipeline_metrics()
         }
 
     def reset_daily_metrics(self):
         """Reseta as métricas diárias (chamar à meia-noite)."""
-        self.daily_metrics = {
-            'total_analyzed': 0,
-            'total_tokens_input': 0,
-            'total_tokens_output': 0,
-            'total_requests': 0,
-            'total_errors': 0,
-            'total_time_ms': 0,
-            'estimated_cost_usd': 0.0,
-            'high_confidence_count': 0,
-            'medium_confidence_count': 0,
-            'low_confidence_count': 0
-        }
+        self.daily_metrics.clear()
+        self.daily_metrics.update(_empty_daily_metrics())
+        reset_pipeline_metrics()
         logger.info("Métricas diárias resetadas")
 
 
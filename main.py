@@ -1,7 +1,7 @@
 from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
-from fastapi.responses import JSONResponse, HTMLResponse, FileResponse
+from fastapi.responses import JSONResponse, HTMLResponse, FileResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 import warnings
@@ -22,7 +22,7 @@ from dotenv import load_dotenv
 # Carregar variáveis de ambiente
 load_dotenv()
 
-from database import SupabaseClient
+from database import SupabaseClient, run_query
 from collector import YouTubeCollector
 from notifier import NotificationChecker
 from comments_logs import CommentsLogsManager
@@ -30,6 +30,9 @@ from monetization_endpoints import router as monetization_router
 from perfis_endpoints import router as perfis_router, clear_perfis_cache
 from financeiro import FinanceiroService
 from analytics import ChannelAnalytics
+from response_cache import response_cache
+from request_metrics import request_metrics, begin_request
+from response_layer import FastJSONResponse, cached_json_response, compact_response_middleware
 
 # Sistema de Agentes Inteligentes
 from agents_endpoints import init_agents_router
@@ -48,7 +51,7 @@ from _features.yt_uploader.database import (
 from _features.yt_uploader.sheets import update_upload_status_in_sheet
 
 # Daily Upload Automation
-from daily_uploader import schedule_daily_uploader, SPREADSHEET_CACHE
+from daily_uploader import schedule_daily_uploader, invalidar_cache_planilha
 
 # JWT Authentication
 from auth import (
@@ -73,8 +76,11 @@ for noisy in [
 ]:
     logging.getLogger(noisy).setLevel(logging.ERROR)
 
-app = FastAPI(title="YouTube Dashboard API", version="1.0.0")
+app = FastAPI(title="YouTube Dashboard API", version="1.0.0", default_response_class=FastJSONResponse)
 
+# ETag/304 + brotli/gzip para JSON da API (registrado antes = por dentro do GZip,
+# que ignora respostas já codificadas e segue comprimindo HTML/estáticos)
+app.middleware("http")(compact_response_middleware)
 app.add_middleware(GZipMiddleware, minimum_size=1000)
 app.add_middleware(
     CORSMiddleware,
@@ -89,9 +95,13 @@ async def no_cache_api_middleware(request: Request, call_next):
     """Impede browser de cachear respostas da API — dados sempre frescos."""
     response = await call_next(request)
     if request.url.path.startswith("/api/"):
-        response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-        response.headers["Pragma"] = "no-cache"
-        response.headers["Expires"] = "0"
+        if "etag" in response.headers:
+            # Com ETag: browser guarda mas revalida SEMPRE (If-None-Match -> 304)
+            response.headers["Cache-Control"] = "no-cache"
+        else:
+            response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
+            response.headers["Pragma"] = "no-cache"
+            response.headers["Expires"] = "0"
     return response
 
 @app.middleware("http")
@@ -108,6 +118,27 @@ async def optional_auth_middleware(request: Request, call_next):
         request.state.user = None
     return await call_next(request)
 
+@app.middleware("http")
+async def request_metrics_middleware(request: Request, call_next):
+    """Latência por rota + queries Supabase do request (exposto em /api/metrics)."""
+    db_stats = begin_request()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - start
+        # Template da rota (ex: /api/canais/{canal_id}) para não explodir cardinalidade
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", None) or "unmatched"
+        request_metrics.observe(request.method, route_path, status, elapsed, db_stats)
+    response.headers["Server-Timing"] = (
+        f'db;dur={db_stats.seconds * 1000:.1f};desc="{db_stats.queries} queries", '
+        f"total;dur={elapsed * 1000:.1f}"
+    )
+    return response
+
 # ========================================
 # 💾 SISTEMA DE CACHE 24H PARA DASHBOARD
 # ========================================
@@ -115,13 +146,14 @@ import hashlib
 from functools import wraps
 import json
 
-# Cache global com TTL de 5 minutos
-dashboard_cache = {}
-CACHE_DURATION = timedelta(minutes=5)  # Cache de 5 min — MV é rápida (~100ms)
+# Cache unificado (LRU + orçamento de memória) - ver response_cache.py
+# TTL de 5 minutos — MV é rápida (~100ms)
+CACHE_DURATION = timedelta(minutes=5)
+response_cache.register_namespace("dashboard", CACHE_DURATION.total_seconds())
 
 # Cache específico para comentários - 5 minutos (atualiza frequentemente)
-comments_cache = {}
 COMMENTS_CACHE_DURATION = timedelta(minutes=5)
+response_cache.register_namespace("comments", COMMENTS_CACHE_DURATION.total_seconds())
 
 def get_cache_key(endpoint: str, params: dict = None) -> str:
     """
@@ -150,20 +182,10 @@ def get_cached_response(cache_key: str) -> Optional[Any]:
     Returns:
         Dados do cache ou None se expirado/inexistente
     """
-    if cache_key in dashboard_cache:
-        cached_data, cached_time = dashboard_cache[cache_key]
-        now = datetime.now(timezone.utc)
-
-        # Verificar se cache ainda é válido
-        if now - cached_time < CACHE_DURATION:
-            age_minutes = int((now - cached_time).total_seconds() / 60)
-            logger.info(f"⚡ Cache hit! Servindo instantâneo (idade: {age_minutes} min)")
-            return cached_data
-        else:
-            # Cache expirado, remover
-            del dashboard_cache[cache_key]
-            logger.info(f"⏰ Cache expirado, buscando novo...")
-
+    entry = response_cache.get_entry("dashboard", cache_key)
+    if entry is not None:
+        logger.info(f"⚡ Cache hit! Servindo instantâneo (idade: {int(entry.age / 60)} min)")
+        return entry.value
     return None
 
 def save_to_cache(cache_key: str, data: Any) -> None:
@@ -174,7 +196,7 @@ def save_to_cache(cache_key: str, data: Any) -> None:
         cache_key: Chave do cache
         data: Dados a serem cacheados
     """
-    dashboard_cache[cache_key] = (data, datetime.now(timezone.utc))
+    response_cache.set("dashboard", cache_key, data)
     logger.info(f"💾 Dados salvos no cache por 5min (key: {cache_key[:8]}...)")
 
 def _clear_cache_internal() -> dict:
@@ -185,15 +207,9 @@ def _clear_cache_internal() -> dict:
     Returns:
         Estatísticas do cache limpo
     """
-    cache_count = len(dashboard_cache)
-    cache_size = sum(len(str(v[0])) for v in dashboard_cache.values())
-    dashboard_cache.clear()
-
-    logger.info(f"🧹 Cache limpo: {cache_count} entradas, ~{cache_size/1024:.1f}KB liberados")
-    return {
-        "entries_cleared": cache_count,
-        "approx_size_kb": round(cache_size/1024, 1)
-    }
+    stats = response_cache.clear("dashboard")
+    logger.info(f"🧹 Cache limpo: {stats['entries_cleared']} entradas, ~{stats['approx_size_kb']}KB liberados")
+    return stats
 
 
 # Alias para compatibilidade — codigo interno usa este nome
@@ -202,6 +218,7 @@ clear_all_cache = _clear_cache_internal
 def cache_endpoint(endpoint_name: str):
     """
     Decorator para adicionar cache automático a endpoints.
+    Misses simultâneos na mesma chave compartilham um único cálculo.
 
     Args:
         endpoint_name: Nome do endpoint para logging
@@ -217,26 +234,123 @@ def cache_endpoint(endpoint_name: str):
             cache_params = {k: str(v) for k, v in kwargs.items() if v is not None}
             cache_key = get_cache_key(endpoint_name, cache_params)
 
-            # Tentar buscar do cache
-            cached_data = get_cached_response(cache_key)
-            if cached_data is not None:
-                return cached_data
+            async def compute():
+                # Cache miss - buscar dados frescos
+                logger.info(f"📊 Cache miss para {endpoint_name} - buscando dados...")
+                start_time = time.time()
+                result = await func(*args, **kwargs)
+                elapsed_ms = int((time.time() - start_time) * 1000)
+                logger.info(f"✅ Dados obtidos em {elapsed_ms}ms")
+                return result
 
-            # Cache miss - buscar dados frescos
-            logger.info(f"📊 Cache miss para {endpoint_name} - buscando dados...")
-            start_time = time.time()
+            return await response_cache.get_or_compute("dashboard", cache_key, compute)
+        return wrapper
+    return decorator
+
+# ========================================
+# ♻️ STALE-WHILE-REVALIDATE (dashboard)
+# ========================================
+# Entrada expirada é servida na hora enquanto UMA task em background recalcula.
+# Após refresh das MVs, as chaves mais pedidas são reaquecidas (sem clear cego).
+DASHBOARD_STALE_MAX_SECONDS = int(os.environ.get("DASHBOARD_STALE_MAX_SECONDS", "3600"))
+DASHBOARD_WARM_TOP_N = int(os.environ.get("DASHBOARD_WARM_TOP_N", "10"))
+# Máximo de chaves rastreadas para revalidação (cada query string distinta é uma chave)
+DASHBOARD_SWR_MAX_KEYS = int(os.environ.get("DASHBOARD_SWR_MAX_KEYS", "500"))
 
-            # Executar função original
-            result = await func(*args, **kwargs)
+# cache_key -> (label, compute) — compute(refresh_mv: bool) recalcula a resposta
+_swr_computers: Dict[str, tuple] = {}
+_swr_request_counts: Dict[str, int] = {}
+_swr_refreshing: set = set()
+# Referência forte às tasks de revalidação (senão o GC pode coletar no meio)
+_swr_tasks: set = set()
 
-            # Salvar no cache
-            elapsed_ms = int((time.time() - start_time) * 1000)
-            logger.info(f"✅ Dados obtidos em {elapsed_ms}ms")
-            save_to_cache(cache_key, result)
 
-            return result
-        return wrapper
-    return decorator
+def _track_swr_key(cache_key: str, label: str, compute) -> None:
+    """Registra o compute da chave; acima do limite descarta a chave menos pedida."""
+    if cache_key not in _swr_computers and len(_swr_computers) >= DASHBOARD_SWR_MAX_KEYS:
+        idle = [k for k in _swr_computers if k not in _swr_refreshing]
+        if idle:
+            coldest = min(idle, key=lambda k: _swr_request_counts.get(k, 0))
+            _swr_computers.pop(coldest, None)
+            _swr_request_counts.pop(coldest, None)
+    _swr_computers[cache_key] = (label, compute)
+    _swr_request_counts[cache_key] = _swr_request_counts.get(cache_key, 0) + 1
+
+
+async def get_or_revalidate(cache_key: str, label: str, compute) -> Any:
+    """
+    Busca resposta do dashboard com semântica stale-while-revalidate.
+
+    Args:
+        cache_key: Chave do cache (namespace "dashboard")
+        label: Nome do endpoint para logging
+        compute: async compute(refresh_mv: bool) que recalcula a resposta
+
+    Returns:
+        Dados frescos, dados expirados (com refresh agendado) ou recém-calculados
+    """
+    _track_swr_key(cache_key, label, compute)
+
+    entry = response_cache.get_entry("dashboard", cache_key, allow_stale=True)
+    if entry is not None:
+        if not entry.expired:
+            logger.info(f"⚡ Cache hit {label} (idade: {int(entry.age / 60)} min)")
+            return entry.value
+        if entry.age <= DASHBOARD_STALE_MAX_SECONDS:
+            logger.info(f"♻️ Cache expirado {label} - servindo stale (idade: {int(entry.age / 60)} min) e revalidando")
+            _schedule_revalidation(cache_key)
+            return entry.value
+
+    # Sem cache utilizável - calcula (misses simultâneos compartilham o cálculo)
+    return await response_cache.get_or_compute("dashboard", cache_key, lambda: compute(True))
+
+
+def _schedule_revalidation(cache_key: str, refresh_mv: bool = True) -> None:
+    """Agenda recálculo em background (no máximo 1 por chave)."""
+    if cache_key in _swr_refreshing or cache_key not in _swr_computers:
+        return
+    _swr_refreshing.add(cache_key)
+    task = asyncio.create_task(_revalidate(cache_key, refresh_mv))
+    _swr_tasks.add(task)
+    task.add_done_callback(_swr_tasks.discard)
+
+
+async def _revalidate(cache_key: str, refresh_mv: bool = True) -> bool:
+    label, compute = _swr_computers[cache_key]
+    try:
+        start_time = time.time()
+        result = await compute(refresh_mv)
+        save_to_cache(cache_key, result)
+        logger.info(f"♻️ {label} revalidado em {int((time.time() - start_time) * 1000)}ms")
+        return True
+    except Exception as e:
+        logger.warning(f"⚠️ Revalidação de {label} falhou (mantendo stale): {e}")
+        return False
+    finally:
+        _swr_refreshing.discard(cache_key)
+
+
+async def warm_dashboard_cache(top_n: int = DASHBOARD_WARM_TOP_N) -> dict:
+    """
+    Chamado logo após refresh das MVs: marca o dashboard como expirado (continua
+    servível como stale) e recalcula as top_n chaves mais pedidas, sem refresh de MV.
+
+    Returns:
+        Estatísticas do aquecimento
+    """
+    expired = response_cache.expire("dashboard")
+    ranked = sorted(_swr_computers, key=lambda k: _swr_request_counts.get(k, 0), reverse=True)
+
+    warmed = 0
+    for cache_key in ranked[:top_n]:
+        if cache_key in _swr_refreshing:
+            continue
+        _swr_refreshing.add(cache_key)
+        if await _revalidate(cache_key, refresh_mv=False):
+            warmed += 1
+
+    logger.info(f"🔥 Cache aquecido: {warmed}/{min(top_n, len(ranked))} chaves recalculadas, {expired} entradas marcadas stale")
+    return {"warmed": warmed, "expired": expired, "tracked_keys": len(ranked)}
 
 # ========================================
 # 🔒 UPLOAD CONCURRENCY CONTROL
@@ -327,6 +441,9 @@ except Exception as e:
 collection_in_progress = False
 last_collection_time = None
 
+# Número de canais processados em paralelo pela coleta diária (1 = caminho serial antigo)
+COLLECTION_CONCURRENCY = int(os.environ.get("COLLECTION_CONCURRENCY", "4"))
+
 # ========================================
 # SISTEMA DE JOBS ASSÍNCRONOS
 # ========================================
@@ -604,6 +721,7 @@ async def health_check():
 
 @app.get("/api/canais")
 async def get_canais(
+    request: Request,
     nicho: Optional[str] = None,
     subnicho: Optional[str] = None,
     lingua: Optional[str] = None,
@@ -630,36 +748,32 @@ async def get_canais(
                 "offset": offset
             })
 
-            # Tentar buscar do cache
-            cached_data = get_cached_response(cache_key)
-            if cached_data is not None:
-                return cached_data
-
-            # Cache miss - refresh MV para garantir dados frescos
-            logger.info(f"📊 Cache miss /api/canais — refreshing MV...")
-            start_time = time.time()
-            try:
-                await db.refresh_all_dashboard_mvs()
-            except Exception as mv_err:
-                logger.warning(f"⚠️ MV refresh no cache miss falhou (usando dados existentes): {mv_err}")
-
-            # Buscar da MV otimizada
-            canais = await db.get_dashboard_from_mv(
-                tipo=tipo,
-                subnicho=subnicho,
-                lingua=lingua,
-                limit=limit,
-                offset=offset
-            )
+            async def compute(refresh_mv: bool):
+                start_time = time.time()
+                if refresh_mv:
+                    # Cache miss - refresh MV para garantir dados frescos
+                    logger.info(f"📊 Cache miss /api/canais — refreshing MV...")
+                    try:
+                        await db.refresh_all_dashboard_mvs()
+                    except Exception as mv_err:
+                        logger.warning(f"⚠️ MV refresh no cache miss falhou (usando dados existentes): {mv_err}")
+
+                # Buscar da MV otimizada
+                canais = await db.get_dashboard_from_mv(
+                    tipo=tipo,
+                    subnicho=subnicho,
+                    lingua=lingua,
+                    limit=limit,
+                    offset=offset
+                )
 
-            result = {"canais": canais, "total": len(canais)}
+                elapsed_ms = int((time.time() - start_time) * 1000)
+                logger.info(f"✅ Dados obtidos em {elapsed_ms}ms")
+                return {"canais": canais, "total": len(canais)}
 
-            # Salvar no cache
-            elapsed_ms = int((time.time() - start_time) * 1000)
-            logger.info(f"✅ Dados obtidos em {elapsed_ms}ms")
-            save_to_cache(cache_key, result)
-
-            return result
+            # Stale-while-revalidate: expirado é servido na hora e recalculado em background
+            data = await get_or_revalidate(cache_key, "/api/canais", compute)
+            return cached_json_response(request, data, "dashboard", cache_key)
 
         else:
             # Para filtros complexos, usar método tradicional (sem cache por enquanto)
@@ -716,103 +830,102 @@ async def get_nossos_canais(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/canais-tabela")
-async def get_canais_tabela():
+async def get_canais_tabela(request: Request):
     """
     Retorna nossos canais agrupados por subnicho para aba Tabela.
     Canais ordenados por desempenho (maior ganho de inscritos no topo).
     Subnichos ordenados alfabeticamente.
 
-    🚀 OTIMIZADO: Usa cache de 5min + Materialized View (auto-refresh)
+    🚀 OTIMIZADO: Usa cache de 5min (stale-while-revalidate) + Materialized View
     """
     try:
         # Gerar chave do cache
         cache_key = get_cache_key("canais-tabela", {})
 
-        # Tentar buscar do cache
-        cached_data = get_cached_response(cache_key)
-        if cached_data is not None:
-            return cached_data
-
-        # Cache miss - refresh MV para garantir dados frescos
-        logger.info("📊 Cache miss canais-tabela — refreshing MV...")
-        start_time = time.time()
-        try:
-            await db.refresh_all_dashboard_mvs()
-        except Exception as mv_err:
-            logger.warning(f"⚠️ MV refresh no cache miss falhou (usando dados existentes): {mv_err}")
-
-        # Buscar todos os nossos canais usando MV otimizada
-        canais = await db.get_dashboard_from_mv(
-            tipo="nosso",
-            limit=1000,
-            offset=0
-        )
+        async def compute(refresh_mv: bool):
+            start_time = time.time()
+            if refresh_mv:
+                # Cache miss - refresh MV para garantir dados frescos
+                logger.info("📊 Cache miss canais-tabela — refreshing MV...")
+                try:
+                    await db.refresh_all_dashboard_mvs()
+                except Exception as mv_err:
+                    logger.warning(f"⚠️ MV refresh no cache miss falhou (usando dados existentes): {mv_err}")
 
-        logger.info(f"Total de canais encontrados: {len(canais)}")
+            # Buscar todos os nossos canais usando MV otimizada
+            canais = await db.get_dashboard_from_mv(
+                tipo="nosso",
+                limit=1000,
+                offset=0
+            )
 
-        # Agrupar por subnicho
-        grupos = {}
-        for canal in canais:
-            subnicho = canal.get('subnicho') or 'Sem Categoria'
-
-            if subnicho not in grupos:
-                grupos[subnicho] = []
-
-            # Adicionar canal ao grupo
-            grupos[subnicho].append({
-                'id': canal['id'],
-                'nome_canal': canal['nome_canal'],
-                'url_canal': canal['url_canal'],
-                'inscritos': canal.get('inscritos', 0),
-                'inscritos_diff': canal.get('inscritos_diff'),
-                'ultima_coleta': canal.get('ultima_coleta'),
-                'subnicho': subnicho,
-                'lingua': canal.get('lingua', 'N/A')
-            })
+            logger.info(f"Total de canais encontrados: {len(canais)}")
+
+            # Agrupar por subnicho
+            grupos = {}
+            for canal in canais:
+                subnicho = canal.get('subnicho') or 'Sem Categoria'
+
+                if subnicho not in grupos:
+                    grupos[subnicho] = []
+
+                # Adicionar canal ao grupo
+                grupos[subnicho].append({
+                    'id': canal['id'],
+                    'nome_canal': canal['nome_canal'],
+                    'url_canal': canal['url_canal'],
+                    'inscritos': canal.get('inscritos', 0),
+                    'inscritos_diff': canal.get('inscritos_diff'),
+                    'ultima_coleta': canal.get('ultima_coleta'),
+                    'subnicho': subnicho,
+                    'lingua': canal.get('lingua', 'N/A')
+                })
 
-        # Ordenar canais dentro de cada grupo por desempenho
-        # Ordem desejada: melhor (positivos) -> menor (negativos) -> zero -> nulo
-        # Ordem secundária: maior número de inscritos (tiebreaker)
-        def sort_key(canal):
-            diff = canal['inscritos_diff']
-            inscritos = canal['inscritos'] or 0  # FIX: None → 0
+            # Ordenar canais dentro de cada grupo por desempenho
+            # Ordem desejada: melhor (positivos) -> menor (negativos) -> zero -> nulo
+            # Ordem secundária: maior número de inscritos (tiebreaker)
+            def sort_key(canal):
+                diff = canal['inscritos_diff']
+                inscritos = canal['inscritos'] or 0  # FIX: None → 0
 
-            # Estratégia de ordenação:
-            # 1. null por último (categoria 3)
-            if diff is None:
-                return (3, 0, -inscritos)
+                # Estratégia de ordenação:
+                # 1. null por último (categoria 3)
+                if diff is None:
+                    return (3, 0, -inscritos)
 
-            # 2. zero em penúltimo (categoria 2)
-            if diff == 0:
-                return (2, 0, -inscritos)
+                # 2. zero em penúltimo (categoria 2)
+                if diff == 0:
+                    return (2, 0, -inscritos)
 
-            # 3. negativos antes do zero (categoria 1, ordenados por valor)
-            if diff < 0:
-                return (1, diff, -inscritos)  # diff negativo = menor primeiro
+                # 3. negativos antes do zero (categoria 1, ordenados por valor)
+                if diff < 0:
+                    return (1, diff, -inscritos)  # diff negativo = menor primeiro
 
-            # 4. positivos no topo (categoria 0, ordenados DESC)
-            return (0, -diff, -inscritos)
+                # 4. positivos no topo (categoria 0, ordenados DESC)
+                return (0, -diff, -inscritos)
 
-        for subnicho in grupos:
-            grupos[subnicho].sort(key=sort_key)
+            for subnicho in grupos:
+                grupos[subnicho].sort(key=sort_key)
 
-        # Ordenar subnichos alfabeticamente
-        grupos_ordenados = dict(sorted(grupos.items()))
+            # Ordenar subnichos alfabeticamente
+            grupos_ordenados = dict(sorted(grupos.items()))
 
-        logger.info(f"Canais agrupados em {len(grupos_ordenados)} subnichos")
+            logger.info(f"Canais agrupados em {len(grupos_ordenados)} subnichos")
 
-        result = {
-            "grupos": grupos_ordenados,
-            "total_canais": len(canais),
-            "total_subnichos": len(grupos_ordenados)
-        }
+            result = {
+                "grupos": grupos_ordenados,
+                "total_canais": len(canais),
+                "total_subnichos": len(grupos_ordenados)
+            }
 
-        # Salvar no cache
-        elapsed_ms = int((time.time() - start_time) * 1000)
-        logger.info(f"✅ Dados processados em {elapsed_ms}ms")
-        save_to_cache(cache_key, result)
+            elapsed_ms = int((time.time() - start_time) * 1000)
+            logger.info(f"✅ Dados processados em {elapsed_ms}ms")
+            return result
 
-        return result
+        # Stale-while-revalidate: expirado é servido na hora e recalculado em background
+        data = await get_or_revalidate(cache_key, "canais-tabela", compute)
+        # ETag = chave + versão do cache: polling sem mudança recebe 304 sem serializar
+        return cached_json_response(request, data, "dashboard", cache_key)
 
     except Exception as e:
         logger.error(f"Error fetching canais tabela: {e}")
@@ -889,6 +1002,9 @@ async def get_canal_analytics(canal_id: int):
     - Detecção de anomalias (outliers, tendências)
     - Melhor dia/hora para postar
 
+    Servido do cache materializado (channel_analytics_cache, gerado após a coleta);
+    recalcula só quando a linha está expirada ou com versão antiga.
+
     Returns:
         JSON com análise completa do canal
     """
@@ -896,8 +1012,8 @@ async def get_canal_analytics(canal_id: int):
         # Criar instância do analisador
         analyzer = ChannelAnalytics(db)
 
-        # Executar análise completa
-        analytics_data = await analyzer.analyze_channel(canal_id)
+        # Cache materializado ou análise completa (se stale)
+        analytics_data = await analyzer.analyze_channel_cached(canal_id)
 
         if not analytics_data:
             raise HTTPException(
@@ -905,6 +1021,10 @@ async def get_canal_analytics(canal_id: int):
                 detail=f"Canal {canal_id} não encontrado ou sem dados para análise"
             )
 
+        # Análise servida do cache: campos do canal já foram atualizados na materialização
+        if analytics_data.get('_cache_metadata', {}).get('cached'):
+            return analytics_data
+
         # Atualizar campos de analytics no banco se houver dados novos
         if analytics_data.get('canal_info'):
             info = analytics_data['canal_info']
@@ -915,14 +1035,14 @@ async def get_canal_analytics(canal_id: int):
                     'video_count': info.get('total_videos')
                 })
 
-        # Atualizar melhor momento no banco
+        # Atualizar melhor momento no banco (recálculo fora da materialização)
         if analytics_data.get('melhor_momento'):
             momento = analytics_data['melhor_momento']
             if momento.get('dia_numero') is not None and momento.get('hora') is not None:
-                await db.supabase.table('canais_monitorados').update({
+                await run_query(db.supabase.table('canais_monitorados').update({
                     'melhor_dia_semana': momento['dia_numero'],
                     'melhor_hora': momento['hora']
-                }).eq('id', canal_id).execute()
+                }).eq('id', canal_id))
 
         logger.info(f"✅ Analytics gerado para canal {canal_id}")
 
@@ -980,7 +1100,7 @@ def safe_days_diff(date_str: str) -> int:
 
 
 @app.get("/api/canais/{canal_id}/engagement")
-async def get_canal_engagement(canal_id: int, page: int = 1, limit: int = 10):
+async def get_canal_engagement(canal_id: int, page: int = 1, limit: int = 10, comments_limit: int = 50):
     """
     💬 Retorna análise completa de engajamento (comentários) de um canal.
 
@@ -993,9 +1113,15 @@ async def get_canal_engagement(canal_id: int, page: int = 1, limit: int = 10):
     - Insights acionáveis
     - Separação entre positivos e negativos
 
+    Contagens vêm de agregados no banco; cada vídeo da página traz os `comments_limit`
+    comentários com mais likes (o resto via /api/canais/{canal_id}/engagement/comments).
+
     Returns:
         JSON com análise de comentários organizada por vídeo
     """
+    # Cada vídeo da página faz 1 query de comentários (count='exact'): mesmo teto do /engagement/comments
+    comments_limit = max(1, min(comments_limit, 200))
+
     try:
         # ========== VALIDAÇÃO: APENAS CANAIS "NOSSOS" ==========
         canal_response = db.supabase.table("canais_monitorados")\
@@ -1095,15 +1221,21 @@ async def get_canal_engagement(canal_id: int, page: int = 1, limit: int = 10):
         offset = (page - 1) * limit
         videos_paginated = videos_list[offset:offset + limit]
 
+        # Comentários só dos vídeos da página (top por likes), em paralelo
+        comments_pages = await asyncio.gather(*(
+            db.get_engagement_comments(canal_id, 'all', page=1, limit=comments_limit, video_id=v.get('video_id'))
+            for v in videos_paginated
+        ))
+
         # Formatar dados dos vídeos para o frontend
         videos_data = []
-        for video_data in videos_paginated:
+        for video_data, comments_page in zip(videos_paginated, comments_pages):
             # Obter dados reais do vídeo do mapa
             video_id = video_data.get('video_id')
             video_info = videos_map.get(video_id, {})
 
-            # Separar comentários positivos e negativos do vídeo
-            video_comments = video_data.get('comments', [])
+            # Comentários do vídeo (página 1; total em video_data['total_comments'])
+            video_comments = comments_page['comments']
 
             # Garantir que cada comentário tenha os campos obrigatórios
             formatted_comments = []
@@ -1163,7 +1295,7 @@ async def get_canal_engagement(canal_id: int, page: int = 1, limit: int = 10):
 
             # UNIFICAÇÃO DE CONTAGENS: Buscar contagem do YouTube para comparação
             youtube_comment_count = video_info.get('comentarios', 0)  # Da tabela videos_historico
-            analyzed_comment_count = len(formatted_comments)  # Comentários que analisamos
+            analyzed_comment_count = video_data.get('total_comments', 0)  # Comentários que analisamos
             coverage_pct = (analyzed_comment_count / youtube_comment_count * 100) if youtube_comment_count > 0 else 0
 
             videos_data.append({
@@ -1185,8 +1317,9 @@ async def get_canal_engagement(canal_id: int, page: int = 1, limit: int = 10):
                 'positive_comments': positive_comments,  # Array vazio
                 'negative_comments': negative_comments,  # Array vazio
                 'neutral_comments': neutral_comments,  # Array vazio
-                # NOVO: Array único com TODOS os comentários
-                'all_comments': formatted_comments  # TODOS os comentários do vídeo (sem limite)
+                # Array único com os comentários do vídeo (top `comments_limit` por likes)
+                'all_comments': formatted_comments,
+                'all_comments_total': comments_page['total']
             })
 
         # Agrupar problemas por tipo (usando comentários com problema)
@@ -1209,19 +1342,28 @@ async def get_canal_engagement(canal_id: int, page: int = 1, limit: int = 10):
         # Vídeos que precisam de ação (com problemas)
         videos_needing_action = set()
 
+        # Contagens por tipo vêm do agregado (problem_comments é só a prévia)
+        problem_breakdown = engagement_data['summary'].get('problem_breakdown')
+        if problem_breakdown is not None:
+            for problem_type, count in problem_breakdown.items():
+                key = problem_type if problem_type in actionable_breakdown else 'other'
+                actionable_breakdown[key] += count
+            for video in videos_list:
+                if video.get('problem_count') and video.get('video_title'):
+                    videos_needing_action.add(video['video_title'])
+
         for comment in engagement_data.get('problem_comments', []):
             problem_type = comment.get('problem_type', 'other')
             video_title = comment.get('video_title', '')
 
-            # Adicionar vídeo à lista de ação necessária
-            if video_title:
-                videos_needing_action.add(video_title)
-
-            # Contar por tipo
-            if problem_type in actionable_breakdown:
-                actionable_breakdown[problem_type] += 1
-            else:
-                actionable_breakdown['other'] += 1
+            # Entradas de cache antigas (lista completa, sem problem_breakdown)
+            if problem_breakdown is None:
+                if video_title:
+                    videos_needing_action.add(video_title)
+                if problem_type in actionable_breakdown:
+                    actionable_breakdown[problem_type] += 1
+                else:
+                    actionable_breakdown['other'] += 1
 
             # Adicionar ao grupo apropriado
             if problem_type in problems_grouped:
@@ -1269,6 +1411,25 @@ async def get_canal_engagement(canal_id: int, page: int = 1, limit: int = 10):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/canais/{canal_id}/engagement/comments")
+async def get_canal_engagement_comments(canal_id: int, category: str = "all", page: int = 1,
+                                        limit: int = 50, video_id: Optional[str] = None):
+    """
+    💬 Página de comentários do canal (ou de um vídeo) por categoria, ordenada por likes.
+
+    category: all | positive | negative | problem | actionable
+    """
+    if category not in ("all", "positive", "negative", "problem", "actionable"):
+        raise HTTPException(status_code=400, detail=f"Categoria inválida: {category}")
+    limit = max(1, min(limit, 200))
+
+    try:
+        return await db.get_engagement_comments(canal_id, category, page=page, limit=limit, video_id=video_id)
+    except Exception as e:
+        logger.error(f"❌ Erro ao paginar comentários do canal {canal_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # ======== ENDPOINTS DE COMENTÁRIOS PARA FRONTEND ========
 
 @app.get("/api/comentarios/monetizados")
@@ -1283,17 +1444,16 @@ async def get_monetized_channels_comments():
     try:
         # Verificar cache
         cache_key = get_cache_key('comentarios_monetizados')
-        if cache_key in comments_cache:
-            cached_data, cached_time = comments_cache[cache_key]
-            if datetime.now(timezone.utc) - cached_time < COMMENTS_CACHE_DURATION:
-                logger.info("📦 Retornando canais monetizados do cache")
-                return cached_data
+        cached_data = response_cache.get("comments", cache_key)
+        if cached_data is not None:
+            logger.info("📦 Retornando canais monetizados do cache")
+            return cached_data
 
         # Buscar dados (função otimizada com apenas 3 queries)
         result = db.get_monetized_channels_with_comments()
 
         # Salvar no cache
-        comments_cache[cache_key] = (result, datetime.now(timezone.utc))
+        response_cache.set("comments", cache_key, result)
         logger.info(f"💾 Cache atualizado para canais monetizados: {len(result)} canais")
 
         return result
@@ -1318,17 +1478,16 @@ async def get_canal_videos_with_comments(canal_id: int, limit: int = 50):
     try:
         # Verificar cache
         cache_key = get_cache_key('videos_comentarios', {'canal_id': canal_id, 'limit': limit})
-        if cache_key in comments_cache:
-            cached_data, cached_time = comments_cache[cache_key]
-            if datetime.now(timezone.utc) - cached_time < COMMENTS_CACHE_DURATION:
-                logger.info(f"📦 Retornando vídeos do canal {canal_id} do cache")
-                return cached_data
+        cached_data = response_cache.get("comments", cache_key)
+        if cached_data is not None:
+            logger.info(f"📦 Retornando vídeos do canal {canal_id} do cache")
+            return cached_data
 
         # Buscar dados (função otimizada com apenas 2 queries)
         result = db.get_videos_with_comments_count(canal_id, limit)
 
         # Salvar no cache
-        comments_cache[cache_key] = (result, datetime.now(timezone.utc))
+        response_cache.set("comments", cache_key, result)
         logger.info(f"💾 Cache atualizado para vídeos do canal {canal_id}: {len(result)} vídeos")
 
         return result
@@ -2527,7 +2686,8 @@ async def force_notifier():
         from notifier import NotificationChecker
         
         checker = NotificationChecker(db.supabase)
-        await checker.check_and_create_notifications()
+        # Varredura completa (não só a última coleta) para recuperar notificações perdidas
+        await checker.check_and_create_notifications(incremental=False)
         
         logger.info("✅ Notifier executado com sucesso!")
         
@@ -2588,6 +2748,9 @@ async def get_cache_stats():
 
         stats = await preprocessor.get_cache_stats()
 
+        # Estatísticas do cache de respostas (hits/misses/evictions por namespace)
+        stats['response_cache'] = response_cache.stats()
+
         return stats
 
     except Exception as e:
@@ -2604,6 +2767,19 @@ async def get_stats():
         logger.error(f"Error fetching stats: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/metrics")
+async def get_metrics(format: str = "prometheus", top: int = 10):
+    """
+    📈 Latência por rota (p50/p95/p99) + queries Supabase por request.
+    Formato Prometheus por padrão; ?format=json retorna o resumo por rota.
+    """
+    if format == "json":
+        return {"routes": request_metrics.route_summary()}
+    return PlainTextResponse(
+        request_metrics.render_prometheus(top_n=top),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
 @app.post("/api/cleanup")
 async def cleanup_data():
     try:
@@ -3037,9 +3213,9 @@ async def api_clear_cache():
         _clear_cache_internal()
 
         # Limpar caches legados
-        global tabela_cache, cache_timestamp_dashboard, cache_timestamp_tabela, comments_cache
+        global tabela_cache, cache_timestamp_dashboard, cache_timestamp_tabela
         tabela_cache = {}
-        comments_cache = {}
+        response_cache.clear("comments")
         cache_timestamp_dashboard = None
         cache_timestamp_tabela = None
 
@@ -3443,20 +3619,27 @@ async def run_collection_job():
         coleta_id = await db.create_coleta_log(total_canais)
         logger.info(f"📝 Created coleta log ID: {coleta_id}")
 
+        # 📸 Histórico D-1/D-7/D-15/D-30 de todos os canais em uma passada (deltas calculados em memória)
+        try:
+            history_snapshot = await db.load_canal_history_snapshot()
+        except Exception as snap_error:
+            logger.warning(f"⚠️ Falha ao carregar snapshot de histórico, usando busca por canal: {snap_error}")
+            history_snapshot = None
+
         # Criar CommentsDB uma vez só quando necessário
         comments_db = None
 
-        for index, canal in enumerate(canais_to_collect, 1):
-            # SEM TIMEOUT - processar todos os canais
+        # 🚀 COLETA CONCORRENTE: até COLLECTION_CONCURRENCY canais em paralelo
+        # Todos os workers compartilham o mesmo collector (RateLimiter por chave + rotação)
+        concurrency = max(1, COLLECTION_CONCURRENCY)
+        semaphore = asyncio.Semaphore(concurrency)
+        canais_concluidos = 0
+        tempo_serial_total = 0.0  # Soma das durações individuais (equivalente ao caminho serial)
+        exhausted_logged = False
+
+        async def _processar_canal(index: int, canal: Dict):
+            nonlocal canais_sucesso, canais_erro, videos_total, comentarios_total, comments_db
 
-            if collector.all_keys_exhausted():
-                logger.error("=" * 80)
-                logger.error("❌ ALL API KEYS EXHAUSTED - STOPPING COLLECTION")
-                logger.error(f"✅ Collected {canais_sucesso}/{total_canais} canais")
-                logger.error(f"📊 Total requests used: {collector.total_quota_units}")
-                logger.error("=" * 80)
-                break
-            
             try:
                 logger.info(f"[{index}/{total_canais}] 🔄 Processing: {canal['nome_canal']}")
 
@@ -3467,7 +3650,7 @@ async def run_collection_job():
                 canal_data, videos_data = await collector.get_canal_data(canal['url_canal'], canal['nome_canal'], days=collection_days)
 
                 if canal_data:
-                    saved = await db.save_canal_data(canal['id'], canal_data)
+                    saved = await db.save_canal_data(canal['id'], canal_data, tipo=canal.get('tipo'), snapshot=history_snapshot)
                     if saved:
                         canais_sucesso += 1
                         await db.marcar_coleta_sucesso(canal['id'])  # 🆕 Tracking de sucesso
@@ -3495,9 +3678,9 @@ async def run_collection_job():
                                             pass
                                 if horas:
                                     hora_mais_comum = Counter(horas).most_common(1)[0][0]
-                                    await db.supabase.table('canais_monitorados').update({
+                                    await run_query(db.supabase.table('canais_monitorados').update({
                                         'melhor_hora': hora_mais_comum
-                                    }).eq('id', canal['id']).execute()
+                                    }).eq('id', canal['id']))
                         except Exception as e_analytics:
                             logger.warning(f"⚠️ Analytics fields update failed for {canal['nome_canal']}: {e_analytics}")
                     else:
@@ -3525,6 +3708,11 @@ async def run_collection_job():
                         channel_id = await collector.get_channel_id(canal['url_canal'], canal['nome_canal'])
 
                         if channel_id:
+                            # Contagem de comentários do snapshot anterior (pula vídeos sem comentários novos)
+                            previous_counts = await db.get_previous_comment_counts(
+                                [v.get('video_id') for v in videos_data if v.get('video_id')]
+                            )
+
                             # Adaptar estrutura dos vídeos para a função de coleta
                             videos_adapted = []
                             for video in videos_data:  # Processar TODOS os vídeos dos últimos 30 dias
@@ -3532,7 +3720,9 @@ async def run_collection_job():
                                     'videoId': video.get('video_id'),
                                     'title': video.get('titulo'),
                                     'viewCount': video.get('views_atuais'),
-                                    'publishedAt': video.get('data_publicacao')
+                                    'publishedAt': video.get('data_publicacao'),
+                                    'commentCount': video.get('comentarios'),
+                                    'previousCommentCount': previous_counts.get(video.get('video_id'))
                                 })
 
                             # Buscar timestamp do último comentário coletado (para coleta incremental)
@@ -3652,11 +3842,34 @@ async def run_collection_job():
                         })
                         # Não interrompe o fluxo - apenas registra o erro
 
-                # 🚀 OTIMIZAÇÃO: Removido sleep entre canais - RateLimiter já controla
-                # await asyncio.sleep(1)
+            except Exception as e:
+                logger.error(f"❌ Error processing {canal['nome_canal']}: {e}")
+                await db.marcar_coleta_falha(canal['id'], str(e))  # 🆕 Tracking de falha
+                canais_erro += 1
+
+        async def _worker(index: int, canal: Dict):
+            nonlocal canais_concluidos, tempo_serial_total, exhausted_logged
+
+            async with semaphore:
+                # SEM TIMEOUT - processar todos os canais
+                if collector.all_keys_exhausted():
+                    if not exhausted_logged:
+                        exhausted_logged = True
+                        logger.error("=" * 80)
+                        logger.error("❌ ALL API KEYS EXHAUSTED - STOPPING COLLECTION")
+                        logger.error(f"✅ Collected {canais_sucesso}/{total_canais} canais")
+                        logger.error(f"📊 Total requests used: {collector.total_quota_units}")
+                        logger.error("=" * 80)
+                    return
+
+                canal_start = time.time()
+                await _processar_canal(index, canal)
+                tempo_serial_total += time.time() - canal_start
+                canais_concluidos += 1
+                done = canais_concluidos
 
                 # Atualizar progresso no banco a cada 10 canais
-                if index % 10 == 0 and coleta_id:
+                if done % 10 == 0 and coleta_id:
                     try:
                         await db.update_coleta_log(
                             coleta_id=coleta_id,
@@ -3671,19 +3884,21 @@ async def run_collection_job():
                         logger.warning(f"⚠️ Failed to update progress: {update_error}")
 
                 # Log de progresso a cada 25 canais
-                if index % 25 == 0:
+                if done % 25 == 0:
                     logger.info("=" * 80)
-                    logger.info(f"🔄 PROGRESS CHECKPOINT [{index}/{total_canais}]")
+                    logger.info(f"🔄 PROGRESS CHECKPOINT [{done}/{total_canais}]")
                     logger.info(f"✅ Success: {canais_sucesso} | ❌ Errors: {canais_erro} | 🎬 Videos: {videos_total}")
                     logger.info(f"💬 Comments: {comentarios_total} | 📡 API: {collector.total_quota_units} | ⏱️  Time: ongoing")
                     logger.info("=" * 80)
 
-            except Exception as e:
-                logger.error(f"❌ Error processing {canal['nome_canal']}: {e}")
-                await db.marcar_coleta_falha(canal['id'], str(e))  # 🆕 Tracking de falha
-                canais_erro += 1
-                continue
-        
+        logger.info(f"⚙️ Concorrência da coleta: {concurrency} canais em paralelo")
+        wall_start = time.time()
+        await asyncio.gather(*(
+            _worker(index, canal) for index, canal in enumerate(canais_to_collect, 1)
+        ))
+        wall_time = time.time() - wall_start
+        speedup = (tempo_serial_total / wall_time) if wall_time > 0 else 1.0
+
         stats = collector.get_request_stats()
         total_requests = stats['total_quota_units']
         
@@ -3695,6 +3910,8 @@ async def run_collection_job():
         logger.info(f"💬 Comments: {comentarios_total}")
         logger.info(f"📡 Total API Requests: {total_requests}")
         logger.info(f"🔑 Active keys: {stats['active_keys']}/{len(collector.api_keys)}")
+        logger.info(f"⏱️  Wall-clock: {wall_time:.1f}s | Serial equivalente: {tempo_serial_total:.1f}s | Speedup: {speedup:.2f}x ({concurrency} workers)")
+        logger.info(f"🌐 HTTP: {stats['http_requests']} requests | latência média {stats['http_avg_latency_ms']}ms (p95 {stats['http_p95_latency_ms']}ms) | conexões reutilizadas: {stats['http_connection_reuse_pct']}%")
         logger.info("=" * 80)
 
         # Salvar log de comentários se houve coleta
@@ -3892,6 +4109,14 @@ async def run_collection_job():
             except Exception as e:
                 logger.error(f"❌ Error in OAuth collection: {e}")
 
+            # 💰 Rollup de receita dos endpoints de monetização (dados novos de yt_daily_metrics)
+            try:
+                from revenue_rollup import refresh_revenue_rollup
+                rollup = await refresh_revenue_rollup(db)
+                logger.info(f"💰 Revenue rollup atualizado: {rollup.stats()}")
+            except Exception as e:
+                logger.error(f"❌ Error refreshing revenue rollup: {e}")
+
         if canais_sucesso >= (total_canais * 0.5):
             logger.info("🧹 Cleanup threshold met (>50% success)")
             await db.cleanup_old_data()
@@ -3939,10 +4164,14 @@ async def run_collection_job():
             else:
                 logger.info("✅ Materialized Views atualizadas com sucesso!")
 
-            # 3. Limpar todo o cache do dashboard (sempre, mesmo se MV falhar)
-            cache_stats = clear_all_cache()
-            logger.info(f"🧹 Cache limpo: {cache_stats['entries_cleared']} entradas removidas")
-            logger.info(f"💾 Memória liberada: ~{cache_stats['approx_size_kb']}KB")
+            # 3. Renovar o cache do dashboard (sempre, mesmo se MV falhar)
+            if 'error' in mv_results:
+                cache_stats = clear_all_cache()
+                logger.info(f"🧹 Cache limpo: {cache_stats['entries_cleared']} entradas removidas")
+                logger.info(f"💾 Memória liberada: ~{cache_stats['approx_size_kb']}KB")
+            else:
+                # MV fresca: reaquece as chaves mais pedidas (o resto é revalidado sob demanda)
+                await warm_dashboard_cache()
 
             logger.info("✅ Dashboard pronto com dados frescos e cache renovado!")
             logger.info("=" * 60)
@@ -3976,6 +4205,17 @@ async def run_collection_job():
             logger.error(f"❌ Erro ao construir cache de engajamento: {cache_error}")
             # Não falha o job principal se o cache falhar
 
+        # =====================================================================
+        # BUILD ANALYTICS CACHE - análise de cada canal pré-calculada (modal abre instantâneo)
+        # =====================================================================
+        try:
+            logger.info("🔄 INICIANDO MATERIALIZAÇÃO DO ANALYTICS DOS CANAIS")
+            from analytics import build_analytics_cache
+            analytics_result = await build_analytics_cache(db)
+            logger.info(f"✅ ANALYTICS CACHE ATUALIZADO: {analytics_result.get('processed', 0)}/{analytics_result.get('total', 0)} canais")
+        except Exception as analytics_error:
+            logger.error(f"❌ Erro ao materializar analytics dos canais: {analytics_error}")
+
     except Exception as e:
         logger.error("=" * 80)
         logger.error(f"❌ COLLECTION JOB FAILED: {e}")
@@ -3995,6 +4235,7 @@ async def run_collection_job():
         raise
     finally:
         collection_in_progress = False
+        await collector.close_session()
 
 
 # =========================================================================
@@ -4275,11 +4516,13 @@ async def schedule_mv_periodic_refresh():
             await asyncio.sleep(1800)  # 30 minutos
             logger.info("🔄 MV periodic refresh iniciando...")
             mv_results = await db.refresh_all_dashboard_mvs()
-            clear_all_cache()
             if mv_results and 'error' not in mv_results:
-                logger.info("✅ MV periodic refresh concluido — cache limpo")
+                # Sem clear cego: chaves populares são reaquecidas, o resto vira stale (SWR)
+                await warm_dashboard_cache()
+                logger.info("✅ MV periodic refresh concluido — cache reaquecido")
             else:
-                logger.warning("⚠️ MV periodic refresh com problemas")
+                # MV não atualizou: mantém o cache atual (reaquecer leria as MVs antigas)
+                logger.warning("⚠️ MV periodic refresh com problemas — cache mantido")
         except Exception as e:
             logger.error(f"❌ MV periodic refresh falhou: {e}")
             await asyncio.sleep(300)  # Retry em 5 min se falhar
@@ -4910,13 +5153,16 @@ async def process_upload_task(upload_id: int, max_retries=3):
                 # FASE 1: Download
                 update_upload_status(upload_id, 'downloading')
                 logger.info(f"[{channel_id}] 📥 Baixando vídeo do Drive...")
-                video_path = uploader.download_video(upload['video_url'], channel_id=channel_id)
+                # Download/upload bloqueantes rodam em thread: uploads simultâneos (até o semáforo)
+                # não travam o event loop
+                video_path = await asyncio.to_thread(uploader.download_video, upload['video_url'], channel_id=channel_id)
 
                 # FASE 2: Upload
                 update_upload_status(upload_id, 'uploading')
                 logger.info(f"[{channel_id}] ⬆️  Fazendo upload para YouTube...")
 
-                result = uploader.upload_to_youtube(
+                result = await asyncio.to_thread(
+                    uploader.upload_to_youtube,
                     channel_id=upload['channel_id'],
                     video_path=video_path,
                     metadata={
@@ -4934,7 +5180,8 @@ async def process_upload_task(upload_id: int, max_retries=3):
 
                 # FASE 4: Atualiza planilha Google Sheets
                 logger.info(f"[{channel_id}] 📊 Atualizando planilha (row {upload['sheets_row_number']})")
-                update_upload_status_in_sheet(
+                await asyncio.to_thread(
+                    update_upload_status_in_sheet,
                     spreadsheet_id=upload['spreadsheet_id'],
                     row=upload['sheets_row_number'],
                     status='✅ done'
@@ -4942,8 +5189,7 @@ async def process_upload_task(upload_id: int, max_retries=3):
                 logger.info(f"[{channel_id}] ✅ Planilha atualizada: ✅ done")
 
                 # Invalidar cache da planilha para contagem de videos disponiveis atualizar
-                if upload['spreadsheet_id'] in SPREADSHEET_CACHE:
-                    del SPREADSHEET_CACHE[upload['spreadsheet_id']]
+                invalidar_cache_planilha(upload['spreadsheet_id'])
                 _dash_cache['data'] = None
                 _dash_cache['timestamp'] = 0
 
@@ -5198,9 +5444,8 @@ async def force_upload_for_channel(channel_id: str, background_tasks: Background
         uploader = DailyUploader()
 
         # Limpar cache da planilha para forçar busca atualizada
-        if canal_data['spreadsheet_id'] in SPREADSHEET_CACHE:
-            del SPREADSHEET_CACHE[canal_data['spreadsheet_id']]
-            logger.info(f"Cache da planilha limpo para {canal_data['channel_name']}")
+        invalidar_cache_planilha(canal_data['spreadsheet_id'])
+        logger.info(f"Cache da planilha limpo para {canal_data['channel_name']}")
 
         # Verificar se tem vídeo pronto na planilha
         # NOTA: _find_ready_video é async, deve ser chamado com await direto (não run_in_threadpool)
@@ -7639,19 +7884,14 @@ async def dash_upload_status():
         # Fetch planilhas sem cache em paralelo (max 5 simultaneos)
         if canais_sem_cache and uploader.sheets_client:
             import asyncio
+            from upload_sheets import read_upload_rows
             sheets_sem = asyncio.Semaphore(5)
-            loop = asyncio.get_event_loop()
-
-            def _fetch_sheet_sync(spreadsheet_id):
-                sheet = uploader.sheets_client.open_by_key(spreadsheet_id)
-                worksheet = sheet.get_worksheet(0)
-                return worksheet.get_all_values()
 
             async def _fetch_and_count(canal):
                 async with sheets_sem:
                     try:
                         sid = canal['spreadsheet_id']
-                        all_values = await loop.run_in_executor(None, _fetch_sheet_sync, sid)
+                        all_values = await read_upload_rows(uploader.sheets_client, sid)
                         SPREADSHEET_CACHE[sid] = (_time.time(), all_values)
                         return canal['channel_id'], uploader.count_available_videos(all_values)
                     except Exception as e:
@@ -7774,7 +8014,8 @@ async def dash_upload_status():
         filtered = {k: v for k, v in subnichos_dict.items() if _norm(k) not in _excluded}
         subnichos_ordenados = dict(sorted(filtered.items(), key=_sub_sort_key))
 
-        result = {'stats': stats, 'subnichos': subnichos_ordenados}
+        from upload_sheets import get_sheets_stats
+        result = {'stats': stats, 'subnichos': subnichos_ordenados, 'sheets': get_sheets_stats()}
         _dash_cache['data'] = result
         _dash_cache['timestamp'] = _time.time()
         return result
@@ -7801,22 +8042,16 @@ async def refresh_disp_canal(channel_id: str):
         sid = canal.data['spreadsheet_id']
 
         # Invalidar cache existente
-        if sid in SPREADSHEET_CACHE:
-            del SPREADSHEET_CACHE[sid]
+        invalidar_cache_planilha(sid)
 
         # Fetch fresco da planilha
         uploader = DailyUploader()
         if not uploader.sheets_client:
             return {'ok': False, 'reason': 'no_sheets_client'}
 
-        import asyncio
-        loop = asyncio.get_event_loop()
-        def _fetch_sync():
-            sheet = uploader.sheets_client.open_by_key(sid)
-            worksheet = sheet.get_worksheet(0)
-            return worksheet.get_all_values()
-
-        all_values = await loop.run_in_executor(None, _fetch_sync)
+        # Refresh manual: leitura completa (ignora o watermark de linhas já postadas)
+        from upload_sheets import read_upload_rows
+        all_values = await read_upload_rows(uploader.sheets_client, sid, full=True)
         SPREADSHEET_CACHE[sid] = (_t.time(), all_values)
 
         count = uploader.count_available_videos(all_values)
@@ -8019,20 +8254,14 @@ async def batch_check_videos():
 
         # Fase 2: Canais sem cache — fetch via Google Sheets com paralelismo em threads
         if canais_sem_cache and uploader.sheets_client:
+            from upload_sheets import read_upload_rows
             sheets_sem = asyncio.Semaphore(5)
-            loop = asyncio.get_event_loop()
-
-            def _fetch_spreadsheet_sync(spreadsheet_id):
-                """Busca planilha sincronamente (roda em thread)."""
-                sheet = uploader.sheets_client.open_by_key(spreadsheet_id)
-                worksheet = sheet.get_worksheet(0)
-                return worksheet.get_all_values()
 
             async def check_uncached(canal):
                 async with sheets_sem:
                     try:
                         sid = canal['spreadsheet_id']
-                        all_values = await loop.run_in_executor(None, _fetch_spreadsheet_sync, sid)
+                        all_values = await read_upload_rows(uploader.sheets_client, sid)
                         SPREADSHEET_CACHE[sid] = (_t.time(), all_values)
                         video = uploader._process_cached_data(all_values)
                         return {
@@ -8118,8 +8347,7 @@ async def batch_upload(request: Request, background_tasks: BackgroundTasks):
 
         # Limpar cache das planilhas dos canais selecionados
         for canal in valid_channels:
-            if canal['spreadsheet_id'] in SPREADSHEET_CACHE:
-                del SPREADSHEET_CACHE[canal['spreadsheet_id']]
+            invalidar_cache_planilha(canal['spreadsheet_id'])
 
         # Limpar cache do dashboard para UI atualizar
         _dash_cache['data'] = None
@@ -9522,7 +9750,7 @@ async def delete_order_analysis_run(channel_id: str, run_id: int):
 # MISSION CONTROL - Escritório Virtual
 # =========================================================================
 try:
-    from mission_control import MISSION_CONTROL_HTML, get_mission_control_data, get_sala_detail, _mc_cache, _mc_sala_cache
+    from mission_control import MISSION_CONTROL_HTML, get_mission_control_data, get_sala_detail, clear_mission_control_cache
 
     @app.get("/mission-control", response_class=HTMLResponse)
     async def mission_control_page():
@@ -9530,9 +9758,10 @@ try:
         return MISSION_CONTROL_HTML
 
     @app.get("/api/mission-control/status")
-    async def mission_control_status():
+    async def mission_control_status(request: Request):
         """Retorna dados de todos os setores, salas e agentes"""
-        return await get_mission_control_data(db)
+        data = await get_mission_control_data(db)
+        return cached_json_response(request, data, 'mission_control', 'status')
 
     @app.get("/api/mission-control/sala/{canal_id}")
     async def mission_control_sala(canal_id: int):
@@ -9551,9 +9780,7 @@ try:
             mv_refreshed = False
 
         # 2. Limpar cache do MC
-        _mc_cache['data'] = None
-        _mc_cache['timestamp'] = 0
-        _mc_sala_cache.clear()
+        clear_mission_control_cache()
 
         return {
             "success": True,
@@ -10,11 +10,13 @@ Click no agente abre painel interativo com acoes
 
 import json
 import re
-import time
 import logging
 import unicodedata
 from datetime import datetime, timezone
 
+from database import run_query
+from response_cache import response_cache
+
 logger = logging.getLogger(__name__)
 
 # ===========================================================
@@ -238,321 +240,167 @@ def build_agent_list(canal_id, agent_statuses=None):
 # API DATA FUNCTIONS
 # ===========================================================
 
-_mc_cache = {'data': None, 'timestamp': 0}
 _MC_CACHE_TTL = 5
+response_cache.register_namespace('mission_control', _MC_CACHE_TTL)
 
-_mc_sala_cache = {}
 _MC_SALA_CACHE_TTL = 3
+response_cache.register_namespace('mission_control_sala', _MC_SALA_CACHE_TTL)
 
 
-async def get_agent_real_status(supabase_client, channel_id):
-    """Query real agent status from analysis tables for a given yt channel_id (UC...)."""
-    status = {}
-
-    # Agent 1: Copy Analysis
-    try:
-        copy_resp = supabase_client.table('copy_analysis_runs') \
-            .select('id,run_date,channel_avg_retention,total_videos_analyzed') \
-            .eq('channel_id', channel_id) \
-            .order('run_date', desc=True) \
-            .limit(1) \
-            .execute()
-        if copy_resp.data:
-            run = copy_resp.data[0]
-            status['estrutura_copy'] = {
-                'status': 'done',
-                'last_run': run.get('run_date'),
-                'videos_analyzed': run.get('total_videos_analyzed', 0),
-                'avg_retention': run.get('channel_avg_retention'),
-            }
-        else:
-            status['estrutura_copy'] = {'status': 'idle', 'last_run': None}
-    except Exception:
-        status['estrutura_copy'] = {'status': 'idle', 'last_run': None}
-
-    # Agent 2: Satisfaction
-    try:
-        sat_resp = supabase_client.table('satisfaction_analysis_runs') \
-            .select('id,run_date,total_videos_analyzed,channel_avg_approval') \
-            .eq('channel_id', channel_id) \
-            .order('run_date', desc=True) \
-            .limit(1) \
-            .execute()
-        if sat_resp.data:
-            run = sat_resp.data[0]
-            status['satisfacao'] = {
-                'status': 'done',
-                'last_run': run.get('run_date'),
-                'videos_analyzed': run.get('total_videos_analyzed', 0),
-                'avg_approval': run.get('channel_avg_approval'),
-            }
-        else:
-            status['satisfacao'] = {'status': 'idle', 'last_run': None}
-    except Exception:
-        status['satisfacao'] = {'status': 'idle', 'last_run': None}
-
-    # Agent 3: Authenticity
-    try:
-        auth_resp = supabase_client.table('authenticity_analysis_runs') \
-            .select('id,run_date,authenticity_score,authenticity_level,has_alerts') \
-            .eq('channel_id', channel_id) \
-            .order('run_date', desc=True) \
-            .limit(1) \
-            .execute()
-        if auth_resp.data:
-            run = auth_resp.data[0]
-            status['autenticidade'] = {
-                'status': 'done' if not run.get('has_alerts') else 'error',
-                'last_run': run.get('run_date'),
-                'score': run.get('authenticity_score'),
-                'level': run.get('authenticity_level'),
-                'has_alerts': run.get('has_alerts', False),
-            }
-        else:
-            status['autenticidade'] = {'status': 'idle', 'last_run': None}
-    except Exception:
-        status['autenticidade'] = {'status': 'idle', 'last_run': None}
+def clear_mission_control_cache():
+    """Limpa status geral + salas do Mission Control (chamado pelo /api/mission-control/refresh)."""
+    response_cache.clear('mission_control')
+    response_cache.clear('mission_control_sala')
 
-    # Agent 4: Temas
-    try:
-        theme_resp = supabase_client.table('theme_analysis_runs') \
-            .select('id,run_date,total_videos_analyzed,theme_count,ranking_json') \
-            .eq('channel_id', channel_id) \
-            .order('run_date', desc=True) \
-            .limit(1) \
-            .execute()
-        if theme_resp.data:
-            run = theme_resp.data[0]
-            ranking = run.get('ranking_json') or []
-            top_theme = ranking[0] if ranking else None
-            status['temas'] = {
-                'status': 'done',
-                'last_run': run.get('run_date'),
-                'videos_analyzed': run.get('total_videos_analyzed', 0),
-                'theme_count': run.get('theme_count', 0),
-                'top_theme': top_theme.get('theme', '') if top_theme else None,
-                'top_theme_score': top_theme.get('score', 0) if top_theme else 0,
-            }
-        else:
-            status['temas'] = {'status': 'idle', 'last_run': None}
-    except Exception:
-        status['temas'] = {'status': 'idle', 'last_run': None}
 
-    # Agent 5: Motores
-    try:
-        motor_resp = supabase_client.table('motor_analysis_runs') \
-            .select('id,run_date,total_videos,motor_counts_json') \
-            .eq('channel_id', channel_id) \
-            .order('run_date', desc=True) \
-            .limit(1) \
-            .execute()
-        if motor_resp.data:
-            run = motor_resp.data[0]
-            motor_counts = run.get('motor_counts_json') or []
-            if isinstance(motor_counts, str):
-                try:
-                    motor_counts = json.loads(motor_counts)
-                except (json.JSONDecodeError, TypeError):
-                    motor_counts = []
-            status['motores'] = {
-                'status': 'done',
-                'last_run': run.get('run_date'),
-                'total_videos': run.get('total_videos', 0),
-                'motor_count': len(motor_counts),
-            }
-        else:
-            status['motores'] = {'status': 'idle', 'last_run': None}
-    except Exception:
-        status['motores'] = {'status': 'idle', 'last_run': None}
-
-    # Agent 6 (Recomendador): Not yet implemented
-    status['recomendador'] = {'status': 'waiting', 'last_run': None}
+# Tabelas de execucao por agente: (tabela, colunas) - usadas so no fallback sem a RPC
+AGENT_RUN_TABLES = {
+    'estrutura_copy': ('copy_analysis_runs', 'channel_id,run_date,total_videos_analyzed,channel_avg_retention'),
+    'satisfacao': ('satisfaction_analysis_runs', 'channel_id,run_date,total_videos_analyzed,channel_avg_approval'),
+    'autenticidade': ('authenticity_analysis_runs', 'channel_id,run_date,authenticity_score,authenticity_level,has_alerts'),
+    'temas': ('theme_analysis_runs', 'channel_id,run_date,total_videos_analyzed,theme_count,ranking_json'),
+    'motores': ('motor_analysis_runs', 'channel_id,run_date,total_videos,motor_counts_json'),
+    'ordenador': ('production_order_runs', 'channel_id,run_date,total_scripts,channel_health'),
+}
 
-    # Agent 7: Ordenador de Producao
-    try:
-        order_resp = supabase_client.table('production_order_runs') \
-            .select('id,run_date,total_scripts,channel_health') \
-            .eq('channel_id', channel_id) \
-            .order('run_date', desc=True) \
-            .limit(1) \
-            .execute()
-        if order_resp.data:
-            run = order_resp.data[0]
-            status['ordenador'] = {
-                'status': 'done',
-                'last_run': run.get('run_date'),
-                'total_scripts': run.get('total_scripts', 0),
-                'channel_health': run.get('channel_health', ''),
-            }
-        else:
-            status['ordenador'] = {'status': 'idle', 'last_run': None}
-    except Exception:
-        status['ordenador'] = {'status': 'idle', 'last_run': None}
+# Chaves do overview (sala/escritorio) para cada agente
+_OVERVIEW_KEYS = {
+    'estrutura_copy': 'copy',
+    'satisfacao': 'satisfacao',
+    'autenticidade': 'auth',
+    'temas': 'temas',
+    'motores': 'motores',
+    'ordenador': 'ordenador',
+}
 
-    return status
 
+def _parse_json_list(value):
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except (json.JSONDecodeError, TypeError):
+            return []
+    return value if isinstance(value, list) else []
+
+
+def _format_agent_run(agent, run):
+    """Linha da ultima execucao de um agente -> status exibido no Mission Control."""
+    if agent == 'estrutura_copy':
+        return {
+            'status': 'done',
+            'last_run': run.get('run_date'),
+            'videos_analyzed': run.get('total_videos_analyzed', 0),
+            'avg_retention': run.get('channel_avg_retention'),
+        }
+    if agent == 'satisfacao':
+        return {
+            'status': 'done',
+            'last_run': run.get('run_date'),
+            'videos_analyzed': run.get('total_videos_analyzed', 0),
+            'avg_approval': run.get('channel_avg_approval'),
+        }
+    if agent == 'autenticidade':
+        return {
+            'status': 'done' if not run.get('has_alerts') else 'error',
+            'last_run': run.get('run_date'),
+            'score': run.get('authenticity_score'),
+            'level': run.get('authenticity_level'),
+            'has_alerts': run.get('has_alerts', False),
+        }
+    if agent == 'temas':
+        ranking = _parse_json_list(run.get('ranking_json'))
+        top_theme = ranking[0] if ranking and isinstance(ranking[0], dict) else None
+        return {
+            'status': 'done',
+            'last_run': run.get('run_date'),
+            'videos_analyzed': run.get('total_videos_analyzed', 0),
+            'theme_count': run.get('theme_count', 0),
+            'top_theme': top_theme.get('theme', '') if top_theme else None,
+            'top_theme_score': top_theme.get('score', 0) if top_theme else 0,
+        }
+    if agent == 'motores':
+        return {
+            'status': 'done',
+            'last_run': run.get('run_date'),
+            'total_videos': run.get('total_videos', 0),
+            'motor_count': len(_parse_json_list(run.get('motor_counts_json'))),
+        }
+    if agent == 'ordenador':
+        return {
+            'status': 'done',
+            'last_run': run.get('run_date'),
+            'total_scripts': run.get('total_scripts', 0),
+            'channel_health': run.get('channel_health', ''),
+        }
+    return {'status': 'done', 'last_run': run.get('run_date')}
 
-async def get_agent_overview_batch(supabase_client):
-    """Batch query agent status for ALL channels. Returns dict keyed by channel_id."""
-    overview = {}
 
-    # Latest copy analysis per channel (limit 100 = margem para ~43 canais)
+async def get_agent_latest_runs(supabase_client, channel_id=None):
+    """
+    Ultima execucao de cada agente por canal, em 1 query (RPC get_agent_latest_runs).
+    channel_id=None traz todos os canais. Returns: {channel_id: {agent: run}}.
+    """
+    latest = {}
     try:
-        copy_resp = supabase_client.table('copy_analysis_runs') \
-            .select('channel_id,run_date,total_videos_analyzed') \
-            .order('run_date', desc=True) \
-            .limit(100) \
-            .execute()
-        seen = set()
-        for row in (copy_resp.data or []):
-            cid = row.get('channel_id')
-            if cid and cid not in seen:
-                seen.add(cid)
-                if cid not in overview:
-                    overview[cid] = {}
-                overview[cid]['copy'] = {
-                    'status': 'done',
-                    'last_run': row.get('run_date'),
-                }
+        resp = await run_query(supabase_client.rpc('get_agent_latest_runs', {'p_channel_id': channel_id}))
+        for row in (resp.data or []):
+            run = dict(row.get('data') or {})
+            run['run_date'] = row.get('run_date')
+            latest.setdefault(row['channel_id'], {})[row['agent']] = run
+        return latest
     except Exception as e:
-        logger.warning(f"[MC] Query falhou: {e}")
+        logger.warning(f"[MC] RPC get_agent_latest_runs falhou ({e}), usando fallback por tabela")
 
-    # Latest satisfaction analysis per channel
-    try:
-        sat_resp = supabase_client.table('satisfaction_analysis_runs') \
-            .select('channel_id,run_date,total_videos_analyzed,channel_avg_approval') \
-            .order('run_date', desc=True) \
-            .limit(100) \
-            .execute()
-        seen = set()
-        for row in (sat_resp.data or []):
-            cid = row.get('channel_id')
-            if cid and cid not in seen:
-                seen.add(cid)
-                if cid not in overview:
-                    overview[cid] = {}
-                overview[cid]['satisfacao'] = {
-                    'status': 'done',
-                    'last_run': row.get('run_date'),
-                    'avg_approval': row.get('channel_avg_approval'),
-                }
-    except Exception as e:
-        logger.warning(f"[MC] Query falhou: {e}")
+    # Fallback (migration 043 ainda nao aplicada): 1 query por tabela
+    for agent, (table, columns) in AGENT_RUN_TABLES.items():
+        try:
+            query = supabase_client.table(table).select(columns).order('run_date', desc=True)
+            if channel_id:
+                query = query.eq('channel_id', channel_id).limit(1)
+            else:
+                query = query.limit(100)
+            resp = await run_query(query)
+            for row in (resp.data or []):
+                cid = row.get('channel_id')
+                if cid and agent not in latest.get(cid, {}):
+                    latest.setdefault(cid, {})[agent] = row
+        except Exception as e:
+            logger.warning(f"[MC] Query falhou: {e}")
+    return latest
 
-    # Latest auth analysis per channel
-    try:
-        auth_resp = supabase_client.table('authenticity_analysis_runs') \
-            .select('channel_id,run_date,authenticity_score,authenticity_level,has_alerts') \
-            .order('run_date', desc=True) \
-            .limit(100) \
-            .execute()
-        seen = set()
-        for row in (auth_resp.data or []):
-            cid = row.get('channel_id')
-            if cid and cid not in seen:
-                seen.add(cid)
-                if cid not in overview:
-                    overview[cid] = {}
-                overview[cid]['auth'] = {
-                    'status': 'done' if not row.get('has_alerts') else 'error',
-                    'last_run': row.get('run_date'),
-                    'score': row.get('authenticity_score'),
-                    'level': row.get('authenticity_level'),
-                    'has_alerts': row.get('has_alerts', False),
-                }
-    except Exception as e:
-        logger.warning(f"[MC] Query falhou: {e}")
 
-    # Latest theme analysis per channel
-    try:
-        theme_resp = supabase_client.table('theme_analysis_runs') \
-            .select('channel_id,run_date,total_videos_analyzed,ranking_json') \
-            .order('run_date', desc=True) \
-            .limit(100) \
-            .execute()
-        seen = set()
-        for row in (theme_resp.data or []):
-            cid = row.get('channel_id')
-            if cid and cid not in seen:
-                seen.add(cid)
-                if cid not in overview:
-                    overview[cid] = {}
-                ranking = row.get('ranking_json') or []
-                if isinstance(ranking, str):
-                    try:
-                        ranking = json.loads(ranking)
-                    except (json.JSONDecodeError, TypeError):
-                        ranking = []
-                top_theme = ranking[0] if ranking and isinstance(ranking, list) else None
-                overview[cid]['temas'] = {
-                    'status': 'done',
-                    'last_run': row.get('run_date'),
-                    'top_theme': top_theme.get('theme', '') if isinstance(top_theme, dict) else None,
-                    'top_theme_score': top_theme.get('score', 0) if isinstance(top_theme, dict) else 0,
-                }
-    except Exception as e:
-        logger.warning(f"[MC] Query falhou: {e}")
+async def get_agent_real_status(supabase_client, channel_id):
+    """Query real agent status from analysis tables for a given yt channel_id (UC...)."""
+    runs = (await get_agent_latest_runs(supabase_client, channel_id)).get(channel_id, {})
 
-    # Latest motor analysis per channel
-    try:
-        motor_resp = supabase_client.table('motor_analysis_runs') \
-            .select('channel_id,run_date,total_videos,motor_counts_json') \
-            .order('run_date', desc=True) \
-            .limit(100) \
-            .execute()
-        seen = set()
-        for row in (motor_resp.data or []):
-            cid = row.get('channel_id')
-            if cid and cid not in seen:
-                seen.add(cid)
-                if cid not in overview:
-                    overview[cid] = {}
-                motor_counts = row.get('motor_counts_json') or []
-                if isinstance(motor_counts, str):
-                    try:
-                        motor_counts = json.loads(motor_counts)
-                    except (json.JSONDecodeError, TypeError):
-                        motor_counts = []
-                overview[cid]['motores'] = {
-                    'status': 'done',
-                    'last_run': row.get('run_date'),
-                    'motor_count': len(motor_counts),
-                }
-    except Exception as e:
-        logger.warning(f"[MC] Query falhou: {e}")
+    status = {}
+    for agent in ('estrutura_copy', 'satisfacao', 'autenticidade', 'temas', 'motores', 'recomendador', 'ordenador'):
+        if agent == 'recomendador':
+            # Agent 6 (Recomendador): Not yet implemented
+            status[agent] = {'status': 'waiting', 'last_run': None}
+            continue
+        run = runs.get(agent)
+        status[agent] = _format_agent_run(agent, run) if run else {'status': 'idle', 'last_run': None}
+    return status
 
-    # Latest production order analysis per channel
-    try:
-        order_resp = supabase_client.table('production_order_runs') \
-            .select('channel_id,run_date,total_scripts,channel_health') \
-            .order('run_date', desc=True) \
-            .limit(100) \
-            .execute()
-        seen = set()
-        for row in (order_resp.data or []):
-            cid = row.get('channel_id')
-            if cid and cid not in seen:
-                seen.add(cid)
-                if cid not in overview:
-                    overview[cid] = {}
-                overview[cid]['ordenador'] = {
-                    'status': 'done',
-                    'last_run': row.get('run_date'),
-                    'total_scripts': row.get('total_scripts', 0),
-                    'channel_health': row.get('channel_health', ''),
-                }
-    except Exception as e:
-        logger.warning(f"[MC] Query falhou: {e}")
 
+async def get_agent_overview_batch(supabase_client):
+    """Batch query agent status for ALL channels. Returns dict keyed by channel_id."""
+    overview = {}
+    for cid, runs in (await get_agent_latest_runs(supabase_client)).items():
+        overview[cid] = {
+            _OVERVIEW_KEYS[agent]: _format_agent_run(agent, run)
+            for agent, run in runs.items() if agent in _OVERVIEW_KEYS
+        }
     return overview
 
 
 async def get_mission_control_data(db):
     """Build complete mission control data with real agent statuses."""
-    now = time.time()
-    if _mc_cache['data'] and (now - _mc_cache['timestamp']) < _MC_CACHE_TTL:
-        return _mc_cache['data']
+    return await response_cache.get_or_compute('mission_control', 'status', lambda: _build_mission_control_data(db))
+
 
+async def _build_mission_control_data(db):
     canais = await db.get_dashboard_from_mv(tipo="nosso", limit=1000, offset=0)
 
     # Get OAuth channel_ids (only show channels with OAuth configured)
@@ -560,7 +408,7 @@ async def get_mission_control_data(db):
     oauth_channel_ids = set()
     sr_client = getattr(db, 'supabase_service', None) or db.supabase
     try:
-        oauth_resp = sr_client.table('yt_oauth_tokens').select('channel_id').execute()
+        oauth_resp = await run_query(sr_client.table('yt_oauth_tokens').select('channel_id'))
         oauth_channel_ids = set(r['channel_id'] for r in (oauth_resp.data or []))
     except Exception as e:
         logger.warning(f"[MC] Query falhou: {e}")
@@ -572,10 +420,9 @@ async def get_mission_control_data(db):
     ctr_map = {}  # lowercase channel_name -> avg_ctr
     oauth_names = set()  # lowercase names of channels with OAuth
     try:
-        yt_resp = db.supabase.table('yt_channels') \
-            .select('channel_id,channel_name,copy_spreadsheet_id,avg_ctr') \
-            .eq('is_active', True) \
-            .execute()
+        yt_resp = await run_query(db.supabase.table('yt_channels')
+            .select('channel_id,channel_name,copy_spreadsheet_id,avg_ctr')
+            .eq('is_active', True))
         for row in (yt_resp.data or []):
             chid = row.get('channel_id')
             chname = (row.get('channel_name') or '').strip().lower()
@@ -595,10 +442,9 @@ async def get_mission_control_data(db):
     retention_map = {}  # channel_id -> avg_retention
     try:
         # Buscar todos os videos com retencao > 0, agrupar por canal
-        ret_resp = db.supabase.table('yt_video_metrics') \
-            .select('channel_id,avg_retention_pct') \
-            .gt('avg_retention_pct', 0) \
-            .execute()
+        ret_resp = await run_query(db.supabase.table('yt_video_metrics')
+            .select('channel_id,avg_retention_pct')
+            .gt('avg_retention_pct', 0))
         from collections import defaultdict
         ret_by_channel = defaultdict(list)
         for row in (ret_resp.data or []):
@@ -618,7 +464,7 @@ async def get_mission_control_data(db):
     # Get video_count directly from canais_monitorados (MV may be stale)
     video_count_map = {}  # canal_id -> video_count
     try:
-        vc_resp = db.supabase.table('canais_monitorados').select('id,video_count').eq('tipo', 'nosso').execute()
+        vc_resp = await run_query(db.supabase.table('canais_monitorados').select('id,video_count').eq('tipo', 'nosso'))
         for row in (vc_resp.data or []):
             if row.get('video_count'):
                 video_count_map[row['id']] = row['video_count']
@@ -627,7 +473,7 @@ async def get_mission_control_data(db):
 
     comments_count_map = {}  # canal_id -> count
     try:
-        _cr = db.supabase.rpc('count_comments_by_canal').execute()
+        _cr = await run_query(db.supabase.rpc('count_comments_by_canal'))
         if _cr.data:
             for row in _cr.data:
                 comments_count_map[row['canal_id']] = row['count']
@@ -639,7 +485,7 @@ async def get_mission_control_data(db):
             _offset = 0
             _batch = 1000
             while True:
-                _cr2 = db.supabase.table('video_comments').select('canal_id').range(_offset, _offset + _batch - 1).execute()
+                _cr2 = await run_query(db.supabase.table('video_comments').select('canal_id').range(_offset, _offset + _batch - 1))
                 if not _cr2.data:
                     break
                 all_comment_ids.extend(r['canal_id'] for r in _cr2.data)
@@ -761,20 +607,16 @@ async def get_mission_control_data(db):
         },
         'setores': setores,
     }
-    _mc_cache['data'] = result
-    _mc_cache['timestamp'] = now
     return result
 
 
 async def get_sala_detail(db, canal_id):
     """Return detailed room data with real agent statuses and yt_channel_id."""
     ck = 'sala_{}'.format(canal_id)
-    now = time.time()
-    if ck in _mc_sala_cache:
-        cc = _mc_sala_cache[ck]
-        if (now - cc['timestamp']) < _MC_SALA_CACHE_TTL:
-            return cc['data']
+    return await response_cache.get_or_compute('mission_control_sala', ck, lambda: _build_sala_detail(db, canal_id))
+
 
+async def _build_sala_detail(db, canal_id):
     canais = await db.get_dashboard_from_mv(tipo="nosso", limit=1000, offset=0)
     canal = next((c for c in canais if c['id'] == canal_id), None)
     if not canal:
@@ -784,11 +626,10 @@ async def get_sala_detail(db, canal_id):
     yt_channel_id = None
     copy_spreadsheet_id = None
     try:
-        yt_resp = db.supabase.table('yt_channels') \
-            .select('channel_id,copy_spreadsheet_id') \
-            .eq('canal_monitorado_id', canal_id) \
-            .limit(1) \
-            .execute()
+        yt_resp = await run_query(db.supabase.table('yt_channels')
+            .select('channel_id,copy_spreadsheet_id')
+            .eq('canal_monitorado_id', canal_id)
+            .limit(1))
         if yt_resp.data:
             yt_channel_id = yt_resp.data[0].get('channel_id')
             copy_spreadsheet_id = yt_resp.data[0].get('copy_spreadsheet_id')
@@ -826,11 +667,10 @@ async def get_sala_detail(db, canal_id):
     }
     # Count real comments for this channel
     try:
-        cr = db.supabase.table('video_comments').select('id', count='exact').eq('canal_id', canal_id).execute()
+        cr = await run_query(db.supabase.table('video_comments').select('id', count='exact').eq('canal_id', canal_id))
         result['canal']['total_comentarios'] = cr.count or 0
     except Exception as e:
         logger.warning(f"[MC] Query falhou: {e}")
-    _mc_sala_cache[ck] = {'data': result, 'timestamp': now}
     return result
 
 
@@ -838,12 +678,11 @@ async def get_agent_report(supabase_client, channel_id, agent_type):
     """Return the latest report for a specific agent on a specific channel."""
     if agent_type == 'estrutura_copy':
         try:
-            resp = supabase_client.table('copy_analysis_runs') \
-                .select('*') \
-                .eq('channel_id', channel_id) \
-                .order('run_date', desc=True) \
-                .limit(1) \
-                .execute()
+            resp = await run_query(supabase_client.table('copy_analysis_runs')
+                .select('*')
+                .eq('channel_id', channel_id)
+                .order('run_date', desc=True)
+                .limit(1))
             if resp.data:
                 return {'implemented': True, 'data': resp.data[0]}
             return {'implemented': True, 'data': None, 'message': 'Nenhum relatorio encontrado'}
@@ -852,12 +691,11 @@ async def get_agent_report(supabase_client, channel_id, agent_type):
 
     elif agent_type == 'autenticidade':
         try:
-            resp = supabase_client.table('authenticity_analysis_runs') \
-                .select('*') \
-                .eq('channel_id', channel_id) \
-                .order('run_date', desc=True) \
-                .limit(1) \
-                .execute()
+            resp = await run_query(supabase_client.table('authenticity_analysis_runs')
+                .select('*')
+                .eq('channel_id', channel_id)
+                .order('run_date', desc=True)
+                .limit(1))
             if resp.data:
                 return {'implemented': True, 'data': resp.data[0]}
             return {'implemented': True, 'data': None, 'message': 'Nenhum relatorio encontrado'}
@@ -866,12 +704,11 @@ async def get_agent_report(supabase_client, channel_id, agent_type):
 
     elif agent_type == 'satisfacao':
         try:
-            resp = supabase_client.table('satisfaction_analysis_runs') \
-                .select('*') \
-                .eq('channel_id', channel_id) \
-                .order('run_date', desc=True) \
-                .limit(1) \
-                .execute()
+            resp = await run_query(supabase_client.table('satisfaction_analysis_runs')
+                .select('*')
+                .eq('channel_id', channel_id)
+                .order('run_date', desc=True)
+                .limit(1))
             if resp.data:
                 return {'implemented': True, 'data': resp.data[0]}
             return {'implemented': True, 'data': None, 'message': 'Nenhum relatorio encontrado'}
@@ -880,12 +717,11 @@ async def get_agent_report(supabase_client, channel_id, agent_type):
 
     elif agent_type == 'temas':
         try:
-            resp = supabase_client.table('theme_analysis_runs') \
-                .select('*') \
-                .eq('channel_id', channel_id) \
-                .order('run_date', desc=True) \
-                .limit(1) \
-                .execute()
+            resp = await run_query(supabase_client.table('theme_analysis_runs')
+                .select('*')
+                .eq('channel_id', channel_id)
+                .order('run_date', desc=True)
+                .limit(1))
             if resp.data:
                 return {'implemented': True, 'data': resp.data[0]}
             return {'implemented': True, 'data': None, 'message': 'Nenhum relatorio encontrado'}
@@ -894,12 +730,11 @@ async def get_agent_report(supabase_client, channel_id, agent_type):
 
     elif agent_type == 'motores':
         try:
-            resp = supabase_client.table('motor_analysis_runs') \
-                .select('*') \
-                .eq('channel_id', channel_id) \
-                .order('run_date', desc=True) \
-                .limit(1) \
-                .execute()
+            resp = await run_query(supabase_client.table('motor_analysis_runs')
+                .select('*')
+                .eq('channel_id', channel_id)
+                .order('run_date', desc=True)
+                .limit(1))
             if resp.data:
                 return {'implemented': True, 'data': resp.data[0]}
             return {'implemented': True, 'data': None, 'message': 'Nenhum relatorio encontrado'}
@@ -908,12 +743,11 @@ async def get_agent_report(supabase_client, channel_id, agent_type):
 
     elif agent_type == 'ordenador':
         try:
-            resp = supabase_client.table('production_order_runs') \
-                .select('*') \
-                .eq('channel_id', channel_id) \
-                .order('run_date', desc=True) \
-                .limit(1) \
-                .execute()
+            resp = await run_query(supabase_client.table('production_order_runs')
+                .select('*')
+                .eq('channel_id', channel_id)
+                .order('run_date', desc=True)
+                .limit(1))
             if resp.data:
                 return {'implemented': True, 'data': resp.data[0]}
             return {'implemented': True, 'data': None, 'message': 'Nenhum relatorio encontrado'}
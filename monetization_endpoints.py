@@ -7,6 +7,7 @@ from typing import Optional, List, Dict
 from datetime import datetime, timedelta, date
 from dateutil.relativedelta import relativedelta
 from database import SupabaseClient
+from revenue_rollup import get_revenue_rollup
 import logging
 
 logger = logging.getLogger(__name__)
@@ -47,60 +48,31 @@ def calculate_monetization_period(reference_date: date = None):
 
     return start_date.isoformat(), end_date.isoformat()
 
-def calculate_channel_rpm(channel_id: str, days: int = 30) -> float:
-    """Calcula RPM médio do canal baseado apenas em dados reais"""
+async def calculate_channel_rpm(channel_id: str, days: int = 30) -> float:
+    """Calcula RPM médio do canal baseado apenas em dados reais (rollup de receita)"""
     try:
-        cutoff_date = (datetime.now().date() - timedelta(days=days)).isoformat()
-
-        response = db.supabase.table("yt_daily_metrics")\
-            .select("revenue, views")\
-            .eq("channel_id", channel_id)\
-            .eq("is_estimate", False)\
-            .gte("date", cutoff_date)\
-            .execute()
-
-        if not response.data:
-            return 0.0
-
-        total_revenue = sum(r.get('revenue', 0) or 0 for r in response.data)
-        total_views = sum(r.get('views', 0) or 0 for r in response.data)
+        rollup = await get_revenue_rollup(db)
+        today = datetime.now().date()
+        totals = rollup.totals(channel_id, today - timedelta(days=days), today, real_only=True)
 
-        if total_views == 0:
+        if totals['views'] == 0:
             return 0.0
 
-        return round((total_revenue / total_views) * 1000, 2)
+        return round((totals['revenue'] / totals['views']) * 1000, 2)
 
     except Exception as e:
         logger.error(f"Erro ao calcular RPM: {e}")
         return 0.0
 
-def get_growth_rate(channel_id: str, days: int = 7) -> float:
+async def get_growth_rate(channel_id: str, days: int = 7) -> float:
     """Calcula taxa de crescimento (últimos N dias vs N dias anteriores)"""
     try:
+        rollup = await get_revenue_rollup(db)
         today = datetime.now().date()
-        period1_start = (today - timedelta(days=days)).isoformat()
-        period1_end = today.isoformat()
-        period2_start = (today - timedelta(days=days*2)).isoformat()
-        period2_end = period1_start
-
-        # Período atual
-        response1 = db.supabase.table("yt_daily_metrics")\
-            .select("revenue")\
-            .eq("channel_id", channel_id)\
-            .gte("date", period1_start)\
-            .lte("date", period1_end)\
-            .execute()
 
-        # Período anterior
-        response2 = db.supabase.table("yt_daily_metrics")\
-            .select("revenue")\
-            .eq("channel_id", channel_id)\
-            .gte("date", period2_start)\
-            .lt("date", period2_end)\
-            .execute()
-
-        revenue1 = sum(r.get('revenue', 0) or 0 for r in (response1.data or []))
-        revenue2 = sum(r.get('revenue', 0) or 0 for r in (response2.data or []))
+        # Período atual [hoje - N, hoje] e anterior [hoje - 2N, hoje - N)
+        revenue1 = rollup.totals(channel_id, today - timedelta(days=days), today)['revenue']
+        revenue2 = rollup.totals(channel_id, today - timedelta(days=days*2), today - timedelta(days=days + 1))['revenue']
 
         if revenue2 == 0:
             return 0.0
@@ -173,55 +145,22 @@ async def get_monetization_summary(
 
             end_date = today.isoformat()
 
-        # Buscar canais monetizados
-        channels_response = db.supabase.table("yt_channels")\
-            .select("channel_id")\
-            .eq("show_monetization_history", True)\
-            .execute()
-
-        total_monetized_channels = len(channels_response.data) if channels_response.data else 0
+        # Canais monetizados + séries acumuladas de receita (rollup em memória)
+        rollup = await get_revenue_rollup(db)
+        total_monetized_channels = len(rollup.channels)
 
         # Extrair channel_ids para filtrar métricas (18 canais: 15 ativos + 3 desmonetizados)
-        monetized_channel_ids = [c['channel_id'] for c in (channels_response.data or [])]
-
-        # Buscar métricas do período APENAS dos 18 canais visíveis
-        # Supabase tem limit de 1000 registros, então usamos paginação
-        metrics = []
-        page_size = 1000
-        offset = 0
-
-        while True:
-            query = db.supabase.table("yt_daily_metrics")\
-                .select("revenue, views, channel_id, is_estimate")\
-                .in_("channel_id", monetized_channel_ids)\
-                .gte("date", start_date)\
-                .lte("date", end_date)\
-                .range(offset, offset + page_size - 1)
-
-            if type_filter == "real_only":
-                query = query.eq("is_estimate", False)
-
-            page_response = query.execute()
-            page_data = page_response.data or []
-
-            if not page_data:
-                break
-
-            metrics.extend(page_data)
+        monetized_channel_ids = rollup.channel_ids
 
-            if len(page_data) < page_size:
-                break
-
-            offset += page_size
-
-        # Calcular totais
-        total_revenue = sum(m.get('revenue', 0) or 0 for m in metrics)
-        total_views = sum(m.get('views', 0) or 0 for m in metrics)
+        # Calcular totais do período APENAS dos 18 canais visíveis
+        total_revenue, total_views = rollup.sum_totals(
+            monetized_channel_ids, start_date, end_date, real_only=(type_filter == "real_only")
+        )
 
         # Calcular RPM médio (só dados reais)
-        real_metrics = [m for m in metrics if not m.get('is_estimate', False)]
-        total_revenue_real = sum(m.get('revenue', 0) or 0 for m in real_metrics)
-        total_views_real = sum(m.get('views', 0) or 0 for m in real_metrics)
+        total_revenue_real, total_views_real = rollup.sum_totals(
+            monetized_channel_ids, start_date, end_date, real_only=True
+        )
 
         rpm_avg = round((total_revenue_real / total_views_real) * 1000, 2) if total_views_real > 0 else 0.0
 
@@ -250,52 +189,11 @@ async def get_monetization_summary(
         growth_rate = 0.0
 
         if period in ["7d", "15d", "30d", "total"]:
-            # Período atual (últimos 7 dias) - APENAS dos 18 canais visíveis
-            current_start = (today - timedelta(days=7)).isoformat()
-
-            # Buscar com paginação
-            current_data = []
-            offset = 0
-            while True:
-                result = db.supabase.table("yt_daily_metrics")\
-                    .select("revenue")\
-                    .in_("channel_id", monetized_channel_ids)\
-                    .gte("date", current_start)\
-                    .range(offset, offset + 999)\
-                    .execute()
-
-                if not result.data:
-                    break
-                current_data.extend(result.data)
-                if len(result.data) < 1000:
-                    break
-                offset += 1000
-
-            # Período anterior (7 dias antes) - APENAS dos 18 canais visíveis
-            previous_start = (today - timedelta(days=14)).isoformat()
-            previous_end = current_start
-
-            # Buscar com paginação
-            previous_data = []
-            offset = 0
-            while True:
-                result = db.supabase.table("yt_daily_metrics")\
-                    .select("revenue")\
-                    .in_("channel_id", monetized_channel_ids)\
-                    .gte("date", previous_start)\
-                    .lt("date", previous_end)\
-                    .range(offset, offset + 999)\
-                    .execute()
-
-                if not result.data:
-                    break
-                previous_data.extend(result.data)
-                if len(result.data) < 1000:
-                    break
-                offset += 1000
-
-            current_revenue = sum(m.get('revenue', 0) or 0 for m in current_data)
-            previous_revenue = sum(m.get('revenue', 0) or 0 for m in previous_data)
+            # Período atual (últimos 7 dias) vs 7 dias anteriores - APENAS dos 18 canais visíveis
+            current_revenue, _ = rollup.sum_totals(monetized_channel_ids, today - timedelta(days=7), today)
+            previous_revenue, _ = rollup.sum_totals(
+                monetized_channel_ids, today - timedelta(days=14), today - timedelta(days=8)
+            )
 
             if previous_revenue > 0:
                 growth_rate = round(((current_revenue - previous_revenue) / previous_revenue) * 100, 1)
@@ -375,70 +273,10 @@ async def get_monetization_channels(
 
             end_date = today.isoformat()
 
-        # QUERY 1: Buscar canais com subnicho/lingua (18 canais)
-        # Busca yt_channels + LEFT JOIN com canais_monitorados via nome
-        channels_response = db.supabase.table("yt_channels")\
-            .select("channel_id, channel_name, is_monetized")\
-            .eq("show_monetization_history", True)\
-            .execute()
-
-        channels = channels_response.data or []
-
-        # Criar mapa de channel_name -> subnicho/lingua
-        # (buscamos todos os canais_monitorados de uma vez)
-        monitored_response = db.supabase.table("canais_monitorados")\
-            .select("nome_canal, subnicho, lingua")\
-            .eq("tipo", "nosso")\
-            .execute()
-
-        # Criar dicionário de lookup
-        monitored_map = {}
-        for canal in (monitored_response.data or []):
-            nome = canal['nome_canal'].lower()
-            monitored_map[nome] = {
-                'subnicho': canal.get('subnicho', 'Outros'),
-                'lingua': canal.get('lingua', 'N/A')
-            }
-
-        # QUERY 2: Buscar TODAS as métricas do período dos 18 canais (com paginação)
-        monetized_channel_ids = [c['channel_id'] for c in channels]
-
-        all_metrics = []
-        page_size = 1000
-        offset = 0
-
-        while True:
-            metrics_query = db.supabase.table("yt_daily_metrics")\
-                .select("channel_id, date, revenue, views, is_estimate")\
-                .in_("channel_id", monetized_channel_ids)\
-                .gte("date", start_date)\
-                .lte("date", end_date)\
-                .order("date", desc=True)\
-                .range(offset, offset + page_size - 1)
-
-            if type_filter == "real_only":
-                metrics_query = metrics_query.eq("is_estimate", False)
-
-            page_response = metrics_query.execute()
-            page_data = page_response.data or []
-
-            if not page_data:
-                break
-
-            all_metrics.extend(page_data)
-
-            if len(page_data) < page_size:
-                break
-
-            offset += page_size
-
-        # Agrupar métricas por channel_id
-        metrics_by_channel = {}
-        for metric in all_metrics:
-            ch_id = metric['channel_id']
-            if ch_id not in metrics_by_channel:
-                metrics_by_channel[ch_id] = []
-            metrics_by_channel[ch_id].append(metric)
+        # Canais (18), subnicho/lingua e séries de receita vêm do rollup em memória
+        rollup = await get_revenue_rollup(db)
+        channels = rollup.channels
+        real_only = type_filter == "real_only"
 
         # Processar cada canal (agora sem queries adicionais!)
         result_by_subnicho = {}
@@ -447,9 +285,15 @@ async def get_monetization_channels(
             channel_id = channel['channel_id']
             channel_name = channel['channel_name']
 
-            # Buscar subnicho/língua no mapa
-            nome_lower = channel_name.lower()
-            canal_info = monitored_map.get(nome_lower, {'subnicho': 'Outros', 'lingua': 'N/A'})
+            # Buscar subnicho/língua (canais "nosso" com o mesmo nome)
+            monitored = rollup.channel_info(channel_name)
+            if monitored:
+                canal_info = {
+                    'subnicho': monitored.get('subnicho', 'Outros'),
+                    'lingua': monitored.get('lingua', 'N/A')
+                }
+            else:
+                canal_info = {'subnicho': 'Outros', 'lingua': 'N/A'}
 
             canal_subnicho = canal_info['subnicho']
             canal_lingua = canal_info['lingua']
@@ -461,27 +305,12 @@ async def get_monetization_channels(
             if subnicho and canal_subnicho.lower() != subnicho.lower():
                 continue
 
-            # Buscar métricas do canal no mapa
-            period_data = metrics_by_channel.get(channel_id, [])
-
-            # Agregar totais do periodo
-            total_revenue = 0
-            total_views = 0
-            has_estimate = False
-            last_date = None
-
-            for day in period_data:
-                revenue = day.get('revenue', 0) or 0
-                views = day.get('views', 0) or 0
-                total_revenue += revenue
-                total_views += views
-
-                if day.get('is_estimate', False):
-                    has_estimate = True
-
-                # Pegar a data mais recente
-                if last_date is None or day['date'] > last_date:
-                    last_date = day['date']
+            # Totais do periodo (2 lookups nas séries acumuladas)
+            totals = rollup.totals(channel_id, start_date, end_date, real_only=real_only)
+            total_revenue = totals['revenue']
+            total_views = totals['views']
+            has_estimate = totals['has_estimate']
+            last_date = totals['last_date']
 
             # Calcular RPM do periodo
             period_rpm = round((total_revenue / total_views) * 1000, 2) if total_views > 0 else 0.0
@@ -601,7 +430,7 @@ async def get_channel_history(channel_id: str):
 
         # Calcular totais
         total_revenue_real = sum(h.get('revenue', 0) or 0 for h in history)
-        rpm_avg = calculate_channel_rpm(channel_id, days=999)  # Todo histórico
+        rpm_avg = await calculate_channel_rpm(channel_id, days=999)  # Todo histórico
 
         # Calcular dias monetizados
         today = datetime.now().date()
@@ -666,13 +495,9 @@ async def get_monetization_analytics(
     - Retencao, tempo medio, CTR
     """
     try:
-        # Buscar IDs dos 18 canais monetizados
-        channels_response = db.supabase.table("yt_channels")\
-            .select("channel_id")\
-            .eq("show_monetization_history", True)\
-            .execute()
-
-        monetized_channel_ids = [c['channel_id'] for c in (channels_response.data or [])]
+        # IDs dos 18 canais monetizados + séries de receita (rollup em memória)
+        rollup = await get_revenue_rollup(db)
+        monetized_channel_ids = rollup.channel_ids
 
         today = datetime.now().date()
 
@@ -725,7 +550,9 @@ async def get_monetization_analytics(
         else:
             # Lógica original baseada em period
             if period == "monetizacao":
-                start_date, end_date = calculate_monetization_period()
+                cutoff_date, end_date = calculate_monetization_period()
+                comparison_start = None
+                comparison_end = None
             elif period == "total":
                 cutoff_date = "2025-10-26"
                 end_date = today.isoformat()
@@ -758,90 +585,25 @@ async def get_monetization_analytics(
                 comparison_start = (today - timedelta(days=60)).isoformat()
                 comparison_end = (today - timedelta(days=30)).isoformat()
 
-        # Métricas do período atual (com paginação)
-        current_data = []
-        offset = 0
-        while True:
-            page = db.supabase.table("yt_daily_metrics")\
-                .select("revenue, views, avg_retention_pct, avg_view_duration_sec, ctr_approx")\
-                .in_("channel_id", monetized_channel_ids)\
-                .gte("date", cutoff_date)\
-                .lte("date", end_date)\
-                .range(offset, offset + 999)\
-                .execute()
-            if not page.data:
-                break
-            current_data.extend(page.data)
-            if len(page.data) < 1000:
-                break
-            offset += 1000
-        current_revenue = sum(m.get('revenue', 0) or 0 for m in current_data)
+        # Revenue do período atual (séries acumuladas do rollup)
+        current_revenue, _ = rollup.sum_totals(monetized_channel_ids, cutoff_date, end_date)
 
-        # Métricas do período de comparação (se aplicável)
+        # Revenue do período de comparação (se aplicável)
         previous_revenue = 0
         growth_pct = 0.0
 
         if comparison_start and comparison_end:
-            previous_data = []
-            offset = 0
-            while True:
-                page = db.supabase.table("yt_daily_metrics")\
-                    .select("revenue")\
-                    .in_("channel_id", monetized_channel_ids)\
-                    .gte("date", comparison_start)\
-                    .lte("date", comparison_end)\
-                    .range(offset, offset + 999)\
-                    .execute()
-                if not page.data:
-                    break
-                previous_data.extend(page.data)
-                if len(page.data) < 1000:
-                    break
-                offset += 1000
-            previous_revenue = sum(m.get('revenue', 0) or 0 for m in previous_data)
+            previous_revenue, _ = rollup.sum_totals(monetized_channel_ids, comparison_start, comparison_end)
 
             # Calcular crescimento
             if previous_revenue > 0:
                 growth_pct = round(((current_revenue - previous_revenue) / previous_revenue) * 100, 1)
 
         # Sempre calcular comparison_7d como fallback
-        seven_days_ago = (today - timedelta(days=7)).isoformat()
-        fourteen_days_ago = (today - timedelta(days=14)).isoformat()
-
-        seven_day_data = []
-        offset = 0
-        while True:
-            page = db.supabase.table("yt_daily_metrics")\
-                .select("revenue")\
-                .in_("channel_id", monetized_channel_ids)\
-                .gte("date", seven_days_ago)\
-                .range(offset, offset + 999)\
-                .execute()
-            if not page.data:
-                break
-            seven_day_data.extend(page.data)
-            if len(page.data) < 1000:
-                break
-            offset += 1000
-        seven_day_revenue = sum(m.get('revenue', 0) or 0 for m in seven_day_data)
-
-        seven_day_prev_data = []
-        offset = 0
-        while True:
-            page = db.supabase.table("yt_daily_metrics")\
-                .select("revenue")\
-                .in_("channel_id", monetized_channel_ids)\
-                .gte("date", fourteen_days_ago)\
-                .lt("date", seven_days_ago)\
-                .range(offset, offset + 999)\
-                .execute()
-            if not page.data:
-                break
-            seven_day_prev_data.extend(page.data)
-            if len(page.data) < 1000:
-                break
-            offset += 1000
-        seven_day_prev_revenue = sum(m.get('revenue', 0) or 0 for m in seven_day_prev_data)
+        seven_day_revenue, _ = rollup.sum_totals(monetized_channel_ids, today - timedelta(days=7), today)
+        seven_day_prev_revenue, _ = rollup.sum_totals(
+            monetized_channel_ids, today - timedelta(days=14), today - timedelta(days=8)
+        )
 
         seven_day_growth = round(((seven_day_revenue - seven_day_prev_revenue) / seven_day_prev_revenue) * 100, 1) if seven_day_prev_revenue > 0 else 0.0
 
@@ -860,28 +622,11 @@ async def get_monetization_analytics(
             projection_monthly = round(seven_day_revenue * 4.3, 2)
 
         # Calcular crescimento mensal
-        thirty_days_ago = (today - timedelta(days=30)).isoformat()
-        last_month_data = []
-        offset = 0
-        while True:
-            page = db.supabase.table("yt_daily_metrics")\
-                .select("revenue")\
-                .in_("channel_id", monetized_channel_ids)\
-                .gte("date", thirty_days_ago)\
-                .range(offset, offset + 999)\
-                .execute()
-            if not page.data:
-                break
-            last_month_data.extend(page.data)
-            if len(page.data) < 1000:
-                break
-            offset += 1000
-
-        last_month_revenue = sum(m.get('revenue', 0) or 0 for m in last_month_data)
+        last_month_revenue, _ = rollup.sum_totals(monetized_channel_ids, today - timedelta(days=30), today)
         growth_vs_last_month = round(((projection_monthly - last_month_revenue) / last_month_revenue) * 100, 1) if last_month_revenue > 0 else 0.0
 
         # Melhor/pior dia especifico baseado no periodo e filtros
-        best_day, worst_day = analyze_best_worst_days(cutoff_date, language, subnicho)
+        best_day, worst_day = analyze_best_worst_days(rollup, cutoff_date, language, subnicho)
 
         # Métricas de analytics (média do período selecionado)
         analytics_data = []
@@ -937,82 +682,29 @@ async def get_monetization_analytics(
         logger.error(f"Erro em /analytics: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-def analyze_best_worst_days(cutoff_date: str, language: Optional[str] = None, subnicho: Optional[str] = None):
+def analyze_best_worst_days(rollup, cutoff_date: str, language: Optional[str] = None, subnicho: Optional[str] = None):
     """Analisa melhor e pior dia especifico do periodo com revenue total"""
     try:
-        # Buscar IDs dos 18 canais monetizados
-        channels_response = db.supabase.table("yt_channels")\
-            .select("channel_id, channel_name")\
-            .eq("show_monetization_history", True)\
-            .execute()
-
-        monetized_channel_ids = [c['channel_id'] for c in (channels_response.data or [])]
-
-        # Buscar metricas do periodo filtrado (COM PAGINAÇÃO)
-        data = []
-        page_size = 1000
-        offset = 0
-
-        while True:
-            page_response = db.supabase.table("yt_daily_metrics")\
-                .select("date, revenue, channel_id")\
-                .in_("channel_id", monetized_channel_ids)\
-                .gte("date", cutoff_date)\
-                .range(offset, offset + page_size - 1)\
-                .execute()
-
-            page_data = page_response.data or []
-
-            if not page_data:
-                break
-
-            data.extend(page_data)
-
-            if len(page_data) < page_size:
-                break
-
-            offset += page_size
-
-        if not data:
-            return {"date": "N/A", "revenue": 0}, {"date": "N/A", "revenue": 0}
-
-        # Se houver filtros de lingua/subnicho, precisamos filtrar canais
-        if language or subnicho:
-            channels = channels_response.data or []
-            filtered_channel_ids = []
-
-            for ch in channels:
-                info = db.supabase.table("canais_monitorados")\
-                    .select("subnicho, lingua")\
-                    .ilike("nome_canal", f"%{ch['channel_name']}%")\
-                    .limit(1)\
-                    .execute()
-
-                if info.data:
-                    canal_info = info.data[0]
-                    canal_lingua = canal_info.get('lingua', '')
-                    canal_subnicho = canal_info.get('subnicho', '')
-
-                    if language and canal_lingua.lower() != language.lower():
-                        continue
-                    if subnicho and canal_subnicho.lower() != subnicho.lower():
-                        continue
-
-                    filtered_channel_ids.append(ch['channel_id'])
-
-            data = [m for m in data if m['channel_id'] in filtered_channel_ids]
+        # Canais monetizados (filtrados por lingua/subnicho se pedido)
+        channel_ids = []
+        for ch in rollup.channels:
+            if language or subnicho:
+                canal_info = rollup.channel_info(ch['channel_name'], exact=False)
+                if not canal_info:
+                    continue
 
-        # Agrupar revenue por data
-        revenue_by_date = {}
+                canal_lingua = canal_info.get('lingua', '') or ''
+                canal_subnicho = canal_info.get('subnicho', '') or ''
 
-        for item in data:
-            day_date = item['date']
-            revenue = item.get('revenue', 0) or 0
+                if language and canal_lingua.lower() != language.lower():
+                    continue
+                if subnicho and canal_subnicho.lower() != subnicho.lower():
+                    continue
 
-            if day_date not in revenue_by_date:
-                revenue_by_date[day_date] = 0
+            channel_ids.append(ch['channel_id'])
 
-            revenue_by_date[day_date] += revenue
+        # Revenue por data (dias com dados a partir do cutoff)
+        revenue_by_date = rollup.revenue_by_date(channel_ids, cutoff_date, datetime.now().date())
 
         if not revenue_by_date:
             return {"date": "N/A", "revenue": 0}, {"date": "N/A", "revenue": 0}
@@ -1072,7 +764,7 @@ async def get_top_performers(
         else:
             # Lógica original baseada em period
             if period == "monetizacao":
-                start_date, end_date = calculate_monetization_period()
+                cutoff_date, end_date = calculate_monetization_period()
             elif period == "total":
                 cutoff_date = "2025-10-26"  # Início da monetização
             elif period == "24h":
@@ -1088,42 +780,18 @@ async def get_top_performers(
 
             end_date = today.isoformat()
 
-        # Buscar canais monetizados
-        channels = db.supabase.table("yt_channels")\
-            .select("channel_id, channel_name")\
-            .eq("show_monetization_history", True)\
-            .execute()
+        # Canais monetizados + séries de receita (rollup em memória)
+        rollup = await get_revenue_rollup(db)
 
-        channels_data = channels.data or []
-
-        # Para cada canal, calcular RPM e Revenue
+        # Para cada canal, calcular RPM e Revenue (só dados reais)
         channel_stats = []
 
-        for channel in channels_data:
-            channel_id = channel['channel_id']
+        for channel in rollup.channels:
             channel_name = channel['channel_name']
 
-            # Métricas do período (com paginação)
-            data = []
-            offset = 0
-            while True:
-                page = db.supabase.table("yt_daily_metrics")\
-                    .select("revenue, views")\
-                    .eq("channel_id", channel_id)\
-                    .eq("is_estimate", False)\
-                    .gte("date", cutoff_date)\
-                    .lte("date", end_date)\
-                    .range(offset, offset + 999)\
-                    .execute()
-                if not page.data:
-                    break
-                data.extend(page.data)
-                if len(page.data) < 1000:
-                    break
-                offset += 1000
-
-            total_revenue = sum(m.get('revenue', 0) or 0 for m in data)
-            total_views = sum(m.get('views', 0) or 0 for m in data)
+            totals = rollup.totals(channel['channel_id'], cutoff_date, end_date, real_only=True)
+            total_revenue = totals['revenue']
+            total_views = totals['views']
 
             rpm = round((total_revenue / total_views) * 1000, 2) if total_views > 0 else 0.0
 
@@ -1203,13 +871,9 @@ async def get_monetization_by_language(
             cutoff_date = (today - timedelta(days=30)).isoformat()
             end_date = today.isoformat()
 
-        # Buscar todos os canais monetizados com língua
-        channels = db.supabase.table("yt_channels")\
-            .select("channel_id, channel_name")\
-            .eq("show_monetization_history", True)\
-            .execute()
-
-        channels_data = channels.data or []
+        # Canais monetizados, língua e séries de receita (rollup em memória)
+        rollup = await get_revenue_rollup(db)
+        channels_data = rollup.channels
 
         # Agrupar por língua
         by_language = {}
@@ -1218,38 +882,18 @@ async def get_monetization_by_language(
             channel_id = channel['channel_id']
             channel_name = channel['channel_name']
 
-            # Buscar língua
-            canal_info = db.supabase.table("canais_monitorados")\
-                .select("lingua")\
-                .ilike("nome_canal", f"%{channel_name}%")\
-                .limit(1)\
-                .execute()
+            # Buscar língua (nome contido, como o ilike '%nome%')
+            canal_info = rollup.channel_info(channel_name, exact=False)
 
-            if not canal_info.data:
+            if not canal_info:
                 continue
 
-            lingua = canal_info.data[0].get('lingua', 'N/A')
+            lingua = canal_info.get('lingua', 'N/A')
 
-            # Buscar métricas (com paginação)
-            data = []
-            offset = 0
-            while True:
-                page = db.supabase.table("yt_daily_metrics")\
-                    .select("revenue, views")\
-                    .eq("channel_id", channel_id)\
-                    .gte("date", cutoff_date)\
-                    .lte("date", end_date)\
-                    .range(offset, offset + 999)\
-                    .execute()
-                if not page.data:
-                    break
-                data.extend(page.data)
-                if len(page.data) < 1000:
-                    break
-                offset += 1000
-
-            revenue = sum(m.get('revenue', 0) or 0 for m in data)
-            views = sum(m.get('views', 0) or 0 for m in data)
+            # Totais do período (séries acumuladas do rollup)
+            totals = rollup.totals(channel_id, cutoff_date, end_date)
+            revenue = totals['revenue']
+            views = totals['views']
 
             if lingua not in by_language:
                 by_language[lingua] = {
@@ -1322,12 +966,8 @@ async def get_monetization_by_subnicho(
             end_date = today.isoformat()
 
         # Similar ao by-language, mas agrupa por subnicho
-        channels = db.supabase.table("yt_channels")\
-            .select("channel_id, channel_name")\
-            .eq("show_monetization_history", True)\
-            .execute()
-
-        channels_data = channels.data or []
+        rollup = await get_revenue_rollup(db)
+        channels_data = rollup.channels
 
         by_subnicho = {}
 
@@ -1335,38 +975,18 @@ async def get_monetization_by_subnicho(
             channel_id = channel['channel_id']
             channel_name = channel['channel_name']
 
-            # Buscar subnicho
-            canal_info = db.supabase.table("canais_monitorados")\
-                .select("subnicho")\
-                .ilike("nome_canal", f"%{channel_name}%")\
-                .limit(1)\
-                .execute()
+            # Buscar subnicho (nome contido, como o ilike '%nome%')
+            canal_info = rollup.channel_info(channel_name, exact=False)
 
-            if not canal_info.data:
+            if not canal_info:
                 continue
 
-            subnicho = canal_info.data[0].get('subnicho', 'Outros')
-
-            # Buscar métricas (com paginação)
-            data = []
-            offset = 0
-            while True:
-                page = db.supabase.table("yt_daily_metrics")\
-                    .select("revenue, views")\
-                    .eq("channel_id", channel_id)\
-                    .gte("date", cutoff_date)\
-                    .lte("date", end_date)\
-                    .range(offset, offset + 999)\
-                    .execute()
-                if not page.data:
-                    break
-                data.extend(page.data)
-                if len(page.data) < 1000:
-                    break
-                offset += 1000
+            subnicho = canal_info.get('subnicho', 'Outros')
 
-            revenue = sum(m.get('revenue', 0) or 0 for m in data)
-            views = sum(m.get('views', 0) or 0 for m in data)
+            # Totais do período (séries acumuladas do rollup)
+            totals = rollup.totals(channel_id, cutoff_date, end_date)
+            revenue = totals['revenue']
+            views = totals['views']
 
             if subnicho not in by_subnicho:
                 by_subnicho[subnicho] = {
@@ -1457,67 +1077,25 @@ async def get_revenue_24h():
     - estimate: estimativa do dia atual
     """
     try:
-        # Buscar IDs dos 18 canais monetizados
-        channels_response = db.supabase.table("yt_channels")\
-            .select("channel_id")\
-            .eq("show_monetization_history", True)\
-            .execute()
-
-        monetized_channel_ids = [c['channel_id'] for c in (channels_response.data or [])]
+        # IDs dos 18 canais monetizados + séries de receita (rollup em memória)
+        rollup = await get_revenue_rollup(db)
+        monetized_channel_ids = rollup.channel_ids
 
         today = datetime.now().date()
 
-        # Buscar ultima data com dados reais (is_estimate=false)
-        last_real_query = db.supabase.table("yt_daily_metrics")\
-            .select("date")\
-            .eq("is_estimate", False)\
-            .order("date", desc=True)\
-            .limit(1)\
-            .execute()
+        # Ultima data com dados reais (is_estimate=false)
+        last_real_date = rollup.last_real_date
 
-        last_real_date = None
-        if last_real_query.data:
-            last_real_date = last_real_query.data[0]['date']
-
-        # Revenue real (ultima coleta) com paginação
+        # Revenue real (ultima coleta)
         real_revenue = 0
         if last_real_date:
-            offset = 0
-            while True:
-                page = db.supabase.table("yt_daily_metrics")\
-                    .select("revenue")\
-                    .in_("channel_id", monetized_channel_ids)\
-                    .eq("date", last_real_date)\
-                    .eq("is_estimate", False)\
-                    .range(offset, offset + 999)\
-                    .execute()
-                if not page.data:
-                    break
-                for item in page.data:
-                    real_revenue += item.get('revenue', 0) or 0
-                if len(page.data) < 1000:
-                    break
-                offset += 1000
+            real_revenue, _ = rollup.sum_totals(monetized_channel_ids, last_real_date, last_real_date, real_only=True)
 
-        # Buscar dados estimados de ONTEM (D-1) com paginação
+        # Revenue estimada de ONTEM (D-1) = total do dia - parte real
         yesterday = (today - timedelta(days=1)).isoformat()
-        estimate_revenue = 0
-        offset = 0
-        while True:
-            page = db.supabase.table("yt_daily_metrics")\
-                .select("revenue")\
-                .in_("channel_id", monetized_channel_ids)\
-                .eq("date", yesterday)\
-                .eq("is_estimate", True)\
-                .range(offset, offset + 999)\
-                .execute()
-            if not page.data:
-                break
-            for item in page.data:
-                estimate_revenue += item.get('revenue', 0) or 0
-            if len(page.data) < 1000:
-                break
-            offset += 1000
+        yesterday_total, _ = rollup.sum_totals(monetized_channel_ids, yesterday, yesterday)
+        yesterday_real, _ = rollup.sum_totals(monetized_channel_ids, yesterday, yesterday, real_only=True)
+        estimate_revenue = yesterday_total - yesterday_real
 
         # Formatar datas
         real_date_formatted = "N/A"
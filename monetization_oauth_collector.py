@@ -10,7 +10,11 @@ import requests
 import json
 import logging
 import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -53,6 +57,21 @@ SUPABASE_HEADERS = {
     "Prefer": "resolution=merge-duplicates,return=minimal"
 }
 
+# Concorrência da coleta (canais em paralelo, por proxy e relatórios por canal)
+OAUTH_CHANNEL_CONCURRENCY = int(os.environ.get("OAUTH_CHANNEL_CONCURRENCY", "6"))
+OAUTH_PER_PROXY_CONCURRENCY = int(os.environ.get("OAUTH_PER_PROXY_CONCURRENCY", "3"))
+OAUTH_REPORT_CONCURRENCY = int(os.environ.get("OAUTH_REPORT_CONCURRENCY", "12"))
+OAUTH_UPSERT_CHUNK_SIZE = 500
+
+_channel_executor = ThreadPoolExecutor(max_workers=max(1, OAUTH_CHANNEL_CONCURRENCY), thread_name_prefix="oauth-canal")
+_report_executor = ThreadPoolExecutor(max_workers=max(1, OAUTH_REPORT_CONCURRENCY), thread_name_prefix="oauth-report")
+
+# Sessão HTTP compartilhada (keep-alive) - pool dimensionado para todas as threads
+_http = requests.Session()
+_http_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=OAUTH_CHANNEL_CONCURRENCY + OAUTH_REPORT_CONCURRENCY)
+_http.mount("https://", _http_adapter)
+_http.mount("http://", _http_adapter)
+
 # =============================================================================
 # FUNÇÕES AUXILIARES
 # =============================================================================
@@ -60,7 +79,7 @@ SUPABASE_HEADERS = {
 def get_channels():
     """Busca todos os canais com tokens OAuth (monetizados + nao-monetizados)"""
     # Passo 1: Buscar todos channel_ids que possuem tokens OAuth
-    resp_tokens = requests.get(
+    resp_tokens = _http.get(
         f"{SUPABASE_URL}/rest/v1/yt_oauth_tokens",
         params={"select": "channel_id"},
         headers={"apikey": AUTH_KEY, "Authorization": f"Bearer {AUTH_KEY}"}
@@ -75,7 +94,7 @@ def get_channels():
 
     # Passo 2: Buscar info dos canais
     ids_str = ",".join(channel_ids)
-    resp = requests.get(
+    resp = _http.get(
         f"{SUPABASE_URL}/rest/v1/yt_channels",
         params={
             "channel_id": f"in.({ids_str})",
@@ -93,7 +112,7 @@ def get_channels():
 
 def get_tokens(channel_id):
     """Busca tokens OAuth de um canal"""
-    resp = requests.get(
+    resp = _http.get(
         f"{SUPABASE_URL}/rest/v1/yt_oauth_tokens",
         params={"channel_id": f"eq.{channel_id}"},
         headers={"apikey": AUTH_KEY, "Authorization": f"Bearer {AUTH_KEY}"}
@@ -104,7 +123,7 @@ def get_tokens(channel_id):
 
 def get_proxy_credentials(proxy_name):
     """Busca credenciais OAuth do proxy"""
-    resp = requests.get(
+    resp = _http.get(
         f"{SUPABASE_URL}/rest/v1/yt_proxy_credentials",
         params={"proxy_name": f"eq.{proxy_name}"},
         headers={"apikey": AUTH_KEY, "Authorization": f"Bearer {AUTH_KEY}"}
@@ -116,7 +135,7 @@ def get_proxy_credentials(proxy_name):
 
 def get_channel_credentials(channel_id):
     """Busca credenciais OAuth isoladas do canal"""
-    resp = requests.get(
+    resp = _http.get(
         f"{SUPABASE_URL}/rest/v1/yt_channel_credentials",
         params={"channel_id": f"eq.{channel_id}"},
         headers={"apikey": AUTH_KEY, "Authorization": f"Bearer {AUTH_KEY}"}
@@ -128,7 +147,7 @@ def get_channel_credentials(channel_id):
 
 def refresh_access_token(refresh_token, client_id, client_secret):
     """Renova o access_token usando o refresh_token"""
-    resp = requests.post("https://oauth2.googleapis.com/token", data={
+    resp = _http.post("https://oauth2.googleapis.com/token", data={
         "client_id": client_id,
         "client_secret": client_secret,
         "refresh_token": refresh_token,
@@ -141,7 +160,7 @@ def refresh_access_token(refresh_token, client_id, client_secret):
 
 def update_tokens(channel_id, access_token):
     """Atualiza access_token no Supabase"""
-    requests.patch(
+    _http.patch(
         f"{SUPABASE_URL}/rest/v1/yt_oauth_tokens",
         params={"channel_id": f"eq.{channel_id}"},
         headers=SUPABASE_HEADERS,
@@ -150,7 +169,7 @@ def update_tokens(channel_id, access_token):
 
 def log_collection(channel_id, status, message):
     """Salva log de coleta no Supabase"""
-    requests.post(
+    _http.post(
         f"{SUPABASE_URL}/rest/v1/yt_collection_logs",
         headers=SUPABASE_HEADERS,
         json={
@@ -168,7 +187,7 @@ def collect_daily_metrics(channel_id, access_token, start_date, end_date):
     """Coleta métricas diárias do canal"""
     headers = {"Authorization": f"Bearer {access_token}"}
 
-    resp = requests.get(
+    resp = _http.get(
         "https://youtubeanalytics.googleapis.com/v2/reports",
         params={
             "ids": f"channel=={channel_id}",
@@ -191,7 +210,7 @@ def collect_country_metrics(channel_id, access_token, start_date, end_date):
     """Coleta métricas por país"""
     headers = {"Authorization": f"Bearer {access_token}"}
 
-    resp = requests.get(
+    resp = _http.get(
         "https://youtubeanalytics.googleapis.com/v2/reports",
         params={
             "ids": f"channel=={channel_id}",
@@ -224,7 +243,7 @@ def collect_video_metrics(channel_id, access_token, start_date, end_date):
     start_index = 1
 
     while True:
-        resp = requests.get(
+        resp = _http.get(
             "https://youtubeanalytics.googleapis.com/v2/reports",
             params={
                 "ids": f"channel=={channel_id}",
@@ -268,7 +287,7 @@ def collect_traffic_sources(channel_id, access_token, start_date, end_date):
     """Coleta fontes de tráfego do canal"""
     headers = {"Authorization": f"Bearer {access_token}"}
 
-    resp = requests.get(
+    resp = _http.get(
         "https://youtubeanalytics.googleapis.com/v2/reports",
         params={
             "ids": f"channel=={channel_id}",
@@ -291,7 +310,7 @@ def collect_search_terms(channel_id, access_token, start_date, end_date):
     """Coleta top 10 termos de busca"""
     headers = {"Authorization": f"Bearer {access_token}"}
 
-    resp = requests.get(
+    resp = _http.get(
         "https://youtubeanalytics.googleapis.com/v2/reports",
         params={
             "ids": f"channel=={channel_id}",
@@ -316,7 +335,7 @@ def collect_suggested_videos(channel_id, access_token, start_date, end_date):
     """Coleta top 10 vídeos que recomendam"""
     headers = {"Authorization": f"Bearer {access_token}"}
 
-    resp = requests.get(
+    resp = _http.get(
         "https://youtubeanalytics.googleapis.com/v2/reports",
         params={
             "ids": f"channel=={channel_id}",
@@ -341,7 +360,7 @@ def collect_demographics(channel_id, access_token, start_date, end_date):
     """Coleta demographics (idade e gênero)"""
     headers = {"Authorization": f"Bearer {access_token}"}
 
-    resp = requests.get(
+    resp = _http.get(
         "https://youtubeanalytics.googleapis.com/v2/reports",
         params={
             "ids": f"channel=={channel_id}",
@@ -364,7 +383,7 @@ def collect_device_metrics(channel_id, access_token, start_date, end_date):
     """Coleta distribuição de dispositivos"""
     headers = {"Authorization": f"Bearer {access_token}"}
 
-    resp = requests.get(
+    resp = _http.get(
         "https://youtubeanalytics.googleapis.com/v2/reports",
         params={
             "ids": f"channel=={channel_id}",
@@ -387,9 +406,96 @@ def collect_device_metrics(channel_id, access_token, start_date, end_date):
 # SALVAR DADOS
 # =============================================================================
 
+def _bulk_upsert(table, rows, label, on_conflict=None, fallback=None, chunk_size=None):
+    """
+    Salva uma lista de linhas com UM POST por chunk (resolution=merge-duplicates).
+    Se o chunk falhar, cai para linha a linha (fallback(row) -> bool, ou POST individual).
+    Retorna quantas linhas foram salvas.
+    """
+    if not rows:
+        return 0
+
+    chunk_size = chunk_size or OAUTH_UPSERT_CHUNK_SIZE
+    params = {"on_conflict": on_conflict} if on_conflict else None
+    url = f"{SUPABASE_URL}/rest/v1/{table}"
+    saved = 0
+
+    for i in range(0, len(rows), chunk_size):
+        chunk = rows[i:i + chunk_size]
+        resp = _http.post(url, params=params, headers=SUPABASE_HEADERS, json=chunk)
+        if resp.status_code in [200, 201, 204]:
+            saved += len(chunk)
+            continue
+
+        log.warning(f"[{label}] Upsert em lote falhou ({resp.status_code}: {resp.text[:200]}) - salvando linha a linha")
+        for row in chunk:
+            if fallback is not None:
+                ok = fallback(row)
+            else:
+                row_resp = _http.post(url, headers=SUPABASE_HEADERS, json=row)
+                ok = row_resp.status_code in [200, 201, 204]
+            if ok:
+                saved += 1
+
+    return saved
+
+def _dedupe(rows, key_fields):
+    """Mantém a última linha por chave (upsert em lote não aceita a mesma chave 2x)."""
+    unique = {}
+    for row in rows:
+        unique[tuple(row[k] for k in key_fields)] = row
+    return list(unique.values())
+
+def _get_real_revenue_by_date(channel_id, dates):
+    """Revenue real (is_estimate=false) já salvo para as datas - 1 GET para todas."""
+    if not dates:
+        return {}
+    resp = _http.get(
+        f"{SUPABASE_URL}/rest/v1/yt_daily_metrics",
+        params={
+            "channel_id": f"eq.{channel_id}",
+            "date": f"in.({','.join(dates)})",
+            "is_estimate": "eq.false",
+            "select": "date,revenue"
+        },
+        headers={"apikey": SUPABASE_KEY, "Authorization": f"Bearer {SUPABASE_KEY}"}
+    )
+    if resp.status_code != 200:
+        return {}
+    return {r["date"]: r.get("revenue") or 0 for r in resp.json()}
+
+def _save_daily_row(data):
+    """Fallback linha a linha de save_daily_metrics: PATCH, e POST se não existir."""
+    channel_id, date = data["channel_id"], data["date"]
+    update_resp = _http.patch(
+        f"{SUPABASE_URL}/rest/v1/yt_daily_metrics",
+        params={"channel_id": f"eq.{channel_id}", "date": f"eq.{date}"},
+        headers=SUPABASE_HEADERS,
+        json=data
+    )
+
+    if update_resp.status_code in [200, 204]:
+        return True
+    if update_resp.status_code == 404:
+        # Se não existir, criar novo
+        create_resp = _http.post(
+            f"{SUPABASE_URL}/rest/v1/yt_daily_metrics",
+            headers=SUPABASE_HEADERS,
+            json=data
+        )
+        if create_resp.status_code in [200, 201, 204]:
+            return True
+        log.error(f"[{date}] Erro ao criar: {create_resp.status_code}")
+        return False
+    log.error(f"[{date}] Erro ao atualizar: {update_resp.status_code}")
+    return False
+
 def save_daily_metrics(channel_id, rows):
     """Salva métricas diárias no Supabase - APENAS se revenue > 0 ou views > 0"""
-    saved = 0
+    # Revenue real já existente para todas as datas (1 query em vez de 1 por dia)
+    existing_revenue = _get_real_revenue_by_date(channel_id, [row[0] for row in rows])
+
+    batch = []
     for row in rows:
         date = row[0]
         revenue = float(row[1])
@@ -402,26 +508,10 @@ def save_daily_metrics(channel_id, rows):
             log.warning(f"[{date}] Sem dados (revenue=0, views=0) - ignorando")
             continue
 
-        # Verificar se já existe dado REAL para esta data
-        check_resp = requests.get(
-            f"{SUPABASE_URL}/rest/v1/yt_daily_metrics",
-            params={
-                "channel_id": f"eq.{channel_id}",
-                "date": f"eq.{date}",
-                "is_estimate": "eq.false",
-                "select": "revenue"
-            },
-            headers={"apikey": SUPABASE_KEY, "Authorization": f"Bearer {SUPABASE_KEY}"}
-        )
-
-        if check_resp.status_code == 200 and check_resp.json():
-            existing = check_resp.json()[0]
-            existing_revenue = existing.get("revenue", 0)
-
-            # Se já tem revenue real > 0, não sobrescrever com 0
-            if existing_revenue > 0 and revenue == 0:
-                log.info(f"[{date}] Já tem revenue real: ${existing_revenue:.2f} - mantendo")
-                continue
+        # Se já tem revenue real > 0, não sobrescrever com 0
+        if existing_revenue.get(date, 0) > 0 and revenue == 0:
+            log.info(f"[{date}] Já tem revenue real: ${existing_revenue[date]:.2f} - mantendo")
+            continue
 
         # Se revenue = 0 mas tem views, é provável delay da API
         # Não marcar como "real" para não confundir
@@ -433,7 +523,7 @@ def save_daily_metrics(channel_id, rows):
         avg_duration = float(row[9]) if len(row) > 9 else 0
         avg_percentage = float(row[10]) if len(row) > 10 else 0
 
-        data = {
+        batch.append({
             "channel_id": channel_id,
             "date": date,
             "revenue": revenue,
@@ -449,72 +539,35 @@ def save_daily_metrics(channel_id, rows):
             "avg_retention_pct": float(avg_percentage) if avg_percentage else None,     # Garante float ou NULL
             "ctr_approx": None,  # CTR removido - não temos dados confiáveis
             "is_estimate": False  # Dados do YouTube Analytics (podem ter delay)
-        }
-
-        # Usar PATCH para atualizar registros existentes
-        # Primeiro tenta atualizar, se não existir, cria novo
-        update_resp = requests.patch(
-            f"{SUPABASE_URL}/rest/v1/yt_daily_metrics",
-            params={"channel_id": f"eq.{channel_id}", "date": f"eq.{date}"},
-            headers=SUPABASE_HEADERS,
-            json=data
-        )
-
-        if update_resp.status_code in [200, 204]:
-            saved += 1
-            if revenue > 0:
-                log.info(f"[{date}] Revenue real atualizado: ${revenue:.2f}")
-        elif update_resp.status_code == 404:
-            # Se não existir, criar novo
-            create_resp = requests.post(
-                f"{SUPABASE_URL}/rest/v1/yt_daily_metrics",
-                headers=SUPABASE_HEADERS,
-                json=data
-            )
-            if create_resp.status_code in [200, 201, 204]:
-                saved += 1
-                if revenue > 0:
-                    log.info(f"[{date}] Revenue real criado: ${revenue:.2f}")
-            else:
-                log.error(f"[{date}] Erro ao criar: {create_resp.status_code}")
-        else:
-            log.error(f"[{date}] Erro ao atualizar: {update_resp.status_code}")
+        })
 
+    saved = _bulk_upsert("yt_daily_metrics", _dedupe(batch, ("date",)), f"{channel_id} daily",
+                         on_conflict="channel_id,date", fallback=_save_daily_row)
+    revenue_total = sum(r["revenue"] for r in batch)
+    if revenue_total > 0:
+        log.info(f"[{channel_id}] Revenue real salvo: ${revenue_total:.2f} em {saved} dias")
     return saved
 
 def save_country_metrics(channel_id, rows, date):
     """Salva métricas por país no Supabase"""
-    saved = 0
-    for row in rows:
-        data = {
-            "channel_id": channel_id,
-            "date": date,
-            "country_code": row[0],
-            "views": int(row[1]),
-            "revenue": float(row[2]),
-            "watch_time_minutes": int(row[3])
-        }
-
-        resp = requests.post(
-            f"{SUPABASE_URL}/rest/v1/yt_country_metrics",
-            headers=SUPABASE_HEADERS,
-            json=data
-        )
-        if resp.status_code in [200, 201, 204]:
-            saved += 1
-
-    return saved
-
-def save_video_metrics(channel_id, rows):
+    batch = [{
+        "channel_id": channel_id,
+        "date": date,
+        "country_code": row[0],
+        "views": int(row[1]),
+        "revenue": float(row[2]),
+        "watch_time_minutes": int(row[3])
+    } for row in rows]
+
+    return _bulk_upsert("yt_country_metrics", _dedupe(batch, ("country_code",)), f"{channel_id} country")
+
+def _save_video_metric_row(data):
     """
-    Salva metricas de analytics por video no Supabase.
+    Fallback linha a linha de save_video_metrics.
     Padrao: INSERT primeiro, PATCH on 409 (UNIQUE constraint em channel_id + video_id).
-    PATCH NAO toca impressions/ctr (pertencem ao ctr_collector).
-    Formato row: [video_id, views, avgViewDuration, avgViewPercentage, cardClickRate, likes, dislikes, subscribersGained]
     """
-    saved = 0
-    errors = 0
     url = f"{SUPABASE_URL}/rest/v1/yt_video_metrics"
+    channel_id, video_id = data["channel_id"], data["video_id"]
 
     # Headers SEM resolution=merge-duplicates para receber 409 no conflito
     insert_headers = {
@@ -524,6 +577,36 @@ def save_video_metrics(channel_id, rows):
         "Prefer": "return=minimal"
     }
 
+    # 1. Tentar INSERT (video novo)
+    resp = _http.post(url, headers=insert_headers, json=data)
+    if resp.status_code in [200, 201, 204]:
+        return True
+    if resp.status_code == 409:
+        # 2. Video ja existe → PATCH apenas campos de analytics (NAO toca impressions/ctr)
+        patch_data = {k: v for k, v in data.items() if k not in ("channel_id", "video_id")}
+        patch_resp = _http.patch(
+            url,
+            params={"channel_id": f"eq.{channel_id}", "video_id": f"eq.{video_id}"},
+            headers=SUPABASE_HEADERS,
+            json=patch_data
+        )
+        if patch_resp.status_code in [200, 204]:
+            return True
+        log.error(f"[{channel_id}] PATCH falhou video {video_id}: {patch_resp.status_code} - {patch_resp.text[:200]}")
+        return False
+    log.error(f"[{channel_id}] POST falhou video {video_id}: {resp.status_code} - {resp.text[:200]}")
+    return False
+
+def save_video_metrics(channel_id, rows):
+    """
+    Salva metricas de analytics por video no Supabase.
+    Upsert em lote em (channel_id, video_id). O payload NAO inclui impressions/ctr
+    (pertencem ao ctr_collector), entao o merge nao toca essas colunas.
+    Formato row: [video_id, views, avgViewDuration, avgViewPercentage, cardClickRate, likes, dislikes, subscribersGained]
+    """
+    updated_at = datetime.now().isoformat()
+    batch = []
+
     for row in rows:
         video_id = row[0]
         views_val = int(row[1])
@@ -533,7 +616,7 @@ def save_video_metrics(channel_id, rows):
         if views_val == 0 and retention_val is None:
             continue
 
-        data = {
+        batch.append({
             "channel_id": channel_id,
             "video_id": video_id,
             "views": views_val,
@@ -543,41 +626,14 @@ def save_video_metrics(channel_id, rows):
             "likes": int(row[5]) if len(row) > 5 and row[5] is not None else 0,
             "dislikes": int(row[6]) if len(row) > 6 and row[6] is not None else 0,
             "subscribers_gained": int(row[7]) if len(row) > 7 and row[7] is not None else 0,
-            "updated_at": datetime.now().isoformat()
-        }
+            "updated_at": updated_at
+        })
 
-        # 1. Tentar INSERT (video novo)
-        resp = requests.post(url, headers=insert_headers, json=data)
-
-        if resp.status_code in [200, 201, 204]:
-            saved += 1
-        elif resp.status_code == 409:
-            # 2. Video ja existe → PATCH apenas campos de analytics (NAO toca impressions/ctr)
-            patch_data = {
-                "views": data["views"],
-                "avg_view_duration": data["avg_view_duration"],
-                "avg_retention_pct": data["avg_retention_pct"],
-                "card_click_rate": data["card_click_rate"],
-                "likes": data["likes"],
-                "dislikes": data["dislikes"],
-                "subscribers_gained": data["subscribers_gained"],
-                "updated_at": data["updated_at"]
-            }
-            patch_resp = requests.patch(
-                url,
-                params={"channel_id": f"eq.{channel_id}", "video_id": f"eq.{video_id}"},
-                headers=SUPABASE_HEADERS,
-                json=patch_data
-            )
-            if patch_resp.status_code in [200, 204]:
-                saved += 1
-            else:
-                errors += 1
-                log.error(f"[{channel_id}] PATCH falhou video {video_id}: {patch_resp.status_code} - {patch_resp.text[:200]}")
-        else:
-            errors += 1
-            log.error(f"[{channel_id}] POST falhou video {video_id}: {resp.status_code} - {resp.text[:200]}")
+    batch = _dedupe(batch, ("video_id",))
+    saved = _bulk_upsert("yt_video_metrics", batch, f"{channel_id} videos",
+                         on_conflict="channel_id,video_id", fallback=_save_video_metric_row)
 
+    errors = len(batch) - saved
     if errors > 0:
         log.warning(f"[{channel_id}] save_video_metrics: {saved} salvos, {errors} erros de {len(rows)} total")
     else:
@@ -590,27 +646,17 @@ def save_video_daily(channel_id, rows, date):
     Salva histórico diário de analytics por vídeo no Supabase.
     Formato row: [video_id, views, avgViewDuration, avgViewPercentage, cardClickRate]
     """
-    saved = 0
-    for row in rows:
-        data = {
-            "channel_id": channel_id,
-            "video_id": row[0],
-            "date": date,
-            "views": int(row[1]),
-            "avg_view_duration": float(row[2]) if len(row) > 2 else None,
-            "avg_retention_pct": float(row[3]) if len(row) > 3 else None,
-            "card_click_rate": float(row[4]) if len(row) > 4 else None,
-        }
-
-        resp = requests.post(
-            f"{SUPABASE_URL}/rest/v1/yt_video_daily",
-            headers=SUPABASE_HEADERS,
-            json=data
-        )
-        if resp.status_code in [200, 201, 204]:
-            saved += 1
-
-    return saved
+    batch = [{
+        "channel_id": channel_id,
+        "video_id": row[0],
+        "date": date,
+        "views": int(row[1]),
+        "avg_view_duration": float(row[2]) if len(row) > 2 else None,
+        "avg_retention_pct": float(row[3]) if len(row) > 3 else None,
+        "card_click_rate": float(row[4]) if len(row) > 4 else None,
+    } for row in rows]
+
+    return _bulk_upsert("yt_video_daily", _dedupe(batch, ("video_id",)), f"{channel_id} video_daily")
 
 # =============================================================================
 # SALVAR DADOS - ANALYTICS AVANÇADO
@@ -618,159 +664,100 @@ def save_video_daily(channel_id, rows, date):
 
 def save_traffic_sources(channel_id, date, rows):
     """Salva fontes de tráfego"""
-    saved = 0
     total_views = sum(int(row[1]) for row in rows) if rows else 1  # Evitar divisão por zero
 
+    batch = []
     for row in rows:
-        source_type = row[0]
         views = int(row[1])
-        watch_time = int(row[2]) if len(row) > 2 else 0
-        percentage = round((views / total_views) * 100, 2) if total_views > 0 else 0
-
-        data = {
+        batch.append({
             "channel_id": channel_id,
             "date": date,
-            "source_type": source_type,
+            "source_type": row[0],
             "views": views,
-            "watch_time_minutes": watch_time,
-            "percentage": percentage
-        }
-
-        resp = requests.post(
-            f"{SUPABASE_URL}/rest/v1/yt_traffic_summary",
-            headers=SUPABASE_HEADERS,
-            json=data
-        )
-
-        if resp.status_code in [200, 201]:
-            saved += 1
+            "watch_time_minutes": int(row[2]) if len(row) > 2 else 0,
+            "percentage": round((views / total_views) * 100, 2) if total_views > 0 else 0
+        })
 
+    saved = _bulk_upsert("yt_traffic_summary", _dedupe(batch, ("source_type",)), f"{channel_id} traffic")
     log.info(f"[Traffic] {saved} fontes salvas")
     return saved
 
 def save_search_terms(channel_id, date, rows):
     """Salva termos de busca"""
-    saved = 0
     total_views = sum(int(row[1]) for row in rows) if rows else 1
 
+    batch = []
     for row in rows:
-        search_term = row[0]
         views = int(row[1])
-        percentage = round((views / total_views) * 100, 2) if total_views > 0 else 0
-
-        data = {
+        batch.append({
             "channel_id": channel_id,
             "date": date,
-            "search_term": search_term,
+            "search_term": row[0],
             "views": views,
-            "percentage_of_search": percentage
-        }
-
-        resp = requests.post(
-            f"{SUPABASE_URL}/rest/v1/yt_search_analytics",
-            headers=SUPABASE_HEADERS,
-            json=data
-        )
-
-        if resp.status_code in [200, 201]:
-            saved += 1
+            "percentage_of_search": round((views / total_views) * 100, 2) if total_views > 0 else 0
+        })
 
+    saved = _bulk_upsert("yt_search_analytics", _dedupe(batch, ("search_term",)), f"{channel_id} search")
     log.info(f"[Search] {saved} termos salvos")
     return saved
 
 def save_suggested_videos(channel_id, date, rows):
     """Salva vídeos que recomendam"""
-    saved = 0
+    batch = []
 
     for row in rows:
         video_id = row[0]
-        views = int(row[1])
 
         # O ID pode vir como URL completa ou só ID
         if "watch?v=" in video_id:
             video_id = video_id.split("watch?v=")[1].split("&")[0]
 
-        data = {
+        batch.append({
             "channel_id": channel_id,
             "date": date,
             "source_video_id": video_id,
             "source_video_title": "",  # API não retorna título
             "source_channel_name": "",  # API não retorna canal
-            "views_generated": views
-        }
-
-        resp = requests.post(
-            f"{SUPABASE_URL}/rest/v1/yt_suggested_sources",
-            headers=SUPABASE_HEADERS,
-            json=data
-        )
-
-        if resp.status_code in [200, 201]:
-            saved += 1
+            "views_generated": int(row[1])
+        })
 
+    saved = _bulk_upsert("yt_suggested_sources", _dedupe(batch, ("source_video_id",)), f"{channel_id} suggested")
     log.info(f"[Suggested] {saved} vídeos salvos")
     return saved
 
 def save_demographics(channel_id, date, rows):
     """Salva demographics"""
-    saved = 0
-
-    for row in rows:
-        age_group = row[0]
-        gender = row[1]
-        percentage = float(row[2])
-
-        data = {
-            "channel_id": channel_id,
-            "date": date,
-            "age_group": age_group,
-            "gender": gender,
-            "views": 0,  # API retorna só percentual
-            "watch_time_minutes": 0,
-            "percentage": percentage
-        }
-
-        resp = requests.post(
-            f"{SUPABASE_URL}/rest/v1/yt_demographics",
-            headers=SUPABASE_HEADERS,
-            json=data
-        )
-
-        if resp.status_code in [200, 201]:
-            saved += 1
-
+    batch = [{
+        "channel_id": channel_id,
+        "date": date,
+        "age_group": row[0],
+        "gender": row[1],
+        "views": 0,  # API retorna só percentual
+        "watch_time_minutes": 0,
+        "percentage": float(row[2])
+    } for row in rows]
+
+    saved = _bulk_upsert("yt_demographics", _dedupe(batch, ("age_group", "gender")), f"{channel_id} demographics")
     log.info(f"[Demographics] {saved} registros salvos")
     return saved
 
 def save_device_metrics(channel_id, date, rows):
     """Salva métricas de dispositivos"""
-    saved = 0
     total_views = sum(int(row[1]) for row in rows) if rows else 1
 
+    batch = []
     for row in rows:
-        device_type = row[0]
         views = int(row[1])
-        watch_time = int(row[2]) if len(row) > 2 else 0
-        percentage = round((views / total_views) * 100, 2) if total_views > 0 else 0
-
-        data = {
+        batch.append({
             "channel_id": channel_id,
             "date": date,
-            "device_type": device_type,
+            "device_type": row[0],
             "views": views,
-            "watch_time_minutes": watch_time,
-            "percentage": percentage
-        }
-
-        resp = requests.post(
-            f"{SUPABASE_URL}/rest/v1/yt_device_metrics",
-            headers=SUPABASE_HEADERS,
-            json=data
-        )
-
-        if resp.status_code in [200, 201]:
-            saved += 1
+            "watch_time_minutes": int(row[2]) if len(row) > 2 else 0,
+            "percentage": round((views / total_views) * 100, 2) if total_views > 0 else 0
+        })
 
+    saved = _bulk_upsert("yt_device_metrics", _dedupe(batch, ("device_type",)), f"{channel_id} devices")
     log.info(f"[Devices] {saved} dispositivos salvos")
     return saved
 
@@ -804,12 +791,168 @@ def save_device_metrics(channel_id, date, rows):
 # MAIN - FUNÇÃO ASSÍNCRONA PARA RAILWAY
 # =============================================================================
 
+class _CredentialsCache:
+    """Credenciais por proxy buscadas 1x por coleta (vários canais dividem o mesmo proxy)."""
+
+    def __init__(self):
+        self._by_proxy = {}
+        self._lock = threading.Lock()
+
+    def get(self, proxy_name):
+        with self._lock:
+            if proxy_name not in self._by_proxy:
+                self._by_proxy[proxy_name] = get_proxy_credentials(proxy_name)
+            return self._by_proxy[proxy_name]
+
+def _fetch_reports(channel_id, access_token, is_monetized, dates):
+    """
+    Dispara os relatórios da Analytics API do canal em paralelo (pool de relatórios).
+    Retorna {nome_relatorio: rows}.
+    """
+    yesterday = dates["yesterday"]
+    reports = {
+        "video": (collect_video_metrics, dates["start_video"], dates["end"]),
+        "traffic": (collect_traffic_sources, yesterday, yesterday),
+        "search": (collect_search_terms, yesterday, yesterday),
+        "suggested": (collect_suggested_videos, yesterday, yesterday),
+        "demographics": (collect_demographics, yesterday, yesterday),
+        "devices": (collect_device_metrics, yesterday, yesterday),
+    }
+    if is_monetized:
+        reports["daily"] = (collect_daily_metrics, dates["start_daily"], dates["end"])
+        reports["country"] = (collect_country_metrics, yesterday, yesterday)
+
+    futures = {
+        name: _report_executor.submit(fn, channel_id, access_token, start, end)
+        for name, (fn, start, end) in reports.items()
+    }
+
+    results = {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            log.error(f"[{channel_id}] Erro no relatório {name}: {e}")
+            results[name] = []
+    return results
+
+def _collect_channel(channel, dates, credentials_cache):
+    """
+    Coleta OAuth completa de UM canal (roda em thread do pool de canais).
+    Retorna True em sucesso.
+    """
+    channel_id = channel["channel_id"]
+    channel_name = channel.get("channel_name", channel_id)
+    proxy_name = channel.get("proxy_name")
+    is_monetized = channel.get("is_monetized", False)
+    mode_label = "MONETIZADO" if is_monetized else "ANALYTICS"
+
+    if proxy_name:
+        log.info(f"[{channel_name}] [{mode_label}] Iniciando coleta OAuth... (proxy: {proxy_name})")
+    else:
+        log.info(f"[{channel_name}] [{mode_label}] Iniciando coleta OAuth... (credenciais isoladas)")
+
+    start_time = time.time()
+    try:
+        # Buscar credenciais (proxy ou isoladas)
+        if proxy_name:
+            credentials = credentials_cache.get(proxy_name)
+            if not credentials:
+                log.error(f"[{channel_name}] Credenciais do proxy {proxy_name} não encontradas!")
+                log_collection(channel_id, "error", f"Credenciais proxy {proxy_name} não encontradas")
+                return False
+        else:
+            credentials = get_channel_credentials(channel_id)
+            if not credentials:
+                log.error(f"[{channel_name}] Credenciais isoladas não encontradas!")
+                log_collection(channel_id, "error", "Credenciais isoladas não encontradas")
+                return False
+
+        # Buscar tokens
+        tokens = get_tokens(channel_id)
+        if not tokens:
+            log.error(f"[{channel_name}] Sem tokens cadastrados!")
+            log_collection(channel_id, "error", "Tokens não encontrados")
+            return False
+
+        # Renovar access_token usando credenciais do proxy
+        access_token = refresh_access_token(
+            tokens["refresh_token"],
+            credentials["client_id"],
+            credentials["client_secret"]
+        )
+        if not access_token:
+            log.error(f"[{channel_name}] Falha ao renovar token!")
+            log_collection(channel_id, "error", "Falha ao renovar token")
+            return False
+
+        # Atualizar token no banco
+        update_tokens(channel_id, access_token)
+
+        # Todos os relatórios do canal em paralelo
+        reports = _fetch_reports(channel_id, access_token, is_monetized, dates)
+        yesterday = dates["yesterday"]
+
+        # =====================================================
+        # MONETIZADOS: coleta completa (revenue + analytics)
+        # =====================================================
+        saved_daily = saved_country = 0
+        if is_monetized:
+            saved_daily = save_daily_metrics(channel_id, reports["daily"])
+            log.info(f"[{channel_name}] Métricas diárias: {saved_daily} dias salvos")
+
+            saved_country = save_country_metrics(channel_id, reports["country"], yesterday)
+            log.info(f"[{channel_name}] Métricas por país: {saved_country} países salvos")
+
+        # =====================================================
+        # TODOS: métricas por vídeo (retencao, views, etc.)
+        # =====================================================
+        saved_video = save_video_metrics(channel_id, reports["video"])
+        log.info(f"[{channel_name}] Métricas por vídeo: {saved_video} vídeos salvos")
+
+        # Histórico diário por vídeo (snapshot de hoje)
+        saved_video_daily = save_video_daily(channel_id, reports["video"], dates["today"])
+        log.info(f"[{channel_name}] Histórico diário vídeos: {saved_video_daily} registros")
+
+        # =============================================================
+        # ANALYTICS AVANÇADO (traffic, search, demographics, devices)
+        # =============================================================
+        saved_traffic = save_traffic_sources(channel_id, yesterday, reports["traffic"])
+        saved_search = save_search_terms(channel_id, yesterday, reports["search"])
+        saved_suggested = save_suggested_videos(channel_id, yesterday, reports["suggested"])
+        saved_demo = save_demographics(channel_id, yesterday, reports["demographics"])
+        saved_devices = save_device_metrics(channel_id, yesterday, reports["devices"])
+        log.info(
+            f"[{channel_name}] Analytics avançado: {saved_traffic} fontes, {saved_search} termos, "
+            f"{saved_suggested} sugeridos, {saved_demo} demographics, {saved_devices} dispositivos"
+        )
+
+        # Atualizar info do canal - DESABILITADO (usa Data API v3)
+        # update_channel_info(channel_id, access_token)
+
+        # Log de sucesso
+        if is_monetized:
+            log_collection(channel_id, "success", f"[MONETIZADO] {saved_video} vídeos, {saved_daily} dias, {saved_country} países")
+        else:
+            log_collection(channel_id, "success", f"[ANALYTICS] {saved_video} vídeos coletados (retencao + views)")
+        log.info(f"[{channel_name}] Coleta concluída em {time.time() - start_time:.1f}s")
+        return True
+
+    except Exception as e:
+        log.error(f"[{channel_name}] Erro: {str(e)}")
+        log_collection(channel_id, "error", str(e)[:200])
+        return False
+
 async def collect_oauth_metrics():
     """
     Coleta métricas OAuth de TODOS canais com tokens OAuth.
     - Monetizados: revenue + analytics completo
     - Nao-monetizados: analytics (retencao, views, watch time)
     Chamado automaticamente pelo scheduler às 5 AM
+
+    Concorrência: até OAUTH_CHANNEL_CONCURRENCY canais ao mesmo tempo (no máximo
+    OAUTH_PER_PROXY_CONCURRENCY por proxy/credencial OAuth) e os relatórios de cada
+    canal em paralelo no pool de relatórios. Nada disso bloqueia o event loop.
     """
     log.info("=" * 60)
     log.info("INICIANDO COLETA OAUTH (ANALYTICS + REVENUE)")
@@ -817,154 +960,50 @@ async def collect_oauth_metrics():
 
     # Datas - Ajustado para delay do YouTube (2-3 dias)
     # YouTube tem delay de 2-3 dias, então pedimos dados até 3 dias atrás
-    end_date = (datetime.now() - timedelta(days=3)).strftime("%Y-%m-%d")
-    start_date_daily = (datetime.now() - timedelta(days=10)).strftime("%Y-%m-%d")  # Revenue/metricas diarias
-    start_date_video = "2005-02-14"  # Lifetime — pega TODOS os videos do canal
+    dates = {
+        "end": (datetime.now() - timedelta(days=3)).strftime("%Y-%m-%d"),
+        "start_daily": (datetime.now() - timedelta(days=10)).strftime("%Y-%m-%d"),  # Revenue/metricas diarias
+        "start_video": "2005-02-14",  # Lifetime — pega TODOS os videos do canal
+        "yesterday": (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d"),
+        "today": datetime.now().strftime("%Y-%m-%d"),
+    }
+
+    loop = asyncio.get_running_loop()
+    start_time = time.time()
 
     # Buscar canais (todos com OAuth tokens)
-    channels = get_channels()
-    log.info(f"Canais para coletar: {len(channels)}")
+    channels = await loop.run_in_executor(_channel_executor, get_channels)
+    log.info(f"Canais para coletar: {len(channels)} (concorrência: {OAUTH_CHANNEL_CONCURRENCY} canais, {OAUTH_PER_PROXY_CONCURRENCY} por proxy)")
 
-    success_count = 0
-    error_count = 0
+    credentials_cache = _CredentialsCache()
+    proxy_semaphores = {}
 
-    for channel in channels:
-        channel_id = channel["channel_id"]
-        channel_name = channel.get("channel_name", channel_id)
+    async def run_channel(channel):
+        # Canais sem proxy usam credenciais isoladas - limite só pelo pool de canais
         proxy_name = channel.get("proxy_name")
-        is_monetized = channel.get("is_monetized", False)
-        mode_label = "MONETIZADO" if is_monetized else "ANALYTICS"
-
         if proxy_name:
-            log.info(f"\n[{channel_name}] [{mode_label}] Iniciando coleta OAuth... (proxy: {proxy_name})")
-        else:
-            log.info(f"\n[{channel_name}] [{mode_label}] Iniciando coleta OAuth... (credenciais isoladas)")
+            semaphore = proxy_semaphores.setdefault(proxy_name, asyncio.Semaphore(OAUTH_PER_PROXY_CONCURRENCY))
+            async with semaphore:
+                return await loop.run_in_executor(_channel_executor, _collect_channel, channel, dates, credentials_cache)
+        return await loop.run_in_executor(_channel_executor, _collect_channel, channel, dates, credentials_cache)
 
-        try:
-            # Buscar credenciais (proxy ou isoladas)
-            if proxy_name:
-                credentials = get_proxy_credentials(proxy_name)
-                if not credentials:
-                    log.error(f"[{channel_name}] Credenciais do proxy {proxy_name} não encontradas!")
-                    log_collection(channel_id, "error", f"Credenciais proxy {proxy_name} não encontradas")
-                    error_count += 1
-                    continue
-            else:
-                credentials = get_channel_credentials(channel_id)
-                if not credentials:
-                    log.error(f"[{channel_name}] Credenciais isoladas não encontradas!")
-                    log_collection(channel_id, "error", "Credenciais isoladas não encontradas")
-                    error_count += 1
-                    continue
-
-            # Buscar tokens
-            tokens = get_tokens(channel_id)
-            if not tokens:
-                log.error(f"[{channel_name}] Sem tokens cadastrados!")
-                log_collection(channel_id, "error", "Tokens não encontrados")
-                error_count += 1
-                continue
-
-            # Renovar access_token usando credenciais do proxy
-            access_token = refresh_access_token(
-                tokens["refresh_token"],
-                credentials["client_id"],
-                credentials["client_secret"]
-            )
-            if not access_token:
-                log.error(f"[{channel_name}] Falha ao renovar token!")
-                log_collection(channel_id, "error", "Falha ao renovar token")
-                error_count += 1
-                continue
-
-            # Atualizar token no banco
-            update_tokens(channel_id, access_token)
-
-            yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
-            today = datetime.now().strftime("%Y-%m-%d")
-
-            # =====================================================
-            # MONETIZADOS: coleta completa (revenue + analytics)
-            # =====================================================
-            if is_monetized:
-                # Métricas diárias (revenue por dia)
-                daily_rows = collect_daily_metrics(channel_id, access_token, start_date_daily, end_date)
-                saved_daily = save_daily_metrics(channel_id, daily_rows)
-                log.info(f"[{channel_name}] Métricas diárias: {saved_daily} dias salvos")
-
-                # Métricas por país (revenue por país)
-                country_rows = collect_country_metrics(channel_id, access_token, yesterday, yesterday)
-                saved_country = save_country_metrics(channel_id, country_rows, yesterday)
-                log.info(f"[{channel_name}] Métricas por país: {saved_country} países salvos")
-
-            # =====================================================
-            # TODOS: métricas por vídeo (retencao, views, etc.)
-            # =====================================================
-            video_rows = collect_video_metrics(channel_id, access_token, start_date_video, end_date)
-            saved_video = save_video_metrics(channel_id, video_rows)
-            log.info(f"[{channel_name}] Métricas por vídeo: {saved_video} vídeos salvos")
-
-            # Histórico diário por vídeo (snapshot de hoje)
-            saved_video_daily = save_video_daily(channel_id, video_rows, today)
-            log.info(f"[{channel_name}] Histórico diário vídeos: {saved_video_daily} registros")
-
-            # =============================================================
-            # ANALYTICS AVANÇADO (traffic, search, demographics, devices)
-            # =============================================================
-            log.info(f"[{channel_name}] Iniciando coleta de analytics avançado...")
-
-            # Coletar fontes de tráfego
-            traffic_rows = collect_traffic_sources(channel_id, access_token, yesterday, yesterday)
-            saved_traffic = save_traffic_sources(channel_id, yesterday, traffic_rows)
-            log.info(f"[{channel_name}] Fontes de tráfego: {saved_traffic} salvos")
-
-            # Coletar termos de busca
-            search_rows = collect_search_terms(channel_id, access_token, yesterday, yesterday)
-            saved_search = save_search_terms(channel_id, yesterday, search_rows)
-            log.info(f"[{channel_name}] Termos de busca: {saved_search} salvos")
-
-            # Coletar vídeos que recomendam
-            suggested_rows = collect_suggested_videos(channel_id, access_token, yesterday, yesterday)
-            saved_suggested = save_suggested_videos(channel_id, yesterday, suggested_rows)
-            log.info(f"[{channel_name}] Vídeos sugeridos: {saved_suggested} salvos")
-
-            # Coletar demographics
-            demo_rows = collect_demographics(channel_id, access_token, yesterday, yesterday)
-            saved_demo = save_demographics(channel_id, yesterday, demo_rows)
-            log.info(f"[{channel_name}] Demographics: {saved_demo} salvos")
-
-            # Coletar dispositivos
-            device_rows = collect_device_metrics(channel_id, access_token, yesterday, yesterday)
-            saved_devices = save_device_metrics(channel_id, yesterday, device_rows)
-            log.info(f"[{channel_name}] Dispositivos: {saved_devices} salvos")
-
-            # Atualizar info do canal - DESABILITADO (usa Data API v3)
-            # update_channel_info(channel_id, access_token)
-
-            # Log de sucesso
-            if is_monetized:
-                log_collection(channel_id, "success", f"[MONETIZADO] {saved_video} vídeos, {saved_daily} dias, {saved_country} países")
-            else:
-                log_collection(channel_id, "success", f"[ANALYTICS] {saved_video} vídeos coletados (retencao + views)")
-            success_count += 1
-
-        except Exception as e:
-            log.error(f"[{channel_name}] Erro: {str(e)}")
-            log_collection(channel_id, "error", str(e)[:200])
-            error_count += 1
+    results = await asyncio.gather(*(run_channel(channel) for channel in channels), return_exceptions=True)
+    success_count = sum(1 for r in results if r is True)
+    error_count = len(results) - success_count
 
     monetized_count = sum(1 for c in channels if c.get("is_monetized"))
     analytics_count = len(channels) - monetized_count
     log.info("\n" + "=" * 60)
     log.info(f"COLETA OAUTH FINALIZADA - Sucesso: {success_count} | Erros: {error_count}")
     log.info(f"  Monetizados: {monetized_count} | Analytics-only: {analytics_count}")
+    log.info(f"  Tempo total: {time.time() - start_time:.1f}s")
     log.info("=" * 60)
 
     # Coleta de subscribers gained dos Shorts (separada, nao afeta coleta principal)
     try:
         from shorts_endpoints import _run_subs_collection_bg
         log.info("[shorts-subs] Iniciando coleta de subscribers dos shorts...")
-        _run_subs_collection_bg()
+        await loop.run_in_executor(_channel_executor, _run_subs_collection_bg)
         log.info("[shorts-subs] Coleta de subscribers concluida")
     except Exception as e:
         log.warning(f"[shorts-subs] Erro na coleta de subscribers (nao afeta coleta principal): {e}")
@@ -9,6 +9,7 @@ import logging
 from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Optional, Any
 from supabase import Client
+from database import run_query, iter_table_pages
 
 logger = logging.getLogger(__name__)
 
@@ -30,97 +31,129 @@ class NotificationChecker:
         logger.info("NotificationChecker inicializado")
     
     
-    async def check_and_create_notifications(self):
+    async def check_and_create_notifications(self, incremental: bool = True):
         """
         Funcao principal que verifica e cria notificacoes.
-        
-        Fluxo com anti-duplicacao:
+
+        Fluxo com anti-duplicacao (todas as regras em UMA passada):
         1. Busca regras ativas ordenadas por hierarquia
-        2. Para cada video que atinge marco:
-           - Se ja tem notificacao NAO VISTA e nova regra é maior: ATUALIZA
-           - Se ja foi visto alguma vez: PULA
-           - Se nao tem notificacao: CRIA
+        2. Monta indice com o snapshot mais recente de cada video
+           (incremental=True: apenas videos tocados pela ultima coleta)
+        3. Para cada video, escolhe o MAIOR marco atingido e, com as notificacoes
+           existentes pre-carregadas em lote:
+           - Se ja tem notificacao NAO VISTA e o marco é maior: ATUALIZA
+           - Se ja foi visto em marco maior ou igual: PULA
+           - Se nao tem notificacao: CRIA (insert em lote)
+
+        Args:
+            incremental: False varre todo o historico dentro do maior periodo
+                         (usado pelo /api/force-notifier para recuperar notificacoes perdidas)
         """
         try:
             logger.info("=" * 80)
-            logger.info("INICIANDO VERIFICACAO DE NOTIFICACOES")
+            logger.info(f"INICIANDO VERIFICACAO DE NOTIFICACOES ({'incremental' if incremental else 'completa'})")
             logger.info("=" * 80)
-            
+
             # Buscar regras ativas ORDENADAS por views_minimas (hierarquia)
             regras = await self.get_regras_ativas_ordenadas()
-            
+
             if not regras:
                 logger.info("Nenhuma regra ativa encontrada. Pulando verificacao.")
                 return
-            
+
             logger.info(f"Encontradas {len(regras)} regras ativas")
-            
-            total_criadas = 0
+            for regra in regras:
+                subnichos = ', '.join(regra['subnichos']) if regra.get('subnichos') else 'TODOS'
+                logger.info(f"   {regra['nome_regra']}: {regra['views_minimas']} views em {regra['periodo_dias']}d (subnichos: {subnichos})")
+
+            # Indice video_id -> snapshot mais recente
+            data_coleta = None
+            if incremental:
+                data_coleta = await self.get_latest_data_coleta()
+                if not data_coleta:
+                    logger.info("Nenhuma coleta encontrada. Pulando verificacao.")
+                    return
+                logger.info(f"📅 Avaliando apenas videos da coleta de {data_coleta}")
+
+            snapshots = await self.build_latest_snapshot_index(regras, data_coleta)
+
+            # Maior marco atingido por video (uma passada sobre o indice)
+            candidatos = {}  # {video_id: (video, regra)}
+            for video in snapshots.values():
+                regra = self._maior_regra_atingida(video, regras)
+                if regra:
+                    candidatos[video['video_id']] = (video, regra)
+
+            logger.info(f"🎯 {len(candidatos)} video(s) atingiram algum marco (de {len(snapshots)} avaliados)")
+
+            if not candidatos:
+                logger.info("=" * 80)
+                logger.info("✅ VERIFICACAO COMPLETA - nenhum marco atingido")
+                logger.info("=" * 80)
+                return
+
+            # Notificacoes existentes pre-carregadas em lote
+            existentes = await self.prefetch_notifications(list(candidatos.keys()))
+
+            # Regra anterior é identificada pelo periodo_dias da notificacao
+            regras_por_periodo = {}
+            for regra in regras:
+                regras_por_periodo.setdefault(regra['periodo_dias'], regra)
+
+            novas = []
+            duplicadas = []
             total_atualizadas = 0
             total_puladas = 0
-            
-            # Processar cada regra (da menor para maior)
-            for regra in regras:
-                logger.info("-" * 80)
-                logger.info(f"Processando regra: {regra['nome_regra']}")
-                logger.info(f"Marco: {regra['views_minimas']} views em {regra['periodo_dias']} dia(s)")
-                
-                # 🆕 Log de subnichos da regra
-                if regra.get('subnichos'):
-                    logger.info(f"Subnichos: {', '.join(regra['subnichos'])}")
-                else:
-                    logger.info("Subnichos: TODOS")
-                
-                # Buscar videos que atingiram o marco
-                videos = await self.get_videos_that_hit_milestone(regra)
-                
-                if not videos:
-                    logger.info("Nenhum video atingiu este marco")
-                    continue
-                
-                logger.info(f"{len(videos)} video(s) atingiram este marco")
-                
-                # Processar cada video
-                for video in videos:
-                    # Limpar duplicatas antigas antes de processar
-                    await self.cleanup_duplicate_notifications(video['video_id'])
-                    
-                    # Verificar se video ja tem notificacao NAO VISTA
-                    notificacao_existente = await self.get_unread_notification(video['video_id'])
-                    
-                    if notificacao_existente:
-                        # Comparar hierarquia de regras
-                        regra_anterior = await self.get_regra_by_periodo(notificacao_existente['periodo_dias'])
-                        
-                        if regra_anterior and regra['views_minimas'] > regra_anterior['views_minimas']:
-                            # Nova regra é maior - ATUALIZAR notificação
-                            await self.update_notification(notificacao_existente['id'], video, regra)
-                            total_atualizadas += 1
-                            logger.info(f"✅ NOTIFICACAO ATUALIZADA: '{video['titulo'][:50]}...' ({regra_anterior['nome_regra']} → {regra['nome_regra']})")
-                        else:
-                            total_puladas += 1
-                            logger.info(f"⭕ Video '{video['titulo'][:50]}...' ja tem notificacao igual ou maior - PULANDO")
+
+            for video_id, (video, regra) in candidatos.items():
+                notificacoes = existentes.get(video_id, [])
+                nao_vistas = sorted(
+                    (n for n in notificacoes if not n.get('vista')),
+                    key=lambda n: n.get('created_at') or '', reverse=True
+                )
+                # Limpar duplicatas antigas (mantem a nao vista mais recente)
+                duplicadas.extend(n['id'] for n in nao_vistas[1:])
+
+                if nao_vistas:
+                    notificacao_existente = nao_vistas[0]
+                    regra_anterior = regras_por_periodo.get(notificacao_existente['periodo_dias'])
+
+                    if regra_anterior and regra['views_minimas'] > regra_anterior['views_minimas']:
+                        # Nova regra é maior - ATUALIZAR notificação
+                        await self.update_notification(notificacao_existente['id'], video, regra)
+                        total_atualizadas += 1
+                        logger.info(f"✅ NOTIFICACAO ATUALIZADA: '{video['titulo'][:50]}...' ({regra_anterior['nome_regra']} → {regra['nome_regra']})")
                     else:
-                        # Verificar se já foi visto em marco maior ou igual
-                        ja_visto = await self.video_already_seen(video['video_id'], regra)
-
-                        if ja_visto:
-                            total_puladas += 1
-                            logger.info(f"👁️ Video '{video['titulo'][:50]}...' ja foi visto em marco maior/igual - PULANDO")
-                            continue
-                        
-                        # Criar nova notificacao
-                        await self.create_notification(video, regra)
-                        total_criadas += 1
-                        logger.info(f"🆕 NOTIFICACAO CRIADA: '{video['titulo'][:50]}...'")
-            
+                        total_puladas += 1
+                        logger.debug(f"⭕ Video '{video['titulo'][:50]}...' ja tem notificacao igual ou maior - PULANDO")
+                    continue
+
+                # Verificar se já foi visto em marco maior ou igual
+                ja_visto = any(
+                    regras_por_periodo.get(n['periodo_dias'])
+                    and regras_por_periodo[n['periodo_dias']]['views_minimas'] >= regra['views_minimas']
+                    for n in notificacoes if n.get('vista')
+                )
+                if ja_visto:
+                    total_puladas += 1
+                    logger.debug(f"👁️ Video '{video['titulo'][:50]}...' ja foi visto em marco maior/igual - PULANDO")
+                    continue
+
+                novas.append(self._build_notification_data(video, regra))
+
+            if duplicadas:
+                await self.delete_notifications(duplicadas)
+
+            total_criadas = await self.create_notifications_batch(novas)
+
             logger.info("=" * 80)
             logger.info(f"✅ VERIFICACAO COMPLETA")
             logger.info(f"   Criadas: {total_criadas}")
             logger.info(f"   Atualizadas: {total_atualizadas}")
             logger.info(f"   Puladas: {total_puladas}")
+            logger.info(f"   Duplicatas removidas: {len(duplicadas)}")
             logger.info("=" * 80)
-            
+
         except Exception as e:
             logger.error(f"Erro ao verificar notificacoes: {e}")
             import traceback
@@ -133,122 +166,144 @@ class NotificationChecker:
         Menor para maior: 15k → 50k → 100k → 150k
         """
         try:
-            response = self.db.table("regras_notificacoes")\
-                .select("*")\
-                .eq("ativa", True)\
-                .order("views_minimas")\
-                .execute()
+            response = await run_query(self.db.table("regras_notificacoes")
+                .select("*")
+                .eq("ativa", True)
+                .order("views_minimas"))
             return response.data if response.data else []
         except Exception as e:
             logger.error(f"Erro ao buscar regras ativas: {e}")
             return []
     
     
-    async def get_unread_notification(self, video_id: str) -> Optional[Dict]:
-        """
-        Busca notificação NÃO VISTA do vídeo.
-        Retorna apenas a primeira (mais recente).
-        """
+    async def get_latest_data_coleta(self) -> Optional[str]:
+        """Data (YYYY-MM-DD) da coleta mais recente em videos_historico."""
         try:
-            response = self.db.table("notificacoes")\
-                .select("*")\
-                .eq("video_id", video_id)\
-                .eq("vista", False)\
-                .order("created_at.desc")\
-                .limit(1)\
-                .execute()
-            
-            if response.data and len(response.data) > 0:
-                return response.data[0]
-            return None
-            
+            response = await run_query(self.db.table("videos_historico")
+                .select("data_coleta")
+                .order("data_coleta", desc=True)
+                .limit(1))
+            return response.data[0]['data_coleta'] if response.data else None
         except Exception as e:
-            logger.error(f"Erro ao buscar notificacao nao vista: {e}")
+            logger.error(f"Erro ao buscar ultima data de coleta: {e}")
             return None
     
     
-    async def get_regra_by_periodo(self, periodo_dias: int) -> Optional[Dict]:
-        """Busca regra ativa pelo período de dias"""
-        try:
-            response = self.db.table("regras_notificacoes")\
-                .select("*")\
-                .eq("periodo_dias", periodo_dias)\
-                .eq("ativa", True)\
-                .limit(1)\
-                .execute()
-            
-            if response.data and len(response.data) > 0:
-                return response.data[0]
-            return None
-            
-        except Exception as e:
-            logger.error(f"Erro ao buscar regra por periodo: {e}")
-            return None
+    async def build_latest_snapshot_index(self, regras: List[Dict], data_coleta: Optional[str] = None) -> Dict[str, Dict]:
+        """
+        Indice {video_id: snapshot mais recente} com os filtros mais amplos entre
+        todas as regras (maior periodo, menor views_minimas).
+
+        Args:
+            regras: Regras ativas
+            data_coleta: Se informado, considera apenas snapshots dessa coleta
+                         (1 linha por video - indice unico video_id,data_coleta)
+        """
+        maior_periodo = max(r['periodo_dias'] for r in regras)
+        menor_views = min(r['views_minimas'] for r in regras)
+        cutoff_date = (datetime.now(timezone.utc) - timedelta(days=maior_periodo)).isoformat()
+
+        def aplicar_filtros(query):
+            query = query.gte("data_publicacao", cutoff_date).gte("views_atuais", menor_views)
+            if data_coleta:
+                query = query.eq("data_coleta", data_coleta)
+            return query
+
+        # Streaming paginado (keyset), mantendo apenas a entrada mais recente de cada video
+        videos_map = {}
+        total_entradas = 0
+
+        async for page in iter_table_pages(
+            self.db, "videos_historico",
+            "id, video_id, titulo, views_atuais, data_publicacao, data_coleta, canal_id, canais_monitorados!inner(tipo, nome_canal, subnicho)",
+            apply=aplicar_filtros
+        ):
+            total_entradas += len(page)
+            for item in page:
+                atual = videos_map.get(item['video_id'])
+                if atual is None or item['data_coleta'] > atual['data_coleta']:
+                    videos_map[item['video_id']] = item
+
+        logger.info(f"📊 {total_entradas} entradas lidas → {len(videos_map)} videos unicos")
+
+        index = {}
+        for video_id, item in videos_map.items():
+            canal_info = item.get('canais_monitorados') or {}
+            index[video_id] = {
+                'video_id': video_id,
+                'titulo': item['titulo'],
+                'canal_id': item['canal_id'],
+                'nome_canal': canal_info.get('nome_canal', 'Unknown'),
+                'tipo_canal': canal_info.get('tipo', 'minerado'),
+                'subnicho': (canal_info.get('subnicho') or '').strip(),
+                'views_atuais': item['views_atuais'],
+                'data_publicacao': item['data_publicacao']
+            }
+        return index
     
     
-    async def video_already_seen(self, video_id: str, regra_atual: Dict) -> bool:
+    def _maior_regra_atingida(self, video: Dict, regras: List[Dict]) -> Optional[Dict]:
         """
-        Verifica se video ja teve notificacao VISTA para um marco MAIOR OU IGUAL.
-        Permite notificar novamente se atingir marcos maiores.
-
-        Exemplo:
-        - Video atingiu 10k → notificou → viu ✓
-        - Video atingiu 50k → pode notificar novamente ✓
-        - Video atingiu 100k → pode notificar novamente ✓
+        Maior regra (views_minimas) atingida pelo video.
+        🆕 SUPORTA FILTRO POR MÚLTIPLOS SUBNICHOS (case-insensitive)
         """
-        try:
-            # Buscar notificações vistas deste vídeo
-            response = self.db.table("notificacoes")\
-                .select("periodo_dias, views_atingidas")\
-                .eq("video_id", video_id)\
-                .eq("vista", True)\
-                .execute()
-
-            if not response.data:
-                return False  # Nunca foi visto
-
-            # Verificar se já viu um marco maior ou igual
-            for notif in response.data:
-                # Buscar regra anterior
-                regra_anterior = await self.get_regra_by_periodo(notif['periodo_dias'])
-
-                if regra_anterior:
-                    # Se regra anterior é maior ou igual, não notificar
-                    if regra_anterior['views_minimas'] >= regra_atual['views_minimas']:
-                        logger.debug(f"Video '{video_id}' ja visto em marco maior/igual: {regra_anterior['views_minimas']} >= {regra_atual['views_minimas']}")
-                        return True
-
-            # Se chegou aqui, todas as notificações vistas são de marcos menores
-            return False
+        agora = datetime.now(timezone.utc)
+        melhor = None
 
-        except Exception as e:
-            logger.error(f"Erro ao verificar se video ja foi visto: {e}")
-            return False
+        for regra in regras:
+            if video['views_atuais'] < regra['views_minimas']:
+                continue
+
+            cutoff_date = (agora - timedelta(days=regra['periodo_dias'])).isoformat()
+            # Comparacao ISO ate segundos (formatos de timezone podem variar)
+            if str(video['data_publicacao']).replace(' ', 'T')[:19] < cutoff_date[:19]:
+                continue
+
+            tipo_canal = regra.get('tipo_canal', 'ambos')
+            if tipo_canal != 'ambos' and video['tipo_canal'] != tipo_canal:
+                continue
+
+            if regra.get('subnichos'):
+                regra_subnichos = [s.strip().lower() for s in regra['subnichos']]
+                if video['subnicho'].lower() not in regra_subnichos:
+                    continue
+
+            # Regras vem ordenadas; em empate mantem a primeira
+            if melhor is None or regra['views_minimas'] > melhor['views_minimas']:
+                melhor = regra
+
+        return melhor
     
     
-    async def cleanup_duplicate_notifications(self, video_id: str):
+    async def prefetch_notifications(self, video_ids: List[str], chunk_size: int = 200) -> Dict[str, List[Dict]]:
         """
-        Remove notificações duplicadas não vistas do mesmo vídeo.
-        Mantém apenas a mais recente.
+        Busca em lote as notificacoes existentes dos videos.
+
+        Returns:
+            {video_id: [notificacoes]}
         """
+        por_video: Dict[str, List[Dict]] = {}
+
+        for i in range(0, len(video_ids), chunk_size):
+            chunk = video_ids[i:i + chunk_size]
+            try:
+                response = await run_query(self.db.table("notificacoes")
+                    .select("id, video_id, periodo_dias, vista, created_at")
+                    .in_("video_id", chunk))
+                for notif in response.data or []:
+                    por_video.setdefault(notif['video_id'], []).append(notif)
+            except Exception as e:
+                logger.error(f"Erro ao pre-carregar notificacoes: {e}")
+
+        return por_video
+    
+    
+    async def delete_notifications(self, ids: List[int], chunk_size: int = 200):
+        """Remove notificações duplicadas não vistas (em lote)."""
         try:
-            # Buscar todas notificações não vistas do vídeo
-            response = self.db.table("notificacoes")\
-                .select("id, created_at")\
-                .eq("video_id", video_id)\
-                .eq("vista", False)\
-                .order("created_at.desc")\
-                .execute()
-            
-            if response.data and len(response.data) > 1:
-                # Manter apenas a mais recente, deletar as outras
-                ids_to_delete = [n['id'] for n in response.data[1:]]
-                
-                for notif_id in ids_to_delete:
-                    self.db.table("notificacoes").delete().eq("id", notif_id).execute()
-                
-                logger.info(f"🧹 Removidas {len(ids_to_delete)} notificações duplicadas do vídeo")
-            
+            for i in range(0, len(ids), chunk_size):
+                await run_query(self.db.table("notificacoes").delete().in_("id", ids[i:i + chunk_size]))
+            logger.info(f"🧹 Removidas {len(ids)} notificações duplicadas")
         except Exception as e:
             logger.error(f"Erro ao limpar notificações duplicadas: {e}")
     
@@ -258,170 +313,73 @@ class NotificationChecker:
         Atualiza notificação existente com nova regra (elevação).
         """
         try:
-            # Formatar periodo e views
-            periodo_texto = self._formatar_periodo(regra['periodo_dias'])
-            views_texto = self._formatar_views(video['views_atuais'])
-            
-            # Criar mensagem
-            mensagem = (
-                f"O video '{video['titulo']}' do canal {video['nome_canal']} "
-                f"atingiu {views_texto} views nas ultimas {periodo_texto}"
-            )
-            
-            # Tipo de alerta
-            tipo_alerta = f"{views_texto}_{regra['periodo_dias']}d"
-            
+            notification_data = self._build_notification_data(video, regra)
+
             # Atualizar no banco
             update_data = {
-                'views_atingidas': video['views_atuais'],
-                'periodo_dias': regra['periodo_dias'],
-                'tipo_alerta': tipo_alerta,
-                'mensagem': mensagem,
-                'tipo_canal': video.get('tipo_canal', 'minerado'),
-                'data_disparo': datetime.now(timezone.utc).isoformat()
+                key: notification_data[key]
+                for key in ('views_atingidas', 'periodo_dias', 'tipo_alerta', 'mensagem', 'tipo_canal', 'data_disparo')
             }
-            
-            self.db.table("notificacoes")\
-                .update(update_data)\
-                .eq("id", notification_id)\
-                .execute()
-            
-            logger.info(f"Notificacao atualizada: {mensagem}")
-            
-        except Exception as e:
-            logger.error(f"Erro ao atualizar notificacao: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
-    
-    
-    async def get_videos_that_hit_milestone(self, regra: Dict) -> List[Dict]:
-        """
-        Busca videos que atingiram o marco especificado na regra.
-        🔧 CORRIGIDO: Usa apenas entrada mais recente de cada vídeo
-        🆕 SUPORTA FILTRO POR MÚLTIPLOS SUBNICHOS
-        """
-        try:
-            logger.info(f"🔍 Buscando videos para regra: {regra['nome_regra']} ({regra['views_minimas']} views em {regra['periodo_dias']}d)")
-
-            # Calcular data de corte
-            cutoff_date = (datetime.now(timezone.utc) - timedelta(days=regra['periodo_dias'])).isoformat()
-            logger.info(f"📅 Data de corte: {cutoff_date[:10]}")
 
-            # PASSO 1: Buscar TODOS os dados de uma vez (mais eficiente)
-            query = self.db.table("videos_historico").select(
-                "video_id, titulo, views_atuais, data_publicacao, data_coleta, canal_id, canais_monitorados!inner(tipo, nome_canal, subnicho)"
-            ).gte("data_publicacao", cutoff_date).gte("views_atuais", regra['views_minimas'])
+            await run_query(self.db.table("notificacoes")
+                .update(update_data)
+                .eq("id", notification_id))
 
-            # Filtrar por tipo de canal se necessario
-            tipo_canal = regra.get('tipo_canal', 'ambos')
-            if tipo_canal != 'ambos':
-                query = query.eq("canais_monitorados.tipo", tipo_canal)
-
-            response = query.execute()
-            logger.info(f"📊 Total de entradas encontradas (pode ter duplicatas): {len(response.data) if response.data else 0}")
-
-            if not response.data:
-                logger.info("❌ Nenhum video encontrado na query inicial")
-                return []
-
-            # PASSO 2: Agrupar por video_id e pegar apenas a entrada mais recente
-            videos_map = {}  # {video_id: entrada_completa_mais_recente}
-
-            for item in response.data:
-                video_id = item['video_id']
-                data_coleta = item['data_coleta']
-
-                # Se video_id já existe, comparar datas
-                if video_id in videos_map:
-                    if data_coleta > videos_map[video_id]['data_coleta']:
-                        videos_map[video_id] = item  # Substituir por mais recente
-                else:
-                    videos_map[video_id] = item
-
-            logger.info(f"🔢 Videos unicos (apos agrupar por mais recente): {len(videos_map)}")
-
-            # PASSO 3: Filtrar por subnichos (views ja foi filtrado na query)
-            videos = []
-            videos_filtrados_subnicho = 0
-
-            for video_id, item in videos_map.items():
-                canal_info = item.get('canais_monitorados', {})
-                video_subnicho = canal_info.get('subnicho', '').strip()
-
-                # Filtrar por subnichos da regra (normalizado e case-insensitive)
-                if regra.get('subnichos'):
-                    # Normalizar subnichos da regra
-                    regra_subnichos_normalized = [s.strip() for s in regra['subnichos']]
-
-                    # Verificar se subnicho do video esta na lista (case-insensitive)
-                    if not any(video_subnicho.lower() == rs.lower() for rs in regra_subnichos_normalized):
-                        videos_filtrados_subnicho += 1
-                        logger.debug(f"⏭️ Video '{item['titulo'][:40]}...' filtrado por subnicho: '{video_subnicho}' não está em {regra['subnichos']}")
-                        continue
-
-                videos.append({
-                    'video_id': item['video_id'],
-                    'titulo': item['titulo'],
-                    'canal_id': item['canal_id'],
-                    'nome_canal': canal_info.get('nome_canal', 'Unknown'),
-                    'tipo_canal': canal_info.get('tipo', 'minerado'),
-                    'views_atuais': item['views_atuais'],
-                    'data_publicacao': item['data_publicacao']
-                })
-
-            logger.info(f"✅ Videos que passaram filtros: {len(videos)}")
-            logger.info(f"📉 Filtrados por subnicho: {videos_filtrados_subnicho}")
-
-            return videos
+            logger.info(f"Notificacao atualizada: {update_data['mensagem']}")
 
         except Exception as e:
-            logger.error(f"Erro ao buscar videos que atingiram marco: {e}")
+            logger.error(f"Erro ao atualizar notificacao: {e}")
             import traceback
             logger.error(traceback.format_exc())
-            return []
     
     
-    async def create_notification(self, video: Dict, regra: Dict):
+    async def create_notifications_batch(self, notifications: List[Dict], chunk_size: int = 500) -> int:
         """
-        Cria uma nova notificacao no banco de dados.
+        Insere novas notificacoes em lote.
+
+        Returns:
+            Quantidade inserida
         """
-        try:
-            # Formatar periodo e views
-            periodo_texto = self._formatar_periodo(regra['periodo_dias'])
-            views_texto = self._formatar_views(video['views_atuais'])
-            
-            # Criar mensagem
-            mensagem = (
-                f"O video '{video['titulo']}' do canal {video['nome_canal']} "
-                f"atingiu {views_texto} views nas ultimas {periodo_texto}"
-            )
-            
-            # Tipo de alerta
-            tipo_alerta = f"{views_texto}_{regra['periodo_dias']}d"
-            
-            # Inserir no banco
-            notification_data = {
-                'video_id': video['video_id'],
-                'canal_id': video['canal_id'],
-                'nome_video': video['titulo'],
-                'nome_canal': video['nome_canal'],
-                'tipo_canal': video.get('tipo_canal', 'minerado'),
-                'views_atingidas': video['views_atuais'],
-                'periodo_dias': regra['periodo_dias'],
-                'tipo_alerta': tipo_alerta,
-                'mensagem': mensagem,
-                'vista': False,
-                'data_disparo': datetime.now(timezone.utc).isoformat()
-            }
-            
-            self.db.table("notificacoes").insert(notification_data).execute()
-            
-            logger.info(f"Notificacao criada: {mensagem}")
-            
-        except Exception as e:
-            logger.error(f"Erro ao criar notificacao: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
+        criadas = 0
+        for i in range(0, len(notifications), chunk_size):
+            chunk = notifications[i:i + chunk_size]
+            try:
+                await run_query(self.db.table("notificacoes").insert(chunk))
+                criadas += len(chunk)
+                for notif in chunk:
+                    logger.info(f"🆕 NOTIFICACAO CRIADA: {notif['mensagem']}")
+            except Exception as e:
+                logger.error(f"Erro ao criar lote de {len(chunk)} notificacoes: {e}")
+                import traceback
+                logger.error(traceback.format_exc())
+        return criadas
+    
+    
+    def _build_notification_data(self, video: Dict, regra: Dict) -> Dict:
+        """Monta a linha de notificacao (mensagem, tipo_alerta) para video + regra."""
+        # Formatar periodo e views
+        periodo_texto = self._formatar_periodo(regra['periodo_dias'])
+        views_texto = self._formatar_views(video['views_atuais'])
+
+        # Criar mensagem
+        mensagem = (
+            f"O video '{video['titulo']}' do canal {video['nome_canal']} "
+            f"atingiu {views_texto} views nas ultimas {periodo_texto}"
+        )
+
+        return {
+            'video_id': video['video_id'],
+            'canal_id': video['canal_id'],
+            'nome_video': video['titulo'],
+            'nome_canal': video['nome_canal'],
+            'tipo_canal': video.get('tipo_canal', 'minerado'),
+            'views_atingidas': video['views_atuais'],
+            'periodo_dias': regra['periodo_dias'],
+            'tipo_alerta': f"{views_texto}_{regra['periodo_dias']}d",
+            'mensagem': mensagem,
+            'vista': False,
+            'data_disparo': datetime.now(timezone.utc).isoformat()
+        }
     
     
     def _formatar_periodo(self, periodo_dias: int) -> str:
@@ -7,9 +7,10 @@ Planilha: 1XL6VhOTVVMmfGNqPyJra2T8KjfFbtJ1o16OZkytvCPc
 from fastapi import APIRouter, HTTPException
 from datetime import datetime, date, timezone, timedelta
 import logging
-import time
 import re
 
+from response_cache import response_cache
+
 _BRT = timezone(timedelta(hours=-3))
 
 logger = logging.getLogger(__name__)
@@ -18,11 +19,11 @@ router = APIRouter(prefix="/api/perfis", tags=["perfis"])
 
 # ── Cache ──────────────────────────────────────────────────────────────
 CACHE_TTL_SECONDS = 60  # 1 min
-_cache = {}  # {"pub": {"data": ..., "ts": ...}, "proxys": {...}, ...}
+response_cache.register_namespace("perfis", CACHE_TTL_SECONDS)  # chaves: "pub", "proxys", ...
 
 def clear_perfis_cache():
     """Clear all perfis cache — called by main.py cache/clear endpoint."""
-    _cache.clear()
+    response_cache.clear("perfis")
 
 SPREADSHEET_ID = "1XL6VhOTVVMmfGNqPyJra2T8KjfFbtJ1o16OZkytvCPc"
 
@@ -63,14 +64,11 @@ def _get_sheets_client():
 
 def _get_cached(key: str):
     """Return cached data if fresh, else None."""
-    entry = _cache.get(key)
-    if entry and (time.time() - entry["ts"]) < CACHE_TTL_SECONDS:
-        return entry["data"]
-    return None
+    return response_cache.get("perfis", key)
 
 
 def _set_cache(key: str, data):
-    _cache[key] = {"data": data, "ts": time.time()}
+    response_cache.set("perfis", key, data)
 
 
 def _parse_date(date_str: str) -> date | None:
@@ -678,6 +676,6 @@ async def get_alerts_count():
 @router.post("/webhook")
 async def perfis_webhook():
     """Webhook chamado pelo Google Apps Script onEdit. Limpa todo o cache."""
-    _cache.clear()
+    clear_perfis_cache()
     logger.info("Perfis cache cleared via webhook")
     return {"status": "ok", "message": "Cache cleared"}
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Instrumentação de latência por rota + contagem de queries Supabase por request
+
+- RequestMetrics.observe(): histograma de latência por rota (template, ex: /api/canais/{canal_id})
+- record_db_query(): chamado por database.run_query — soma queries/tempo do request atual
+  (ContextVar, então tasks criadas dentro do request também contam)
+- render_prometheus(): texto no formato Prometheus para /api/metrics
+"""
+
+import os
+import time
+import threading
+from collections import deque
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+# Quantas amostras por rota guardar para p50/p95/p99 (janela deslizante)
+METRICS_RESERVOIR_SIZE = int(os.environ.get("METRICS_RESERVOIR_SIZE", "1024"))
+
+# Buckets do histograma (segundos)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class RequestDbStats:
+    """Queries Supabase feitas durante um request."""
+    __slots__ = ("queries", "seconds", "by_target")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+        self.by_target: Dict[str, int] = {}
+
+
+_current_db_stats: ContextVar[Optional[RequestDbStats]] = ContextVar("current_db_stats", default=None)
+
+
+def begin_request() -> RequestDbStats:
+    """Inicia a contagem de queries para o request atual."""
+    stats = RequestDbStats()
+    _current_db_stats.set(stats)
+    return stats
+
+
+def record_db_query(target: str, elapsed: float):
+    """Registra uma query (tabela/rpc + duração) no request atual e no agregado global."""
+    stats = _current_db_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.seconds += elapsed
+        stats.by_target[target] = stats.by_target.get(target, 0) + 1
+    request_metrics.observe_query(target, elapsed)
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+class _RouteStats:
+    __slots__ = ("count", "sum", "buckets", "samples", "db_queries", "db_seconds", "max_db_queries", "errors")
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.samples = deque(maxlen=METRICS_RESERVOIR_SIZE)
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.max_db_queries = 0
+        self.errors = 0
+
+
+class RequestMetrics:
+    """Agregado em memória (por processo) de latência por rota e queries ao banco."""
+
+    def __init__(self):
+        self._routes: Dict[tuple, _RouteStats] = {}
+        self._queries: Dict[str, List[float]] = {}  # target -> [count, seconds]
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def observe(self, method: str, route: str, status: int, seconds: float, db: Optional[RequestDbStats] = None):
+        with self._lock:
+            stats = self._routes.get((method, route))
+            if stats is None:
+                stats = self._routes[(method, route)] = _RouteStats()
+            stats.count += 1
+            stats.sum += seconds
+            stats.samples.append(seconds)
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    stats.buckets[i] += 1
+            if status >= 500:
+                stats.errors += 1
+            if db is not None:
+                stats.db_queries += db.queries
+                stats.db_seconds += db.seconds
+                stats.max_db_queries = max(stats.max_db_queries, db.queries)
+
+    def observe_query(self, target: str, seconds: float):
+        with self._lock:
+            entry = self._queries.setdefault(target, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def route_summary(self) -> List[Dict]:
+        """Resumo por rota (p50/p95/p99, queries por request), ordenado por p95 desc."""
+        with self._lock:
+            items = [(key, stats, sorted(stats.samples)) for key, stats in self._routes.items()]
+
+        summary = []
+        for (method, route), stats, samples in items:
+            summary.append({
+                "method": method,
+                "route": route,
+                "count": stats.count,
+                "errors": stats.errors,
+                "p50_ms": round(_percentile(samples, 50) * 1000, 1),
+                "p95_ms": round(_percentile(samples, 95) * 1000, 1),
+                "p99_ms": round(_percentile(samples, 99) * 1000, 1),
+                "avg_db_queries": round(stats.db_queries / stats.count, 2) if stats.count else 0.0,
+                "max_db_queries": stats.max_db_queries,
+                "db_time_pct": round(stats.db_seconds / stats.sum * 100, 1) if stats.sum else 0.0,
+            })
+        summary.sort(key=lambda r: r["p95_ms"], reverse=True)
+        return summary
+
+    def render_prometheus(self, top_n: int = 10) -> str:
+        """Exporta métricas no formato texto do Prometheus."""
+        lines = []
+        with self._lock:
+            routes = [(key, stats, sorted(stats.samples)) for key, stats in self._routes.items()]
+            queries = sorted(self._queries.items(), key=lambda kv: kv[1][1], reverse=True)
+
+        def label(method, route):
+            return f'method="{method}",route="{route}"'
+
+        lines.append("# HELP http_request_duration_seconds Latência dos requests por rota")
+        lines.append("# TYPE http_request_duration_seconds histogram")
+        for (method, route), stats, _ in routes:
+            for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+                lines.append(f'http_request_duration_seconds_bucket{{{label(method, route)},le="{bound}"}} {count}')
+            lines.append(f'http_request_duration_seconds_bucket{{{label(method, route)},le="+Inf"}} {stats.count}')
+            lines.append(f"http_request_duration_seconds_sum{{{label(method, route)}}} {stats.sum:.6f}")
+            lines.append(f"http_request_duration_seconds_count{{{label(method, route)}}} {stats.count}")
+
+        lines.append("# HELP http_request_duration_quantile_seconds p50/p95/p99 (janela das últimas amostras)")
+        lines.append("# TYPE http_request_duration_quantile_seconds gauge")
+        for (method, route), _, samples in routes:
+            for pct in (50, 95, 99):
+                lines.append(
+                    f'http_request_duration_quantile_seconds{{{label(method, route)},quantile="0.{pct}"}} '
+                    f"{_percentile(samples, pct):.6f}"
+                )
+
+        lines.append("# HELP http_request_errors_total Respostas 5xx por rota")
+        lines.append("# TYPE http_request_errors_total counter")
+        for (method, route), stats, _ in routes:
+            lines.append(f"http_request_errors_total{{{label(method, route)}}} {stats.errors}")
+
+        lines.append("# HELP http_request_db_queries_total Queries Supabase feitas pela rota")
+        lines.append("# TYPE http_request_db_queries_total counter")
+        for (method, route), stats, _ in routes:
+            lines.append(f"http_request_db_queries_total{{{label(method, route)}}} {stats.db_queries}")
+
+        lines.append("# HELP http_request_db_seconds_total Tempo em queries Supabase pela rota")
+        lines.append("# TYPE http_request_db_seconds_total counter")
+        for (method, route), stats, _ in routes:
+            lines.append(f"http_request_db_seconds_total{{{label(method, route)}}} {stats.db_seconds:.6f}")
+
+        # Top N rotas com mais queries por request (candidatas a N+1)
+        offenders = sorted(routes, key=lambda r: r[1].db_queries / r[1].count if r[1].count else 0, reverse=True)
+        lines.append(f"# HELP http_request_db_queries_per_request Média de queries por request (top {top_n})")
+        lines.append("# TYPE http_request_db_queries_per_request gauge")
+        for (method, route), stats, _ in offenders[:top_n]:
+            if stats.db_queries:
+                lines.append(
+                    f"http_request_db_queries_per_request{{{label(method, route)}}} {stats.db_queries / stats.count:.2f}"
+                )
+
+        lines.append(f"# HELP db_query_seconds_total Tempo total por tabela/rpc (top {top_n})")
+        lines.append("# TYPE db_query_seconds_total counter")
+        for target, (count, seconds) in queries[:top_n]:
+            lines.append(f'db_query_seconds_total{{target="{target}"}} {seconds:.6f}')
+        lines.append(f"# HELP db_query_total Queries por tabela/rpc (top {top_n})")
+        lines.append("# TYPE db_query_total counter")
+        for target, (count, seconds) in queries[:top_n]:
+            lines.append(f'db_query_total{{target="{target}"}} {count}')
+
+        lines.append("# HELP process_uptime_seconds Tempo desde o início do processo")
+        lines.append("# TYPE process_uptime_seconds gauge")
+        lines.append(f"process_uptime_seconds {time.time() - self.started_at:.0f}")
+        return "\n".join(lines) + "\n"
+
+
+# Instância única (main.py middleware + database.run_query)
+request_metrics = RequestMetrics()
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""
+Cache unificado de respostas (LRU + orçamento de memória + TTL por namespace)
+
+Substitui os dicts soltos que cada módulo mantinha (dashboard_cache, comments_cache,
+_mc_cache, perfis _cache, _leva3_cache). Cada módulo registra um namespace com o
+seu TTL; todos dividem o mesmo orçamento de memória e a mesma política LRU.
+
+- get_or_compute(): coalescing — N misses simultâneos na mesma chave = 1 cálculo
+- stats(): hits/misses/evictions por namespace (exposto em /api/cache-stats)
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Orçamento total de memória do cache (MB)
+RESPONSE_CACHE_MAX_MB = int(os.environ.get("RESPONSE_CACHE_MAX_MB", "64"))
+
+
+def estimate_size(obj: Any, _depth: int = 0) -> int:
+    """
+    Estimativa aproximada (bytes) do tamanho de uma resposta em memória.
+    Percorre dict/list recursivamente (limite de profundidade) em vez de len(str(obj)).
+    """
+    size = sys.getsizeof(obj)
+    if _depth > 8:
+        return size
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            size += estimate_size(k, _depth + 1) + estimate_size(v, _depth + 1)
+    elif isinstance(obj, (list, tuple, set)):
+        for item in obj:
+            size += estimate_size(item, _depth + 1)
+    return size
+
+
+class _Entry:
+    __slots__ = ("value", "created_at", "expires_at", "size")
+
+    def __init__(self, value: Any, ttl: float, size: int):
+        now = time.time()
+        self.value = value
+        self.created_at = now
+        self.expires_at = now + ttl
+        self.size = size
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.created_at
+
+    @property
+    def expired(self) -> bool:
+        return time.time() >= self.expires_at
+
+
+class ResponseCache:
+    """
+    Cache LRU com orçamento de memória compartilhado entre namespaces.
+
+    Entradas expiradas não são servidas por get(), mas continuam na LRU até serem
+    sobrescritas ou despejadas.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._ttls: Dict[str, float] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+
+    # ------------------------------------------------------------------
+    # Namespaces
+    # ------------------------------------------------------------------
+
+    def register_namespace(self, namespace: str, ttl_seconds: float):
+        """Registra (ou atualiza) o TTL padrão de um namespace."""
+        self._ttls[namespace] = ttl_seconds
+        self._stats.setdefault(namespace, {"hits": 0, "misses": 0, "evictions": 0, "coalesced": 0})
+
+    def _ns_stats(self, namespace: str) -> Dict[str, int]:
+        return self._stats.setdefault(namespace, {"hits": 0, "misses": 0, "evictions": 0, "coalesced": 0})
+
+    # ------------------------------------------------------------------
+    # Leitura / escrita
+    # ------------------------------------------------------------------
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Retorna o valor se existir e não estiver expirado (senão None)."""
+        entry = self.get_entry(namespace, key)
+        return entry.value if entry is not None else None
+
+    def get_entry(self, namespace: str, key: str, allow_stale: bool = False,
+                  count: bool = True) -> Optional[_Entry]:
+        """
+        Como get(), mas retorna a entrada (value/age). allow_stale=True serve expiradas.
+        count=False: consulta de metadados (não conta hit/miss nem mexe na LRU).
+        """
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None or (entry.expired and not allow_stale):
+                if count:
+                    self._ns_stats(namespace)["misses"] += 1
+                return None
+            if count:
+                self._entries.move_to_end((namespace, key))
+                self._ns_stats(namespace)["hits"] += 1
+            return entry
+
+    def version(self, namespace: str, key: str, value: Any) -> Optional[float]:
+        """
+        created_at da entrada se ela ainda guarda exatamente `value` (mesmo objeto).
+        Usado como versão dos dados no ETag; não conta hit/miss.
+        """
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            return entry.created_at if entry is not None and entry.value is value else None
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None,
+            size: Optional[int] = None):
+        """
+        Salva valor no namespace (TTL padrão do namespace se ttl=None).
+        size: bytes ocupados, para objetos que estimate_size não percorre (instâncias de classe).
+        """
+        ttl = ttl if ttl is not None else self._ttls.get(namespace, 300)
+        size = size if size is not None else estimate_size(value)
+        if size > self.max_bytes:
+            logger.warning(f"⚠️ Cache: resposta de {size / 1024:.0f}KB maior que o orçamento - não cacheada ({namespace})")
+            return
+
+        with self._lock:
+            old = self._entries.pop((namespace, key), None)
+            if old is not None:
+                self._bytes -= old.size
+            self._entries[(namespace, key)] = _Entry(value, ttl, size)
+            self._bytes += size
+            self._evict_locked()
+
+    def _evict_locked(self):
+        while self._bytes > self.max_bytes and self._entries:
+            (namespace, _), entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+            self._ns_stats(namespace)["evictions"] += 1
+
+    async def get_or_compute(self, namespace: str, key: str, compute: Callable[[], Awaitable[Any]],
+                             ttl: Optional[float] = None,
+                             size_of: Optional[Callable[[Any], int]] = None) -> Any:
+        """
+        Retorna do cache ou calcula. Misses simultâneos na mesma chave aguardam o
+        mesmo cálculo (request coalescing) em vez de bater no banco N vezes.
+        size_of(valor): tamanho em bytes a contabilizar (padrão: estimate_size).
+        """
+        value = self.get(namespace, key)
+        if value is not None:
+            return value
+
+        inflight = self._inflight.get((namespace, key))
+        if inflight is not None:
+            self._ns_stats(namespace)["coalesced"] += 1
+            return await asyncio.shield(inflight)
+
+        # Cálculo em task própria: cancelar o request que disparou (cliente desconectou)
+        # não cancela o cálculo dos outros requests que aguardam a mesma chave
+        task = asyncio.ensure_future(self._compute_and_store(namespace, key, compute, ttl, size_of))
+        self._inflight[(namespace, key)] = task
+        task.add_done_callback(lambda t: self._finish_inflight(namespace, key, t))
+        return await asyncio.shield(task)
+
+    async def _compute_and_store(self, namespace: str, key: str, compute: Callable[[], Awaitable[Any]],
+                                 ttl: Optional[float], size_of: Optional[Callable[[Any], int]]) -> Any:
+        value = await compute()
+        if value is not None:
+            self.set(namespace, key, value, ttl, size=size_of(value) if size_of else None)
+        return value
+
+    def _finish_inflight(self, namespace: str, key: str, task: "asyncio.Task"):
+        if self._inflight.get((namespace, key)) is task:
+            del self._inflight[(namespace, key)]
+        # Evita "Task exception was never retrieved" quando todos os requests cancelaram
+        if not task.cancelled():
+            task.exception()
+
+    # ------------------------------------------------------------------
+    # Invalidação / estatísticas
+    # ------------------------------------------------------------------
+
+    def invalidate(self, namespace: str, key: str) -> bool:
+        with self._lock:
+            entry = self._entries.pop((namespace, key), None)
+            if entry is not None:
+                self._bytes -= entry.size
+            return entry is not None
+
+    def expire(self, namespace: str) -> int:
+        """
+        Marca todas as entradas do namespace como expiradas sem removê-las
+        (continuam disponíveis via get_entry(allow_stale=True)). Retorna quantas.
+        """
+        now = time.time()
+        count = 0
+        with self._lock:
+            for (ns, _), entry in self._entries.items():
+                if ns == namespace and entry.expires_at > now:
+                    entry.expires_at = now
+                    count += 1
+        return count
+
+    def clear(self, namespace: Optional[str] = None) -> dict:
+        """Limpa um namespace (ou tudo). Retorna {entries_cleared, approx_size_kb}."""
+        with self._lock:
+            if namespace is None:
+                keys = list(self._entries.keys())
+            else:
+                keys = [k for k in self._entries if k[0] == namespace]
+            freed = 0
+            for k in keys:
+                freed += self._entries.pop(k).size
+            self._bytes -= freed
+        return {"entries_cleared": len(keys), "approx_size_kb": round(freed / 1024, 1)}
+
+    def stats(self) -> dict:
+        with self._lock:
+            per_ns: Dict[str, dict] = {}
+            for (namespace, _), entry in self._entries.items():
+                ns = per_ns.setdefault(namespace, {"entries": 0, "bytes": 0, "stale_entries": 0})
+                ns["entries"] += 1
+                ns["bytes"] += entry.size
+                if entry.expired:
+                    ns["stale_entries"] += 1
+
+            namespaces = {}
+            for namespace in set(self._stats) | set(per_ns):
+                counters = self._ns_stats(namespace)
+                usage = per_ns.get(namespace, {"entries": 0, "bytes": 0, "stale_entries": 0})
+                lookups = counters["hits"] + counters["misses"]
+                namespaces[namespace] = {
+                    "ttl_seconds": self._ttls.get(namespace),
+                    **counters,
+                    "hit_rate_pct": round(counters["hits"] / lookups * 100, 1) if lookups else 0.0,
+                    "entries": usage["entries"],
+                    "stale_entries": usage["stale_entries"],
+                    "size_kb": round(usage["bytes"] / 1024, 1),
+                }
+
+            return {
+                "entries": len(self._entries),
+                "size_kb": round(self._bytes / 1024, 1),
+                "max_size_kb": round(self.max_bytes / 1024, 1),
+                "utilization_pct": round(self._bytes / self.max_bytes * 100, 1) if self.max_bytes else 0.0,
+                "namespaces": namespaces,
+            }
+
+
+# Instância única usada por main.py, mission_control, perfis_endpoints e shorts_endpoints
+response_cache = ResponseCache(max_bytes=RESPONSE_CACHE_MAX_MB * 1024 * 1024)
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+Camada de resposta JSON: serialização rápida, compressão e respostas condicionais
+
+- FastJSONResponse: orjson (fallback json stdlib) - default_response_class do app
+- compact_response_middleware: GET /api/* em JSON recebe ETag forte (hash do corpo),
+  304 se If-None-Match bater, e brotli/gzip acima de RESPONSE_COMPRESS_MIN_BYTES
+- cached_json_response(): para respostas do response_cache - ETag derivado de
+  chave + versão (created_at da entrada), então 304 sai sem serializar nada e o
+  corpo comprimido fica guardado por versão (polling do dashboard não recomprime)
+"""
+
+import os
+import gzip
+import json
+import hashlib
+import logging
+from decimal import Decimal
+from typing import Any, List, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+from response_cache import response_cache
+
+try:
+    import orjson
+except ImportError:  # fallback: json stdlib compacto
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # sem brotli: só gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Respostas menores que isso vão sem compressão (overhead > ganho)
+RESPONSE_COMPRESS_MIN_BYTES = int(os.environ.get("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+
+# Corpos já serializados/comprimidos por versão (chave = ETag + encoding)
+_ENCODED_NAMESPACE = "encoded_responses"
+response_cache.register_namespace(_ENCODED_NAMESPACE, 15 * 60)
+
+_BROTLI_QUALITY = 5
+_GZIP_LEVEL = 6
+
+
+def _default(obj: Any) -> Any:
+    """Tipos que o encoder não conhece (mesmo resultado do jsonable_encoder)."""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    if hasattr(obj, "tolist"):  # numpy
+        return obj.tolist()
+    return str(obj)
+
+
+if orjson is not None:
+    _ORJSON_OPTS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=_ORJSON_OPTS)
+else:
+    def dumps(content: Any) -> bytes:
+        return json.dumps(content, default=_default, ensure_ascii=False,
+                          separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse serializada com orjson (compacta, sem espaços)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+# ========================================
+# ETag / compressão
+# ========================================
+
+def make_etag(*parts: Any) -> str:
+    digest = hashlib.blake2b("\x1f".join(str(p) for p in parts).encode("utf-8"), digest_size=16)
+    return digest.hexdigest()
+
+
+def _body_etag(body: bytes) -> str:
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def choose_encoding(request: Request) -> Optional[str]:
+    """br se o cliente aceita e brotli está instalado; senão gzip; senão None."""
+    accepted = set()
+    for item in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = item.strip().partition(";")
+        if name and params.replace(" ", "") not in ("q=0", "q=0.0"):
+            accepted.add(name.lower())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    """Comprime acima do limite. Retorna (corpo, encoding usado ou None)."""
+    if encoding is None or len(body) < RESPONSE_COMPRESS_MIN_BYTES:
+        return body, None
+    if encoding == "br":
+        return brotli.compress(body, quality=_BROTLI_QUALITY), "br"
+    # mtime=0: mesmo corpo -> mesmos bytes (ETag estável entre requests)
+    return gzip.compress(body, compresslevel=_GZIP_LEVEL, mtime=0), "gzip"
+
+
+def _quoted(etag: str, encoding: Optional[str]) -> str:
+    # ETag forte por representação: a versão comprimida tem ETag próprio
+    return f'"{etag}-{encoding}"' if encoding else f'"{etag}"'
+
+
+def _matches(request: Request, quoted_etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in candidates or quoted_etag in candidates
+
+
+def _headers(quoted_etag: str, encoding: Optional[str]) -> dict:
+    headers = {"ETag": quoted_etag, "Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return headers
+
+
+def cached_json_response(request: Request, content: Any, namespace: str, cache_key: str) -> Response:
+    """
+    Resposta para um valor servido do response_cache (namespace, cache_key).
+
+    ETag = chave + versão da entrada: 304 não serializa nada e o corpo
+    serializado/comprimido é reaproveitado enquanto a versão não mudar.
+    Se o valor não é mais o que está no cache, cai no ETag por hash do corpo.
+    """
+    version = response_cache.version(namespace, cache_key, content)
+    if version is None:
+        return json_response(request, content)
+
+    etag = make_etag(namespace, cache_key, version)
+    encoding = choose_encoding(request)
+    quoted = _quoted(etag, encoding)
+    # Corpo pequeno vai sem compressão (ETag sem sufixo): aceita os dois
+    if _matches(request, quoted) or _matches(request, _quoted(etag, None)):
+        return Response(status_code=304, headers=_headers(quoted, None))
+
+    encoded_key = f"{etag}:{encoding or 'identity'}"
+    cached = response_cache.get(_ENCODED_NAMESPACE, encoded_key)
+    if cached is None:
+        cached = compress(dumps(content), encoding)
+        response_cache.set(_ENCODED_NAMESPACE, encoded_key, cached)
+    body, used_encoding = cached
+    # Corpo abaixo do limite vai sem compressão: ETag sem sufixo
+    quoted = _quoted(etag, used_encoding)
+    return Response(content=body, media_type="application/json", headers=_headers(quoted, used_encoding))
+
+
+def json_response(request: Request, content: Any) -> Response:
+    """Resposta JSON com ETag por hash do corpo (304 / compressão como o middleware)."""
+    return _conditional(request, dumps(content))
+
+
+def _conditional(request: Request, body: bytes, status_code: int = 200,
+                 raw_headers: Optional[List[Tuple[bytes, bytes]]] = None) -> Response:
+    etag = _body_etag(body)
+    encoding = choose_encoding(request) if len(body) >= RESPONSE_COMPRESS_MIN_BYTES else None
+    quoted = _quoted(etag, encoding)
+    if status_code == 200 and _matches(request, quoted):
+        return Response(status_code=304, headers=_headers(quoted, None))
+
+    body, used_encoding = compress(body, encoding)
+    response = Response(content=body, status_code=status_code, media_type="application/json",
+                        headers=_headers(quoted, used_encoding))
+    # Pares crus: headers repetidos (Set-Cookie) chegam todos ao cliente
+    response.raw_headers.extend(raw_headers or [])
+    return response
+
+
+async def compact_response_middleware(request: Request, call_next):
+    """
+    GET /api/* com corpo JSON: ETag forte + 304 + brotli/gzip.
+    Respostas que já trazem ETag/Content-Encoding (cached_json_response) passam direto.
+    Registrar ANTES do GZipMiddleware (fica por dentro dele; o GZip ignora corpo já codificado).
+    """
+    response = await call_next(request)
+    if (
+        request.method != "GET"
+        or not request.url.path.startswith("/api/")
+        or response.status_code != 200
+        or "etag" in response.headers
+        or "content-encoding" in response.headers
+        or not response.headers.get("content-type", "").startswith("application/json")
+    ):
+        return response
+
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    # ETag/Content-Encoding não chegam aqui (retorno acima); Vary repetido é válido
+    raw_headers = [
+        (k, v) for k, v in response.headers.raw
+        if k.lower() not in (b"content-length", b"content-type")
+    ]
+    return _conditional(request, body, response.status_code, raw_headers)
@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+"""
+Rollup diário de receita (yt_daily_metrics) para os endpoints de monetização
+
+Cada canal vira séries acumuladas (prefix sums) por dia desde a primeira data:
+revenue/views (todas as linhas) e revenue/views só de dados reais. Qualquer
+período [início, fim] sai com 2 lookups por canal (cum[fim] - cum[início - 1]),
+sem reler linhas do banco a cada request.
+
+- Construído com 1 leitura paginada de yt_daily_metrics + metadados dos canais
+- Guardado no response_cache (namespace "monetization_rollup", TTL configurável)
+- refresh_revenue_rollup() é chamado depois de collect_oauth_metrics
+"""
+
+import os
+import sys
+import time
+import logging
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from database import run_query
+from response_cache import estimate_size, response_cache
+
+logger = logging.getLogger(__name__)
+
+# Validade do rollup em memória (yt_daily_metrics também recebe estimativas fora da coleta OAuth)
+MONETIZATION_ROLLUP_TTL_MINUTES = int(os.environ.get("MONETIZATION_ROLLUP_TTL_MINUTES", "30"))
+
+_NAMESPACE = "monetization_rollup"
+_KEY = "all"
+response_cache.register_namespace(_NAMESPACE, MONETIZATION_ROLLUP_TTL_MINUTES * 60)
+
+_PAGE_SIZE = 1000
+
+
+def _as_date(value) -> date:
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+
+class ChannelRevenueSeries:
+    """
+    Séries acumuladas de um canal. Índice i = origin + i dias; cum_*[i + 1] = soma até o dia i.
+    last_row[i] / last_real[i] = último índice <= i com linha (qualquer / real), -1 se nenhum.
+    """
+
+    __slots__ = ("origin", "days", "cum_revenue", "cum_views", "cum_revenue_real", "cum_views_real",
+                 "cum_estimates", "last_row", "last_real")
+
+    def __init__(self, origin: date, days: int, rows: List[Tuple[int, float, int, bool]]):
+        self.origin = origin
+        self.days = days
+
+        revenue = [0.0] * days
+        views = [0] * days
+        revenue_real = [0.0] * days
+        views_real = [0] * days
+        estimates = [0] * days
+        has_row = [False] * days
+        has_real = [False] * days
+        for index, rev, vws, is_estimate in rows:
+            revenue[index] += rev
+            views[index] += vws
+            has_row[index] = True
+            if is_estimate:
+                estimates[index] += 1
+            else:
+                revenue_real[index] += rev
+                views_real[index] += vws
+                has_real[index] = True
+
+        self.cum_revenue = self._prefix(revenue)
+        self.cum_views = self._prefix(views)
+        self.cum_revenue_real = self._prefix(revenue_real)
+        self.cum_views_real = self._prefix(views_real)
+        self.cum_estimates = self._prefix(estimates)
+        self.last_row = self._last_seen(has_row)
+        self.last_real = self._last_seen(has_real)
+
+    def approx_bytes(self) -> int:
+        """Memória das séries (listas + objetos int/float de cada posição)."""
+        total = 0
+        for name in ("cum_revenue", "cum_views", "cum_revenue_real", "cum_views_real",
+                     "cum_estimates", "last_row", "last_real"):
+            values = getattr(self, name)
+            total += sys.getsizeof(values) + len(values) * 32
+        return total
+
+    @staticmethod
+    def _prefix(values: List) -> List:
+        cum = [0] * (len(values) + 1)
+        total = 0
+        for i, value in enumerate(values):
+            total += value
+            cum[i + 1] = total
+        return cum
+
+    @staticmethod
+    def _last_seen(flags: List[bool]) -> List[int]:
+        last, out = -1, [-1] * len(flags)
+        for i, flag in enumerate(flags):
+            if flag:
+                last = i
+            out[i] = last
+        return out
+
+    def _span(self, start: date, end: date) -> Optional[Tuple[int, int]]:
+        """Intervalo [i, j] (inclusivo) recortado para a série; None se vazio."""
+        i = max((start - self.origin).days, 0)
+        j = min((end - self.origin).days, self.days - 1)
+        return (i, j) if i <= j else None
+
+    def totals(self, start: date, end: date, real_only: bool = False) -> Dict:
+        """Soma do período inclusivo [start, end] em O(1)."""
+        span = self._span(start, end)
+        if span is None:
+            return {"revenue": 0.0, "views": 0, "has_estimate": False, "last_date": None}
+        i, j = span
+        if real_only:
+            revenue = self.cum_revenue_real[j + 1] - self.cum_revenue_real[i]
+            views = self.cum_views_real[j + 1] - self.cum_views_real[i]
+            has_estimate = False
+            last = self.last_real[j]
+        else:
+            revenue = self.cum_revenue[j + 1] - self.cum_revenue[i]
+            views = self.cum_views[j + 1] - self.cum_views[i]
+            has_estimate = self.cum_estimates[j + 1] - self.cum_estimates[i] > 0
+            last = self.last_row[j]
+        last_date = (self.origin + timedelta(days=last)).isoformat() if last >= i else None
+        return {"revenue": revenue, "views": views, "has_estimate": has_estimate, "last_date": last_date}
+
+    def daily(self, start: date, end: date, real_only: bool = False) -> List[Tuple[str, float, bool]]:
+        """(data, revenue, teve_linha) de cada dia do período - diferença de prefixos vizinhos."""
+        span = self._span(start, end)
+        if span is None:
+            return []
+        cum = self.cum_revenue_real if real_only else self.cum_revenue
+        last = self.last_real if real_only else self.last_row
+        return [
+            ((self.origin + timedelta(days=k)).isoformat(), cum[k + 1] - cum[k], last[k] == k)
+            for k in range(span[0], span[1] + 1)
+        ]
+
+
+class RevenueRollup:
+    """Séries de todos os canais + metadados usados pelos endpoints (nome, subnicho, língua)."""
+
+    def __init__(self, series: Dict[str, ChannelRevenueSeries], channels: List[Dict], monitored: List[Dict],
+                 last_real_date: Optional[str], rows: int, build_seconds: float):
+        self.series = series
+        self.channels = channels          # yt_channels com show_monetization_history
+        self.monitored = monitored        # canais_monitorados (nome_canal, subnicho, lingua, tipo)
+        self.last_real_date = last_real_date
+        self.rows = rows
+        self.build_seconds = build_seconds
+        self.built_at = time.time()
+        self._nosso_by_name = {
+            (c.get("nome_canal") or "").lower(): c for c in monitored if c.get("tipo") == "nosso"
+        }
+
+    @property
+    def channel_ids(self) -> List[str]:
+        return [c["channel_id"] for c in self.channels]
+
+    def totals(self, channel_id: str, start, end, real_only: bool = False) -> Dict:
+        series = self.series.get(channel_id)
+        if series is None:
+            return {"revenue": 0.0, "views": 0, "has_estimate": False, "last_date": None}
+        return series.totals(_as_date(start), _as_date(end), real_only)
+
+    def sum_totals(self, channel_ids: List[str], start, end, real_only: bool = False) -> Tuple[float, int]:
+        """(revenue, views) somados de vários canais no período."""
+        revenue, views = 0.0, 0
+        for channel_id in channel_ids:
+            t = self.totals(channel_id, start, end, real_only)
+            revenue += t["revenue"]
+            views += t["views"]
+        return revenue, views
+
+    def revenue_by_date(self, channel_ids: List[str], start, end, real_only: bool = False) -> Dict[str, float]:
+        """Revenue somada por dia (só dias com alguma linha), para melhor/pior dia."""
+        by_date: Dict[str, float] = {}
+        start, end = _as_date(start), _as_date(end)
+        for channel_id in channel_ids:
+            series = self.series.get(channel_id)
+            if series is None:
+                continue
+            for day, revenue, has_row in series.daily(start, end, real_only):
+                if has_row:
+                    by_date[day] = by_date.get(day, 0) + revenue
+        return by_date
+
+    def channel_info(self, channel_name: str, exact: bool = True) -> Optional[Dict]:
+        """
+        Linha de canais_monitorados do canal.
+        exact=True: nome igual entre canais "nosso" (como /channels);
+        exact=False: nome contido, como o ilike '%nome%' dos demais endpoints.
+        """
+        name = (channel_name or "").lower()
+        match = self._nosso_by_name.get(name)
+        if match is not None or exact:
+            return match
+        for canal in self.monitored:
+            if name in (canal.get("nome_canal") or "").lower():
+                return canal
+        return None
+
+    def approx_bytes(self) -> int:
+        """Tamanho contabilizado no orçamento do response_cache (sys.getsizeof não vê as séries)."""
+        return (sum(s.approx_bytes() for s in self.series.values())
+                + estimate_size(self.channels) + estimate_size(self.monitored))
+
+    def stats(self) -> Dict:
+        return {
+            "channels": len(self.series),
+            "approx_kb": round(self.approx_bytes() / 1024, 1),
+            "rows": self.rows,
+            "build_seconds": round(self.build_seconds, 2),
+            "age_seconds": int(time.time() - self.built_at),
+            "last_real_date": self.last_real_date
+        }
+
+
+async def _fetch_all(query_factory) -> List[Dict]:
+    rows, offset = [], 0
+    while True:
+        page = (await run_query(query_factory().range(offset, offset + _PAGE_SIZE - 1))).data or []
+        rows.extend(page)
+        if len(page) < _PAGE_SIZE:
+            return rows
+        offset += _PAGE_SIZE
+
+
+async def build_revenue_rollup(db_client) -> RevenueRollup:
+    """Lê yt_daily_metrics uma vez e monta as séries acumuladas de cada canal."""
+    start = time.monotonic()
+    client = db_client.supabase
+
+    channels = (await run_query(client.table("yt_channels")
+        .select("channel_id, channel_name, is_monetized")
+        .eq("show_monetization_history", True))).data or []
+    monitored = await _fetch_all(lambda: client.table("canais_monitorados")
+        .select("nome_canal, subnicho, lingua, tipo").order("id"))
+    metrics = await _fetch_all(lambda: client.table("yt_daily_metrics")
+        .select("channel_id, date, revenue, views, is_estimate")
+        .order("date").order("channel_id"))
+
+    by_channel: Dict[str, List[Tuple[date, float, int, bool]]] = {}
+    last_real_date = None
+    for row in metrics:
+        day = _as_date(row["date"])
+        is_estimate = bool(row.get("is_estimate"))
+        by_channel.setdefault(row["channel_id"], []).append(
+            (day, row.get("revenue") or 0, row.get("views") or 0, is_estimate)
+        )
+        if not is_estimate and (last_real_date is None or row["date"] > last_real_date):
+            last_real_date = row["date"]
+
+    series = {}
+    for channel_id, rows in by_channel.items():
+        origin = min(r[0] for r in rows)
+        days = (max(r[0] for r in rows) - origin).days + 1
+        series[channel_id] = ChannelRevenueSeries(
+            origin, days, [((d - origin).days, rev, vws, est) for d, rev, vws, est in rows]
+        )
+
+    rollup = RevenueRollup(series, channels, monitored, last_real_date, len(metrics), time.monotonic() - start)
+    logger.info(f"💰 Rollup de receita: {len(series)} canais, {len(metrics)} linhas em {rollup.build_seconds:.1f}s")
+    return rollup
+
+
+async def get_revenue_rollup(db_client) -> RevenueRollup:
+    """Rollup atual (reconstrói se expirou; requests simultâneos compartilham a construção)."""
+    return await response_cache.get_or_compute(_NAMESPACE, _KEY, lambda: build_revenue_rollup(db_client),
+                                               size_of=RevenueRollup.approx_bytes)
+
+
+async def refresh_revenue_rollup(db_client) -> RevenueRollup:
+    """Reconstrói o rollup (chamar depois de gravar yt_daily_metrics)."""
+    rollup = await build_revenue_rollup(db_client)
+    response_cache.set(_NAMESPACE, _KEY, rollup, size=rollup.approx_bytes())
+    return rollup
@@ -21,6 +21,7 @@ from fastapi import APIRouter, HTTPException, BackgroundTasks, Body
 from pydantic import BaseModel
 from typing import Optional
 from database import SupabaseClient
+from response_cache import response_cache
 
 logger = logging.getLogger(__name__)
 
@@ -1013,8 +1014,8 @@ LEVA_2_SUBNICHOS = ["Relatos de Guerra", "Monetizados", "Culturas Macabras", "Hi
 # Leva 3 = filtro dinamico (OAuth configurado + <LEVA3_INSCRITOS_MAX inscritos).
 # NAO usa subnicho, usa lista de canais calculada em runtime.
 LEVA3_INSCRITOS_MAX = 1000
-_leva3_cache: dict = {"at": 0.0, "canais": []}
 LEVA3_CACHE_TTL = 300  # 5 min
+response_cache.register_namespace("shorts_leva3", LEVA3_CACHE_TTL)
 
 # Mapeamento abreviação -> nome completo da lingua
 LINGUA_MAP = {
@@ -1081,20 +1082,25 @@ def _compute_leva3_canais() -> list[dict]:
 
 def _get_leva3_canais(force_refresh: bool = False) -> list[dict]:
     """Retorna canais da Leva 3, com cache de LEVA3_CACHE_TTL segundos."""
-    now = time.time()
-    if (not force_refresh
-        and _leva3_cache["canais"]
-        and (now - _leva3_cache["at"]) < LEVA3_CACHE_TTL):
-        return _leva3_cache["canais"]
+    if not force_refresh:
+        cached = response_cache.get("shorts_leva3", "canais")
+        if cached and cached["canais"]:
+            return cached["canais"]
     try:
         canais = _compute_leva3_canais()
-        _leva3_cache["canais"] = canais
-        _leva3_cache["at"] = now
+        response_cache.set("shorts_leva3", "canais", {"at": time.time(), "canais": canais})
         return canais
     except Exception as e:
         logger.error(f"[leva3] Erro computando: {e}")
         # Se falhou, devolve ultimo cache (mesmo expirado) pra nao derrubar endpoint
-        return _leva3_cache["canais"] or []
+        stale = response_cache.get_entry("shorts_leva3", "canais", allow_stale=True)
+        return stale.value["canais"] if stale else []
+
+
+def _leva3_cached_at() -> float:
+    """Timestamp do ultimo calculo da Leva 3 (0 se nunca calculado)."""
+    entry = response_cache.get_entry("shorts_leva3", "canais", allow_stale=True, count=False)
+    return entry.value["at"] if entry else 0
 
 
 def _get_leva3_canal_names(force_refresh: bool = False) -> list[str]:
@@ -1495,7 +1501,7 @@ async def leva3_channels(refresh: bool = False):
         "count": len(canais),
         "threshold": LEVA3_INSCRITOS_MAX,
         "canais": canais,
-        "cached_at": _leva3_cache.get("at", 0),
+        "cached_at": _leva3_cached_at(),
     }
 
 
@@ -3,6 +3,7 @@
 Modulo de Traducao Otimizado usando GPT-4 Mini
 Data: 04/02/2026
 Atualizado: 18/02/2026 - batch_size=15, max_tokens dinamico, truncamento 500 chars
+Atualizado: 18/10/2026 - sub-batches em paralelo (orcamento TPM) + cache por hash do texto
 Objetivo: Traduzir comentarios usando OpenAI GPT-4 Mini via httpx
 Funciona para todas as linguas -> PT-BR
 """
@@ -12,9 +13,11 @@ import logging
 import os
 import json
 import httpx
-from typing import List
+from typing import List, Optional, Tuple
 from dotenv import load_dotenv
 
+from gpt_pipeline import run_cached_batches, text_hash
+
 logger = logging.getLogger(__name__)
 
 # Carregar variaveis de ambiente
@@ -44,6 +47,10 @@ class OptimizedTranslator:
         """
         Traduz batch de textos para portugues brasileiro usando GPT-4 Mini
 
+        Textos repetidos sao traduzidos uma vez e traducoes ja feitas vem do cache
+        por hash (gpt_pipeline); os sub-batches restantes rodam em paralelo dentro
+        do orcamento de tokens por minuto.
+
         Args:
             texts: Lista de textos para traduzir
 
@@ -53,27 +60,53 @@ class OptimizedTranslator:
         if not texts:
             return []
 
-        translated = []
+        keys = [text_hash(t, self.model) for t in texts]
 
         try:
             async with httpx.AsyncClient(timeout=90.0) as client:
-                # Processar em sub-batches
-                for i in range(0, len(texts), self.batch_size):
-                    sub_batch = texts[i:i + self.batch_size]
+                async def call(sub_batch: List[str]) -> Tuple[List[str], Optional[int]]:
+                    return await self._translate_sub_batch(client, sub_batch)
+
+                translations, failures = await run_cached_batches(
+                    stage="translation",
+                    items=list(zip(keys, texts)),
+                    batch_size=self.batch_size,
+                    call=call,
+                    estimate_tokens=self._estimate_tokens
+                )
+
+            if failures:
+                raise failures[0][1]
+
+            translated = [translations[k] for k in keys]
+            logger.info(f"[TRADUTOR GPT] Total traduzido: {len(translated)} textos")
+            return translated
 
-                    # Truncar textos longos para evitar estourar tokens
-                    truncated_batch = [
-                        t[:MAX_TEXT_LENGTH] + '...' if len(t) > MAX_TEXT_LENGTH else t
-                        for t in sub_batch
-                    ]
+        except Exception as e:
+            logger.error(f"Erro critico no tradutor: {e}")
+            raise
 
-                    # Criar prompt para traducao em batch
-                    comments_json = json.dumps(
-                        [{"id": idx, "text": text} for idx, text in enumerate(truncated_batch)],
-                        ensure_ascii=False
-                    )
+    @staticmethod
+    def _estimate_tokens(sub_batch: List[str]) -> int:
+        """Estimativa para o orcamento TPM: prompt (~4 chars/token) + max_tokens"""
+        chars = sum(min(len(t), MAX_TEXT_LENGTH) for t in sub_batch)
+        return 300 + chars // 4 + len(sub_batch) * 120 + 200
 
-                    system_prompt = """Voce e um tradutor especializado em adaptar textos para portugues brasileiro.
+    async def _translate_sub_batch(self, client: httpx.AsyncClient, sub_batch: List[str]) -> Tuple[List[str], Optional[int]]:
+        """Uma chamada GPT para ate batch_size textos. Retorna (traducoes, tokens usados)."""
+        # Truncar textos longos para evitar estourar tokens
+        truncated_batch = [
+            t[:MAX_TEXT_LENGTH] + '...' if len(t) > MAX_TEXT_LENGTH else t
+            for t in sub_batch
+        ]
+
+        # Criar prompt para traducao em batch
+        comments_json = json.dumps(
+            [{"id": idx, "text": text} for idx, text in enumerate(truncated_batch)],
+            ensure_ascii=False
+        )
+
+        system_prompt = """Voce e um tradutor especializado em adaptar textos para portugues brasileiro.
 
 TAREFA: Traduza os comentarios para PT-BR mantendo o tom e contexto original.
 
@@ -87,89 +120,86 @@ DIRETRIZES:
 FORMATO DE RESPOSTA:
 ["texto traduzido 1", "texto traduzido 2", ...]"""
 
-                    user_prompt = f"Traduza estes comentarios para PT-BR:\n{comments_json}"
-
-                    # max_tokens dinamico: 120 tokens por comentario + 200 buffer
-                    max_tokens = len(sub_batch) * 120 + 200
-
-                    # Payload da requisicao
-                    payload = {
-                        "model": self.model,
-                        "messages": [
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": user_prompt}
-                        ],
-                        "temperature": 0.3,
-                        "max_tokens": max_tokens
-                    }
-
-                    headers = {
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json"
-                    }
-
-                    try:
-                        # Fazer chamada HTTP direta
-                        response = await client.post(
-                            self.api_url,
-                            json=payload,
-                            headers=headers
-                        )
-
-                        if response.status_code != 200:
-                            error_text = response.text
-                            logger.error(f"Erro API OpenAI: {response.status_code} - {error_text}")
-                            raise Exception(f"API OpenAI retornou {response.status_code}: {error_text}")
-
-                        data = response.json()
-
-                        # Verificar truncamento
-                        finish_reason = data["choices"][0].get("finish_reason", "")
-                        if finish_reason != "stop":
-                            logger.warning(f"Resposta truncada (finish_reason={finish_reason}), batch de {len(sub_batch)}")
-                            raise Exception(f"Resposta truncada pelo GPT (finish_reason={finish_reason})")
-
-                        content = data["choices"][0]["message"]["content"].strip()
-
-                        # Tentar fazer parse do JSON
-                        try:
-                            # Limpar possiveis marcadores de codigo
-                            if content.startswith("```"):
-                                content = content.split("```")[1]
-                                if content.startswith("json"):
-                                    content = content[4:]
-
-                            translations = json.loads(content)
-
-                            if isinstance(translations, list):
-                                translated.extend(translations)
-                            else:
-                                logger.error(f"Resposta nao e uma lista: {type(translations)}")
-                                raise Exception(f"Formato inesperado: {type(translations)}")
-
-                        except json.JSONDecodeError as e:
-                            logger.error(f"Erro ao fazer parse do JSON: {e}")
-                            logger.error(f"Conteudo recebido: {content[:500]}")
-                            raise Exception(f"Erro ao parsear resposta: {e}")
-
-                        logger.info(f"[TRADUTOR GPT] Traduzidos {len(sub_batch)} textos")
-
-                        # Pequena pausa entre batches
-                        if i + self.batch_size < len(texts):
-                            await asyncio.sleep(1)
-
-                    except httpx.TimeoutException as e:
-                        logger.error(f"Timeout na chamada OpenAI: {e}")
-                        raise
-                    except Exception as e:
-                        logger.error(f"Erro na chamada GPT-4 Mini: {e}")
-                        raise
+        user_prompt = f"Traduza estes comentarios para PT-BR:\n{comments_json}"
 
-            logger.info(f"[TRADUTOR GPT] Total traduzido: {len(translated)} textos")
-            return translated
+        # max_tokens dinamico: 120 tokens por comentario + 200 buffer
+        max_tokens = len(sub_batch) * 120 + 200
+
+        # Payload da requisicao
+        payload = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            "temperature": 0.3,
+            "max_tokens": max_tokens
+        }
 
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+        try:
+            # Fazer chamada HTTP direta
+            response = await client.post(
+                self.api_url,
+                json=payload,
+                headers=headers
+            )
+
+            if response.status_code != 200:
+                error_text = response.text
+                logger.error(f"Erro API OpenAI: {response.status_code} - {error_text}")
+                raise Exception(f"API OpenAI retornou {response.status_code}: {error_text}")
+
+            data = response.json()
+
+            # Verificar truncamento
+            finish_reason = data["choices"][0].get("finish_reason", "")
+            if finish_reason != "stop":
+                logger.warning(f"Resposta truncada (finish_reason={finish_reason}), batch de {len(sub_batch)}")
+                raise Exception(f"Resposta truncada pelo GPT (finish_reason={finish_reason})")
+
+            content = data["choices"][0]["message"]["content"].strip()
+
+            # Tentar fazer parse do JSON
+            try:
+                # Limpar possiveis marcadores de codigo
+                if content.startswith("```"):
+                    content = content.split("```")[1]
+                    if content.startswith("json"):
+                        content = content[4:]
+
+                translations = json.loads(content)
+
+            except json.JSONDecodeError as e:
+                logger.error(f"Erro ao fazer parse do JSON: {e}")
+                logger.error(f"Conteudo recebido: {content[:500]}")
+                raise Exception(f"Erro ao parsear resposta: {e}")
+
+            if not isinstance(translations, list):
+                logger.error(f"Resposta nao e uma lista: {type(translations)}")
+                raise Exception(f"Formato inesperado: {type(translations)}")
+
+            # Quantidade diferente desalinharia texto e traducao (e o cache por hash)
+            if len(translations) != len(sub_batch):
+                raise Exception(f"GPT retornou {len(translations)} traducoes para {len(sub_batch)} textos")
+
+            # Item null/nao-texto ficaria sem resultado no pipeline: erro do batch inteiro
+            invalid = sum(1 for t in translations if not isinstance(t, str))
+            if invalid:
+                raise Exception(f"GPT retornou {invalid} traducoes invalidas (null/nao-texto) no batch")
+
+            logger.info(f"[TRADUTOR GPT] Traduzidos {len(sub_batch)} textos")
+            return translations, (data.get("usage") or {}).get("total_tokens")
+
+        except httpx.TimeoutException as e:
+            logger.error(f"Timeout na chamada OpenAI: {e}")
+            raise
         except Exception as e:
-            logger.error(f"Erro critico no tradutor: {e}")
+            logger.error(f"Erro na chamada GPT-4 Mini: {e}")
             raise
 
     async def translate_single(self, text: str) -> str:
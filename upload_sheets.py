@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+Leitura das planilhas de upload (Google Sheets) para o DailyUploader
+
+- 1 chamada values:batchGet por planilha (sem open_by_key / get_worksheet):
+  só as colunas usadas (A:C nome/descrição, J:O status/post/data/drive/upload)
+- Watermark por planilha: linhas acima da primeira linha "em aberto" já foram
+  postadas e não são relidas (leitura completa a cada SHEETS_FULL_READ_HOURS)
+- Token bucket no lugar dos sleeps fixos: SHEETS_READS_PER_MINUTE leituras/min
+  (quota "read requests per minute per user"); 429 esvazia o bucket e tenta de novo
+- Chamadas HTTP rodam em thread (asyncio.to_thread), fora do event loop
+
+Retorna linhas no mesmo formato de worksheet.get_all_values() (índices 0..14),
+então _process_cached_data / count_available_videos / SPREADSHEET_CACHE não mudam.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+from gspread.exceptions import APIError
+
+logger = logging.getLogger(__name__)
+
+# Quota de leitura do Sheets por service account (padrão Google: 60/min)
+SHEETS_READS_PER_MINUTE = int(os.environ.get("SHEETS_READS_PER_MINUTE", "60"))
+# Intervalo para reler a planilha inteira (pega edições manuais acima do watermark)
+SHEETS_FULL_READ_HOURS = int(os.environ.get("SHEETS_FULL_READ_HOURS", "6"))
+
+_MAX_RETRIES = 3
+_ROW_WIDTH = 15  # até coluna O
+
+# Colunas lidas -> índice da primeira coluna na linha montada
+_RANGES = (("A", "C", 0), ("J", "O", 9))
+
+
+class SheetsTokenBucket:
+    """
+    Token bucket da quota de leitura: capacidade = leituras/min, reposição contínua.
+
+    acquire() espera só o necessário para o próximo token (sem sleeps fixos);
+    penalize() zera o bucket quando o Google responde 429 (quota real estourada).
+    """
+
+    def __init__(self, reads_per_minute: int):
+        self.capacity = float(max(reads_per_minute, 1))
+        self.rate = self.capacity / 60.0  # tokens por segundo
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.wait_seconds = 0.0
+        self.throttled = 0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, tokens: float = 1.0):
+        # Sem await entre checar e consumir: atômico dentro do event loop
+        started = time.monotonic()
+        while True:
+            now = time.monotonic()
+            self._refill(now)
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                self.wait_seconds += now - started
+                return
+            await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+    def penalize(self):
+        self._refill(time.monotonic())
+        self.tokens = min(self.tokens, 0.0)
+        self.throttled += 1
+
+
+# Bucket único por processo (todas as leituras usam a mesma service account)
+sheets_bucket = SheetsTokenBucket(SHEETS_READS_PER_MINUTE)
+
+# spreadsheet_id -> (primeira linha em aberto, timestamp da última leitura completa)
+_first_open_row: Dict[str, tuple] = {}
+
+
+def _is_closed(row: List[str]) -> bool:
+    """Linha já postada (Post/Published preenchido ou Upload sem erro): não volta a ficar pronta."""
+    post, published_date, upload_status = row[10], row[11], row[14]
+    if post or published_date:
+        return True
+    return bool(upload_status.strip()) and "erro" not in upload_status.lower()
+
+
+def _merge_ranges(value_ranges: List[Dict], start_row: int) -> List[List[str]]:
+    """Junta os ranges lidos em linhas de 15 colunas; linhas antes de start_row ficam vazias."""
+    columns = [vr.get("values", []) for vr in value_ranges]
+    height = max((len(c) for c in columns), default=0)
+
+    merged = []
+    for k in range(height):
+        row = [""] * _ROW_WIDTH
+        for (_, _, offset), values in zip(_RANGES, columns):
+            if k < len(values):
+                cells = values[k]
+                row[offset:offset + len(cells)] = cells
+        merged.append(row[:_ROW_WIDTH])
+
+    # Índice 0 = header, linha N da planilha = índice N-1 (igual get_all_values)
+    header = merged[0] if start_row == 1 and merged else []
+    body = merged[1:] if start_row == 1 else merged
+    return [header] + [[] for _ in range(max(start_row - 2, 0))] + body
+
+
+async def _batch_get(sheets_client, spreadsheet_id: str, ranges: List[str]) -> List[Dict]:
+    for attempt in range(1, _MAX_RETRIES + 1):
+        await sheets_bucket.acquire()
+        try:
+            response = await asyncio.to_thread(
+                sheets_client.http_client.values_batch_get,
+                spreadsheet_id, ranges, {"majorDimension": "ROWS"}
+            )
+            return response.get("valueRanges", [])
+        except APIError as e:
+            if getattr(e, "code", None) != 429 or attempt == _MAX_RETRIES:
+                raise
+            sheets_bucket.penalize()
+            logger.warning(f"⏳ Sheets quota (429) em {spreadsheet_id} - tentativa {attempt}/{_MAX_RETRIES}")
+    return []
+
+
+async def read_upload_rows(sheets_client, spreadsheet_id: str, full: bool = False) -> List[List[str]]:
+    """
+    Linhas da primeira aba no formato de get_all_values() (só colunas A:C e J:O preenchidas).
+
+    Args:
+        sheets_client: Cliente gspread autorizado
+        spreadsheet_id: ID da planilha
+        full: Ignora o watermark e lê desde o header
+    """
+    watermark = _first_open_row.get(spreadsheet_id)
+    expired = watermark is None or time.time() - watermark[1] > SHEETS_FULL_READ_HOURS * 3600
+    start_row = 1 if full or expired else watermark[0]
+
+    ranges = [f"{first}{start_row}:{last}" for first, last, _ in _RANGES]
+    all_values = _merge_ranges(await _batch_get(sheets_client, spreadsheet_id, ranges), start_row)
+
+    # Próxima leitura começa na primeira linha ainda em aberto (ou logo após a última)
+    first_open = len(all_values) + 1
+    for i, row in enumerate(all_values[1:], start=2):
+        if row and not _is_closed(row):
+            first_open = i
+            break
+    full_read_at = time.time() if start_row == 1 else watermark[1]
+    _first_open_row[spreadsheet_id] = (max(first_open, 2), full_read_at)
+
+    return all_values
+
+
+def reset_watermark(spreadsheet_id: Optional[str] = None):
+    """Força leitura completa na próxima consulta (uma planilha ou todas)."""
+    if spreadsheet_id is None:
+        _first_open_row.clear()
+    else:
+        _first_open_row.pop(spreadsheet_id, None)
+
+
+def get_sheets_stats() -> Dict:
+    return {
+        "reads_per_minute": SHEETS_READS_PER_MINUTE,
+        "tokens_available": round(sheets_bucket.tokens, 1),
+        "wait_seconds": round(sheets_bucket.wait_seconds, 1),
+        "throttled": sheets_bucket.throttled,
+        "watermarks": len(_first_open_row)
+    }